@@ -0,0 +1,76 @@
+"""
+Concurrent execution of the calls made to other services, with a bounded number of worker threads.
+
+Worker threads do not share the database connection, nor the transaction, of the calling thread. Within a
+transaction, only the calls to other services should run in the worker threads, and database queries and updates
+must stay in the calling thread.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import crum
+from django.db import connections
+from threadlocals.threadlocals import get_current_request, set_thread_variable
+
+logger = logging.getLogger(__name__)
+
+
+def bind_current_request(func):
+    """
+    Return a function calling func in a worker thread with the request of the calling thread, and closing the
+    database connections opened by the worker thread.
+    """
+    request = crum.get_current_request()
+    threadlocals_request = get_current_request()
+
+    def call(*args, **kwargs):
+        crum.set_current_request(request)
+        set_thread_variable('request', threadlocals_request)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            crum.set_current_request(None)
+            set_thread_variable('request', None)
+            connections.close_all()
+
+    return call
+
+
+def run_concurrently(func, items, max_workers, thread_name_prefix='concurrent'):
+    """
+    Call a function for every item, with a bounded number of worker threads.
+
+    The worker threads see the current request of the calling thread. Exceptions raised by the function are
+    returned instead of being raised, so that the outcome of every item can be reported.
+
+    Args:
+        func (callable): Function called with every item.
+        items (iterable): Items to call the function with.
+        max_workers (int): Maximum number of threads.
+        thread_name_prefix (str): Prefix of the names of the worker threads.
+
+    Returns:
+        List of (item, result, exception) tuples, in the order of the items.
+    """
+    items = list(items)
+    max_workers = min(max_workers, len(items))
+
+    if max_workers <= 1:
+        outcomes = []
+        for item in items:
+            try:
+                outcomes.append((item, func(item), None))
+            except Exception as exc:  # pylint: disable=broad-except
+                outcomes.append((item, None, exc))
+        return outcomes
+
+    logger.debug('Running %d %s calls with %d workers.', len(items), thread_name_prefix, max_workers)
+    call = bind_current_request(func)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix) as executor:
+        futures = [executor.submit(call, item) for item in items]
+
+    outcomes = []
+    for item, future in zip(items, futures):
+        exc = future.exception()
+        outcomes.append((item, None if exc else future.result(), exc))
+    return outcomes
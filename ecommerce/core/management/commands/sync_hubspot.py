@@ -1,5 +1,10 @@
 """
 Django management command to Sync Product, Orders and Lines to Hubspot server.
+
+Every site keeps the date its baskets have been synced until. Each run syncs the baskets created or submitted since
+that date, or since --initial-sync-days days ago on the first run, up to the start of the current day, and moves the
+date forward once all of them have been synced, so days missed by failed runs are synced by the next one. Only
+complete days are synced, so baskets still being filled in today are synced with all their lines.
 """
 
 
@@ -12,11 +17,15 @@ from decimal import Decimal as D
 
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import Q
+from django.db.models import Prefetch, Q
+from django.utils.timezone import now
 from edx_rest_api_client.client import EdxRestApiClient
 from oscar.core.loading import get_class, get_model
+from requests.exceptions import ConnectionError as ReqConnectionError
+from requests.exceptions import Timeout
 from slumber.exceptions import HttpClientError, HttpServerError
 
+from ecommerce.core.concurrency import run_concurrently
 from ecommerce.extensions.fulfillment.status import ORDER
 
 Basket = get_model('basket', 'Basket')
@@ -31,6 +40,9 @@ logger = logging.getLogger(__name__)
 
 
 DEFAULT_INITIAL_DAYS = 1
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 2
 HUBSPOT_API_BASE_URL = 'https://api.hubapi.com'
 HUBSPOT_ECOMMERCE_SETTINGS = {
     'enabled': True,
@@ -173,11 +185,16 @@ PRODUCT = "PRODUCT"
 LINE_ITEM = "LINE_ITEM"
 DEAL = "DEAL"
 BATCH_SIZE = 200
+# Object types synced in the same phase do not reference each other, so their batches are uploaded concurrently.
+# Deals reference contacts, and line items reference deals and products, so they are synced after them.
+SYNC_PHASES = ((CONTACT, PRODUCT), (DEAL,), (LINE_ITEM,))
 
 
 class Command(BaseCommand):
     help = 'Sync Product, Orders and Lines to Hubspot server.'
     initial_sync_days = None
+    workers = DEFAULT_WORKERS
+    max_retries = DEFAULT_MAX_RETRIES
 
     def _get_hubspot_enable_sites(self):
         """
@@ -265,7 +282,7 @@ class Command(BaseCommand):
     def _get_carts_extra_properties(self, cart):
         total_price = D(0.0)
         description = ''
-        lines = cart.all_lines()
+        lines = cart.lines.all()
         for line in lines:
             total_price += self._get_cart_line_prices(line, 'price_incl_tax')
             description += self._get_cart_line_information(line)
@@ -286,27 +303,43 @@ class Command(BaseCommand):
             'Quantity': line.quantity
         })
 
+    def _iter_queryset_chunks(self, queryset, chunk_size=BATCH_SIZE):
+        """
+        Yields the objects of queryset in chunks ordered by primary key, so that the
+        related objects it prefetches are only loaded for a chunk at a time.
+        """
+        last_pk = None
+        while True:
+            chunk = queryset.order_by('pk')
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            chunk = list(chunk[:chunk_size])
+            if not chunk:
+                return
+            for obj in chunk:
+                yield obj
+            last_pk = chunk[-1].pk
+
     def _get_hubspot_contact_structure(self, users):
         """
-        Returns list of dicts, each dict represents hubspot CONTACT.
+        Yields dicts, each dict represents hubspot CONTACT.
         """
-        hubspot_contacts = []
         for user in users:
-            hubspot_contacts.append({
+            yield {
                 'integratorObjectId': str(user.id),
                 'action': 'UPSERT',
                 'changeOccurredTimestamp': self._get_timestamp(),
                 'propertyNameToValues': {
                     'email': user.email
                 }
-            })
-        return hubspot_contacts
+            }
 
     def _get_hubspot_deal_structure(self, carts, partner):
         """
-        Returns list of dicts, each dict represents hubspot DEAL.
+        Yields dicts, each dict represents hubspot DEAL.
+
+        Carts are expected to have their lines and orders prefetched.
         """
-        hubspot_deals = []
         for cart in carts:
             deal = {
                 'integratorObjectId': str(cart.id),
@@ -315,8 +348,9 @@ class Command(BaseCommand):
                 'propertyNameToValues': {}
             }
             total_price, description = self._get_carts_extra_properties(cart)
-            if cart.status == Basket.SUBMITTED:
-                order = Order.objects.filter(basket=cart).first()
+            orders = cart.order_set.all()
+            order = orders[0] if orders else None
+            if cart.status == Basket.SUBMITTED and order:
                 deal['propertyNameToValues'] = {
                     'deal_name': order.number,
                     'total_incl_tax': float(order.total_incl_tax),
@@ -333,44 +367,40 @@ class Command(BaseCommand):
                     'user_id': str(cart.owner.id) if cart.owner else ''
                 }
             deal['propertyNameToValues']['description'] = description
-            hubspot_deals.append(deal)
-        return hubspot_deals
+            yield deal
 
     def _get_hubspot_line_item_structure(self, lines):
         """
-        Returns list of dicts, each dict represents hubspot LINE_ITEM.
+        Yields dicts, each dict represents hubspot LINE_ITEM.
         """
-        hubspot_line_items = []
         for line in lines:
             line_price_incl_tax = self._get_cart_line_prices(line, 'price_incl_tax')
             line_price_excl_tax = self._get_cart_line_prices(line, 'price_excl_tax')
-            hubspot_line_items.append({
+            yield {
                 'integratorObjectId': str(line.id),
                 'action': 'UPSERT',
                 'changeOccurredTimestamp': self._get_timestamp(),
                 'propertyNameToValues': {
-                    'order_id': str(line.basket.id),
+                    'order_id': str(line.basket_id),
                     'price_currency': str(line.price_currency),
                     'tax': float(line_price_incl_tax - line_price_excl_tax),
-                    'product_id': str(line.product.id),
+                    'product_id': str(line.product_id),
                     'price_incl_tax': float(line_price_incl_tax),
                     'price_excl_tax': float(line_price_excl_tax),
                     'quantity': line.quantity
                 }
-            })
-        return hubspot_line_items
+            }
 
     def _get_hubspot_product_structure(self, products):
         """
-        Returns list of dicts, each dict represents hubspot PRODUCT.
+        Yields dicts, each dict represents hubspot PRODUCT.
         """
-        hubspot_products = []
         for product in products:
             if product.description:
                 description = product.description
             else:
                 description = product.course.id if product.course else ''
-            hubspot_products.append({
+            yield {
                 'integratorObjectId': str(product.id),
                 'action': 'UPSERT',
                 'changeOccurredTimestamp': self._get_timestamp(),
@@ -378,27 +408,46 @@ class Command(BaseCommand):
                     'title': str(product.title),
                     'description': description
                 }
-            })
-        return hubspot_products
+            }
 
-    def _upsert_hubspot_objects(self, object_type, objects, site_configuration):
+    def _iter_batches(self, object_type, objects):
         """
-        Calls the sync message endpoint on given objects (PRODUCT, DEAL
-        and LINE_ITEM) and each request can has 200 (BATCH_SIZE) objects.
+        Yields (object_type, start, batch) tuples, each batch having up to 200 (BATCH_SIZE) objects.
         """
-        try:
-            total = len(objects)
-            for start in range(0, total, BATCH_SIZE):
-                batch = objects[start:start + BATCH_SIZE]
-                self.stdout.write(
-                    'Syncing {object_type}s batch from {start} to {end} of total: {total} for site {site}'.format(
-                        object_type=object_type,
-                        start=start,
-                        end=start + BATCH_SIZE,
-                        total=total,
-                        site=site_configuration.site.domain
-                    )
-                )
+        batch = []
+        start = 0
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == BATCH_SIZE:
+                yield object_type, start, batch
+                start += BATCH_SIZE
+                batch = []
+        if batch:
+            yield object_type, start, batch
+
+    def _is_retryable(self, ex):
+        """
+        Returns True for server errors, rate limiting and connection errors.
+        """
+        if isinstance(ex, HttpClientError):
+            response = getattr(ex, 'response', None)
+            return response is not None and response.status_code == 429
+        return isinstance(ex, (HttpServerError, ReqConnectionError, Timeout))
+
+    def _upsert_hubspot_batch(self, object_type, start, batch, site_configuration):
+        """
+        Calls the sync message endpoint on a batch of objects, retrying
+        retryable errors with an exponential backoff.
+        """
+        end = start + len(batch)
+        self.stdout.write(
+            'Syncing {object_type}s batch from {start} to {end} for site {site}'.format(
+                object_type=object_type, start=start, end=end, site=site_configuration.site.domain
+            )
+        )
+        attempt = 0
+        while True:
+            try:
                 self._hubspot_endpoint(
                     object_type,
                     'extensions/ecomm/v1/sync-messages/',
@@ -406,22 +455,58 @@ class Command(BaseCommand):
                     body=batch,
                     hapikey=site_configuration.hubspot_secret_key
                 )
-                self.stdout.write(
-                    'Successfully synced {object_type}s batch from {start} to {end} of total: '
-                    '{total} for site {site}'.format(
-                        object_type=object_type,
-                        start=start,
-                        end=start + BATCH_SIZE,
-                        total=total,
-                        site=site_configuration.site.domain
-                    )
-                )
-        except (HttpClientError, HttpServerError) as ex:
-            self.stderr.write(
-                'An error occurred while upserting {object_type} for site {site}: {message}'.format(
-                    object_type=object_type, site=site_configuration.site.domain, message=ex
+                break
+            except (HttpClientError, HttpServerError, ReqConnectionError, Timeout) as ex:
+                if attempt >= self.max_retries or not self._is_retryable(ex):
+                    raise
+                delay = RETRY_BACKOFF_SECONDS * 2 ** attempt
+                attempt += 1
+                logger.warning(
+                    'Retrying %ss batch from %d to %d for site %s in %d seconds: %s',
+                    object_type, start, end, site_configuration.site.domain, delay, ex
                 )
+                time.sleep(delay)
+        self.stdout.write(
+            'Successfully synced {object_type}s batch from {start} to {end} for site {site}'.format(
+                object_type=object_type, start=start, end=end, site=site_configuration.site.domain
             )
+        )
+
+    def _upsert_hubspot_objects(self, objects_by_type, site_configuration):
+        """
+        Calls the sync message endpoint on given objects (CONTACT, PRODUCT, DEAL
+        and LINE_ITEM) by object type, and each request can has 200 (BATCH_SIZE) objects.
+
+        Up to `workers` batches are built and uploaded concurrently at a time, so
+        only these batches are held in memory. Returns True if all batches were synced.
+        """
+        batches = (
+            batch
+            for object_type, objects in objects_by_type
+            for batch in self._iter_batches(object_type, objects)
+        )
+
+        def upsert(batch):
+            object_type, start, objects = batch
+            self._upsert_hubspot_batch(object_type, start, objects, site_configuration)
+
+        success = True
+        while True:
+            # Batches are built in the calling thread, the worker threads only upload them.
+            window = [batch for __, batch in zip(range(self.workers), batches)]
+            if not window:
+                return success
+            for batch, __, ex in run_concurrently(upsert, window, max_workers=self.workers):
+                if ex is None:
+                    continue
+                if not isinstance(ex, (HttpClientError, HttpServerError, ReqConnectionError, Timeout)):
+                    raise ex
+                success = False
+                self.stderr.write(
+                    'An error occurred while upserting {object_type} for site {site}: {message}'.format(
+                        object_type=batch[0], site=site_configuration.site.domain, message=ex
+                    )
+                )
 
     def _call_sync_errors_messages_endpoint(self, site_configuration):
         """
@@ -450,12 +535,28 @@ class Command(BaseCommand):
                 )
             )
 
-    def _get_unsynced_carts(self, site_configuration):
+    def _get_sync_start(self, site_configuration):
+        """
+        Returns the date the baskets of the site have been synced until, or the start
+        of the day --initial-sync-days days ago if they have never been synced.
+        """
+        if site_configuration.hubspot_synced_until:
+            return site_configuration.hubspot_synced_until
+        return self._get_sync_end() - timedelta(self.initial_sync_days)
+
+    def _get_sync_end(self):
+        """
+        Returns the start of the current day, the baskets of the current day are synced once the day is over.
+        """
+        return now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def _get_unsynced_carts(self, site_configuration, until):
         carts = Basket.objects.filter(site=site_configuration.site, lines__isnull=False)
-        start_date = datetime.now().date() - timedelta(self.initial_sync_days)
+        start_date = self._get_sync_start(site_configuration)
         unsynced_carts = carts.filter(
-            Q(date_created__date=start_date) | Q(date_submitted__date=start_date)
-        )
+            Q(date_created__gte=start_date, date_created__lt=until) |
+            Q(date_submitted__gte=start_date, date_submitted__lt=until)
+        ).distinct()
         self.stdout.write(
             'Pulled unsynced carts for site {site} from {start_date} and total count is total: {count}'.format(
                 site=site_configuration.site.domain, start_date=start_date, count=unsynced_carts.count()
@@ -465,39 +566,50 @@ class Command(BaseCommand):
 
     def _sync_data(self, site_configuration):
         """
-        Create lists of Order, OrderLine and Product objects and
-        call upsert(PUT) sync-messages endpoint for each objects.
+        Stream Order, OrderLine and Product objects and call upsert(PUT)
+        sync-messages endpoint for each objects.
+
+        The date the site is synced until is moved forward once all objects are synced.
         """
-        unsynced_carts = self._get_unsynced_carts(site_configuration)
-        if unsynced_carts:
+        until = self._get_sync_end()
+        unsynced_carts = self._get_unsynced_carts(site_configuration, until)
+        if unsynced_carts is not None and unsynced_carts.exists():
             # we need to exclude the CartLines without product
             # because product is required in hubspot for LINE_ITEM.
             unsynced_cart_lines = CartLine.objects.filter(basket__in=unsynced_carts).exclude(product=None)
-            unsynced_products = Product.objects.filter(basket_lines__in=unsynced_cart_lines)
-            unsynced_users = User.objects.filter(baskets__in=unsynced_carts)
-            self._upsert_hubspot_objects(
-                CONTACT,
-                self._get_hubspot_contact_structure(unsynced_users),
-                site_configuration
-            )
-            self._upsert_hubspot_objects(
-                PRODUCT,
-                self._get_hubspot_product_structure(unsynced_products),
-                site_configuration
-            )
-            self._upsert_hubspot_objects(
-                DEAL,
-                self._get_hubspot_deal_structure(unsynced_carts, site_configuration.partner),
-                site_configuration
-            )
-            self._upsert_hubspot_objects(
-                LINE_ITEM,
-                self._get_hubspot_line_item_structure(unsynced_cart_lines),
-                site_configuration
+            unsynced_products = Product.objects.filter(
+                basket_lines__in=unsynced_cart_lines
+            ).select_related('course').distinct()
+            unsynced_users = User.objects.filter(baskets__in=unsynced_carts).distinct()
+            unsynced_deals = unsynced_carts.select_related('owner').prefetch_related(
+                Prefetch('lines', queryset=CartLine.objects.select_related('product__course').order_by('pk')),
+                Prefetch('order_set', queryset=Order.objects.select_related('user')),
             )
+            structures = {
+                CONTACT: lambda: self._get_hubspot_contact_structure(unsynced_users.iterator()),
+                PRODUCT: lambda: self._get_hubspot_product_structure(unsynced_products.iterator()),
+                DEAL: lambda: self._get_hubspot_deal_structure(
+                    self._iter_queryset_chunks(unsynced_deals), site_configuration.partner
+                ),
+                LINE_ITEM: lambda: self._get_hubspot_line_item_structure(unsynced_cart_lines.iterator()),
+            }
+            synced = True
+            for phase in SYNC_PHASES:
+                objects_by_type = ((object_type, structures[object_type]()) for object_type in phase)
+                synced = self._upsert_hubspot_objects(objects_by_type, site_configuration) and synced
+            if not synced:
+                self.stderr.write(
+                    'Some objects could not be synced for site {site}, they will be synced again on the next '
+                    'run'.format(site=site_configuration.site.domain)
+                )
+                return
         else:
             self.stdout.write('No data found to sync for site {site}'.format(site=site_configuration.site.domain))
 
+        # update() does not clear the site configuration cache, as save() does
+        SiteConfiguration.objects.filter(pk=site_configuration.pk).update(hubspot_synced_until=until)
+        site_configuration.hubspot_synced_until = until
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--initial-sync-days',
@@ -506,12 +618,28 @@ class Command(BaseCommand):
             type=int,
             help='Number of days before today to start initial sync',
         )
+        parser.add_argument(
+            '--workers',
+            default=DEFAULT_WORKERS,
+            dest='workers',
+            type=int,
+            help='Number of batches uploaded concurrently',
+        )
+        parser.add_argument(
+            '--max-retries',
+            default=DEFAULT_MAX_RETRIES,
+            dest='max_retries',
+            type=int,
+            help='Number of times a batch is retried after a server, rate limit or connection error',
+        )
 
     def handle(self, *args, **options):
         """
         Main command handler.
         """
         self.initial_sync_days = options['initial_sync_days']
+        self.workers = max(options['workers'], 1)
+        self.max_retries = options['max_retries']
         try:
             site_configurations = self._get_hubspot_enable_sites()
             if not site_configurations:
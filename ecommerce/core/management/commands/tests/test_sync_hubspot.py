@@ -8,9 +8,10 @@ from io import StringIO
 
 from django.core.management import call_command
 from django.core.management.base import CommandError
+from django.utils.timezone import now
 from factory.django import get_model
 from mock import patch
-from slumber.exceptions import HttpClientError
+from slumber.exceptions import HttpClientError, HttpServerError
 
 from ecommerce.core.management.commands.sync_hubspot import Command as sync_command
 from ecommerce.extensions.test.factories import create_basket, create_order
@@ -207,6 +208,73 @@ class TestSyncHubspotCommand(TestCase):
             self.assertIn('Successfully installed hubspot ecommerce bridge', output)
             self.assertIn('Successfully defined the hubspot ecommerce settings', output)
 
+    @patch.object(sync_command, '_hubspot_endpoint')
+    def test_synced_until(self, mocked_hubspot):
+        """
+        Test the baskets are synced until the start of the current day, and the baskets of the current day are
+        synced once the day is over.
+        """
+        with patch.object(sync_command, '_install_hubspot_ecommerce_bridge', return_value=True), \
+                patch.object(sync_command, '_define_hubspot_ecommerce_settings', return_value=True):
+            self._get_command_output()
+            # contacts, products, deals, line items and sync errors
+            self.assertEqual(mocked_hubspot.call_count, 5)
+            self.hubspot_site_configuration.refresh_from_db()
+            start_of_today = now().replace(hour=0, minute=0, second=0, microsecond=0)
+            self.assertEqual(self.hubspot_site_configuration.hubspot_synced_until, start_of_today)
+
+            mocked_hubspot.reset_mock()
+            basket = create_basket(site=self.hubspot_site_configuration.site)
+            output = self._get_command_output()
+            self.assertIn('No data found to sync', output)
+            self.assertEqual(mocked_hubspot.call_count, 1)
+            self.hubspot_site_configuration.refresh_from_db()
+            self.assertEqual(self.hubspot_site_configuration.hubspot_synced_until, start_of_today)
+
+            mocked_hubspot.reset_mock()
+            tomorrow = now() + timedelta(days=1)
+            with patch('ecommerce.core.management.commands.sync_hubspot.now', return_value=tomorrow):
+                self._get_command_output()
+            deals = [call[1]['body'] for call in mocked_hubspot.call_args_list if call[0][0] == 'DEAL']
+            self.assertEqual([[deal['integratorObjectId'] for deal in body] for body in deals], [[str(basket.id)]])
+            self.hubspot_site_configuration.refresh_from_db()
+            self.assertEqual(self.hubspot_site_configuration.hubspot_synced_until, start_of_today + timedelta(days=1))
+
+    @patch.object(sync_command, '_hubspot_endpoint')
+    def test_synced_until_with_errors(self, mocked_hubspot):
+        """
+        Test the synced until date is not moved forward when objects fail to sync.
+        """
+        with patch.object(sync_command, '_install_hubspot_ecommerce_bridge', return_value=True), \
+                patch.object(sync_command, '_define_hubspot_ecommerce_settings', return_value=True):
+            mocked_hubspot.side_effect = HttpClientError
+            output = self._get_command_output(is_stderr=True)
+            self.assertIn('they will be synced again on the next run', output)
+            self.hubspot_site_configuration.refresh_from_db()
+            self.assertIsNone(self.hubspot_site_configuration.hubspot_synced_until)
+
+    @patch('ecommerce.core.management.commands.sync_hubspot.time.sleep')
+    @patch.object(sync_command, '_hubspot_endpoint')
+    def test_upsert_retry(self, mocked_hubspot, mocked_sleep):
+        """
+        Test batches are retried with an exponential backoff after server errors.
+        """
+        with patch.object(sync_command, '_install_hubspot_ecommerce_bridge', return_value=True), \
+                patch.object(sync_command, '_define_hubspot_ecommerce_settings', return_value=True), \
+                patch.object(sync_command, '_call_sync_errors_messages_endpoint'):
+            errors = [HttpServerError, HttpServerError]
+
+            def endpoint(hubspot_object, *args, **kwargs):     # pylint: disable=unused-argument
+                if hubspot_object == 'CONTACT' and errors:
+                    raise errors.pop()
+                return {}
+
+            mocked_hubspot.side_effect = endpoint
+            self._get_command_output()
+            self.assertEqual([call[0][0] for call in mocked_sleep.call_args_list], [2, 4])
+            self.hubspot_site_configuration.refresh_from_db()
+            self.assertIsNotNone(self.hubspot_site_configuration.hubspot_synced_until)
+
     @patch.object(sync_command, '_hubspot_endpoint')
     def test_with_exception(self, mocked_hubspot):      # pylint: disable=unused-argument
         """
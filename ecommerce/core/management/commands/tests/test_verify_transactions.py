@@ -9,6 +9,8 @@ import ddt
 import pytz
 from django.core.management import call_command
 from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from oscar.core.loading import get_class, get_model
 from oscar.test.factories import OrderFactory, OrderLineFactory, ProductFactory
 
@@ -252,3 +254,60 @@ class VerifyTransactionsTest(TestCase):
         self.assertIn(str(refund.id), exception)
         self.assertIn('"amount": 90.0', exception)
         self.assertIn('"amount": 100.0', exception)
+
+    def test_refund_without_payment(self):
+        """ Test verify_transactions flags refunds made for orders without payments """
+        refund = PaymentEventFactory(order=self.order,
+                                     amount=90,
+                                     event_type_id=self.refundevent.id,
+                                     date_created=self.timestamp)
+        refund.save()
+        with self.assertRaises(CommandError) as cm:
+            call_command('verify_transactions')
+        exception = str(cm.exception)
+        self.assertIn("The following orders had excessive refunds", exception)
+        self.assertIn(str(refund.id), exception)
+
+    def test_no_payment_for_child_product_order(self):
+        """ Verify orders of child products are checked against the product class of their parent """
+        parent = ProductFactory(
+            product_class=self.seat_product_class,
+            structure='parent',
+            categories=None,
+            stockrecords__partner=self.product.stockrecords.first().partner
+        )
+        self.product.product_class = None
+        self.product.structure = 'child'
+        self.product.parent = parent
+        self.product.save()
+
+        with self.assertRaises(CommandError) as cm:
+            call_command('verify_transactions')
+        self.assertIn("The following orders are without payments", str(cm.exception))
+
+    def test_chunks(self):
+        """ Verify orders are verified in chunks, with a number of queries that does not depend on the orders """
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                call_command('verify_transactions', '--chunk-size=2', '--threshold=100')
+            return len(queries)
+
+        for i in range(3):
+            order = OrderFactory(total_incl_tax=50 + i, date_placed=self.timestamp)
+            order.save()
+            OrderLineFactory(order=order, product=self.product, partner_sku='test_sku')
+            PaymentEventFactory(order=order, amount=50 + i, event_type_id=self.payevent.id)
+        initial_query_count = count_queries()
+
+        for i in range(2):
+            order = OrderFactory(total_incl_tax=100, date_placed=self.timestamp)
+            order.save()
+            OrderLineFactory(order=order, product=self.product, partner_sku='test_sku')
+            PaymentEventFactory(order=order, amount=100, event_type_id=self.payevent.id)
+            PaymentEventFactory(order=order, amount=100, event_type_id=self.payevent.id)
+
+        with self.assertRaises(CommandError) as cm:
+            call_command('verify_transactions', '--chunk-size=2')
+        self.assertIn("The following orders had multiple payments", str(cm.exception))
+        # The two new orders fill one more chunk, and the payment events of their errors are fetched at once.
+        self.assertEqual(count_queries(), initial_query_count + 4)
@@ -12,6 +12,12 @@ PaymentEvent amount is different from the order amount, then the order
 id and relevant payment information is logged in a list associated with
 each of these scenarios.
 
+Orders are verified in chunks of --chunk-size orders. The payment totals, refund
+totals and payment counts of a chunk are computed with a grouped query over
+PaymentEvent, and the orders that require a payment with a single query over Line,
+so the number of queries does not depend on the number of orders. The payment
+events are only fetched for the orders with errors.
+
 After considering each order in the time window the errors are input into the
 exit_errors dictionary. If any errors exist at the end of the script a
 CommandError is raised and the dictionary is printed as a string log.
@@ -29,16 +35,18 @@ Example output:
 import datetime
 import json
 import logging
+from collections import defaultdict
 
 import pytz
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import Sum
+from django.db.models import Count, Min, Q, Sum
 from oscar.core.loading import get_class, get_model
 
 from ecommerce.core.constants import COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME, SEAT_PRODUCT_CLASS_NAME
 from ecommerce.core.utils import use_read_replica_if_available
 
 logger = logging.getLogger(__name__)
+Line = get_model('order', 'Line')
 Order = get_model('order', 'Order')
 PaymentEvent = get_model('order', 'PaymentEvent')
 PaymentEventType = get_model('order', 'PaymentEventType')
@@ -46,9 +54,19 @@ PaymentEventTypeName = get_class('order.constants', 'PaymentEventTypeName')
 
 DEFAULT_START_DELTA_TIME = 240
 DEFAULT_END_DELTA_TIME = 60
+DEFAULT_CHUNK_SIZE = 1000
 VALID_PRODUCT_CLASS_NAMES = [SEAT_PRODUCT_CLASS_NAME, COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME]
 
 
+class PaymentSummary:
+    """ Number, total and first id of the payment events of one type made for an order. """
+
+    def __init__(self, count=0, total=None, first_id=None):
+        self.count = count
+        self.total = total
+        self.first_id = first_id
+
+
 class Command(BaseCommand):
     ERRORS_DICT = None
     PAID_EVENT_TYPE = None
@@ -84,6 +102,13 @@ class Command(BaseCommand):
             action='store_true',
             help='Mismatched orders to go to Support'
         )
+        parser.add_argument(
+            '--chunk-size',
+            action='store',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Number of orders verified at once.'
+        )
 
     def handle(self, *args, **options):
         logger.info("Verify transactions with options: %r", options)
@@ -96,40 +121,97 @@ class Command(BaseCommand):
         start_delta = options['start_delta']
         end_delta = options['end_delta']
         threshold = max(options['threshold'], 0)
+        chunk_size = max(options['chunk_size'], 1)
 
         start = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=start_delta)
         end = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=end_delta)
         logger.info("Start time: %s  --  End time: %s", start, end)
 
         orders = use_read_replica_if_available(Order.objects.all()
-                                               .filter(date_placed__gte=start, date_placed__lt=end)
-                                               .prefetch_related('payment_events__event_type'))
-        logger.info("Number of orders to verify: %s", orders.count())
-        if orders.count() == 0:
+                                               .filter(date_placed__gte=start, date_placed__lt=end))
+        order_count = orders.count()
+        logger.info("Number of orders to verify: %s", order_count)
+        if order_count == 0:
             logger.info("No orders, DONE")
             return
 
+        order_chunks = self.iter_order_chunks(orders, chunk_size)
         if support:
-            self.handle_support(orders)
+            self.handle_support(order_chunks, order_count)
         else:
-            self.handle_alert(orders, threshold)
+            self.handle_alert(order_chunks, order_count, threshold)
+
+    def iter_order_chunks(self, orders, chunk_size):
+        """
+        Yield the orders in chunks of `chunk_size` orders, ordered by id.
+
+        Each chunk is fetched with its own query, so long time windows are never loaded at once.
+        """
+        orders = orders.only('id', 'number', 'total_incl_tax', 'guest_email').order_by('id')
+        last_id = 0
+        while True:
+            chunk = list(orders.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1].id
+
+    def get_payment_summaries(self, order_ids):
+        """
+        Return the summaries of the payments and refunds made for the orders, computed with a single grouped query.
+
+        Returns:
+            dict: (order id, event type id) to PaymentSummary. Orders without events of a type are left out.
+        """
+        summaries = use_read_replica_if_available(
+            PaymentEvent.objects.filter(
+                order_id__in=order_ids,
+                event_type__in=(self.PAID_EVENT_TYPE, self.REFUNDED_EVENT_TYPE),
+            ).values('order_id', 'event_type_id').annotate(
+                count=Count('id'), total=Sum('amount'), first_id=Min('id')
+            ).order_by()
+        )
+        return {
+            (summary['order_id'], summary['event_type_id']): PaymentSummary(
+                summary['count'], summary['total'], summary['first_id']
+            )
+            for summary in summaries
+        }
+
+    def get_payment_events(self, order_ids):
+        """
+        Return the payments and refunds made for the orders.
+
+        Returns:
+            dict: (order id, event type id) to list of PaymentEvent.
+        """
+        payment_events = defaultdict(list)
+        events = use_read_replica_if_available(
+            PaymentEvent.objects.filter(
+                order_id__in=order_ids,
+                event_type__in=(self.PAID_EVENT_TYPE, self.REFUNDED_EVENT_TYPE),
+            ).select_related('event_type')
+        )
+        for event in events:
+            payment_events[(event.order_id, event.event_type_id)].append(event)
+        return payment_events
 
-    def process_errors(self, orders):
+    def process_errors(self, order_count):
         # FIXME: it is possible for an order to have more than one error, so this really should
         # count "unique orders with errors", not number of errors
         error_count = sum([len(v["errors"]) for v in self.ERRORS_DICT.values()])
         exit_errors = json.dumps(self.ERRORS_DICT)
-        error_rate = float(error_count) / orders.count()
+        error_rate = float(error_count) / order_count
 
         logger.info("Summary: %d errors, %.1f %%", error_count, error_rate * 100.0)
 
         return error_count, exit_errors, error_rate
 
-    def handle_alert(self, orders, threshold):
-        for order in orders:
-            self.validate_order(order)
+    def handle_alert(self, order_chunks, order_count, threshold):
+        for orders in order_chunks:
+            self.validate_orders(orders)
 
-        error_count, exit_errors, error_rate = self.process_errors(orders)
+        error_count, exit_errors, error_rate = self.process_errors(order_count)
 
         if threshold == 0 or threshold >= 1:
             threshold = int(threshold)
@@ -142,80 +224,107 @@ class Command(BaseCommand):
         if self.ERRORS_DICT:
             logger.warning("Errors in transactions within threshold (%r): %s", threshold, exit_errors)
 
-    def handle_support(self, orders):
-        for order in orders:
-            all_payment_events = order.payment_events
-            payments = all_payment_events.filter(event_type=self.PAID_EVENT_TYPE)
-
-            # If the payment total and the order total do not match, flag for review.
-            if payments.count() == 1 and payments[0].amount != order.total_incl_tax:
-                mismatch_total = float(payments[0].amount - order.total_incl_tax)
-                # FIXME: validate_order should be changed to log _all_ errors related to an order
-                # If payment amount > order amount, a refund is required from Support
-                if mismatch_total > 0:
-                    error_dict = {
-                        "order_number": order.number,
-                        "order_id": order.id,
-                        "order_amount": float(order.total_incl_tax),
-                        # Assuming just one payment since we do not support multi-payment
-                        "payment_id": payments[0].id,
-                        "payment_amount": float(payments[0].amount),
-                        "user_email": order.guest_email,
-                        "refund_amount": mismatch_total
-                    }
-                    self.add_error(
-                        "orders_mismatched_totals_support",
-                        "There was a mismatch in the totals in the following order that require a refund",
-                        error_dict=error_dict,
-                    )
-
-        error_count, exit_errors, error_rate = self.process_errors(orders)
+    def handle_support(self, order_chunks, order_count):
+        for orders in order_chunks:
+            summaries = self.get_payment_summaries([order.id for order in orders])
+            for order in orders:
+                payments = summaries.get((order.id, self.PAID_EVENT_TYPE.id), PaymentSummary())
+
+                # If the payment total and the order total do not match, flag for review.
+                if payments.count == 1 and payments.total != order.total_incl_tax:
+                    mismatch_total = float(payments.total - order.total_incl_tax)
+                    # FIXME: validate_order should be changed to log _all_ errors related to an order
+                    # If payment amount > order amount, a refund is required from Support
+                    if mismatch_total > 0:
+                        error_dict = {
+                            "order_number": order.number,
+                            "order_id": order.id,
+                            "order_amount": float(order.total_incl_tax),
+                            # Assuming just one payment since we do not support multi-payment
+                            "payment_id": payments.first_id,
+                            "payment_amount": float(payments.total),
+                            "user_email": order.guest_email,
+                            "refund_amount": mismatch_total
+                        }
+                        self.add_error(
+                            "orders_mismatched_totals_support",
+                            "There was a mismatch in the totals in the following order that require a refund",
+                            error_dict=error_dict,
+                        )
+
+        error_count, exit_errors, error_rate = self.process_errors(order_count)
         if error_count and error_rate > 0:
             raise CommandError("Errors in transactions: {errors}".format(errors=exit_errors))
 
-    def validate_order(self, order):
-        all_payment_events = order.payment_events
-        refunds = all_payment_events.filter(event_type=self.REFUNDED_EVENT_TYPE)
-        payments = all_payment_events.filter(event_type=self.PAID_EVENT_TYPE)
+    def validate_orders(self, orders):
+        """
+        Verify the payments of a chunk of orders.
+
+        The orders are classified with the payment summaries of the chunk. The payment events of the orders
+        with errors are then fetched with a single query, to be logged with the errors.
+        """
+        order_ids = [order.id for order in orders]
+        summaries = self.get_payment_summaries(order_ids)
+        orders_requiring_payment = self.get_orders_requiring_payment(order_ids)
+
+        errors = []
+        for order in orders:
+            errors.extend(self.validate_order(order, summaries, orders_requiring_payment))
+
+        payment_events = self.get_payment_events(
+            {order.id for __, __, order, event_type in errors if event_type is not None}
+        )
+        for tag, msg, order, event_type in errors:
+            payments = payment_events[(order.id, event_type.id)] if event_type is not None else None
+            self.add_error(tag, msg, order, payments)
+
+    def validate_order(self, order, summaries, orders_requiring_payment):
+        """
+        Return the errors of an order, as (tag, message, order, type of the payment events to log) tuples.
+        """
+        errors = []
+        refunds = summaries.get((order.id, self.REFUNDED_EVENT_TYPE.id), PaymentSummary())
+        payments = summaries.get((order.id, self.PAID_EVENT_TYPE.id), PaymentSummary())
 
         # If a coupon is used to purchase a product for the full price, there will be no PaymentEvent
         # so we must also verify that order had a price > 0.
-        if payments.count() == 0:
-            if self.order_requires_payment(order) and order.total_incl_tax > 0:
-                self.add_error(
+        if payments.count == 0:
+            if order.id in orders_requiring_payment and order.total_incl_tax > 0:
+                errors.append((
                     "orders_no_payment",
                     "The following orders are without payments",
-                    order
-                )
+                    order,
+                    None
+                ))
 
         # We do not support multi-payment today, so flag this for review.
-        elif payments.count() > 1:
-            self.add_error(
+        elif payments.count > 1:
+            errors.append((
                 "orders_multi_payment",
                 "The following orders had multiple payments",
                 order,
-                payments
-            )
+                self.PAID_EVENT_TYPE
+            ))
 
         # If the payment total and the order total do not match, flag for review.
-        elif payments.aggregate(total=Sum('amount')).get('total') != order.total_incl_tax:
+        elif payments.total != order.total_incl_tax:
             # FIXME: validate_order should be changed to log _all_ errors related to an order
-            self.add_error(
+            errors.append((
                 "orders_mismatched_totals",
                 "The following order totals mismatch payments received",
                 order,
-                payments
-            )
+                self.PAID_EVENT_TYPE
+            ))
 
-        refund_total = refunds.aggregate(total=Sum('amount')).get('total')
-        payment_total = payments.aggregate(total=Sum('amount')).get('total')
-        if refund_total is not None and refund_total > payment_total:
-            self.add_error(
+        if refunds.total is not None and refunds.total > (payments.total or 0):
+            errors.append((
                 "orders_refund_exceeded",
                 "The following orders had excessive refunds",
                 order,
-                refunds
-            )
+                self.REFUNDED_EVENT_TYPE
+            ))
+
+        return errors
 
     def add_error(self, tag, msg, order=None, payments=None, error_dict=None):
         if tag not in self.ERRORS_DICT:
@@ -244,12 +353,17 @@ class Command(BaseCommand):
             ]
         return d
 
-    def order_requires_payment(self, order):
+    def get_orders_requiring_payment(self, order_ids):
+        """
+        Return the ids of the orders, among `order_ids`, that contain a seat or an entitlement.
+        """
         # We only expect immediate payments for Seats and Entitlements.
-        # Filter out orders that were flagged as being without payment for other product types
-        # FIXME: there are better ways to do this
-        for line in order.lines.all():
-            name = line.product.get_product_class().name
-            if name in VALID_PRODUCT_CLASS_NAMES:
-                return True
-        return False
+        # Filter out orders that were flagged as being without payment for other product types.
+        # Child products, such as seats, take their product class from their parent.
+        return set(use_read_replica_if_available(
+            Line.objects.filter(
+                Q(product__parent__isnull=True, product__product_class__name__in=VALID_PRODUCT_CLASS_NAMES) |
+                Q(product__parent__product_class__name__in=VALID_PRODUCT_CLASS_NAMES),
+                order_id__in=order_ids,
+            ).values_list('order_id', flat=True).distinct()
+        ))
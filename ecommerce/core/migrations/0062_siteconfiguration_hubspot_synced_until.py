@@ -0,0 +1,18 @@
+# Generated by Django 2.2.17 on 2026-10-17 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0061_auto_20200407_1725'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='siteconfiguration',
+            name='hubspot_synced_until',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Baskets created or submitted before this date have been synced to Hubspot', null=True, verbose_name='Hubspot Synced Until'),
+        ),
+    ]
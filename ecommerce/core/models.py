@@ -199,6 +199,13 @@ class SiteConfiguration(models.Model):
         max_length=255,
         blank=True
     )
+    hubspot_synced_until = models.DateTimeField(
+        verbose_name=_('Hubspot Synced Until'),
+        help_text=_('Baskets created or submitted before this date have been synced to Hubspot'),
+        null=True,
+        blank=True,
+        editable=False
+    )
     enable_microfrontend_for_basket_page = models.BooleanField(
         verbose_name=_('Enable Microfrontend for Basket Page'),
         help_text=_('Use the microfrontend implementation of the basket page instead of the server-side template'),
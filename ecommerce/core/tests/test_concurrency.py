@@ -0,0 +1,43 @@
+"""Tests of the concurrent execution of calls to other services."""
+import threading
+
+import crum
+from django.test import RequestFactory
+
+from ecommerce.core.concurrency import run_concurrently
+from ecommerce.tests.testcases import TestCase
+
+
+class RunConcurrentlyTests(TestCase):
+    def test_run_concurrently(self):
+        """ Verify the results and errors of every item are returned in order, using a bounded number of threads. """
+        thread_names = set()
+
+        def double(value):
+            thread_names.add(threading.current_thread().name)
+            if value == 3:
+                raise ValueError(value)
+            return value * 2
+
+        outcomes = run_concurrently(double, range(6), max_workers=3, thread_name_prefix='test')
+
+        self.assertEqual([(item, result) for item, result, __ in outcomes], [
+            (0, 0), (1, 2), (2, 4), (3, None), (4, 8), (5, 10)
+        ])
+        self.assertEqual([type(exc) for __, __, exc in outcomes], [type(None)] * 3 + [ValueError] + [type(None)] * 2)
+        self.assertLessEqual(len(thread_names), 3)
+        self.assertTrue(all(name.startswith('test') for name in thread_names))
+
+    def test_run_concurrently_current_request(self):
+        """ Verify the worker threads see the current request of the calling thread. """
+        request = RequestFactory().get('/')
+        crum.set_current_request(request)
+        self.addCleanup(crum.set_current_request, None)
+
+        outcomes = run_concurrently(lambda value: crum.get_current_request(), range(2), max_workers=2)
+        self.assertEqual([result for __, result, __ in outcomes], [request, request])
+
+    def test_run_concurrently_single_item(self):
+        """ Verify a single item is handled in the calling thread. """
+        outcomes = run_concurrently(lambda value: threading.current_thread(), [1], max_workers=3)
+        self.assertEqual(outcomes, [(1, threading.current_thread(), None)])
@@ -6,21 +6,28 @@ from uuid import UUID
 
 import crum
 from django.contrib import messages
-from django.db.models import Sum
 from django.utils.translation import ugettext as _
 from oscar.core.loading import get_model
 from requests.exceptions import ConnectionError as ReqConnectionError
 from requests.exceptions import Timeout
 from slumber.exceptions import SlumberHttpBaseException
 
-from ecommerce.courses.utils import get_course_info_from_catalog
-from ecommerce.enterprise.api import catalog_contains_course_runs, get_enterprise_id_for_user
-from ecommerce.enterprise.utils import get_or_create_enterprise_customer_user
+from ecommerce.courses.utils import get_course_detail, get_course_info_from_catalog
+from ecommerce.enterprise.api import (
+    catalog_contains_course_runs,
+    fetch_enterprise_learner_data,
+    get_enterprise_id_for_user
+)
+from ecommerce.enterprise.discount_ledger import DiscountLedger
+from ecommerce.enterprise.utils import (
+    get_enterprise_id_for_current_request_user_from_jwt,
+    get_or_create_enterprise_customer_user
+)
 from ecommerce.extensions.basket.utils import ENTERPRISE_CATALOG_ATTRIBUTE_TYPE
-from ecommerce.extensions.fulfillment.status import ORDER
 from ecommerce.extensions.offer.constants import OFFER_ASSIGNMENT_REVOKED, OFFER_REDEEMED
 from ecommerce.extensions.offer.mixins import ConditionWithoutRangeMixin, SingleItemConsumptionConditionMixin
 from ecommerce.extensions.offer.models import OFFER_PRIORITY_ENTERPRISE
+from ecommerce.extensions.offer.prefetch import RemoteLookup
 from ecommerce.extensions.offer.utils import get_benefit_type, get_discount_value
 
 BasketAttribute = get_model('basket', 'BasketAttribute')
@@ -30,7 +37,6 @@ Condition = get_model('offer', 'Condition')
 ConditionalOffer = get_model('offer', 'ConditionalOffer')
 OfferAssignment = get_model('offer', 'OfferAssignment')
 Order = get_model('order', 'Order')
-OrderDiscount = get_model('order', 'OrderDiscount')
 StockRecord = get_model('partner', 'StockRecord')
 Voucher = get_model('voucher', 'Voucher')
 logger = logging.getLogger(__name__)
@@ -41,11 +47,10 @@ def is_offer_max_user_discount_available(basket, offer):
     # no need to do anything if this is not an enterprise offer or `user_max_discount` is not set
     if offer.priority != OFFER_PRIORITY_ENTERPRISE or offer.max_user_discount is None:
         return True
-    discount_value = _get_basket_discount_value(basket, offer)
+    ledger = DiscountLedger.for_basket(basket)
+    discount_value = _get_basket_discount_value(basket, offer, ledger)
     # check if offer has discount available for user
-    sum_user_discounts_for_this_offer = OrderDiscount.objects.filter(
-        offer_id=offer.id, order__user_id=basket.owner.id, order__status=ORDER.COMPLETE
-    ).aggregate(Sum('amount'))['amount__sum'] or Decimal(0.00)
+    sum_user_discounts_for_this_offer = ledger.get_user_discount(offer)
     new_total_discount = discount_value + sum_user_discounts_for_this_offer
     if new_total_discount <= offer.max_user_discount:
         return True
@@ -58,7 +63,7 @@ def is_offer_max_discount_available(basket, offer):
     # no need to do anything if this is not an enterprise offer or `max_discount` is not set
     if offer.priority != OFFER_PRIORITY_ENTERPRISE or offer.max_discount is None:
         return True
-    discount_value = _get_basket_discount_value(basket, offer)
+    discount_value = _get_basket_discount_value(basket, offer, DiscountLedger.for_basket(basket))
     # check if offer has discount available
     new_total_discount = discount_value + offer.total_discount
     if new_total_discount <= offer.max_discount:
@@ -67,9 +72,9 @@ def is_offer_max_discount_available(basket, offer):
     return False
 
 
-def _get_basket_discount_value(basket, offer):
+def _get_basket_discount_value(basket, offer, ledger=None):
     """Calculate the discount value based on benefit type and value"""
-    sum_basket_lines = basket.all_lines().aggregate(total=Sum('stockrecord__price_excl_tax'))['total'] or Decimal(0.0)
+    sum_basket_lines = (ledger or DiscountLedger.for_basket(basket)).basket_subtotal
     # calculate discount value that will be covered by the offer
     benefit_type = get_benefit_type(offer.benefit)
     benefit_value = offer.benefit.value
@@ -96,6 +101,55 @@ class EnterpriseCustomerCondition(ConditionWithoutRangeMixin, SingleItemConsumpt
     def name(self):
         return "Basket contains a seat from {}'s catalog".format(self.enterprise_customer_name)
 
+    def get_remote_lookups(self, offer, basket, snapshot):  # pylint: disable=unused-argument
+        """
+        Declares the Discovery and Enterprise data needed to evaluate this condition, so it can be prefetched.
+
+        The catalog lookup depends on the course details of the entitlement products in the basket and on the
+        learner's enterprise, so it is only declared once those are available in the snapshot.
+        See ecommerce.extensions.offer.prefetch for details.
+        """
+        if not basket.owner:
+            return []
+
+        site = basket.site
+        lookups = []
+        course_ids = []
+        for line in basket.all_lines():
+            if line.product.is_course_entitlement_product:
+                course_uuid = line.product.attr.UUID
+                course_key = ('course_detail', site.domain, course_uuid)
+                lookups.append(RemoteLookup(course_key, get_course_detail, (site, course_uuid)))
+                course = snapshot.get(course_key)
+                course_ids.append(course.get('key') if isinstance(course, dict) else None)
+            elif line.product.course:
+                course_ids.append(line.product.course.id)
+            else:
+                # The condition can not be satisfied by baskets with products not related to a course.
+                return lookups
+
+        user_enterprise = get_enterprise_id_for_current_request_user_from_jwt()
+        if not user_enterprise:
+            learner_key = ('enterprise_learner', site.domain, basket.owner.username)
+            lookups.append(RemoteLookup(learner_key, fetch_enterprise_learner_data, (site, basket.owner)))
+            if learner_key not in snapshot:
+                return lookups
+            if not isinstance(snapshot[learner_key], Exception):
+                user_enterprise = get_enterprise_id_for_user(site, basket.owner)
+
+        enterprise_in_condition = str(self.enterprise_customer_uuid)
+        if None in course_ids or (user_enterprise and user_enterprise != enterprise_in_condition):
+            return lookups
+
+        enterprise_catalog = str(self.enterprise_customer_catalog_uuid) if self.enterprise_customer_catalog_uuid \
+            else None
+        lookups.append(RemoteLookup(
+            ('catalog_contains', site.domain, enterprise_in_condition, enterprise_catalog, tuple(course_ids)),
+            catalog_contains_course_runs,
+            (site, course_ids, enterprise_in_condition, enterprise_catalog),
+        ))
+        return lookups
+
     def is_satisfied(self, offer, basket):  # pylint: disable=unused-argument
         """
         Determines if a user is eligible for an enterprise customer offer
@@ -289,7 +343,7 @@ class EnterpriseCustomerCondition(ConditionWithoutRangeMixin, SingleItemConsumpt
             'catalog'
         ) if basket.strategy.request else None
 
-        if not catalog:
+        if not catalog and basket.id:
             # For actual baskets get `catalog` from basket attribute
             enterprise_catalog_attribute, __ = BasketAttributeType.objects.get_or_create(
                 name=ENTERPRISE_CATALOG_ATTRIBUTE_TYPE
@@ -331,7 +385,7 @@ class AssignableEnterpriseCustomerCondition(EnterpriseCustomerCondition):
         if condition_satisfied is False:
             return False
 
-        voucher = basket.vouchers.first()
+        voucher = next(iter(basket.get_vouchers()), None)
 
         # get assignments for the basket owner and basket voucher
         user_with_code_assignments = OfferAssignment.objects.filter(
@@ -0,0 +1,71 @@
+"""
+Discount data used to check the discount limits of enterprise offers.
+"""
+from decimal import Decimal
+
+from django.db.models import Sum
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.fulfillment.status import ORDER
+from ecommerce.extensions.offer.models import OFFER_PRIORITY_ENTERPRISE
+
+OrderDiscount = get_model('order', 'OrderDiscount')
+
+
+class DiscountLedger:
+    """
+    Discount data for a single offer calculation of a basket.
+
+    The Applicator creates a ledger for every calculation and attaches it to the basket, so the enterprise
+    conditions checking the discount limits of the candidate offers share the basket subtotal and load the
+    discount consumed by the basket owner for all candidate offers in a single grouped query.
+
+    Use ``DiscountLedger.for_basket`` to get the ledger of a basket.
+    """
+
+    def __init__(self, basket, offers=()):
+        self.basket = basket
+        self.offer_ids = {
+            offer.id for offer in offers
+            if offer.priority == OFFER_PRIORITY_ENTERPRISE and offer.max_user_discount is not None
+        }
+        self._basket_subtotal = None
+        self._user_discounts = None
+
+    @classmethod
+    def for_basket(cls, basket):
+        """
+        Return the ledger attached to the basket, or a new one if offers are not being applied by the Applicator.
+        """
+        return getattr(basket, 'discount_ledger', None) or cls(basket)
+
+    @property
+    def basket_subtotal(self):
+        """ Sum of the prices, excluding tax, of the stock records of the basket lines. """
+        if self._basket_subtotal is None:
+            self._basket_subtotal = sum(
+                (
+                    line.stockrecord.price_excl_tax for line in self.basket.all_lines()
+                    if line.stockrecord and line.stockrecord.price_excl_tax is not None
+                ),
+                Decimal(0.0)
+            )
+        return self._basket_subtotal
+
+    def _load_user_discounts(self, offer_ids):
+        return dict(
+            OrderDiscount.objects.filter(
+                offer_id__in=offer_ids, order__user_id=self.basket.owner.id, order__status=ORDER.COMPLETE
+            ).values_list('offer_id').annotate(total=Sum('amount')).order_by()
+        )
+
+    def get_user_discount(self, offer):
+        """
+        Return the discount the basket owner already received from the offer on completed orders.
+        """
+        if offer.id not in self.offer_ids:
+            return self._load_user_discounts([offer.id]).get(offer.id) or Decimal(0.00)
+
+        if self._user_discounts is None:
+            self._user_discounts = self._load_user_discounts(self.offer_ids)
+        return self._user_discounts.get(offer.id) or Decimal(0.00)
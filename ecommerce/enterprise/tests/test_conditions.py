@@ -82,6 +82,51 @@ class EnterpriseCustomerConditionTests(EnterpriseServiceMockMixin, DiscoveryTest
         )
         self.assertTrue(self.condition.is_satisfied(offer, basket))
 
+    def test_get_remote_lookups(self):
+        """ The catalog lookup should only be declared once the learner's enterprise is known. """
+        offer = factories.EnterpriseOfferFactory(partner=self.partner, condition=self.condition)
+        basket = BasketFactory(site=self.site, owner=self.user)
+        basket.add_product(self.course_run.seat_products[0])
+        learner_key = ('enterprise_learner', self.site.domain, self.user.username)
+
+        lookups = self.condition.get_remote_lookups(offer, basket, {})
+        self.assertEqual([lookup.key for lookup in lookups], [learner_key])
+
+        with mock.patch('ecommerce.enterprise.conditions.get_enterprise_id_for_user') as mock_get_enterprise_id:
+            mock_get_enterprise_id.return_value = str(self.condition.enterprise_customer_uuid)
+            lookups = self.condition.get_remote_lookups(offer, basket, {learner_key: {}})
+        self.assertEqual(lookups[-1].func.__name__, 'catalog_contains_course_runs')
+        self.assertEqual(
+            lookups[-1].args,
+            (
+                self.site,
+                [self.course_run.id],
+                str(self.condition.enterprise_customer_uuid),
+                str(self.condition.enterprise_customer_catalog_uuid),
+            )
+        )
+
+        with mock.patch('ecommerce.enterprise.conditions.get_enterprise_id_for_user') as mock_get_enterprise_id:
+            mock_get_enterprise_id.return_value = str(uuid4())
+            lookups = self.condition.get_remote_lookups(offer, basket, {learner_key: {}})
+        self.assertEqual([lookup.key for lookup in lookups], [learner_key])
+
+    def test_get_remote_lookups_entitlement(self):
+        """ The course details of entitlement products should be prefetched before the catalog lookup. """
+        offer = factories.EnterpriseOfferFactory(partner=self.partner, condition=self.condition)
+        basket = BasketFactory(site=self.site, owner=self.user)
+        basket.add_product(self.entitlement)
+        course_key = ('course_detail', self.site.domain, self.entitlement.attr.UUID)
+
+        with mock.patch('ecommerce.enterprise.conditions.get_enterprise_id_for_current_request_user_from_jwt') as \
+                mock_get_enterprise_id:
+            mock_get_enterprise_id.return_value = str(self.condition.enterprise_customer_uuid)
+            lookups = self.condition.get_remote_lookups(offer, basket, {})
+            self.assertEqual([lookup.key for lookup in lookups], [course_key])
+
+            lookups = self.condition.get_remote_lookups(offer, basket, {course_key: {'key': 'edX+DemoX'}})
+            self.assertEqual(lookups[-1].args[1], ['edX+DemoX'])
+
     def _check_condition_is_satisfied(self, offer, basket, is_satisfied):
         """
         Helper method to verify that conditional offer is valid for provided basket.
@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from oscar.test.factories import BasketFactory, OrderDiscountFactory, OrderFactory
+
+from ecommerce.enterprise.discount_ledger import DiscountLedger
+from ecommerce.extensions.fulfillment.status import ORDER
+from ecommerce.extensions.test import factories
+from ecommerce.tests.factories import ProductFactory, UserFactory
+from ecommerce.tests.testcases import TestCase
+
+
+class DiscountLedgerTests(TestCase):
+    def setUp(self):
+        super(DiscountLedgerTests, self).setUp()
+        self.user = UserFactory()
+        self.basket = BasketFactory(site=self.site, owner=self.user)
+        self.basket.add_product(ProductFactory(stockrecords__partner=self.partner, stockrecords__price_excl_tax=100))
+        self.basket.add_product(ProductFactory(stockrecords__partner=self.partner, stockrecords__price_excl_tax=50))
+
+    def create_order_discounts(self, offer, amounts, user=None, status=ORDER.COMPLETE):
+        for amount in amounts:
+            order = OrderFactory(user=user or self.user, status=status)
+            OrderDiscountFactory(order=order, offer_id=offer.id, amount=amount)
+
+    def test_basket_subtotal(self):
+        """ Verify the subtotal is computed from the loaded basket lines, without any query. """
+        ledger = DiscountLedger(self.basket)
+        list(self.basket.all_lines())
+        with self.assertNumQueries(0):
+            self.assertEqual(ledger.basket_subtotal, Decimal(150))
+            self.assertEqual(ledger.basket_subtotal, Decimal(150))
+
+    def test_basket_subtotal_empty_basket(self):
+        """ Verify the subtotal of an empty basket is zero. """
+        basket = BasketFactory(site=self.site, owner=self.user)
+        self.assertEqual(DiscountLedger(basket).basket_subtotal, Decimal(0))
+
+    def test_get_user_discount(self):
+        """ Verify the discounts of all candidate offers are loaded with a single query. """
+        offers = [factories.EnterpriseOfferFactory(partner=self.partner, max_user_discount=500) for __ in range(3)]
+        self.create_order_discounts(offers[0], [10, 20])
+        self.create_order_discounts(offers[1], [30])
+        self.create_order_discounts(offers[1], [40], status=ORDER.OPEN)
+        self.create_order_discounts(offers[1], [50], user=UserFactory())
+
+        ledger = DiscountLedger(self.basket, offers)
+        with self.assertNumQueries(1):
+            self.assertEqual(ledger.get_user_discount(offers[0]), Decimal(30))
+            self.assertEqual(ledger.get_user_discount(offers[1]), Decimal(30))
+            self.assertEqual(ledger.get_user_discount(offers[2]), Decimal(0))
+
+    def test_get_user_discount_not_candidate(self):
+        """ Verify the discount of an offer which is not a candidate of the ledger is loaded on its own. """
+        offer = factories.EnterpriseOfferFactory(partner=self.partner, max_user_discount=500)
+        self.create_order_discounts(offer, [10, 20])
+
+        ledger = DiscountLedger(self.basket, [factories.EnterpriseOfferFactory(partner=self.partner)])
+        self.assertEqual(ledger.offer_ids, set())
+        with self.assertNumQueries(1):
+            self.assertEqual(ledger.get_user_discount(offer), Decimal(30))
+
+    def test_for_basket(self):
+        """ Verify the ledger attached to the basket is used when available. """
+        ledger = DiscountLedger(self.basket)
+        self.assertIsNot(DiscountLedger.for_basket(self.basket), ledger)
+
+        self.basket.discount_ledger = ledger
+        self.assertIs(DiscountLedger.for_basket(self.basket), ledger)
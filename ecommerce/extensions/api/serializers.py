@@ -2,7 +2,7 @@
 
 
 import logging
-from collections import OrderedDict
+from collections import Counter, OrderedDict
 from decimal import Decimal
 from urllib.parse import urljoin
 
@@ -13,8 +13,9 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models import Count, Q, Sum, prefetch_related_objects
+from django.db.models import Count, Q, prefetch_related_objects
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 from oscar.core.loading import get_class, get_model
 from rest_framework import serializers
@@ -29,7 +30,6 @@ from ecommerce.core.constants import (
 )
 from ecommerce.core.url_utils import get_ecommerce_url
 from ecommerce.core.utils import log_message_and_raise_validation_error
-from ecommerce.coupons.utils import is_coupon_available
 from ecommerce.courses.models import Course
 from ecommerce.enterprise.benefits import BENEFIT_MAP as ENTERPRISE_BENEFIT_MAP
 from ecommerce.entitlements.utils import create_or_update_course_entitlement
@@ -55,6 +55,7 @@ from ecommerce.extensions.offer.utils import (
     send_assigned_offer_reminder_email,
     send_revoked_offer_email
 )
+from ecommerce.extensions.voucher.coupon_stats import get_coupon_stats
 from ecommerce.extensions.voucher.utils import create_enterprise_vouchers
 from ecommerce.invoice.models import Invoice
 from ecommerce.programs.custom import class_path
@@ -737,7 +738,84 @@ class VoucherSerializer(serializers.ModelSerializer):
         )
 
 
+class CodeUsagePage:
+    """
+    Vouchers, offer assignments and voucher applications of a page of code usages.
+
+    Each of them is loaded for all the codes of the page with a single query, the first time it is needed.
+    """
+    ACTIVE_ASSIGNMENT_STATUSES = [OFFER_ASSIGNED, OFFER_ASSIGNMENT_EMAIL_PENDING, OFFER_ASSIGNMENT_EMAIL_BOUNCED]
+
+    def __init__(self, usages):
+        """
+        Arguments:
+            usages (list): (code, user_email) pairs of the page. user_email is empty for unassigned codes.
+        """
+        self.codes = {code for code, __ in usages}
+        self.emails = {user_email for __, user_email in usages if user_email}
+
+    @cached_property
+    def vouchers(self):
+        """ Vouchers by code, with their offers. """
+        vouchers = Voucher.objects.filter(code__in=self.codes).prefetch_related('offers__condition')
+        return {voucher.code: voucher for voucher in vouchers}
+
+    @cached_property
+    def assignments(self):
+        """ First offer assignment of each code and user email. """
+        assignments = {}
+        if self.emails:
+            for assignment in OfferAssignment.objects.filter(
+                    code__in=self.codes, user_email__in=self.emails
+            ).order_by('pk'):
+                assignments.setdefault((assignment.code, assignment.user_email), assignment)
+        return assignments
+
+    @cached_property
+    def num_assignments(self):
+        """ Number of active offer assignments by code, and by code and user email. """
+        counts = Counter()
+        assignments = OfferAssignment.objects.filter(
+            code__in=self.codes,
+            status__in=self.ACTIVE_ASSIGNMENT_STATUSES,
+        ).values('code', 'user_email').annotate(num_assignments=Count('id')).order_by()
+        for item in assignments:
+            counts[(item['code'], item['user_email'])] += item['num_assignments']
+            counts[(item['code'], None)] += item['num_assignments']
+        return counts
+
+    @cached_property
+    def num_applications(self):
+        """ Number of voucher applications by code and user email. """
+        counts = Counter()
+        if self.emails:
+            applications = VoucherApplication.objects.filter(
+                voucher__code__in=self.codes,
+                user__email__in=self.emails,
+            ).values('voucher__code', 'user__email').annotate(num_applications=Count('id')).order_by()
+            for item in applications:
+                counts[(item['voucher__code'], item['user__email'])] += item['num_applications']
+        return counts
+
+
+class CodeUsageListSerializer(serializers.ListSerializer):  # pylint: disable=abstract-method
+    """
+    Serializes a page of code usages, loading the data of all its codes at once.
+    """
+
+    def to_representation(self, data):
+        usages = list(data)
+        self.child.load_page(usages)
+        return super(CodeUsageListSerializer, self).to_representation(usages)
+
+
 class CodeUsageSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    Serializes a code usage.
+
+    Serializing many code usages loads the vouchers, assignments and applications
+    of all of them at once, see CodeUsagePage.
+    """
     code = serializers.SerializerMethodField()
     assigned_to = serializers.SerializerMethodField()
     redeem_url = serializers.SerializerMethodField()
@@ -747,11 +825,30 @@ class CodeUsageSerializer(serializers.Serializer):  # pylint: disable=abstract-m
     revocation_date = serializers.SerializerMethodField()
     is_public = serializers.SerializerMethodField()
 
+    page = None
+
+    class Meta:
+        list_serializer_class = CodeUsageListSerializer
+
+    def load_page(self, usages):
+        """
+        Load the data of the code usages serialized next.
+        """
+        self.page = CodeUsagePage([(self.get_code(obj), self.get_assigned_to(obj)) for obj in usages])
+
+    def _get_page(self, obj):
+        if self.page is None:
+            self.load_page([obj])
+        return self.page
+
+    def _get_voucher(self, obj):
+        return self._get_page(obj).vouchers[self.get_code(obj)]
+
     def _get_assignment(self, obj):
         assigned_to = self.get_assigned_to(obj)
         code = self.get_code(obj)
         if assigned_to and code:
-            return OfferAssignment.objects.filter(code=code, user_email=assigned_to).first()
+            return self._get_page(obj).assignments.get((code, assigned_to))
         return None
 
     def get_assignment_date(self, obj):
@@ -780,7 +877,7 @@ class CodeUsageSerializer(serializers.Serializer):  # pylint: disable=abstract-m
         return obj.get('user_email')
 
     def get_redemptions(self, obj):
-        voucher = Voucher.objects.get(code=self.get_code(obj))
+        voucher = self._get_voucher(obj)
         offer = voucher.best_offer
         redemption_count = voucher.num_orders
 
@@ -797,18 +894,13 @@ class CodeUsageSerializer(serializers.Serializer):  # pylint: disable=abstract-m
         }
 
     def get_is_public(self, obj):
-        voucher = Voucher.objects.get(code=self.get_code(obj))
-        return voucher.is_public
+        return self._get_voucher(obj).is_public
 
-    def num_assignments(self, code, user_email=None):
-        offer_assignments = OfferAssignment.objects.filter(
-            code=code,
-            status__in=[OFFER_ASSIGNED, OFFER_ASSIGNMENT_EMAIL_PENDING, OFFER_ASSIGNMENT_EMAIL_BOUNCED],
-        )
-        if user_email:
-            offer_assignments = offer_assignments.filter(user_email=user_email)
+    def num_assignments(self, obj, user_email=None):
+        return self._get_page(obj).num_assignments[(self.get_code(obj), user_email or None)]
 
-        return offer_assignments.count()
+    def num_applications(self, obj):
+        return self._get_page(obj).num_applications[(self.get_code(obj), self.get_assigned_to(obj))]
 
 
 class NotAssignedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disable=abstract-method
@@ -818,7 +910,7 @@ class NotAssignedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disable=ab
 
     def get_redemptions(self, obj):
         redemptions = super(NotAssignedCodeUsageSerializer, self).get_redemptions(obj)
-        return dict(redemptions, num_assignments=self.num_assignments(code=self.get_code(obj)))
+        return dict(redemptions, num_assignments=self.num_assignments(obj))
 
 
 class NotRedeemedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disable=abstract-method
@@ -828,7 +920,7 @@ class NotRedeemedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disable=ab
         if usage_type in (Voucher.SINGLE_USE, Voucher.MULTI_USE_PER_CUSTOMER):
             return super(NotRedeemedCodeUsageSerializer, self).get_redemptions(obj)
 
-        num_assignments = self.num_assignments(code=self.get_code(obj), user_email=self.get_assigned_to(obj))
+        num_assignments = self.num_assignments(obj, user_email=self.get_assigned_to(obj))
         return {'used': 0, 'total': num_assignments}
 
 
@@ -842,11 +934,8 @@ class PartialRedeemedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disabl
         if usage_type == Voucher.MULTI_USE_PER_CUSTOMER:
             return super(PartialRedeemedCodeUsageSerializer, self).get_redemptions(obj)
 
-        num_assignments = self.num_assignments(code=self.get_code(obj), user_email=self.get_assigned_to(obj))
-        num_applications = VoucherApplication.objects.filter(
-            voucher__code=self.get_code(obj),
-            user__email=self.get_assigned_to(obj)
-        ).count()
+        num_assignments = self.num_assignments(obj, user_email=self.get_assigned_to(obj))
+        num_applications = self.num_applications(obj)
         return {'used': num_applications, 'total': num_assignments + num_applications}
 
 
@@ -859,10 +948,7 @@ class RedeemedCodeUsageSerializer(CodeUsageSerializer):  # pylint: disable=abstr
         return obj.get('user__email')
 
     def get_redemptions(self, obj):
-        num_applications = VoucherApplication.objects.filter(
-            voucher__code=self.get_code(obj),
-            user__email=self.get_assigned_to(obj)
-        ).count()
+        num_applications = self.num_applications(obj)
         return {'used': num_applications, 'total': num_applications}
 
 
@@ -982,31 +1068,9 @@ class OfferAssignmentEmailTemplatesSerializer(serializers.ModelSerializer):
 class EnterpriseCouponOverviewListSerializer(serializers.ModelSerializer):
     """
     Serializer for Enterprise Coupons list overview.
-    """
-    def _get_num_unassigned(self, vouchers):
-        """
-        Return number of available assignments.
-        """
-        all_slots_available = 0
-        enterprise_offer = vouchers.first().enterprise_offer
-
-        assignments = OfferAssignment.objects.filter(code__in=vouchers.values_list('code', flat=True)).exclude(
-            status__in=[OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]
-        ).values('code').annotate(num_assignments=Count('code')).order_by('code')
-
-        vouchers_num_assignments = {item['code']: item['num_assignments'] for item in assignments}
-
-        for voucher in vouchers:
-            num_assignments = vouchers_num_assignments.get(voucher.code, 0)
-            voucher_slots_available = voucher.calculate_available_slots(
-                enterprise_offer.max_global_applications,
-                num_assignments
-            )
-            if voucher_slots_available > 0:
-                all_slots_available += voucher_slots_available
-
-        return all_slots_available
 
+    Coupon statistics are read from their stored CouponStats, see ecommerce.extensions.voucher.coupon_stats.
+    """
     def _get_errors(self, coupon):
         """
         Returns a list of OfferAssignment errors associated with coupon.
@@ -1018,39 +1082,21 @@ class EnterpriseCouponOverviewListSerializer(serializers.ModelSerializer):
         )
         return OfferAssignmentSerializer(offer_assignments_with_error, many=True).data
 
-    # Max number of codes available (Maximum Coupon Usage).
-    def _get_max_uses(self, voucher, voucher_usage, voucher_count):
-        offer = voucher.best_offer
-
-        max_uses_per_code = None
-        if voucher_usage == Voucher.SINGLE_USE:
-            max_uses_per_code = 1
-        elif offer.max_global_applications:
-            max_uses_per_code = offer.max_global_applications
-        else:
-            max_uses_per_code = OFFER_MAX_USES_DEFAULT
-
-        return max_uses_per_code * voucher_count
-
     def to_representation(self, coupon):  # pylint: disable=arguments-differ
         representation = super(EnterpriseCouponOverviewListSerializer, self).to_representation(coupon)
 
-        vouchers = coupon.attr.coupon_vouchers.vouchers.all()
-        voucher = vouchers.first()
-        usage = voucher.usage
-        count = vouchers.count()
-        num_orders = vouchers.aggregate(Sum('num_orders'))
-
+        stats = get_coupon_stats(coupon)
         data = {
-            'start_date': voucher.start_datetime,
-            'end_date': voucher.end_datetime,
-            'num_uses': num_orders['num_orders__sum'],
-            'usage_limitation': usage,
-            'num_codes': count,
-            'max_uses': self._get_max_uses(voucher, usage, count),
-            'num_unassigned': self._get_num_unassigned(vouchers),
-            'errors': self._get_errors(coupon),
-            'available': is_coupon_available(coupon),
+            'start_date': stats.start_datetime,
+            'end_date': stats.end_datetime,
+            'num_uses': stats.num_uses,
+            'usage_limitation': stats.usage,
+            'num_codes': stats.num_codes,
+            'max_uses': stats.max_uses,
+            'num_unassigned': stats.num_unassigned,
+            # Bounced assignments are only looked up for the coupons that have some.
+            'errors': self._get_errors(coupon) if stats.num_errors else [],
+            'available': stats.start_datetime < timezone.now() < stats.end_datetime,
         }
 
         return dict(representation, **data)
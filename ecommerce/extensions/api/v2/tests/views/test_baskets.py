@@ -11,7 +11,9 @@ import ddt
 import httpretty
 import mock
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from edx_rest_framework_extensions.auth.jwt.cookies import jwt_cookie_name
 from oscar.core.loading import get_model
@@ -716,7 +718,7 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
             self.assertEqual(response.status_code, 200)
             mock_track.assert_not_called()
 
-    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket_atomic')
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
     def test_basket_calculate_anonymous_caching(self, mock_calculate_basket):
         """Verify a request made with the is_anonymous parameter is cached"""
         url_with_one_sku = self._generate_sku_url(self.products[0:1], username=None)
@@ -776,7 +778,7 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         self.assertFalse(mock_calculate_basket.called, msg='The cache should be hit.')
         self.assertEqual(response.data, expected)
 
-    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket_atomic')
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
     def test_basket_calculate_no_query_parameters(self, mock_calculate_basket_atomic):
         """Verify a request made without query parameters uses the request user"""
         expected = {'Test Succeeded': True}
@@ -813,7 +815,7 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         self.assertTrue(mock_logger.called)
 
     @httpretty.activate
-    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket_atomic')
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
     def test_conflicting_user_anonymous_params(self, mock_calculate_basket):
         """
         Verify that when the request contains both a username and an is_anonymous parameter, a Bad Request response
@@ -829,7 +831,7 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         self.assertFalse(mock_calculate_basket.called)
 
     @httpretty.activate
-    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket_atomic')
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateView._calculate_temporary_basket')
     def test_basket_calculate_with_anonymous_caching_disabled(self, mock_calculate_basket_atomic):
         """Verify a request made by a staff user is not cached"""
         expected = {'Test Succeeded': True}
@@ -903,7 +905,7 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         response = self.client.get(self.url + '&username={username}'.format(username=differentuser.username))
         self.assertEqual(response.status_code, 403)
 
-    @mock.patch('ecommerce.extensions.basket.models.Basket.add_product', mock.Mock(side_effect=Exception))
+    @mock.patch('ecommerce.extensions.basket.models.PricingBasket.add_product', mock.Mock(side_effect=Exception))
     @mock.patch('ecommerce.extensions.api.v2.views.baskets.logger.exception')
     def test_exception_log(self, mock_logger):
         """A log entry is filed when an exception happens."""
@@ -1007,3 +1009,93 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         self.client.logout()
         self.client.login(username=user.username, password=self.password)
         return user
+
+
+class BasketCalculateBatchViewTests(ThrottlingMixin, TestCase):
+    def setUp(self):
+        super(BasketCalculateBatchViewTests, self).setUp()
+        self.products = ProductFactory.create_batch(
+            3, stockrecords__partner=self.partner, stockrecords__price_excl_tax=Decimal('10.00'), categories=[]
+        )
+        self.skus = [product.stockrecords.first().partner_sku for product in self.products]
+        self.path = reverse('api:v2:baskets:calculate_batch')
+        self.range = factories.RangeFactory(includes_all_products=True)
+        self.user = self.create_user(is_staff=True)
+        self.client.login(username=self.user.username, password=self.password)
+
+    def post_quotes(self, quotes, **data):
+        data['quotes'] = quotes
+        return self.client.post(self.path, json.dumps(data), content_type=JSON_CONTENT_TYPE)
+
+    def test_calculate_batch(self):
+        """ Verify every quote is calculated, with its voucher, and returned in order. """
+        voucher, __ = prepare_voucher(_range=self.range, benefit_type=Benefit.FIXED, benefit_value=5)
+
+        response = self.post_quotes([
+            {'skus': self.skus[1::-1]},
+            {'skus': self.skus, 'code': voucher.code},
+            {'skus': ['foo']},
+        ], username=self.user.username)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [
+            {
+                'skus': sorted(self.skus[:2]), 'code': None, 'bundle': None,
+                'total_incl_tax_excl_discounts': Decimal('20.00'), 'total_incl_tax': Decimal('20.00'), 'currency': 'GBP'
+            },
+            {
+                'skus': sorted(self.skus), 'code': voucher.code, 'bundle': None,
+                'total_incl_tax_excl_discounts': Decimal('30.00'), 'total_incl_tax': Decimal('25.00'), 'currency': 'GBP'
+            },
+            {'skus': ['foo'], 'code': None, 'bundle': None, 'error': 'Products with SKU(s) [foo] do not exist.'},
+        ])
+
+    def test_calculate_batch_shared_lookups(self):
+        """ Verify products and vouchers are looked up once for all the quotes. """
+        voucher, __ = prepare_voucher(_range=self.range, benefit_type=Benefit.FIXED, benefit_value=5)
+        quote = {'skus': self.skus, 'code': voucher.code}
+
+        with CaptureQueriesContext(connection) as single_quote_queries:
+            self.post_quotes([quote], username=self.user.username)
+        with CaptureQueriesContext(connection) as three_quote_queries:
+            self.post_quotes([quote] * 3, username=self.user.username)
+
+        def count_lookups(queries):
+            lookups = ('"partner_stockrecord"."partner_sku" IN', '"voucher_voucher"."code" IN')
+            return len([query for query in queries if any(lookup in query['sql'] for lookup in lookups)])
+
+        self.assertEqual(count_lookups(single_quote_queries), count_lookups(three_quote_queries))
+
+    @mock.patch('ecommerce.extensions.api.v2.views.baskets.BasketCalculateBatchView._calculate_temporary_basket')
+    def test_calculate_batch_anonymous_caching(self, mock_calculate_basket):
+        """ Verify anonymous quotes are read from the cache shared with the calculate endpoint. """
+        expected = {'total_incl_tax_excl_discounts': 10, 'total_incl_tax': 10, 'currency': 'GBP'}
+        mock_calculate_basket.return_value = expected
+
+        response = self.client.get(
+            '{path}?sku={sku}&is_anonymous=true'.format(path=reverse('api:v2:baskets:calculate'), sku=self.skus[0])
+        )
+        self.assertEqual(response.data, expected)
+        mock_calculate_basket.reset_mock()
+
+        quotes = [{'skus': self.skus[:1]}, {'skus': self.skus[1:]}, {'skus': self.skus[:0:-1]}]
+        response = self.post_quotes(quotes, is_anonymous=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([{key: quote[key] for key in expected} for quote in response.data], [expected] * 3)
+        self.assertEqual(mock_calculate_basket.call_count, 1, msg='Only the first missing quote should be calculated.')
+        mock_calculate_basket.reset_mock()
+
+        response = self.post_quotes(quotes, is_anonymous=True)
+        self.assertFalse(mock_calculate_basket.called, msg='The cache should be hit.')
+
+    def test_calculate_batch_invalid(self):
+        """ Verify bad requests are rejected. """
+        for quotes in (None, [{'skus': []}], ['foo'], [{'skus': self.skus}] * 51):
+            response = self.post_quotes(quotes, username=self.user.username)
+            self.assertEqual(response.status_code, 400)
+
+    def test_calculate_batch_get(self):
+        """ Verify quotes can only be requested with POST. """
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, 405)
@@ -12,7 +12,9 @@ import httpretty
 import mock
 import rules
 from django.conf import settings
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.http import urlencode
@@ -64,6 +66,7 @@ from ecommerce.tests.testcases import TestCase
 Basket = get_model('basket', 'Basket')
 Benefit = get_model('offer', 'Benefit')
 CodeAssignmentNudgeEmails = get_model('offer', 'CodeAssignmentNudgeEmails')
+CouponStats = get_model('voucher', 'CouponStats')
 OfferAssignment = get_model('offer', 'OfferAssignment')
 OfferAssignmentEmailSentRecord = get_model('offer', 'OfferAssignmentEmailSentRecord')
 OfferAssignmentEmailTemplates = get_model('offer', 'OfferAssignmentEmailTemplates')
@@ -1015,6 +1018,37 @@ class EnterpriseCouponViewSetRbacTests(
             codes
         )
 
+    @ddt.data(VOUCHER_NOT_ASSIGNED, VOUCHER_NOT_REDEEMED, VOUCHER_PARTIAL_REDEEMED, VOUCHER_REDEEMED)
+    def test_coupon_codes_detail_queries(self, code_filter):
+        """
+        Verify the number of queries of `/api/v2/enterprise/coupons/{coupon_id}/codes/` does not grow with the page.
+        """
+        coupon_post_data = dict(self.data, voucher_type=Voucher.MULTI_USE, quantity=8, max_uses=2)
+        coupon_id = self.get_response('POST', ENTERPRISE_COUPONS_LINK, coupon_post_data).json()['coupon_id']
+        coupon_vouchers = Product.objects.get(id=coupon_id).attr.coupon_vouchers.vouchers.all()
+        vouchers = {voucher.code: voucher for voucher in coupon_vouchers}
+        emails = ['user{}@example.com'.format(index) for index in range(4)]
+        self.assign_user_to_code(coupon_id, emails, [])
+        # Redeem half of the assignments, and use some of the unassigned codes
+        assignments = OfferAssignment.objects.filter(code__in=vouchers).order_by('pk')
+        assigned_codes = set(assignments.values_list('code', flat=True))
+        for assignment in assignments[:2]:
+            self.use_voucher(vouchers[assignment.code], self.create_user(email=assignment.user_email))
+        for code in sorted(set(vouchers) - assigned_codes)[:2]:
+            self.use_voucher(vouchers[code], self.create_user())
+
+        num_queries = []
+        for page_size in (1, 4):
+            endpoint = '/api/v2/enterprise/coupons/{}/codes/?code_filter={}&page_size={}'.format(
+                coupon_id, code_filter, page_size
+            )
+            with CaptureQueriesContext(connection) as queries:
+                response = self.get_response('GET', endpoint)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            num_queries.append(len(queries))
+
+        self.assertEqual(num_queries[0], num_queries[1])
+
     def test_implicit_permission_coupon_overview(self):
         """
         Test that we get implicit access via role assignment
@@ -1620,6 +1654,45 @@ class EnterpriseCouponViewSetRbacTests(
 
         self.assertEqual(overview_response, expected_results[0])
 
+    def test_coupon_overview_stats(self):
+        """
+        Test the coupon overview reads the stored coupon stats, which are calculated
+        again after codes are assigned, redeemed or their assignment emails bounce.
+        """
+        coupon_id = self.get_response('POST', ENTERPRISE_COUPONS_LINK, self.data).json()['coupon_id']
+        coupon = Product.objects.get(id=coupon_id)
+        base_url = reverse(
+            'api:v2:enterprise-coupons-overview',
+            kwargs={'enterprise_id': self.data['enterprise_customer']['id']}
+        )
+        request_url = '{}?{}'.format(base_url, urlencode({'coupon_id': coupon_id}))
+
+        def get_overview():
+            overview = self.get_response_json('GET', request_url)
+            return {field: overview[field] for field in ('num_codes', 'num_uses', 'num_unassigned', 'errors')}
+
+        self.assertFalse(CouponStats.objects.filter(coupon=coupon).exists())
+        self.assertEqual(get_overview(), {'num_codes': 2, 'num_uses': 0, 'num_unassigned': 2, 'errors': []})
+        stats = CouponStats.objects.get(coupon=coupon)
+
+        # Stored stats are read as they are.
+        CouponStats.objects.filter(pk=stats.pk).update(num_unassigned=5)
+        self.assertEqual(get_overview()['num_unassigned'], 5)
+
+        vouchers = coupon.attr.coupon_vouchers.vouchers.all()
+        self.assign_user_to_code(coupon_id, ['user1@example.com'], [vouchers[0].code])
+        self.assertEqual(get_overview(), {'num_codes': 2, 'num_uses': 0, 'num_unassigned': 1, 'errors': []})
+
+        self.use_voucher(vouchers[1], self.create_user())
+        self.assertEqual(get_overview(), {'num_codes': 2, 'num_uses': 1, 'num_unassigned': 0, 'errors': []})
+
+        assignment = OfferAssignment.objects.get(code=vouchers[0].code)
+        assignment.status = OFFER_ASSIGNMENT_EMAIL_BOUNCED
+        assignment.save()
+        self.assertEqual(get_overview()['errors'], [
+            {'id': assignment.id, 'user_email': 'user1@example.com', 'code': vouchers[0].code}
+        ])
+
     @ddt.data(
         {
             'voucher_type': Voucher.SINGLE_USE,
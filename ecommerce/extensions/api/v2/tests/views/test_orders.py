@@ -10,7 +10,9 @@ import mock
 import pytz
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
+from django.db import connection
 from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from oscar.core.loading import get_class, get_model
 from oscar.test import factories
@@ -31,6 +33,7 @@ from ecommerce.tests.mixins import ThrottlingMixin
 from ecommerce.tests.testcases import TestCase
 
 Basket = get_model('basket', 'Basket')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
 Order = get_model('order', 'Order')
 Product = get_model('catalogue', 'Product')
 ShippingEventType = get_model('order', 'ShippingEventType')
@@ -366,6 +369,11 @@ class ManualCourseEnrollmentOrderViewSetTests(TestCase, DiscoveryMockMixin):
     """
     def setUp(self):
         super(ManualCourseEnrollmentOrderViewSetTests, self).setUp()
+        # The view does not run in the request transaction. Keep REST framework from marking the transaction
+        # of the test for rollback when it returns an error response, as it would for an atomic request.
+        atomic_requests_patcher = mock.patch.dict(connection.settings_dict, {'ATOMIC_REQUESTS': False})
+        atomic_requests_patcher.start()
+        self.addCleanup(atomic_requests_patcher.stop)
         self.url = reverse('api:v2:manual-course-enrollment-order-list')
         self.user = self.create_user(is_staff=True)
         self.client.login(username=self.user.username, password=self.password)
@@ -875,6 +883,48 @@ class ManualCourseEnrollmentOrderViewSetTests(TestCase, DiscoveryMockMixin):
                     response_data["orders"][index]
                 )
 
+    def count_course_queries(self, post_data):
+        """
+        Make HTTP POST request and return the JSON response and the number of queries made to the course table.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            __, response_data = self.post_order(post_data, self.user)
+        return response_data, len([query for query in queries if 'FROM "courses_course"' in query['sql']])
+
+    @override_settings(MANUAL_ENROLLMENT_ORDER_CHUNK_SIZE=2)
+    def test_bulk_prefetch(self):
+        """
+        Test that bulk enrollments are looked up once for the whole payload and reuse the discount offer of
+        their enterprise.
+        """
+        __, single_course_queries = self.count_course_queries(self.generate_post_data(1))
+
+        post_data = self.generate_post_data(5)
+        del post_data["enrollments"][0]
+        post_data["enrollments"][3]["enterprise_customer_uuid"] = "5d4e2c7b-9a41-4f45-8a2f-3d0c4e1d1b11"
+        get_or_create = ConditionalOffer.objects.get_or_create
+        with mock.patch.object(ConditionalOffer.objects, 'get_or_create', side_effect=get_or_create) as mock_offer:
+            response_data, course_queries = self.count_course_queries(post_data)
+
+        self.assertEqual([order["new_order_created"] for order in response_data["orders"]], [True] * 4)
+        self.assertEqual(mock_offer.call_count, 2)
+        self.assertEqual(course_queries, single_course_queries)
+
+    def test_bulk_duplicate_enrollment(self):
+        """
+        Test that an enrollment repeated in the payload reuses the order created for the first one.
+        """
+        post_data = self.generate_post_data(1)
+        post_data["enrollments"].append(dict(post_data["enrollments"][0]))
+        pre_request_order_count = Order.objects.count()
+
+        _, response_data = self.post_order(post_data, self.user)
+
+        orders = response_data["orders"]
+        self.assertEqual(Order.objects.count(), pre_request_order_count + 1)
+        self.assertEqual(orders[1]["detail"], orders[0]["detail"])
+        self.assertEqual([order["new_order_created"] for order in orders], [True, False])
+
     @mock.patch(
         'ecommerce.extensions.api.v2.views.orders.EdxOrderPlacementMixin.place_free_order',
         new_callable=mock.PropertyMock,
@@ -19,6 +19,7 @@ from ecommerce.extensions.offer.constants import (
     OFFER_ASSIGNMENT_EMAIL_PENDING
 )
 from ecommerce.extensions.offer.models import OfferAssignment, OfferAssignmentEmailAttempt
+from ecommerce.extensions.voucher.coupon_stats import invalidate_coupon_stats
 
 logger = logging.getLogger(__name__)
 
@@ -133,6 +134,7 @@ class AssignmentEmailBounce(APIView):
                 code=assigned_offer.code,
                 status=OFFER_ASSIGNED
             ).update(status=OFFER_ASSIGNMENT_EMAIL_BOUNCED)
+            invalidate_coupon_stats(codes=[assigned_offer.code])
 
     def post(self, request):
         """
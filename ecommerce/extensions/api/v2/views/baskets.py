@@ -19,7 +19,6 @@ from rest_framework.permissions import DjangoModelPermissions, IsAuthenticated
 from rest_framework.response import Response
 
 from ecommerce.core.exceptions import MissingLmsUserIdException
-from ecommerce.core.utils import get_cache_key
 from ecommerce.extensions.analytics.utils import audit_log
 from ecommerce.extensions.api import data as data_api
 from ecommerce.extensions.api import exceptions as api_exceptions
@@ -27,19 +26,26 @@ from ecommerce.extensions.api.permissions import IsStaffOrOwner
 from ecommerce.extensions.api.serializers import BasketSerializer, OrderSerializer
 from ecommerce.extensions.api.throttles import ServiceUserThrottle
 from ecommerce.extensions.basket.constants import TEMPORARY_BASKET_CACHE_KEY
+from ecommerce.extensions.basket.pricing import (
+    get_cached_price_quotes,
+    get_price_quote,
+    get_price_quote_cache_key,
+    get_price_quote_sku_versions,
+    get_products_by_sku,
+    price_products,
+    set_cached_price_quotes
+)
 from ecommerce.extensions.basket.utils import attribute_cookie_data
 from ecommerce.extensions.checkout.mixins import EdxOrderPlacementMixin
 from ecommerce.extensions.partner.shortcuts import get_partner_for_site
 from ecommerce.extensions.payment import exceptions as payment_exceptions
 from ecommerce.extensions.payment.helpers import get_default_processor_class, get_processor_class_by_name
 
-Applicator = get_class('offer.applicator', 'Applicator')
 Basket = get_model('basket', 'Basket')
 logger = logging.getLogger(__name__)
 Order = get_model('order', 'Order')
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
 Product = get_model('catalogue', 'Product')
-Selector = get_class('partner.strategy', 'Selector')
 User = get_user_model()
 Voucher = get_model('voucher', 'Voucher')
 
@@ -372,99 +378,40 @@ class BasketCalculateView(generics.GenericAPIView):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    def _calculate_temporary_basket_atomic(self, user, request, products, voucher, skus, code):
-        response = None
+    def _calculate_temporary_basket(self, user, request, products, voucher, bundle_id, skus, code):
         try:
-            # We wrap this in an atomic operation so we never commit this to the db.
-            # This is to avoid merging this temporary basket with a real user basket.
-            with transaction.atomic():
-                basket = Basket(owner=user, site=request.site)
-                basket.strategy = Selector().strategy(user=user, request=request)
-                bundle_id = request.GET.get('bundle')
-
-                for product in products:
-                    basket.add_product(product, 1)
-
-                if voucher:
-                    basket.vouchers.add(voucher)
-
-                # Calculate any discounts on the basket.
-                Applicator().apply(basket, user=user, request=request, bundle_id=bundle_id)
-
-                discounts = []
-                if basket.offer_discounts:
-                    discounts = basket.offer_discounts
-                if basket.voucher_discounts:
-                    discounts.extend(basket.voucher_discounts)
-
-                response = {
-                    'total_incl_tax_excl_discounts': round(basket.total_incl_tax_excl_discounts, 2),
-                    'total_incl_tax': round(basket.total_incl_tax, 2),
-                    'currency': basket.currency
-                }
-                raise api_exceptions.TemporaryBasketException
-        except api_exceptions.TemporaryBasketException:
-            pass
+            # The basket is priced in memory, so it is never merged with a real user basket.
+            basket = price_products(request.site, user, products, voucher=voucher, request=request, bundle_id=bundle_id)
+            return get_price_quote(basket)
         except:  # pylint: disable=bare-except
             logger.exception(
                 'Failed to calculate basket discount for SKUs [%s] and voucher [%s].',
                 skus, code
             )
             raise
-        return response
-
-    def get(self, request):  # pylint: disable=too-many-statements
-        """ Calculate basket totals given a list of sku's
 
-        Create a temporary basket add the sku's and apply an optional voucher code.
-        Then calculate the total price less discounts. If a voucher code is not
-        provided apply a voucher in the Enterprise entitlements available
-        to the user.
+    def _get_basket_owner(self, request, requested_username, is_anonymous):
+        """
+        Return the user the basket is calculated for, or None for an anonymous basket.
 
-        Query Params:
-            sku (string): A list of sku(s) to calculate
-            code (string): Optional voucher code to apply to the basket.
-            username (string): Optional username of a user for which to calculate the basket.
+        Args:
+            request (Request): The request of the user calculating the basket.
+            requested_username (str): Username of the user to calculate the basket for, if any.
+            is_anonymous (bool): Whether an anonymous basket is requested.
 
         Returns:
-            JSON: {
-                    'total_incl_tax_excl_discounts': basket.total_incl_tax_excl_discounts,
-                    'total_incl_tax': basket.total_incl_tax,
-                    'currency': basket.currency
-                }
+            tuple: The basket owner, and the error response to return instead of calculating the basket, if any.
 
-         Side effects:
+        Side effects:
             If the basket owner does not have an LMS user id, tries to find it. If found, adds the id to the user and
             saves the user. If the id cannot be found, writes custom metrics to record this fact.
-       """
-        DEFAULT_REQUEST_CACHE.set(TEMPORARY_BASKET_CACHE_KEY, True)
-
-        partner = get_partner_for_site(request)
-        skus = request.GET.getlist('sku')
-        if not skus:
-            return HttpResponseBadRequest(_('No SKUs provided.'))
-        skus.sort()
-
-        code = request.GET.get('code', None)
-        try:
-            voucher = Voucher.objects.get(code=code) if code else None
-        except Voucher.DoesNotExist:
-            voucher = None
-
-        products = Product.objects.filter(stockrecords__partner=partner, stockrecords__partner_sku__in=skus)
-        if not products:
-            return HttpResponseBadRequest(_('Products with SKU(s) [{skus}] do not exist.').format(skus=', '.join(skus)))
-
+        """
         basket_owner = request.user
-
-        requested_username = request.GET.get('username', default='')
-        is_anonymous = request.GET.get('is_anonymous', 'false').lower() == 'true'
-
         use_default_basket = is_anonymous
 
         # validate query parameters
         if requested_username and is_anonymous:
-            return HttpResponseBadRequest(_('Provide username or is_anonymous query param, but not both'))
+            return None, HttpResponseBadRequest(_('Provide username or is_anonymous query param, but not both'))
         if not requested_username and not is_anonymous:
             logger.warning("Request to Basket Calculate must supply either username or is_anonymous query"
                            " param. Requesting user=%s. Future versions of this API will treat this "
@@ -484,7 +431,7 @@ class BasketCalculateView(generics.GenericAPIView):
                     # never purchased before.
                     use_default_basket = True
             else:
-                return HttpResponseForbidden('Unauthorized user credentials')
+                return None, HttpResponseForbidden('Unauthorized user credentials')
 
         if basket_owner.username == self.MARKETING_USER and not use_default_basket:
             # For legacy requests that predate is_anonymous parameter, we will calculate
@@ -494,37 +441,191 @@ class BasketCalculateView(generics.GenericAPIView):
             use_default_basket = True
 
         if use_default_basket:
-            basket_owner = None
+            return None, None
 
         # If we have a basket owner, ensure they have an LMS user id
         try:
-            if basket_owner:
-                called_from = u'calculation of basket total'
-                basket_owner.add_lms_user_id('ecommerce_missing_lms_user_id_calculate_basket_total', called_from)
+            called_from = u'calculation of basket total'
+            basket_owner.add_lms_user_id('ecommerce_missing_lms_user_id_calculate_basket_total', called_from)
         except MissingLmsUserIdException:
-            return self._report_bad_request(
+            return None, self._report_bad_request(
                 api_exceptions.LMS_USER_ID_NOT_FOUND_DEVELOPER_MESSAGE.format(user_id=basket_owner.id),
                 api_exceptions.LMS_USER_ID_NOT_FOUND_USER_MESSAGE
             )
 
+        return basket_owner, None
+
+    def get(self, request):
+        """ Calculate basket totals given a list of sku's
+
+        Price the sku's in a temporary in-memory basket and apply an optional voucher code.
+        Then calculate the total price less discounts. If a voucher code is not
+        provided apply a voucher in the Enterprise entitlements available
+        to the user.
+
+        Query Params:
+            sku (string): A list of sku(s) to calculate
+            code (string): Optional voucher code to apply to the basket.
+            username (string): Optional username of a user for which to calculate the basket.
+
+        Returns:
+            JSON: {
+                    'total_incl_tax_excl_discounts': basket.total_incl_tax_excl_discounts,
+                    'total_incl_tax': basket.total_incl_tax,
+                    'currency': basket.currency
+                }
+
+         Side effects:
+            If the basket owner does not have an LMS user id, tries to find it. If found, adds the id to the user and
+            saves the user. If the id cannot be found, writes custom metrics to record this fact.
+       """
+        DEFAULT_REQUEST_CACHE.set(TEMPORARY_BASKET_CACHE_KEY, True)
+
+        partner = get_partner_for_site(request)
+        skus = request.GET.getlist('sku')
+        if not skus:
+            return HttpResponseBadRequest(_('No SKUs provided.'))
+        skus.sort()
+
+        code = request.GET.get('code', None)
+        try:
+            voucher = Voucher.objects.get(code=code) if code else None
+        except Voucher.DoesNotExist:
+            voucher = None
+
+        products = Product.objects.filter(
+            stockrecords__partner=partner, stockrecords__partner_sku__in=skus
+        ).prefetch_related('stockrecords')
+        if not products:
+            return HttpResponseBadRequest(_('Products with SKU(s) [{skus}] do not exist.').format(skus=', '.join(skus)))
+
+        basket_owner, error_response = self._get_basket_owner(
+            request,
+            request.GET.get('username', default=''),
+            request.GET.get('is_anonymous', 'false').lower() == 'true'
+        )
+        if error_response:
+            return error_response
+        use_default_basket = basket_owner is None
+
         cache_key = None
         bundle_id = request.GET.get('bundle')
         if use_default_basket:
             # For an anonymous user we can directly get the cached price, because
             # there can't be any enrollments or entitlements.
             # We want bundle_id to be in the cache_key, since calls without bundle_id will produce different results
-            cache_key = get_cache_key(
-                site_domain=request.site,
-                resource_name='calculate',
-                skus=skus,
-                bundle_id=bundle_id
-            )
+            cache_key = get_price_quote_cache_key(request.site, skus, bundle_id)
             cached_response = TieredCache.get_cached_response(cache_key)
             if cached_response.is_found:
                 return Response(cached_response.value)
 
-        response = self._calculate_temporary_basket_atomic(basket_owner, request, products, voucher, skus, code)
+        response = self._calculate_temporary_basket(basket_owner, request, products, voucher, bundle_id, skus, code)
         if response and use_default_basket:
             TieredCache.set_all_tiers(cache_key, response, settings.ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT)
 
         return Response(response)
+
+
+class BasketCalculateBatchView(BasketCalculateView):
+    """ Calculate the basket totals of several SKU sets in a single request. """
+    http_method_names = ['post', 'options']
+
+    def _get_quotes_data(self, request):
+        """ Return the validated list of quotes to calculate, or None if the request data is invalid. """
+        quotes = request.data.get('quotes')
+        if not isinstance(quotes, list) or len(quotes) > settings.BASKET_CALCULATE_BATCH_MAX_QUOTES:
+            return None
+
+        quotes_data = []
+        for quote in quotes:
+            skus = quote.get('skus') if isinstance(quote, dict) else None
+            if not skus or not isinstance(skus, list) or not all(isinstance(sku, str) for sku in skus):
+                return None
+            quotes_data.append({
+                'skus': sorted(skus),
+                'code': quote.get('code') or None,
+                'bundle': quote.get('bundle') or None,
+            })
+        return quotes_data
+
+    def post(self, request):
+        """ Calculate basket totals for a list of SKU sets.
+
+        Every SKU set is priced as by the basket calculate endpoint. Products, stock records and vouchers are
+        looked up once for all the SKU sets, and the cached quotes of anonymous baskets are read with a single
+        multi-get, so that only the missing quotes are calculated.
+
+        Body Params:
+            quotes (list): Quotes to calculate, each one a dict with a list of 'skus', and an optional voucher
+                'code' and program 'bundle'.
+            username (string): Optional username of a user for which to calculate the baskets.
+            is_anonymous (bool): Optional, whether to calculate anonymous baskets.
+
+        Returns:
+            JSON: A list with the SKU set, code and bundle of every quote in the request, in the same order, and
+                either its totals, as returned by the basket calculate endpoint, or an error.
+        """
+        DEFAULT_REQUEST_CACHE.set(TEMPORARY_BASKET_CACHE_KEY, True)
+
+        quotes_data = self._get_quotes_data(request)
+        if quotes_data is None:
+            return HttpResponseBadRequest(
+                _('Provide a list of at most {max_quotes} quotes, each with a list of SKUs.').format(
+                    max_quotes=settings.BASKET_CALCULATE_BATCH_MAX_QUOTES
+                )
+            )
+
+        basket_owner, error_response = self._get_basket_owner(
+            request,
+            request.data.get('username') or '',
+            request.data.get('is_anonymous') is True
+        )
+        if error_response:
+            return error_response
+
+        products_by_sku = get_products_by_sku(
+            get_partner_for_site(request), {sku for quote_data in quotes_data for sku in quote_data['skus']}
+        )
+        codes = {quote_data['code'] for quote_data in quotes_data if quote_data['code']}
+        vouchers_by_code = {
+            voucher.code: voucher for voucher in Voucher.objects.filter(code__in=codes).prefetch_related('offers')
+        } if codes else {}
+
+        # Anonymous quotes are cached as in the basket calculate endpoint.
+        if basket_owner is None:
+            # Read the versions of all the SKUs at once, instead of once per quote
+            get_price_quote_sku_versions({sku for quote_data in quotes_data for sku in quote_data['skus']})
+        cache_keys = [
+            get_price_quote_cache_key(request.site, quote_data['skus'], quote_data['bundle'])
+            if basket_owner is None else None
+            for quote_data in quotes_data
+        ]
+        cached_quotes = get_cached_price_quotes([key for key in cache_keys if key]) if basket_owner is None else {}
+
+        results = []
+        new_quotes = {}
+        for quote_data, cache_key in zip(quotes_data, cache_keys):
+            result = dict(quote_data)
+            products = list({
+                products_by_sku[sku].id: products_by_sku[sku] for sku in quote_data['skus'] if sku in products_by_sku
+            }.values())
+            if not products:
+                result['error'] = _('Products with SKU(s) [{skus}] do not exist.').format(
+                    skus=', '.join(quote_data['skus'])
+                )
+            elif cache_key in cached_quotes or cache_key in new_quotes:
+                result.update(cached_quotes.get(cache_key) or new_quotes[cache_key])
+            else:
+                quote = self._calculate_temporary_basket(
+                    basket_owner, request, products, vouchers_by_code.get(quote_data['code']), quote_data['bundle'],
+                    quote_data['skus'], quote_data['code']
+                )
+                if cache_key:
+                    new_quotes[cache_key] = quote
+                result.update(quote)
+            results.append(result)
+
+        if new_quotes:
+            set_cached_price_quotes(new_quotes)
+
+        return Response(results)
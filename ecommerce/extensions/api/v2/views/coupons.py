@@ -27,6 +27,7 @@ from ecommerce.extensions.catalogue.utils import (
 )
 from ecommerce.extensions.checkout.mixins import EdxOrderPlacementMixin
 from ecommerce.extensions.payment.processors.invoice import InvoicePayment
+from ecommerce.extensions.voucher.coupon_stats import invalidate_coupon_stats
 from ecommerce.extensions.voucher.models import CouponVouchers
 from ecommerce.extensions.voucher.utils import (
     get_or_create_enterprise_offer,
@@ -364,6 +365,7 @@ class CouponViewSet(EdxOrderPlacementMixin, viewsets.ModelViewSet):
         data = self.create_update_data_dict(data=request_data, fields=CouponVouchers.UPDATEABLE_VOUCHER_FIELDS)
         if data:
             vouchers.update(**data)
+            invalidate_coupon_stats(voucher_ids=vouchers.values('id'))
 
     def create_update_data_dict(self, data, fields):
         """
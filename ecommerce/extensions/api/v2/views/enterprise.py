@@ -631,7 +631,7 @@ class EnterpriseCouponViewSet(CouponViewSet):
             - Valid from.
             - Valid end.
         """
-        enterprise_coupons = self.get_queryset()
+        enterprise_coupons = self.get_queryset().select_related('coupon_stats')
         coupon_id = self.request.query_params.get('coupon_id', None)
         if coupon_id is not None:
             coupon = get_object_or_404(enterprise_coupons, id=coupon_id)
@@ -2,14 +2,15 @@
 
 
 import logging
+from collections import defaultdict
 from decimal import Decimal
 
 import dateutil
 import django_filters
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models import Q
 from django.utils.decorators import method_decorator
 from edx_rest_framework_extensions.auth.jwt.authentication import JwtAuthentication
 from oscar.core.loading import get_class, get_model
@@ -22,6 +23,7 @@ from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 from slumber.exceptions import HttpServerError, SlumberBaseException
 
+from ecommerce.core.constants import SEAT_PRODUCT_CLASS_NAME
 from ecommerce.courses.models import Course
 from ecommerce.courses.utils import get_course_run_detail
 from ecommerce.enterprise.mixins import EnterpriseDiscountMixin
@@ -41,7 +43,7 @@ logger = logging.getLogger(__name__)
 
 Order = get_model('order', 'Order')
 OrderLine = get_model('order', 'Line')
-Product = get_model('catalogue', 'Product')
+ProductAttributeValue = get_model('catalogue', 'ProductAttributeValue')
 post_checkout = get_class('checkout.signals', 'post_checkout')
 Basket = get_model('basket', 'Basket')
 Applicator = get_class('offer.applicator', 'Applicator')
@@ -103,6 +105,7 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
 class ManualCourseEnrollmentOrderViewSet(EdxOrderPlacementMixin, EnterpriseDiscountMixin, ViewSet):
     """
         **Use Cases**
@@ -112,7 +115,8 @@ class ManualCourseEnrollmentOrderViewSet(EdxOrderPlacementMixin, EnterpriseDisco
 
         **Behavior**
 
-            Implements POST action only.
+            Implements POST action only. Orders are placed in transactions of MANUAL_ENROLLMENT_ORDER_CHUNK_SIZE
+            enrollments, so they are kept if a later enrollment of the payload fails or the request times out.
 
             POST /api/v2/manual_course_enrollment_order/
             >>> {
@@ -181,15 +185,16 @@ class ManualCourseEnrollmentOrderViewSet(EdxOrderPlacementMixin, EnterpriseDisco
 
     SUCCESS, FAILURE = "success", "failure"
 
-    @staticmethod
-    def existing_purchased_line(seat_product, user, site):
-        """ Returns existing OrderLine object purchased by user whether in the form of course entitlement
-        or course enrollment."""
-        course_uuid = get_course_run_detail(site, seat_product.course.id)['course_uuid']
-        products = Product.objects.filter(
-            Q(pk=seat_product.pk) | Q(attributes__code='UUID', attribute_values__value_text=course_uuid)
-        )
-        return OrderLine.objects.filter(product__in=products, order__user=user, status=LINE.COMPLETE).first()
+    def __init__(self, **kwargs):
+        super(ManualCourseEnrollmentOrderViewSet, self).__init__(**kwargs)
+        # Data of the enrollments of the request, set by `_prefetch_enrollment_data`.
+        self._learner_users = {}
+        self._courses = {}
+        self._seat_products = {}
+        self._course_uuids = {}
+        self._entitlement_product_ids = defaultdict(set)
+        self._purchased_lines = defaultdict(list)
+        self._discount_offers = {}
 
     def create(self, request):
         """
@@ -215,15 +220,104 @@ class ManualCourseEnrollmentOrderViewSet(EdxOrderPlacementMixin, EnterpriseDisco
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        orders = []
-        for enrollment in enrollments:
-            orders.append(self._create_single_order(enrollment, request.user, request.site))
+        orders = self._create_orders(enrollments, request.user, request.site)
 
         return Response({"orders": orders}, status=status.HTTP_200_OK)
 
-    def _create_single_order(self, enrollment, request_user, request_site):
+    def _create_orders(self, enrollments, request_user, request_site):
+        """
+            Creates the orders of all the enrollments.
+
+            The learners, courses, seat products and lines already purchased by the learners are fetched for the
+            whole payload at once, and the orders are placed in transactions of MANUAL_ENROLLMENT_ORDER_CHUNK_SIZE
+            enrollments, so that the orders placed before a failure or a timeout are kept.
+
+            Returns:
+                list: The result of `_create_single_order` for every enrollment, in the order of `enrollments`.
+        """
+        orders = [None] * len(enrollments)
+        valid_enrollments = []
+        for index, enrollment in enumerate(enrollments):
+            try:
+                enrollment_data = self._get_enrollment_data(enrollment)
+            except ValidationError as ex:
+                orders[index] = dict(enrollment, status=self.FAILURE, detail=ex.message, new_order_created=None)
+            else:
+                valid_enrollments.append((index, enrollment, enrollment_data))
+
+        self._prefetch_enrollment_data([enrollment_data for __, __, enrollment_data in valid_enrollments], request_site)
+
+        chunk_size = settings.MANUAL_ENROLLMENT_ORDER_CHUNK_SIZE
+        for start in range(0, len(valid_enrollments), chunk_size):
+            with transaction.atomic():
+                for index, enrollment, enrollment_data in valid_enrollments[start:start + chunk_size]:
+                    orders[index] = self._create_single_order(enrollment, enrollment_data, request_user, request_site)
+
+        return orders
+
+    def _prefetch_enrollment_data(self, enrollments_data, request_site):
+        """
+            Fetches the learners, courses, seat products and purchased lines of all the enrollments, and stores
+            them on the view.
+
+            Params:
+                `enrollments_data`: <list> of the tuples returned by `_get_enrollment_data`.
+                `request_site`: <Site>
+        """
+        usernames = {enrollment_data[1] for enrollment_data in enrollments_data}
+        course_run_keys = {enrollment_data[3] for enrollment_data in enrollments_data}
+        modes = {enrollment_data[4] for enrollment_data in enrollments_data}
+
+        self._learner_users = {
+            user.username: user for user in get_user_model().objects.filter(username__in=usernames)
+        }
+        self._courses = {course.id: course for course in Course.objects.filter(id__in=course_run_keys)}
+
+        seat_attribute_values = ProductAttributeValue.objects.filter(
+            attribute__name='certificate_type',
+            value_text__in=modes,
+            product__course__in=self._courses.keys(),
+            product__parent__product_class__name=SEAT_PRODUCT_CLASS_NAME,
+        ).select_related('product').prefetch_related('product__stockrecords').order_by('-product__date_created')
+        for attribute_value in seat_attribute_values:
+            seat_product = attribute_value.product
+            self._seat_products.setdefault((seat_product.course_id, attribute_value.value_text), seat_product)
+
+        # Learners may have purchased the course run seat, or an entitlement to the course it belongs to.
+        for course in self._courses.values():
+            try:
+                self._course_uuids[course.id] = get_course_run_detail(request_site, course.id)['course_uuid']
+            except (SlumberBaseException, ConnectionError, Timeout, HttpServerError) as ex:
+                logger.exception(
+                    "Could not access course run detail. Site: %s, course_run_key: %s, message: %s",
+                    request_site,
+                    course.id,
+                    ex,
+                )
+
+        entitlement_attribute_values = ProductAttributeValue.objects.filter(
+            attribute__code='UUID', value_text__in=set(self._course_uuids.values())
+        ).values_list('product_id', 'value_text')
+        for product_id, course_uuid in entitlement_attribute_values:
+            self._entitlement_product_ids[course_uuid].add(product_id)
+
+        product_ids = {seat_product.id for seat_product in self._seat_products.values()}
+        product_ids.update(*self._entitlement_product_ids.values())
+        purchased_lines = OrderLine.objects.filter(
+            product_id__in=product_ids, order__user__in=self._learner_users.values(), status=LINE.COMPLETE
+        ).select_related('order').order_by('pk')
+        for line in purchased_lines:
+            self._purchased_lines[line.order.user_id].append(line)
+
+    def _get_existing_purchased_line(self, seat_product, user):
+        """ Returns existing OrderLine object purchased by user whether in the form of course entitlement
+        or course enrollment."""
+        product_ids = {seat_product.id} | self._entitlement_product_ids[self._course_uuids[seat_product.course_id]]
+        return next((line for line in self._purchased_lines[user.id] if line.product_id in product_ids), None)
+
+    def _create_single_order(self, enrollment, enrollment_data, request_user, request_site):
         """
-            Creates an order from a single enrollment.
+            Creates an order from a single enrollment, using the data fetched by `_prefetch_enrollment_data`.
             Params:
                 `enrollment`: <dict> with fields:
                     "lms_user_id": <int>,
@@ -235,6 +329,7 @@ class ManualCourseEnrollmentOrderViewSet(EdxOrderPlacementMixin, EnterpriseDisco
                     "mode": <string>,
                     "enterprise_customer_name": <string>,
                     "enterprise_customer_uuid": <string>,
+                `enrollment_data`: <tuple> returned by `_get_enrollment_data` for `enrollment`
                 `request_user`: <User>
                 `request_site`: <Site>
             Returns:
@@ -242,18 +337,15 @@ class ManualCourseEnrollmentOrderViewSet(EdxOrderPlacementMixin, EnterpriseDisco
                     "status": <string> ("success" or "failure")
                     "detail": <string> (order number if success, otherwise failure reason)
         """
-        try:
-            (
-                lms_user_id,
-                learner_username,
-                learner_email,
-                course_run_key,
-                mode,
-                discount_percentage,
-                sales_force_id,
-            ) = self._get_enrollment_data(enrollment)
-        except ValidationError as ex:
-            return dict(enrollment, status=self.FAILURE, detail=ex.message, new_order_created=None)
+        (
+            lms_user_id,
+            learner_username,
+            learner_email,
+            course_run_key,
+            mode,
+            discount_percentage,
+            sales_force_id,
+        ) = enrollment_data
 
         logger.info(
             '[Manual Order Creation] Request received. User: %s, Email: %s, Course: %s, RequestUser: %s, '
@@ -268,28 +360,24 @@ class ManualCourseEnrollmentOrderViewSet(EdxOrderPlacementMixin, EnterpriseDisco
 
         learner_user = self._get_learner_user(lms_user_id, learner_username, learner_email)
 
-        try:
-            course = Course.objects.get(id=course_run_key)
-        except Course.DoesNotExist:
+        course = self._courses.get(course_run_key)
+        if course is None:
             return dict(enrollment, status=self.FAILURE, detail="Course not found", new_order_created=None)
 
-        seat_product = course.seat_products.filter(
-            attributes__name='certificate_type',
-            attribute_values__value_text=mode
-        ).first()
+        seat_product = self._seat_products.get((course.id, mode))
 
         # check if an order already exists with the requested data
-        try:
-            order_line = self.existing_purchased_line(seat_product, learner_user, request_site)
-        except (SlumberBaseException, ConnectionError, Timeout, HttpServerError, AttributeError) as ex:
-            logger.exception(
-                "Could not access existing purchased line. User: %s, Site: %s, course_run_key: %s, message: %s",
+        if seat_product is None or course.id not in self._course_uuids:
+            logger.error(
+                "Could not access existing purchased line. User: %s, Site: %s, course_run_key: %s, mode: %s",
                 learner_user,
                 request_site,
                 course_run_key,
-                ex,
+                mode,
             )
             return dict(enrollment, status=self.FAILURE, detail="Failed to create free order", new_order_created=None)
+
+        order_line = self._get_existing_purchased_line(seat_product, learner_user)
         if order_line:
             order = order_line.order
             self._update_all_orderline_with_enterprise_discount(order, discount_percentage)
@@ -303,18 +391,18 @@ class ManualCourseEnrollmentOrderViewSet(EdxOrderPlacementMixin, EnterpriseDisco
         basket = Basket.create_basket(request_site, learner_user)
         basket.add_product(seat_product)
 
-        enterprise_customer_name = enrollment.get('enterprise_customer_name')
-        enterprise_customer_uuid = enrollment.get('enterprise_customer_uuid')
         discount_offer = self._get_or_create_discount_offer(
-            enterprise_customer_name,
-            enterprise_customer_uuid,
+            enrollment.get('enterprise_customer_name'),
+            enrollment.get('enterprise_customer_uuid'),
             sales_force_id
         )
         Applicator().apply_offers(basket, [discount_offer])
         try:
-            order = self.place_free_order(basket)
-            self._update_order_according_to_date_place(order, enrollment.get('date_placed'))
-            self._update_all_orderline_with_enterprise_discount(order, discount_percentage)
+            # A failed order must not roll back the other orders of the chunk.
+            with transaction.atomic():
+                order = self.place_free_order(basket)
+                self._update_order_according_to_date_place(order, enrollment.get('date_placed'))
+                self._update_all_orderline_with_enterprise_discount(order, discount_percentage)
         except:  # pylint: disable=bare-except
             logger.exception(
                 '[Manual Order Creation Failure] Failed to place the order. User: %s, Course: %s, Basket: %s, '
@@ -326,6 +414,9 @@ class ManualCourseEnrollmentOrderViewSet(EdxOrderPlacementMixin, EnterpriseDisco
             )
             return dict(enrollment, status=self.FAILURE, detail="Failed to create free order", new_order_created=None)
 
+        # Later enrollments of the payload for the same learner and course reuse this order.
+        self._purchased_lines[learner_user.id].extend(order.lines.all())
+
         logger.info(
             '[Manual Order Creation] Order completed. User: %s, Course: %s, Basket: %s, Order: %s, Product: %s',
             learner_user.username,
@@ -439,18 +530,33 @@ class ManualCourseEnrollmentOrderViewSet(EdxOrderPlacementMixin, EnterpriseDisco
 
         If user exists then email will be upated to matach the `learner_email`.
         If user does not exist then a new one will be created.
+        Existing users are looked up in the users fetched by `_prefetch_enrollment_data`.
         """
-        learner_user, __ = get_user_model().objects.update_or_create(username=learner_username, defaults={
-            'email': learner_email,
-            'lms_user_id': lms_user_id
-        })
+        learner_user = self._learner_users.get(learner_username)
+        if learner_user is None:
+            learner_user = get_user_model().objects.create(
+                username=learner_username,
+                email=learner_email,
+                lms_user_id=lms_user_id
+            )
+            self._learner_users[learner_username] = learner_user
+        elif learner_user.email != learner_email or learner_user.lms_user_id != lms_user_id:
+            learner_user.email = learner_email
+            learner_user.lms_user_id = lms_user_id
+            learner_user.save()
 
         return learner_user
 
     def _get_or_create_discount_offer(self, enterprise_customer_name, enterprise_customer_uuid, sales_force_id):
         """
         Get or Create 100% discount offer for `Manual Enrollment Order`.
+
+        The offer is only looked up once per request for the same enterprise customer and Salesforce opportunity.
         """
+        offer_key = (enterprise_customer_name, enterprise_customer_uuid, sales_force_id)
+        if offer_key in self._discount_offers:
+            return self._discount_offers[offer_key]
+
         condition, _ = Condition.objects.get_or_create(
             proxy_class=class_path(ManualEnrollmentOrderDiscountCondition),
             enterprise_customer_uuid=enterprise_customer_uuid
@@ -481,6 +587,7 @@ class ManualCourseEnrollmentOrderViewSet(EdxOrderPlacementMixin, EnterpriseDisco
             offer.sales_force_id = sales_force_id
             offer.save()
 
+        self._discount_offers[offer_key] = offer
         return offer
 
     def handle_successful_order(self, order, request=None):  # pylint: disable=arguments-differ
@@ -12,6 +12,9 @@ class BasketConfig(apps.BasketConfig):
     # pylint: disable=attribute-defined-outside-init
     def ready(self):
         super().ready()
+        # Register signal handlers
+        # noinspection PyUnresolvedReferences
+        import ecommerce.extensions.basket.signals  # pylint: disable=unused-import, import-outside-toplevel
         self.basket_add_items_view = get_class('basket.views', 'BasketAddItemsView')
         self.summary_view = get_class('basket.views', 'BasketSummaryView')
 
@@ -0,0 +1,44 @@
+"""
+Management command that calculates and caches the anonymous price quotes of the products sold on every site.
+
+Run it more often than ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT, so that the quotes requested from the basket
+calculate endpoints are refreshed before they expire.
+"""
+
+
+import logging
+
+from django.contrib.sites.models import Site
+from django.core.management import BaseCommand, CommandError
+
+from ecommerce.extensions.basket.pricing import warm_price_quotes
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Calculate and cache the anonymous price quotes of active seats, entitlements and program bundles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site-domain',
+                            action='store',
+                            dest='site_domain',
+                            default=None,
+                            help='Domain of the site to warm the quotes of. Defaults to every site.')
+        parser.add_argument('-b', '--batch-size',
+                            action='store',
+                            dest='batch_size',
+                            default=100,
+                            type=int,
+                            help='Number of quotes written to the cache at once.')
+
+    def handle(self, *args, **options):
+        sites = Site.objects.filter(siteconfiguration__isnull=False).select_related('siteconfiguration__partner')
+        if options['site_domain']:
+            sites = sites.filter(domain=options['site_domain'])
+            if not sites:
+                raise CommandError('No site configuration found for domain [{}].'.format(options['site_domain']))
+
+        for site in sites:
+            count = warm_price_quotes(site, batch_size=options['batch_size'])
+            logger.info('Cached [%d] price quotes for site [%s].', count, site.domain)
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.17 on 2026-10-17 09:26
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basket', '0014_basket_authorization_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingBasket',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('basket.basket',),
+        ),
+    ]
@@ -10,6 +10,7 @@ from oscar.core.loading import get_class
 from ecommerce.extensions.analytics.utils import track_segment_event, translate_basket_line_for_segment
 from ecommerce.extensions.basket.constants import TEMPORARY_BASKET_CACHE_KEY
 
+OfferApplications = get_class('offer.results', 'OfferApplications')
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
 Selector = get_class('partner.strategy', 'Selector')
 
@@ -94,6 +95,10 @@ class Basket(AbstractBasket):
             track_segment_event(self.site, self.owner, 'Product Added', properties)
         return line, created
 
+    def get_vouchers(self):
+        """ Return the vouchers applied to the basket. """
+        return self.vouchers.all()
+
     def clear_vouchers(self):
         """Remove all vouchers applied to the basket."""
         for v in self.vouchers.all():
@@ -107,6 +112,106 @@ class Basket(AbstractBasket):
             num_lines=self.num_lines)
 
 
+class PricingBasket(Basket):
+    """
+    Basket used to calculate prices in memory.
+
+    Lines and vouchers are kept on the instance instead of being saved, so the same strategy and offers
+    applied to real baskets can price products without writing to the basket tables. Pricing baskets
+    can never be saved.
+    """
+
+    class Meta:
+        proxy = True
+
+    def __init__(self, *args, **kwargs):
+        super(PricingBasket, self).__init__(*args, **kwargs)
+        self._pricing_lines = []
+        self._vouchers = []
+
+    def save(self, *args, **kwargs):  # pylint: disable=arguments-differ
+        raise TypeError('Pricing baskets cannot be saved.')
+
+    def all_lines(self):
+        return self._pricing_lines
+
+    def reset_offer_applications(self):
+        """ Remove the discounts of the offers applied to the basket, keeping its lines. """
+        self.offer_applications = OfferApplications()
+        for line in self._pricing_lines:
+            line.clear_discount()
+
+    def add_product(self, product, quantity=1, options=None):
+        """
+        Add the indicated product to the in-memory lines of the basket.
+
+        Lines are validated as in AbstractBasket.add_product. Product options are not supported.
+        """
+        if options:
+            raise ValueError('Pricing baskets do not support product options.')
+
+        stock_info = self.get_stock_info(product, options)
+        if not stock_info.price.exists:
+            raise ValueError("Strategy hasn't found a price for product %s" % product)
+
+        price_currency = self.currency
+        if price_currency and stock_info.price.currency != price_currency:
+            raise ValueError((
+                "Basket lines must all have the same currency. Proposed "
+                "line has currency %s, while basket has currency %s") % (stock_info.price.currency, price_currency))
+
+        if stock_info.stockrecord is None:
+            raise ValueError((
+                "Basket lines must all have stock records. Strategy hasn't "
+                "found any stock record for product %s") % product)
+
+        line_reference = self._create_line_reference(product, stock_info.stockrecord, options)
+        for line in self._pricing_lines:
+            if line.line_reference == line_reference:
+                line.quantity = max(0, line.quantity + quantity)
+                self.reset_offer_applications()
+                return line, False
+
+        line = Line(
+            basket=self,
+            line_reference=line_reference,
+            product=product,
+            stockrecord=stock_info.stockrecord,
+            quantity=quantity,
+            price_currency=stock_info.price.currency,
+            price_excl_tax=stock_info.price.excl_tax,
+            price_incl_tax=stock_info.price.incl_tax if stock_info.price.is_tax_known else None,
+        )
+        self._pricing_lines.append(line)
+        self.reset_offer_applications()
+        return line, True
+    add = add_product
+
+    def add_voucher(self, voucher):
+        """ Apply the voucher to the basket. """
+        if voucher not in self._vouchers:
+            self._vouchers.append(voucher)
+
+    def get_vouchers(self):
+        return list(self._vouchers)
+
+    @property
+    def contains_a_voucher(self):
+        return bool(self._vouchers)
+
+    @property
+    def is_empty(self):
+        return not self._pricing_lines
+
+    @property
+    def num_lines(self):
+        return len(self._pricing_lines)
+
+    @property
+    def num_items(self):
+        return sum(line.quantity for line in self._pricing_lines)
+
+
 class BasketAttributeType(models.Model):
     """
     Used to keep attribute types for BasketAttribute
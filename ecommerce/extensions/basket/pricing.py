@@ -0,0 +1,342 @@
+"""
+In-memory pricing of products.
+
+Price quotes used to be calculated with a temporary basket, saved in a transaction that was rolled back once the
+offers were applied. Quotes are now calculated with a ``PricingBasket``, which keeps its lines and vouchers in memory,
+so pricing products takes no writes nor row locks on the basket tables, while using the same strategy and offers as
+real baskets.
+
+Quotes of anonymous users are cached. The cache is versioned (see ecommerce.extensions.basket.signals): saving or
+deleting a stock record, or changing the products of a range used by a site offer, stores a new version of the
+affected SKUs, which invalidates their cached quotes. Saving or deleting a site offer, or saving its condition,
+benefit or ranges, stores a new version of every quote. ``warm_price_quotes`` calculates the quotes of the products
+sold on a site ahead of the requests asking for them.
+"""
+import logging
+from uuid import uuid4
+
+import crum
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import HttpRequest
+from django.utils.timezone import now
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE, TieredCache
+from oscar.core.loading import get_class, get_model
+from threadlocals.threadlocals import set_thread_variable
+
+from ecommerce.core.constants import COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME, SEAT_PRODUCT_CLASS_NAME
+from ecommerce.core.utils import get_cache_key
+from ecommerce.programs.utils import get_program
+
+Applicator = get_class('offer.applicator', 'Applicator')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+PricingBasket = get_model('basket', 'PricingBasket')
+Product = get_model('catalogue', 'Product')
+Selector = get_class('partner.strategy', 'Selector')
+logger = logging.getLogger(__name__)
+
+PRICE_QUOTE_VERSION_CACHE_KEY = 'basket.pricing.price_quote_version'
+PRICE_QUOTE_SKU_VERSION_RESOURCE = 'basket.pricing.price_quote_sku_version'
+
+
+def price_products(site, user, products, voucher=None, request=None, bundle_id=None):
+    """
+    Price products in memory, applying the offers available to the user.
+
+    Args:
+        site (Site): Site the products are sold on.
+        user (User): User the products are priced for. None for anonymous users.
+        products (iterable): Products to price, one unit each.
+        voucher (Voucher): Optional voucher to apply.
+        request (Request): Optional request, used by the strategy and the offer conditions.
+        bundle_id (str): Optional UUID of the program the products are bought as a bundle of.
+
+    Returns:
+        PricingBasket: The unsaved basket with the products and the applied offers.
+    """
+    basket = PricingBasket(owner=user, site=site)
+    basket.strategy = Selector().strategy(user=user, request=request)
+
+    for product in products:
+        basket.add_product(product, 1)
+
+    if voucher:
+        basket.add_voucher(voucher)
+
+    Applicator().apply(basket, user=user, request=request, bundle_id=bundle_id)
+    return basket
+
+
+def get_price_quote(basket):
+    """
+    Return the totals of a priced basket, as returned by the basket calculate endpoint.
+
+    Args:
+        basket (Basket): Basket the offers were applied to.
+
+    Returns:
+        dict
+    """
+    return {
+        'total_incl_tax_excl_discounts': round(basket.total_incl_tax_excl_discounts, 2),
+        'total_incl_tax': round(basket.total_incl_tax, 2),
+        'currency': basket.currency
+    }
+
+
+def get_products_by_sku(partner, skus):
+    """
+    Return the products of the partner with the given SKUs, with their stock records prefetched.
+
+    Returns:
+        dict: Products by SKU. SKUs without a product are left out.
+    """
+    products_by_sku = {}
+    products = Product.objects.filter(
+        stockrecords__partner=partner, stockrecords__partner_sku__in=skus
+    ).prefetch_related('stockrecords').distinct()
+    for product in products:
+        for stockrecord in product.stockrecords.all():
+            if stockrecord.partner_id == partner.id:
+                products_by_sku[stockrecord.partner_sku] = product
+    return products_by_sku
+
+
+def _set_new_version(cache_key):
+    version = uuid4().hex
+    # Versions never expire, so that cached quotes are not invalidated without a reason.
+    TieredCache.set_all_tiers(cache_key, version, None)
+    return version
+
+
+def _get_sku_version_cache_key(sku):
+    return get_cache_key(resource_name=PRICE_QUOTE_SKU_VERSION_RESOURCE, sku=sku)
+
+
+def get_price_quote_version():
+    """ Return the current version of every cached price quote. """
+    cached_response = TieredCache.get_cached_response(PRICE_QUOTE_VERSION_CACHE_KEY)
+    if cached_response.is_found:
+        return cached_response.value
+    return invalidate_price_quotes()
+
+
+def get_price_quote_sku_versions(skus):
+    """
+    Return the current versions of the cached price quotes of the SKUs.
+
+    Versions are looked up in the request cache first, and the remaining ones are read from the django cache with
+    a single multi-get.
+
+    Returns:
+        dict: Versions by SKU.
+    """
+    cache_keys = {sku: _get_sku_version_cache_key(sku) for sku in set(skus)}
+    versions = {}
+    missing_keys = {}
+    for sku, cache_key in cache_keys.items():
+        cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(cache_key)
+        if cached_response.is_found:
+            versions[sku] = cached_response.value
+        else:
+            missing_keys[cache_key] = sku
+
+    if missing_keys:
+        cached_versions = cache.get_many(list(missing_keys))
+        for cache_key, sku in missing_keys.items():
+            if cache_key in cached_versions:
+                versions[sku] = cached_versions[cache_key]
+                DEFAULT_REQUEST_CACHE.set(cache_key, versions[sku])
+            else:
+                versions[sku] = _set_new_version(cache_key)
+    return versions
+
+
+def invalidate_price_quotes():
+    """
+    Store a new price quote version, invalidating every cached price quote.
+
+    Returns:
+        str: The new version.
+    """
+    return _set_new_version(PRICE_QUOTE_VERSION_CACHE_KEY)
+
+
+def invalidate_sku_price_quotes(skus):
+    """
+    Store a new price quote version for each SKU, invalidating the cached price quotes that include it.
+    """
+    for sku in set(skus):
+        _set_new_version(_get_sku_version_cache_key(sku))
+
+
+def get_price_quote_cache_key(site, skus, bundle_id=None):
+    """
+    Return the key the price quote of the SKUs is cached under for anonymous users.
+
+    Quotes of anonymous users do not depend on enrollments, entitlements nor vouchers, so they are cached per site,
+    SKUs and program bundle.
+    """
+    sku_versions = get_price_quote_sku_versions(skus)
+    return get_cache_key(
+        site_domain=site,
+        resource_name='calculate',
+        skus=sorted(skus),
+        bundle_id=bundle_id,
+        version=get_price_quote_version(),
+        sku_versions=[sku_versions[sku] for sku in sorted(skus)]
+    )
+
+
+def get_cached_price_quotes(cache_keys):
+    """
+    Return the cached price quotes found for the keys.
+
+    Quotes are looked up in the request cache first, and the remaining ones are read from the django cache with
+    a single multi-get.
+
+    Returns:
+        dict: Cached quotes by cache key. Keys without a cached quote are left out.
+    """
+    quotes = {}
+    missing_keys = []
+    for cache_key in cache_keys:
+        cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(cache_key)
+        if cached_response.is_found:
+            quotes[cache_key] = cached_response.value
+        else:
+            missing_keys.append(cache_key)
+
+    if missing_keys:
+        for cache_key, quote in cache.get_many(missing_keys).items():
+            DEFAULT_REQUEST_CACHE.set(cache_key, quote)
+            quotes[cache_key] = quote
+    return quotes
+
+
+def set_cached_price_quotes(quotes):
+    """
+    Cache price quotes in all tiers, with a single multi-set in the django cache.
+
+    Args:
+        quotes (dict): Quotes by cache key.
+    """
+    for cache_key, quote in quotes.items():
+        DEFAULT_REQUEST_CACHE.set(cache_key, quote)
+    cache.set_many(quotes, settings.ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT)
+
+
+def _get_program_bundle_skus(program):
+    """
+    Return the SKUs the marketing site prices a program bundle with: one per course of the program, preferring the
+    entitlement to the seats of the course runs.
+    """
+    applicable_seat_types = program['applicable_seat_types']
+    skus = []
+    for course in program['courses']:
+        course_skus = [
+            entitlement['sku'] for entitlement in course['entitlements']
+            if entitlement['mode'].lower() in applicable_seat_types
+        ] + [
+            seat['sku'] for course_run in course['course_runs'] for seat in course_run['seats']
+            if seat['type'] in applicable_seat_types
+        ]
+        if course_skus:
+            skus.append(course_skus[0])
+    return skus
+
+
+def get_anonymous_quote_products(site):
+    """
+    Return the products anonymous quotes are requested for on a site.
+
+    These are the seats and course entitlements that have not expired, priced one at a time, and the bundles of
+    the programs with an open program offer.
+
+    Returns:
+        list: (products, bundle_id) tuples.
+    """
+    partner = site.siteconfiguration.partner
+    products = Product.objects.filter(
+        Q(expires__isnull=True) | Q(expires__gte=now()),
+        structure=Product.CHILD,
+        parent__product_class__name__in=(SEAT_PRODUCT_CLASS_NAME, COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME),
+        stockrecords__partner=partner,
+    ).prefetch_related('stockrecords').distinct()
+    quote_products = [([product], None) for product in products]
+
+    program_uuids = ConditionalOffer.objects.filter(
+        Q(end_datetime__gte=now()) | Q(end_datetime=None),
+        offer_type=ConditionalOffer.SITE,
+        status=ConditionalOffer.OPEN,
+        partner=partner,
+        condition__program_uuid__isnull=False,
+    ).values_list('condition__program_uuid', flat=True).distinct()
+    for program_uuid in program_uuids:
+        program = get_program(program_uuid, site.siteconfiguration)
+        if not program:
+            continue
+        products_by_sku = get_products_by_sku(partner, _get_program_bundle_skus(program))
+        if products_by_sku:
+            bundle_products = list({product.id: product for product in products_by_sku.values()}.values())
+            quote_products.append((bundle_products, str(program_uuid)))
+
+    return quote_products
+
+
+def warm_price_quotes(site, batch_size=100):
+    """
+    Calculate and cache the anonymous price quotes of the products sold on a site.
+
+    Quotes are cached for ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT seconds. Warming the quotes more often than that
+    keeps them from expiring, so requests never have to calculate them.
+
+    Args:
+        site (Site): Site to warm the quotes of.
+        batch_size (int): Number of quotes written to the cache at once.
+
+    Returns:
+        int: Number of quotes cached.
+    """
+    partner = site.siteconfiguration.partner
+    # Offer conditions read the current request, as they do when quotes are calculated by the API.
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = '/'
+    request.META['HTTP_HOST'] = site.domain
+    request.site = site
+    request.user = AnonymousUser()
+    crum.set_current_request(request)
+    set_thread_variable('request', request)
+
+    count = 0
+    quotes = {}
+    try:
+        for products, bundle_id in get_anonymous_quote_products(site):
+            skus = [
+                stockrecord.partner_sku
+                for product in products for stockrecord in product.stockrecords.all()
+                if stockrecord.partner_id == partner.id
+            ]
+            try:
+                basket = price_products(site, None, products, request=request, bundle_id=bundle_id)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Failed to warm the price quote of SKUs [%s] and bundle [%s].', skus, bundle_id)
+                continue
+
+            quotes[get_price_quote_cache_key(site, skus, bundle_id)] = get_price_quote(basket)
+            if len(quotes) >= batch_size:
+                set_cached_price_quotes(quotes)
+                count += len(quotes)
+                quotes = {}
+
+        if quotes:
+            set_cached_price_quotes(quotes)
+            count += len(quotes)
+    finally:
+        crum.set_current_request(None)
+        set_thread_variable('request', None)
+
+    return count
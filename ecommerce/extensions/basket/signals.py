@@ -0,0 +1,85 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.basket.pricing import invalidate_price_quotes, invalidate_sku_price_quotes
+from ecommerce.extensions.offer.signals import is_offer_usage_update
+
+Benefit = get_model('offer', 'Benefit')
+Condition = get_model('offer', 'Condition')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+Range = get_model('offer', 'Range')
+RangeProduct = get_model('offer', 'RangeProduct')
+StockRecord = get_model('partner', 'StockRecord')
+
+
+def _invalidate_price_quotes(skus=None):
+    """
+    Invalidate the cached price quotes of the SKUs, or every cached price quote, immediately and again once the
+    transaction is committed, so other processes cannot cache quotes calculated from uncommitted data.
+    """
+    invalidate = partial(invalidate_sku_price_quotes, skus) if skus is not None else invalidate_price_quotes
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def _has_site_offers(offers):
+    return offers.filter(offer_type=ConditionalOffer.SITE).exists()
+
+
+@receiver(post_save, sender=StockRecord, dispatch_uid='pricing.stockrecord_saved')
+@receiver(post_delete, sender=StockRecord, dispatch_uid='pricing.stockrecord_deleted')
+def invalidate_price_quotes_on_stockrecord_change(instance, **_kwargs):
+    """ Invalidate the cached price quotes of the SKU of a stock record. """
+    _invalidate_price_quotes(skus=[instance.partner_sku])
+
+
+@receiver(post_save, sender=RangeProduct, dispatch_uid='pricing.range_product_saved')
+@receiver(post_delete, sender=RangeProduct, dispatch_uid='pricing.range_product_deleted')
+def invalidate_price_quotes_on_range_product_change(instance, **_kwargs):
+    """ Invalidate the cached price quotes of the SKUs of a product added to or removed from a site offer range. """
+    if not _has_site_offers(ConditionalOffer.objects.filter(
+            Q(condition__range=instance.range_id) | Q(benefit__range=instance.range_id))):
+        return
+    skus = StockRecord.objects.filter(
+        Q(product=instance.product_id) | Q(product__parent=instance.product_id)
+    ).values_list('partner_sku', flat=True)
+    _invalidate_price_quotes(skus=list(skus))
+
+
+@receiver(post_save, sender=ConditionalOffer, dispatch_uid='pricing.offer_saved')
+@receiver(post_delete, sender=ConditionalOffer, dispatch_uid='pricing.offer_deleted')
+def invalidate_price_quotes_on_offer_change(sender, instance, update_fields=None, **_kwargs):
+    """
+    Invalidate every cached price quote when a site offer changes. Other offers are only applied with vouchers,
+    or to users, so they are not part of the cached quotes of anonymous users.
+    Recording the usage of an offer doesn't invalidate them, unless the offer is consumed.
+    """
+    if instance.offer_type != ConditionalOffer.SITE or is_offer_usage_update(sender, update_fields):
+        return
+    _invalidate_price_quotes()
+
+
+@receiver(post_save, sender=Benefit, dispatch_uid='pricing.benefit_saved')
+@receiver(post_save, sender=Condition, dispatch_uid='pricing.condition_saved')
+def invalidate_price_quotes_on_offer_terms_change(instance, **_kwargs):
+    """
+    Invalidate every cached price quote when the condition or benefit of a site offer changes.
+    Deleting them deletes their offers, which invalidates the quotes.
+    """
+    if _has_site_offers(instance.offers.all()):
+        _invalidate_price_quotes()
+
+
+@receiver(post_save, sender=Range, dispatch_uid='pricing.range_saved')
+def invalidate_price_quotes_on_range_change(instance, **_kwargs):
+    """
+    Invalidate every cached price quote when a range used by a site offer changes.
+    Deleting a range deletes the conditions and benefits using it, and their offers, which invalidates the quotes.
+    """
+    if _has_site_offers(ConditionalOffer.objects.filter(Q(condition__range=instance) | Q(benefit__range=instance))):
+        _invalidate_price_quotes()
@@ -2,6 +2,7 @@
 
 from io import StringIO
 
+import mock
 from django.contrib.sites.models import Site
 from django.core.management import CommandError, call_command
 from oscar.core.loading import get_model
@@ -134,3 +135,22 @@ class AddSiteToBasketsBasketsCommandTests(TestCase):
         """ Verify an error is raised if no site ID is specified. """
         with self.assertRaisesMessage(CommandError, 'A valid Site ID must be specified!'):
             call_command(self.command, commit=False)
+
+
+class WarmPriceQuotesCommandTests(TestCase):
+    command = 'warm_price_quotes'
+
+    @mock.patch('ecommerce.extensions.basket.management.commands.warm_price_quotes.warm_price_quotes', return_value=0)
+    def test_warm_price_quotes(self, mock_warm_price_quotes):
+        """ Verify the quotes of the requested site, or of every site, are warmed. """
+        call_command(self.command, site_domain=self.site.domain, batch_size=10)
+        mock_warm_price_quotes.assert_called_once_with(self.site, batch_size=10)
+
+        mock_warm_price_quotes.reset_mock()
+        call_command(self.command)
+        self.assertIn(mock.call(self.site, batch_size=100), mock_warm_price_quotes.call_args_list)
+
+    def test_unknown_site(self):
+        """ Verify an error is raised if no site has the requested domain. """
+        with self.assertRaisesMessage(CommandError, 'No site configuration found for domain [unknown.example.com].'):
+            call_command(self.command, site_domain='unknown.example.com')
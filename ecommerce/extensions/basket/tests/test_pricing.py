@@ -0,0 +1,218 @@
+import datetime
+from decimal import Decimal
+
+import httpretty
+import mock
+import pytz
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from oscar.core.loading import get_model
+from oscar.test import factories
+
+from ecommerce.courses.tests.factories import CourseFactory
+from ecommerce.extensions.basket.pricing import (
+    get_cached_price_quotes,
+    get_price_quote,
+    get_price_quote_cache_key,
+    price_products,
+    warm_price_quotes
+)
+from ecommerce.extensions.test.factories import ProgramOfferFactory, prepare_voucher
+from ecommerce.tests.factories import ProductFactory
+from ecommerce.tests.testcases import TestCase
+
+Basket = get_model('basket', 'Basket')
+Benefit = get_model('offer', 'Benefit')
+Condition = get_model('offer', 'Condition')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+Line = get_model('basket', 'Line')
+
+
+class PricingTests(TestCase):
+    def setUp(self):
+        super(PricingTests, self).setUp()
+        self.user = self.create_user()
+        self.products = ProductFactory.create_batch(
+            2, stockrecords__partner=self.partner, stockrecords__price_excl_tax=Decimal('10.00'), categories=[]
+        )
+        self.range = factories.RangeFactory(includes_all_products=True)
+        self.product_total = sum(product.stockrecords.first().price_excl_tax for product in self.products)
+
+    def assert_no_writes(self, queries):
+        """ Verify only SELECT queries were made. """
+        statements = [query['sql'].split(' ', 1)[0].upper() for query in queries]
+        self.assertEqual([statement for statement in statements if statement != 'SELECT'], [])
+
+    def test_price_products(self):
+        """ Verify products are priced in memory, without saving the basket nor its lines. """
+        with CaptureQueriesContext(connection) as queries:
+            basket = price_products(self.site, self.user, self.products)
+
+        self.assert_no_writes(queries)
+        self.assertIsNone(basket.id)
+        self.assertEqual(basket.num_lines, 2)
+        self.assertEqual(Basket.objects.count(), 0)
+        self.assertEqual(Line.objects.count(), 0)
+        self.assertEqual(get_price_quote(basket), {
+            'total_incl_tax_excl_discounts': self.product_total,
+            'total_incl_tax': self.product_total,
+            'currency': 'GBP'
+        })
+
+    @httpretty.activate
+    def test_price_products_site_offer(self):
+        """ Verify the site offers are applied to the priced products. """
+        benefit = factories.BenefitFactory(type=Benefit.PERCENTAGE, range=self.range, value=10)
+        condition = factories.ConditionFactory(value=2, range=self.range, type=Condition.COVERAGE)
+        factories.ConditionalOfferFactory(benefit=benefit, condition=condition, offer_type=ConditionalOffer.SITE)
+
+        basket = price_products(self.site, self.user, self.products)
+
+        self.assertEqual(get_price_quote(basket)['total_incl_tax'], Decimal('18.00'))
+
+    def test_price_products_voucher(self):
+        """ Verify the offers of the voucher are applied to the priced products, without saving the voucher. """
+        voucher, __ = prepare_voucher(_range=self.range, benefit_type=Benefit.FIXED, benefit_value=5)
+
+        with CaptureQueriesContext(connection) as queries:
+            basket = price_products(self.site, self.user, self.products, voucher=voucher)
+
+        self.assert_no_writes(queries)
+        self.assertEqual(list(basket.get_vouchers()), [voucher])
+        self.assertEqual(get_price_quote(basket)['total_incl_tax'], self.product_total - 5)
+
+    def test_price_products_voucher_anonymous(self):
+        """ Verify vouchers are not applied for anonymous users, as with saved baskets. """
+        voucher, __ = prepare_voucher(_range=self.range, benefit_type=Benefit.FIXED, benefit_value=5)
+
+        basket = price_products(self.site, None, self.products, voucher=voucher)
+
+        self.assertEqual(get_price_quote(basket)['total_incl_tax'], self.product_total)
+
+    def test_add_product_twice(self):
+        """ Verify adding a product again increases the quantity of its line. """
+        basket = price_products(self.site, self.user, [self.products[0], self.products[0]])
+
+        self.assertEqual(basket.num_lines, 1)
+        self.assertEqual(basket.num_items, 2)
+
+    def test_save(self):
+        """ Verify pricing baskets cannot be saved. """
+        basket = price_products(self.site, self.user, self.products)
+        with self.assertRaises(TypeError):
+            basket.save()
+
+
+class PriceQuoteCacheTests(TestCase):
+    def setUp(self):
+        super(PriceQuoteCacheTests, self).setUp()
+        course = CourseFactory(partner=self.partner)
+        self.seat = course.create_or_update_seat('verified', True, 100)
+        self.expired_seat = course.create_or_update_seat(
+            'professional', True, 50, expires=datetime.datetime(2000, 1, 1, tzinfo=pytz.UTC)
+        )
+        self.sku = self.seat.stockrecords.first().partner_sku
+
+    def test_invalidate_on_change(self):
+        """ Verify the cached quotes are invalidated when a stock record or an offer changes. """
+        cache_key = get_price_quote_cache_key(self.site, [self.sku])
+        self.assertEqual(get_price_quote_cache_key(self.site, [self.sku]), cache_key)
+
+        stockrecord = self.seat.stockrecords.first()
+        stockrecord.price_excl_tax = 90
+        stockrecord.save()
+        new_cache_key = get_price_quote_cache_key(self.site, [self.sku])
+        self.assertNotEqual(new_cache_key, cache_key)
+
+        factories.ConditionalOfferFactory()
+        self.assertNotEqual(get_price_quote_cache_key(self.site, [self.sku]), new_cache_key)
+
+    def test_invalidate_stockrecord_sku(self):
+        """ Verify a stock record change only invalidates the cached quotes of its SKU. """
+        other_sku = self.expired_seat.stockrecords.first().partner_sku
+        cache_key = get_price_quote_cache_key(self.site, [self.sku])
+        other_cache_key = get_price_quote_cache_key(self.site, [other_sku])
+        bundle_cache_key = get_price_quote_cache_key(self.site, [self.sku, other_sku])
+
+        stockrecord = self.seat.stockrecords.first()
+        stockrecord.price_excl_tax = 90
+        stockrecord.save()
+
+        self.assertNotEqual(get_price_quote_cache_key(self.site, [self.sku]), cache_key)
+        self.assertNotEqual(get_price_quote_cache_key(self.site, [self.sku, other_sku]), bundle_cache_key)
+        self.assertEqual(get_price_quote_cache_key(self.site, [other_sku]), other_cache_key)
+
+    def test_invalidate_range_product_sku(self):
+        """ Verify adding a product to the range of a site offer only invalidates the cached quotes of its SKUs. """
+        site_range = factories.RangeFactory()
+        factories.ConditionalOfferFactory(condition__range=site_range, benefit__range=site_range)
+        voucher_range = factories.RangeFactory()
+        factories.ConditionalOfferFactory(
+            offer_type=ConditionalOffer.VOUCHER, condition__range=voucher_range, benefit__range=voucher_range
+        )
+        other_seat = CourseFactory(partner=self.partner).create_or_update_seat('verified', True, 10)
+        other_sku = other_seat.stockrecords.first().partner_sku
+        cache_key = get_price_quote_cache_key(self.site, [self.sku])
+        other_cache_key = get_price_quote_cache_key(self.site, [other_sku])
+
+        voucher_range.add_product(self.seat)
+        self.assertEqual(get_price_quote_cache_key(self.site, [self.sku]), cache_key)
+
+        site_range.add_product(self.seat.parent)
+        self.assertNotEqual(get_price_quote_cache_key(self.site, [self.sku]), cache_key)
+        self.assertEqual(get_price_quote_cache_key(self.site, [other_sku]), other_cache_key)
+
+    def test_not_invalidated_on_voucher_offer_change(self):
+        """ Verify the cached quotes are kept when an offer that is not a site offer changes. """
+        offer = factories.ConditionalOfferFactory(offer_type=ConditionalOffer.VOUCHER)
+        cache_key = get_price_quote_cache_key(self.site, [self.sku])
+
+        offer.status = ConditionalOffer.CONSUMED
+        offer.save()
+        offer.condition.save()
+        offer.benefit.save()
+        self.assertEqual(get_price_quote_cache_key(self.site, [self.sku]), cache_key)
+
+    def test_not_invalidated_on_offer_usage(self):
+        """ Verify the cached quotes are kept when an order records the usage of an offer. """
+        offer = factories.ConditionalOfferFactory()
+        cache_key = get_price_quote_cache_key(self.site, [self.sku])
+
+        offer.record_usage({'freq': 1, 'discount': 10})
+        self.assertEqual(get_price_quote_cache_key(self.site, [self.sku]), cache_key)
+
+    def test_warm_price_quotes(self):
+        """ Verify the quotes of the seats that have not expired and of the program bundles are cached. """
+        offer = ProgramOfferFactory(partner=self.partner, benefit__value=10)
+        program_uuid = str(offer.condition.program_uuid)
+        program = {
+            'status': 'active',
+            'applicable_seat_types': ['verified'],
+            'courses': [{
+                'key': 'course',
+                'uuid': 'course-uuid',
+                'entitlements': [],
+                'course_runs': [{'key': 'run', 'seats': [{'type': 'verified', 'sku': self.sku}]}],
+            }],
+        }
+        seat_key = get_price_quote_cache_key(self.site, [self.sku])
+        expired_seat_key = get_price_quote_cache_key(self.site, [self.expired_seat.stockrecords.first().partner_sku])
+        bundle_key = get_price_quote_cache_key(self.site, [self.sku], program_uuid)
+
+        with mock.patch('ecommerce.extensions.basket.pricing.get_program', return_value=program), \
+                mock.patch('ecommerce.programs.conditions.get_program', return_value=program):
+            self.assertEqual(warm_price_quotes(self.site), 2)
+
+        quotes = get_cached_price_quotes([seat_key, expired_seat_key, bundle_key])
+        self.assertEqual(quotes, {
+            seat_key: {
+                'total_incl_tax_excl_discounts': Decimal('100.00'),
+                'total_incl_tax': Decimal('100.00'),
+                'currency': 'USD'
+            },
+            bundle_key: {
+                'total_incl_tax_excl_discounts': Decimal('100.00'),
+                'total_incl_tax': Decimal('90.00'),
+                'currency': 'USD'
+            },
+        })
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.17 on 2026-10-17 11:10
+
+from hashlib import sha256
+
+from django.db import migrations, models
+
+
+def get_fingerprint(name, partner_id, stock_record_ids):
+    """ Same fingerprint as Catalog.get_fingerprint at the time of this migration. """
+    stock_records = ','.join(str(stock_record_id) for stock_record_id in sorted(set(stock_record_ids)))
+    content = u'{}\n{}\n{}'.format(name, partner_id, stock_records)
+    return sha256(content.encode('utf-8')).hexdigest()
+
+
+def add_fingerprints(apps, schema_editor):
+    """ Fingerprint the existing catalogs. """
+    Catalog = apps.get_model('catalogue', 'Catalog')
+    for catalog in Catalog.objects.prefetch_related('stock_records'):
+        stock_record_ids = [stock_record.id for stock_record in catalog.stock_records.all()]
+        Catalog.objects.filter(pk=catalog.pk).update(
+            fingerprint=get_fingerprint(catalog.name, catalog.partner_id, stock_record_ids))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0052_add_scholarship_coupon_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalog',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, help_text='Hash of the name, partner and stock records of the catalog, used to find identical catalogs.', max_length=64, null=True),
+        ),
+        migrations.RunPython(add_fingerprints, migrations.RunPython.noop),
+    ]
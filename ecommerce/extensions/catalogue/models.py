@@ -1,9 +1,11 @@
 
 
+from hashlib import sha256
+
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 from django.db import models
-from django.db.models.signals import post_init, post_save
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 from oscar.apps.catalogue.abstract_models import (
@@ -148,6 +150,10 @@ class Catalog(models.Model):
     name = models.CharField(max_length=255)
     partner = models.ForeignKey('partner.Partner', related_name='catalogs', on_delete=models.CASCADE)
     stock_records = models.ManyToManyField('partner.StockRecord', blank=True, related_name='catalogs')
+    fingerprint = models.CharField(
+        max_length=64, null=True, blank=True, db_index=True,
+        help_text=_('Hash of the name, partner and stock records of the catalog, used to find identical catalogs.'),
+    )
 
     def __str__(self):
         return u'{id}: {partner_code}-{catalog_name}'.format(
@@ -156,6 +162,62 @@ class Catalog(models.Model):
             catalog_name=self.name
         )
 
+    @staticmethod
+    def get_fingerprint(name, partner_id, stock_record_ids):
+        """
+        Returns the fingerprint of a catalog with the given name, partner and stock records.
+        """
+        stock_records = ','.join(str(stock_record_id) for stock_record_id in sorted(set(stock_record_ids)))
+        content = u'{}\n{}\n{}'.format(name, partner_id, stock_records)
+        return sha256(content.encode('utf-8')).hexdigest()
+
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        # New catalogs may be created with the fingerprint of the stock records added right after
+        if self.pk or self.fingerprint is None:
+            stock_record_ids = self.stock_records.values_list('id', flat=True) if self.pk else []
+            self.fingerprint = self.get_fingerprint(self.name, self.partner_id, stock_record_ids)
+        super(Catalog, self).save(force_insert, force_update, using, update_fields)
+
+
+@receiver(m2m_changed, sender=Catalog.stock_records.through)
+def update_catalog_fingerprint(sender, instance, action, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """
+    Keep the fingerprint of catalogs current when their stock records change.
+    """
+    if action == 'pre_clear' and kwargs['reverse']:
+        # post_clear has no pk_set, keep the catalogs the stock record is removed from
+        instance.__dict__['_cleared_catalog_ids'] = list(instance.catalogs.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not kwargs['reverse']:
+        instance.save(update_fields=['fingerprint'])
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_catalog_ids', None)
+    if pk_set:
+        for catalog in Catalog.objects.filter(pk__in=pk_set):
+            catalog.save(update_fields=['fingerprint'])
+
+
+@receiver(pre_delete, sender='partner.StockRecord', dispatch_uid='catalogue.stockrecord_pre_delete')
+def collect_deleted_stock_record_catalogs(instance, **_kwargs):
+    """
+    Keep the catalogs of a deleted stock record, whose removal doesn't send m2m_changed.
+    """
+    instance.__dict__['_deleted_catalog_ids'] = list(instance.catalogs.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender='partner.StockRecord', dispatch_uid='catalogue.stockrecord_post_delete')
+def update_deleted_stock_record_catalogs(instance, **_kwargs):
+    """
+    Keep the fingerprint of catalogs current when one of their stock records is deleted.
+    """
+    catalog_ids = instance.__dict__.pop('_deleted_catalog_ids', None)
+    if catalog_ids:
+        for catalog in Catalog.objects.filter(pk__in=catalog_ids):
+            catalog.save(update_fields=['fingerprint'])
+
 
 class Category(AbstractCategory):
     # Do not record the slug field in the history table because AutoSlugField is not compatible with
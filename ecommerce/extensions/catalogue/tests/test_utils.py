@@ -85,6 +85,82 @@ class UtilsTests(DiscoveryTestMixin, TestCase):
         self.assertTrue(created)
         self.assertNotEqual(self.catalog, new_catalog)
         self.assertEqual(Catalog.objects.count(), 2)
+        self.assertEqual(set(new_catalog.stock_records.all()), {stock_record, stock_record_2})
+
+        found_catalog, created = get_or_create_catalog(
+            name='Test',
+            partner=self.partner,
+            stock_record_ids=[stock_record_2.id, stock_record.id]
+        )
+        self.assertFalse(created)
+        self.assertEqual(new_catalog, found_catalog)
+
+    def test_get_or_create_catalog_changed_stock_records(self):
+        """Verify catalogs are not fetched once their stock records change."""
+        stock_record = self.seat.stockrecords.first()
+        self.catalog.stock_records.add(stock_record)
+        self.catalog.stock_records.remove(stock_record)
+
+        catalog, created = get_or_create_catalog(
+            name='Test',
+            partner=self.partner,
+            stock_record_ids=[stock_record.id]
+        )
+        self.assertTrue(created)
+        self.assertNotEqual(self.catalog, catalog)
+
+        existing_catalog, created = get_or_create_catalog(name='Test', partner=self.partner, stock_record_ids=[])
+        self.assertFalse(created)
+        self.assertEqual(self.catalog, existing_catalog)
+
+    def test_get_or_create_catalog_cleared_catalogs(self):
+        """Verify catalogs are not fetched once a stock record is cleared from its catalogs."""
+        stock_record = self.seat.stockrecords.first()
+        self.catalog.stock_records.add(stock_record)
+        stock_record.catalogs.clear()
+
+        catalog, created = get_or_create_catalog(
+            name='Test',
+            partner=self.partner,
+            stock_record_ids=[stock_record.id]
+        )
+        self.assertTrue(created)
+        self.assertNotEqual(self.catalog, catalog)
+
+        existing_catalog, created = get_or_create_catalog(name='Test', partner=self.partner, stock_record_ids=[])
+        self.assertFalse(created)
+        self.assertEqual(self.catalog, existing_catalog)
+
+    def test_get_or_create_catalog_deleted_stock_record(self):
+        """Verify catalogs are fetched without the stock records deleted from them."""
+        stock_record = self.seat.stockrecords.first()
+        self.catalog.stock_records.add(stock_record)
+        stock_record.delete()
+
+        existing_catalog, created = get_or_create_catalog(name='Test', partner=self.partner, stock_record_ids=[])
+        self.assertFalse(created)
+        self.assertEqual(self.catalog, existing_catalog)
+
+    def test_get_or_create_catalog_queries(self):
+        """Verify the number of queries to fetch a catalog doesn't grow with the number of catalogs."""
+        stock_record = self.seat.stockrecords.first()
+        self.catalog.stock_records.add(stock_record)
+        for index in range(5):
+            Catalog.objects.create(name='Other {}'.format(index), partner=self.partner).stock_records.add(stock_record)
+
+        with self.assertNumQueries(3):
+            catalog, created = get_or_create_catalog(
+                name='Test',
+                partner=self.partner,
+                stock_record_ids=[stock_record.id]
+            )
+        self.assertFalse(created)
+        self.assertEqual(self.catalog, catalog)
+
+    def test_get_or_create_catalog_missing_stock_record(self):
+        """Verify an error is raised if a stock record doesn't exist."""
+        with self.assertRaises(StockRecord.DoesNotExist):
+            get_or_create_catalog(name='Test', partner=self.partner, stock_record_ids=[0])
 
 
 class CouponUtilsTests(CouponMixin, DiscoveryTestMixin, TestCase):
@@ -222,16 +222,23 @@ def get_or_create_catalog(name, partner, stock_record_ids):
     """
     Returns the catalog which has the same name, partner and stock records.
     If there isn't one with that data, creates and returns a new one.
-    """
-    catalogs = Catalog.objects.all()
-    stock_records = [StockRecord.objects.get(id=id) for id in stock_record_ids]  # pylint: disable=redefined-builtin
-
-    for catalog in catalogs:
-        if catalog.name == name and catalog.partner == partner:
-            if set(catalog.stock_records.all()) == set(stock_records):
-                return catalog, False
 
-    catalog = Catalog.objects.create(name=name, partner=partner)
-    for stock_record in stock_records:
-        catalog.stock_records.add(stock_record)
+    Catalogs are looked up by their fingerprint, then their stock records are compared
+    in case the fingerprint of another catalog is stale.
+    """
+    stock_record_ids = {int(stock_record_id) for stock_record_id in stock_record_ids}
+    if StockRecord.objects.filter(id__in=stock_record_ids).count() != len(stock_record_ids):
+        raise StockRecord.DoesNotExist('StockRecord matching query does not exist.')
+
+    fingerprint = Catalog.get_fingerprint(name, partner.id, stock_record_ids)
+    catalogs = Catalog.objects.filter(fingerprint=fingerprint, name=name, partner=partner)
+    for catalog in catalogs.prefetch_related('stock_records'):
+        if {stock_record.id for stock_record in catalog.stock_records.all()} == stock_record_ids:
+            return catalog, False
+
+    catalog = Catalog.objects.create(name=name, partner=partner, fingerprint=fingerprint)
+    CatalogStockRecord = Catalog.stock_records.through
+    CatalogStockRecord.objects.bulk_create([
+        CatalogStockRecord(catalog=catalog, stockrecord_id=stock_record_id) for stock_record_id in stock_record_ids
+    ])
     return catalog, True
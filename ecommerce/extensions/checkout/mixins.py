@@ -19,6 +19,7 @@ from ecommerce.extensions.checkout.exceptions import BasketNotFreeError
 from ecommerce.extensions.customer.utils import Dispatcher
 from ecommerce.extensions.offer.constants import OFFER_ASSIGNED, OFFER_ASSIGNMENT_REVOKED, OFFER_REDEEMED
 from ecommerce.extensions.order.constants import PaymentEventTypeName
+from ecommerce.extensions.voucher.coupon_stats import invalidate_coupon_stats
 from ecommerce.invoice.models import Invoice
 
 CommunicationEventType = get_model('customer', 'CommunicationEventType')
@@ -394,3 +395,4 @@ class EdxOrderPlacementMixin(OrderPlacementMixin, metaclass=abc.ABCMeta):
                     for __ in range(offer_assignments_available)
                 ]
                 OfferAssignment.objects.bulk_create(assignments)
+                invalidate_coupon_stats(codes=[voucher.code])
@@ -8,17 +8,26 @@ can successfully fulfill the product. Success can be reported back based on each
 
 
 import logging
+import time
+from functools import lru_cache
 from importlib import import_module
 
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.dispatch import receiver
 from django.utils.timezone import now
+from oscar.core.loading import get_model
 
 from ecommerce.extensions.fulfillment import exceptions
+from ecommerce.extensions.fulfillment.executor import run_concurrently
 from ecommerce.extensions.fulfillment.status import LINE, ORDER
 from ecommerce.extensions.refund.status import REFUND_LINE
 
 logger = logging.getLogger(__name__)
 
+OrderNote = get_model('order', 'OrderNote')
+
 
 def fulfill_order(order, lines, email_opt_in=False):
     """ Fulfills line items in an Order
@@ -47,19 +56,23 @@ def fulfill_order(order, lines, email_opt_in=False):
         raise exceptions.IncorrectOrderStatusError(error_msg)
 
     # Construct a dict of lines by their product type.
-    line_items = list(lines.all())
+    order_lines = list(lines.all())
+    line_items = list(order_lines)
 
     try:
         # Iterate over the Fulfillment Modules defined in our configuration and determine if they support
         # any of the lines in the order. Fulfill line items in the order they are designated by the configuration.
         # Remaining line items should be marked with a fulfillment error since we have no configuration that
         # allows them to be fulfilled.
+        module_lines = []
         for module_class in get_fulfillment_modules():
             module = module_class()
             supported_lines = module.get_supported_lines(line_items)
             if supported_lines:
                 line_items = list(set(line_items) - set(supported_lines))
-                module.fulfill_product(order, supported_lines, email_opt_in=email_opt_in)
+                module_lines.append((module, supported_lines))
+
+        _dispatch_fulfillment(order, module_lines, email_opt_in)
 
         # Check to see if any line items in the order have not been accounted for by a FulfillmentModule
         # Any product does not line up with a module, we have to mark a fulfillment error.
@@ -73,7 +86,7 @@ def fulfill_order(order, lines, email_opt_in=False):
     finally:
         # Check if all lines are successful, or there were errors, and set the status of the Order.
         order_status = ORDER.COMPLETE
-        for line in lines.all():
+        for line in order_lines:
             if line.status != LINE.COMPLETE:
                 logger.error('There was an error while fulfilling order [%s]', order.number)
                 order_status = ORDER.FULFILLMENT_ERROR
@@ -92,9 +105,57 @@ def fulfill_order(order, lines, email_opt_in=False):
         return order  # pylint: disable=lost-exception
 
 
-def get_fulfillment_modules():
-    """ Retrieves all fulfillment modules declared in settings. """
-    module_paths = getattr(settings, 'FULFILLMENT_MODULES', [])
+def _dispatch_fulfillment(order, module_lines, email_opt_in):
+    """ Fulfills the lines supported by each Fulfillment Module, and records the time taken by each module.
+
+    Fulfillment Modules fulfill different lines through different services, so they run concurrently when the
+    order is fulfilled outside of a database transaction. Within a transaction, as is the case of orders fulfilled
+    during checkout, the modules run one after the other, since the database connection of the transaction cannot
+    be shared with other threads.
+
+    The timings are recorded in a system note of the order.
+
+    Args:
+        order (Order): The Order being fulfilled.
+        module_lines (List of tuples): (module, lines) tuples, with the lines supported by each module.
+        email_opt_in (bool): Whether the user should be opted in to emails as part of the fulfillment.
+
+    Raises:
+        Exception: The first error raised by a module.
+    """
+    timings = []
+
+    def fulfill(item):
+        module, supported_lines = item
+        start = time.monotonic()
+        try:
+            module.fulfill_product(order, supported_lines, email_opt_in=email_opt_in)
+        finally:
+            timings.append((module, supported_lines, time.monotonic() - start))
+
+    try:
+        if len(module_lines) > 1 and not connection.in_atomic_block:
+            outcomes = run_concurrently(
+                fulfill, module_lines, max_workers=settings.FULFILLMENT_MODULES_MAX_WORKERS
+            )
+            errors = [exc for __, __, exc in outcomes if exc is not None]
+            if errors:
+                raise errors[0]
+        else:
+            for item in module_lines:
+                fulfill(item)
+    finally:
+        if timings:
+            message = 'Fulfillment module timings: {}'.format(', '.join(
+                '{} [{} lines] {:.3f}s'.format(module.__class__.__name__, len(supported_lines), elapsed)
+                for module, supported_lines, elapsed in timings
+            ))
+            logger.info('%s for order [%s]', message, order.number)
+            order.notes.create(message=message, note_type=OrderNote.SYSTEM)
+
+
+@lru_cache(maxsize=None)
+def _load_fulfillment_modules(module_paths):
     modules = []
 
     for cls_path in module_paths:
@@ -105,7 +166,21 @@ def get_fulfillment_modules():
         except (ImportError, ValueError, AttributeError):
             logger.exception("Could not load module at [%s]", cls_path)
 
-    return modules
+    return tuple(modules)
+
+
+@receiver(setting_changed)
+def _clear_fulfillment_modules(setting, **kwargs):  # pylint: disable=unused-argument
+    if setting == 'FULFILLMENT_MODULES':
+        _load_fulfillment_modules.cache_clear()
+
+
+def get_fulfillment_modules():
+    """ Retrieves all fulfillment modules declared in settings.
+
+    The modules are imported once, and reused until the FULFILLMENT_MODULES setting changes.
+    """
+    return list(_load_fulfillment_modules(tuple(getattr(settings, 'FULFILLMENT_MODULES', []))))
 
 
 def get_fulfillment_modules_for_line(line):
@@ -0,0 +1,65 @@
+"""
+Pooled HTTP sessions and concurrent execution of the requests made to fulfill order lines.
+
+Fulfillment modules used to make a new connection for every request sent to a fulfillment service, one line at
+a time. Sessions returned by ``get_fulfillment_session`` keep the connections of a site open between requests,
+and ``run_concurrently`` sends the requests of all the lines of an order with a bounded number of threads.
+
+Worker threads do not share the database connection, nor the transaction, of the calling thread (see
+ecommerce.core.concurrency).
+"""
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from ecommerce.core import concurrency
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_fulfillment_session(site=None):
+    """
+    Return the requests Session shared by the fulfillment requests made for a site.
+
+    The connection pool of the session is large enough to serve all the worker threads of ``run_concurrently``.
+    Cookies are never stored, since the session is shared by the requests made on behalf of all users.
+
+    Args:
+        site (Site): Site the requests are made for.
+
+    Returns:
+        requests.Session
+    """
+    key = site.domain if site else None
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(pool_maxsize=settings.ENROLLMENT_FULFILLMENT_MAX_WORKERS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[key] = session
+    return session
+
+
+def run_concurrently(func, items, max_workers=None):
+    """
+    Send the fulfillment requests made by calling a function for every item, with a bounded number of worker
+    threads. See ecommerce.core.concurrency.run_concurrently.
+
+    Args:
+        func (callable): Function called with every item.
+        items (iterable): Items to call the function with.
+        max_workers (int): Maximum number of threads. Defaults to ENROLLMENT_FULFILLMENT_MAX_WORKERS.
+
+    Returns:
+        List of (item, result, exception) tuples, in the order of the items.
+    """
+    return concurrency.run_concurrently(
+        func, items, max_workers or settings.ENROLLMENT_FULFILLMENT_MAX_WORKERS, thread_name_prefix='fulfillment'
+    )
@@ -41,6 +41,7 @@ from ecommerce.extensions.api.v2.views.coupons import CouponViewSet
 from ecommerce.extensions.basket.constants import PURCHASER_BEHALF_ATTRIBUTE
 from ecommerce.extensions.basket.models import BasketAttribute
 from ecommerce.extensions.checkout.utils import get_receipt_page_url
+from ecommerce.extensions.fulfillment.executor import get_fulfillment_session, run_concurrently
 from ecommerce.extensions.fulfillment.status import LINE
 from ecommerce.extensions.voucher.models import OrderLineVouchers
 from ecommerce.extensions.voucher.utils import create_vouchers
@@ -189,9 +190,7 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
             messages if the LMS user id cannot be found.
     """
 
-    def _post_to_enrollment_api(self, data, user, usage):
-        enrollment_api_url = get_lms_enrollment_api_url()
-        timeout = settings.ENROLLMENT_FULFILLMENT_TIMEOUT
+    def _get_enrollment_api_headers(self, user, usage):
         headers = {
             'Content-Type': 'application/json',
             'X-Edx-Api-Key': settings.EDX_API_KEY
@@ -205,37 +204,74 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
         if ip:
             headers['X-Forwarded-For'] = ip
 
-        return requests.post(enrollment_api_url, data=json.dumps(data), headers=headers, timeout=timeout)
-
-    def _add_enterprise_data_to_enrollment_api_post(self, data, order):
-        """ Augment enrollment api POST data with enterprise specific data.
+        return headers
 
-        Checks the order to see if there was a discount applied and if that discount
-        was associated with an EnterpriseCustomer. If so, enterprise specific data
-        is added to the POST data and an EnterpriseCustomerUser model is created if
-        one does not already exist.
+    def _post_to_enrollment_api(self, data, user, usage, site=None, headers=None, enrollment_api_url=None):
+        """ Post data to the Enrollment API with the pooled session of the site.
 
-        Arguments:
-            data (dict): The POST data for the enrollment API.
-            order (Order): The order.
+        The headers and the Enrollment API URL can be computed beforehand, since they cannot be computed
+        from the worker threads of a concurrent fulfillment.
         """
-        # Collect the EnterpriseCustomer UUID from the coupon, if any.
-        enterprise_customer_uuid = None
+        enrollment_api_url = enrollment_api_url or get_lms_enrollment_api_url()
+        timeout = settings.ENROLLMENT_FULFILLMENT_TIMEOUT
+        headers = headers or self._get_enrollment_api_headers(user, usage)
+
+        return get_fulfillment_session(site).post(
+            enrollment_api_url, data=json.dumps(data), headers=headers, timeout=timeout
+        )
+
+    def _get_enterprise_customer_uuid(self, order):
+        """ Return the UUID of the EnterpriseCustomer associated with the coupon applied to the order, if any. """
         for discount in order.discounts.all():
             if discount.voucher:
                 enterprise_customer_uuid = get_enterprise_customer_uuid_from_voucher(discount.voucher)
+                if enterprise_customer_uuid is not None:
+                    return enterprise_customer_uuid
+        return None
 
-            if enterprise_customer_uuid is not None:
-                data['linked_enterprise_customer'] = str(enterprise_customer_uuid)
-                break
-        # If an EnterpriseCustomer UUID is associated with the coupon, create an EnterpriseCustomerUser
-        # on the Enterprise service if one doesn't already exist.
-        if enterprise_customer_uuid is not None:
-            get_or_create_enterprise_customer_user(
-                order.site,
-                enterprise_customer_uuid,
-                order.user.username
+    def _get_enrollment_api_post_data(self, order, line):
+        """ Return the POST data for the enrollment API, and the mode, course key and credit provider of the line.
+
+        Raises:
+            AttributeError: if the product of the line does not have the required attributes.
+        """
+        mode = mode_for_product(line.product)
+        course_key = line.product.attr.course_key
+        try:
+            provider = line.product.attr.credit_provider
+        except AttributeError:
+            logger.debug("Seat [%d] has no credit_provider attribute. Defaulted to None.", line.product.id)
+            provider = None
+
+        data = {
+            'user': order.user.username,
+            'is_active': True,
+            'mode': mode,
+            'course_details': {
+                'course_id': course_key
+            },
+            'enrollment_attributes': [
+                {
+                    'namespace': 'order',
+                    'name': 'order_number',
+                    'value': order.number
+                },
+                {
+                    'namespace': 'order',
+                    'name': 'date_placed',
+                    'value': order.date_placed.strftime(ISO_8601_FORMAT)
+                }
+            ]
+        }
+        if provider:
+            data['enrollment_attributes'].append(
+                {
+                    'namespace': 'credit',
+                    'name': 'provider_id',
+                    'value': provider
+                }
             )
+        return data, mode, course_key, provider
 
     def supports_line(self, line):
         return line.product.is_seat_product
@@ -262,6 +298,10 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
         certificate types. May result in an error if the Enrollment API cannot be reached, or if there is
         additional business logic errors when trying to enroll the student.
 
+        The enterprise data of the order is computed once, and the enrollments of all the lines are posted
+        concurrently, with at most ENROLLMENT_FULFILLMENT_MAX_WORKERS requests in flight. Statuses, notes and
+        audit logs are then recorded line by line.
+
         Args:
             order (Order): The Order associated with the lines to be fulfilled. The user associated with the order
                 is presumed to be the student to enroll in a course.
@@ -286,95 +326,91 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
 
             return order, lines
 
+        enrollments = []
         for line in lines:
             try:
-                mode = mode_for_product(line.product)
-                course_key = line.product.attr.course_key
+                data, mode, course_key, provider = self._get_enrollment_api_post_data(order, line)
             except AttributeError:
                 logger.error("Supported Seat Product does not have required attributes, [certificate_type, course_key]")
                 line.set_status(LINE.FULFILLMENT_CONFIGURATION_ERROR)
                 continue
-            try:
-                provider = line.product.attr.credit_provider
-            except AttributeError:
-                logger.debug("Seat [%d] has no credit_provider attribute. Defaulted to None.", line.product.id)
-                provider = None
+            enrollments.append((line, data, mode, course_key, provider))
 
-            data = {
-                'user': order.user.username,
-                'is_active': True,
-                'mode': mode,
-                'course_details': {
-                    'course_id': course_key
-                },
-                'enrollment_attributes': [
-                    {
-                        'namespace': 'order',
-                        'name': 'order_number',
-                        'value': order.number
-                    },
-                    {
-                        'namespace': 'order',
-                        'name': 'date_placed',
-                        'value': order.date_placed.strftime(ISO_8601_FORMAT)
-                    }
-                ]
-            }
-            if provider:
-                data['enrollment_attributes'].append(
-                    {
-                        'namespace': 'credit',
-                        'name': 'provider_id',
-                        'value': provider
-                    }
-                )
-            try:
-                self._add_enterprise_data_to_enrollment_api_post(data, order)
-                self.update_orderline_with_enterprise_discount_metadata(order, line)
+        if not enrollments:
+            logger.info("Finished fulfilling 'Seat' product types for order [%s]", order.number)
+            return order, lines
 
-                # Post to the Enrollment API. The LMS will take care of posting a new EnterpriseCourseEnrollment to
-                # the Enterprise service if the user+course has a corresponding EnterpriseCustomerUser.
-                response = self._post_to_enrollment_api(data, user=order.user, usage='fulfill enrollment')
-
-                if response.status_code == status.HTTP_200_OK:
-                    line.set_status(LINE.COMPLETE)
-
-                    audit_log(
-                        'line_fulfilled',
-                        order_line_id=line.id,
-                        order_number=order.number,
-                        product_class=line.product.get_product_class().name,
-                        course_id=course_key,
-                        mode=mode,
-                        user_id=order.user.id,
-                        credit_provider=provider,
-                    )
-                else:
-                    try:
-                        data = response.json()
-                        reason = data.get('message')
-                    except Exception:  # pylint: disable=broad-except
-                        reason = '(No detail provided.)'
-
-                    logger.error(
-                        "Fulfillment of line [%d] on order [%s] failed with status code [%d]: %s",
-                        line.id, order.number, response.status_code, reason
-                    )
-                    order.notes.create(message=reason, note_type='Error')
-                    line.set_status(LINE.FULFILLMENT_SERVER_ERROR)
-            except ReqConnectionError:
+        try:
+            enterprise_customer_uuid = self._get_enterprise_customer_uuid(order)
+            # If an EnterpriseCustomer UUID is associated with the coupon, create an EnterpriseCustomerUser
+            # on the Enterprise service if one doesn't already exist.
+            if enterprise_customer_uuid is not None:
+                get_or_create_enterprise_customer_user(order.site, enterprise_customer_uuid, order.user.username)
+                for enrollment in enrollments:
+                    enrollment[1]['linked_enterprise_customer'] = str(enterprise_customer_uuid)
+            for enrollment in enrollments:
+                self.update_orderline_with_enterprise_discount_metadata(order, enrollment[0])
+        except (ReqConnectionError, Timeout) as exc:
+            outcomes = [(enrollment, None, exc) for enrollment in enrollments]
+        else:
+            headers = self._get_enrollment_api_headers(order.user, usage='fulfill enrollment')
+            enrollment_api_url = get_lms_enrollment_api_url()
+
+            # Post to the Enrollment API. The LMS will take care of posting a new EnterpriseCourseEnrollment to
+            # the Enterprise service if the user+course has a corresponding EnterpriseCustomerUser.
+            outcomes = run_concurrently(
+                lambda enrollment: self._post_to_enrollment_api(
+                    enrollment[1], user=order.user, usage='fulfill enrollment', site=order.site, headers=headers,
+                    enrollment_api_url=enrollment_api_url
+                ),
+                enrollments
+            )
+
+        for (line, __, mode, course_key, provider), response, exc in outcomes:
+            if isinstance(exc, ReqConnectionError):
                 logger.error(
                     "Unable to fulfill line [%d] of order [%s] due to a network problem", line.id, order.number
                 )
                 order.notes.create(message='Fulfillment of order failed due to a network problem.', note_type='Error')
                 line.set_status(LINE.FULFILLMENT_NETWORK_ERROR)
-            except Timeout:
+            elif isinstance(exc, Timeout):
                 logger.error(
                     "Unable to fulfill line [%d] of order [%s] due to a request time out", line.id, order.number
                 )
                 order.notes.create(message='Fulfillment of order failed due to a request time out.', note_type='Error')
                 line.set_status(LINE.FULFILLMENT_TIMEOUT_ERROR)
-        logger.info("Finished fulfilling 'Seat' product types for order [%s]", order.number)
+            elif exc is not None:
+                raise exc
+            elif response.status_code == status.HTTP_200_OK:
+                line.set_status(LINE.COMPLETE)
+
+                audit_log(
+                    'line_fulfilled',
+                    order_line_id=line.id,
+                    order_number=order.number,
+                    product_class=line.product.get_product_class().name,
+                    course_id=course_key,
+                    mode=mode,
+                    user_id=order.user.id,
+                    credit_provider=provider,
+                )
+            else:
+                try:
+                    reason = response.json().get('message')
+                except Exception:  # pylint: disable=broad-except
+                    reason = '(No detail provided.)'
+
+                logger.error(
+                    "Fulfillment of line [%d] on order [%s] failed with status code [%d]: %s",
+                    line.id, order.number, response.status_code, reason
+                )
+                order.notes.create(message=reason, note_type='Error')
+                line.set_status(LINE.FULFILLMENT_SERVER_ERROR)
+
+        logger.info(
+            "Finished fulfilling 'Seat' product types for order [%s]: %s", order.number,
+            ', '.join('line [{}] {}'.format(line.id, line.status) for line, __, __, __, __ in enrollments)
+        )
         return order, lines
 
     def revoke_line(self, line):
@@ -392,7 +428,9 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
                 },
             }
 
-            response = self._post_to_enrollment_api(data, user=line.order.user, usage='revoke enrollment')
+            response = self._post_to_enrollment_api(
+                data, user=line.order.user, usage='revoke enrollment', site=line.order.site
+            )
 
             if response.status_code == status.HTTP_200_OK:
                 audit_log(
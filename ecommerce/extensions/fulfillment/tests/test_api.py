@@ -1,9 +1,13 @@
 """Tests for the Fulfillment API"""
 
 
+import threading
+
 import ddt
 from django.test.utils import override_settings
-from mock import patch
+from mock import Mock, patch
+from oscar.core.loading import get_model
+from oscar.test import factories
 from testfixtures import LogCapture
 
 from ecommerce.extensions.fulfillment import api, exceptions
@@ -17,8 +21,36 @@ from ecommerce.extensions.fulfillment.tests.mixins import FulfillmentTestMixin
 from ecommerce.extensions.fulfillment.tests.modules import FakeFulfillmentModule
 from ecommerce.extensions.refund.status import REFUND, REFUND_LINE
 from ecommerce.extensions.refund.tests.factories import RefundFactory
+from ecommerce.extensions.test.factories import create_order
 from ecommerce.tests.testcases import TestCase
 
+OrderNote = get_model('order', 'OrderNote')
+
+
+class TitleFulfillmentModule(FakeFulfillmentModule):
+    """ Fulfills the lines of the products with a given title, recording the threads used to fulfill them. """
+    title = None
+    threads = set()
+
+    def supports_line(self, line):
+        return line.product.title == self.title
+
+    def get_supported_lines(self, lines):
+        return [line for line in lines if self.supports_line(line)]
+
+    def fulfill_product(self, order, lines, email_opt_in=False):
+        self.threads.add(threading.current_thread().name)
+        for line in lines:
+            line.status = LINE.COMPLETE
+
+
+class FirstFulfillmentModule(TitleFulfillmentModule):
+    title = 'First'
+
+
+class SecondFulfillmentModule(TitleFulfillmentModule):
+    title = 'Second'
+
 
 @ddt.ddt
 class FulfillmentApiTests(FulfillmentTestMixin, TestCase):
@@ -34,6 +66,33 @@ class FulfillmentApiTests(FulfillmentTestMixin, TestCase):
         api.fulfill_order(self.order, self.order.lines)
         self.assert_order_fulfilled(self.order)
 
+    @override_settings(FULFILLMENT_MODULES=['ecommerce.extensions.fulfillment.tests.modules.FakeFulfillmentModule', ])
+    def test_fulfill_order_timings(self):
+        """ Verify the time taken by each fulfillment module is recorded in a note of the order. """
+        api.fulfill_order(self.order, self.order.lines)
+        note = self.order.notes.get()
+        self.assertEqual(note.note_type, OrderNote.SYSTEM)
+        self.assertRegex(note.message, r'^Fulfillment module timings: FakeFulfillmentModule \[1 lines\] \d+\.\d{3}s$')
+
+    def test_fulfill_order_concurrent_modules(self):
+        """ Verify fulfillment modules run concurrently when the order is fulfilled outside of a transaction. """
+        basket = factories.BasketFactory(owner=self.create_user(), site=self.site)
+        for title in ('First', 'Second'):
+            basket.add_product(factories.ProductFactory(title=title, stockrecords__partner=self.partner))
+        order = create_order(basket=basket, user=basket.owner, status=ORDER.OPEN)
+        TitleFulfillmentModule.threads = set()
+
+        with patch.object(api, 'get_fulfillment_modules', return_value=[FirstFulfillmentModule,
+                                                                        SecondFulfillmentModule]), \
+                patch.object(api, 'connection', Mock(in_atomic_block=False)):
+            api.fulfill_order(order, order.lines)
+
+        self.assertEqual(order.status, ORDER.COMPLETE)
+        self.assertTrue(TitleFulfillmentModule.threads)
+        self.assertTrue(all(name.startswith('fulfillment') for name in TitleFulfillmentModule.threads))
+        self.assertIn('FirstFulfillmentModule [1 lines]', order.notes.get().message)
+        self.assertIn('SecondFulfillmentModule [1 lines]', order.notes.get().message)
+
     def test_donation_fulfill_order_successful_fulfillment(self):
         """ Test a successful fulfillment of a donation order. """
         order_with_donation = self.generate_open_order(product_class="Donation")
@@ -94,6 +153,20 @@ class FulfillmentApiTests(FulfillmentTestMixin, TestCase):
                 'Could not load module at [ecommerce.extensions.fulfillment.tests.modules.NotARealModule]'
             ))
 
+    @override_settings(FULFILLMENT_MODULES=['ecommerce.extensions.fulfillment.tests.modules.FakeFulfillmentModule'])
+    def test_get_fulfillment_modules_cached(self):
+        """ Verify the modules are imported once, until the FULFILLMENT_MODULES setting changes. """
+        with patch.object(api, 'import_module', wraps=api.import_module) as mock_import_module:
+            self.assertEqual(get_fulfillment_modules(), [FakeFulfillmentModule])
+            self.assertEqual(get_fulfillment_modules(), [FakeFulfillmentModule])
+            self.assertEqual(mock_import_module.call_count, 1)
+
+            with override_settings(FULFILLMENT_MODULES=[]):
+                self.assertEqual(get_fulfillment_modules(), [])
+
+            self.assertEqual(get_fulfillment_modules(), [FakeFulfillmentModule])
+            self.assertEqual(mock_import_module.call_count, 2)
+
     @override_settings(FULFILLMENT_MODULES=['ecommerce.extensions.fulfillment.tests.modules.FakeFulfillmentModule',
                                             'ecommerce.extensions.fulfillment.tests.modules.FulfillNothingModule'])
     def test_get_fulfillment_modules_for_line(self):
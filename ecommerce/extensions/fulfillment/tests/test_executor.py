@@ -0,0 +1,43 @@
+"""Tests of the pooled sessions and concurrent requests used by the fulfillment modules."""
+import threading
+
+from django.test import override_settings
+
+from ecommerce.extensions.fulfillment.executor import get_fulfillment_session, run_concurrently
+from ecommerce.tests.factories import SiteFactory
+from ecommerce.tests.testcases import TestCase
+
+
+class FulfillmentExecutorTests(TestCase):
+    def test_get_fulfillment_session(self):
+        """ Verify a single session is shared by the requests of a site, and that it does not store cookies. """
+        session = get_fulfillment_session(self.site)
+        self.assertIs(get_fulfillment_session(self.site), session)
+        self.assertIsNot(get_fulfillment_session(SiteFactory()), session)
+
+        self.assertEqual(session.cookies.get_policy().allowed_domains(), ())
+
+    @override_settings(ENROLLMENT_FULFILLMENT_MAX_WORKERS=3)
+    def test_run_concurrently(self):
+        """ Verify the results and errors of every item are returned in order, using a bounded number of threads. """
+        thread_names = set()
+
+        def double(value):
+            thread_names.add(threading.current_thread().name)
+            if value == 3:
+                raise ValueError(value)
+            return value * 2
+
+        outcomes = run_concurrently(double, range(6))
+
+        self.assertEqual([(item, result) for item, result, __ in outcomes], [
+            (0, 0), (1, 2), (2, 4), (3, None), (4, 8), (5, 10)
+        ])
+        self.assertEqual([type(exc) for __, __, exc in outcomes], [type(None)] * 3 + [ValueError] + [type(None)] * 2)
+        self.assertLessEqual(len(thread_names), 3)
+        self.assertTrue(all(name.startswith('fulfillment') for name in thread_names))
+
+    def test_run_concurrently_single_item(self):
+        """ Verify a single item is handled in the calling thread. """
+        outcomes = run_concurrently(lambda value: threading.current_thread(), [1])
+        self.assertEqual(outcomes, [(1, threading.current_thread(), None)])
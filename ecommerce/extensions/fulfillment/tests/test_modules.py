@@ -306,13 +306,13 @@ class EnrollmentFulfillmentModuleTests(
         EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
         self.assertEqual(LINE.FULFILLMENT_CONFIGURATION_ERROR, self.order.lines.all()[0].status)
 
-    @mock.patch('requests.post', mock.Mock(side_effect=ReqConnectionError))
+    @mock.patch('requests.Session.post', mock.Mock(side_effect=ReqConnectionError))
     def test_enrollment_module_network_error(self):
         """Test that lines receive a network error status if a fulfillment request experiences a network error."""
         EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
         self.assertEqual(LINE.FULFILLMENT_NETWORK_ERROR, self.order.lines.all()[0].status)
 
-    @mock.patch('requests.post', mock.Mock(side_effect=Timeout))
+    @mock.patch('requests.Session.post', mock.Mock(side_effect=Timeout))
     def test_enrollment_module_request_timeout(self):
         """Test that lines receive a timeout error status if a fulfillment request times out."""
         EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
@@ -328,6 +328,61 @@ class EnrollmentFulfillmentModuleTests(
         EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
         self.assertEqual(LINE.FULFILLMENT_SERVER_ERROR, self.order.lines.all()[0].status)
 
+    @override_settings(ENROLLMENT_FULFILLMENT_MAX_WORKERS=3)
+    def test_enrollment_module_fulfill_multiple_lines(self):
+        """Test that the lines of an order are enrolled concurrently, and that each line gets its own status."""
+        failed_course_id = 'edX/DemoX/Course_4'
+
+        def post_enrollment(url, data, **kwargs):  # pylint: disable=unused-argument
+            if json.loads(data)['course_details']['course_id'] == failed_course_id:
+                return mock.Mock(status_code=400, json=mock.Mock(return_value={'message': 'Oops!'}))
+            return mock.Mock(status_code=200)
+
+        basket = factories.BasketFactory(owner=self.user, site=self.site)
+        for index in range(5):
+            course = CourseFactory(id='edX/DemoX/Course_{}'.format(index), partner=self.partner)
+            basket.add_product(course.create_or_update_seat(self.certificate_type, False, 100), 1)
+        order = create_order(number=3, basket=basket, user=self.user)
+
+        with mock.patch('requests.Session.post', side_effect=post_enrollment) as mock_post:
+            __, lines = EnrollmentFulfillmentModule().fulfill_product(order, list(order.lines.all()))
+
+        self.assertEqual(mock_post.call_count, 5)
+        self.assertEqual(
+            {line.product.attr.course_key: line.status for line in lines},
+            {
+                'edX/DemoX/Course_{}'.format(index): LINE.COMPLETE if index != 4 else LINE.FULFILLMENT_SERVER_ERROR
+                for index in range(5)
+            }
+        )
+        self.assertEqual(list(order.notes.values_list('message', flat=True)), ['Oops!'])
+
+    def test_enrollment_module_fulfill_enterprise_user_created_once(self):
+        """Test that the EnterpriseCustomerUser is created once per order, not once per line."""
+        basket = factories.BasketFactory(owner=self.user, site=self.site)
+        for index in range(3):
+            course = CourseFactory(id='edX/DemoX/Course_{}'.format(index), partner=self.partner)
+            basket.add_product(course.create_or_update_seat(self.certificate_type, False, 100), 1)
+        order = create_order(number=3, basket=basket, user=self.user)
+        enterprise_customer_uuid = uuid.uuid4()
+        module = EnrollmentFulfillmentModule()
+
+        with mock.patch.object(module, '_get_enterprise_customer_uuid', return_value=enterprise_customer_uuid), \
+                mock.patch('ecommerce.extensions.fulfillment.modules.get_or_create_enterprise_customer_user') as \
+                mock_get_or_create_enterprise_customer_user, \
+                mock.patch('requests.Session.post', return_value=mock.Mock(status_code=200)) as mock_post:
+            __, lines = module.fulfill_product(order, list(order.lines.all()))
+
+        mock_get_or_create_enterprise_customer_user.assert_called_once_with(
+            self.site, enterprise_customer_uuid, self.user.username
+        )
+        self.assertEqual(mock_post.call_count, 3)
+        for call in mock_post.call_args_list:
+            self.assertEqual(
+                json.loads(call[1]['data'])['linked_enterprise_customer'], str(enterprise_customer_uuid)
+            )
+        self.assertEqual({line.status for line in lines}, {LINE.COMPLETE})
+
     @httpretty.activate
     def test_revoke_product(self):
         """ The method should call the Enrollment API to un-enroll the student, and return True. """
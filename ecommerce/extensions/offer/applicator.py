@@ -7,6 +7,9 @@ from oscar.apps.offer.applicator import Applicator as OscarApplicator
 from oscar.core.loading import get_model
 
 from ecommerce.enterprise.api import get_enterprise_id_for_user
+from ecommerce.enterprise.discount_ledger import DiscountLedger
+from ecommerce.extensions.offer.offer_index import get_offer_index
+from ecommerce.extensions.offer.prefetch import prefetch_condition_data
 
 logger = logging.getLogger(__name__)
 BUNDLE = 'bundle_identifier'
@@ -38,7 +41,12 @@ class Applicator(OscarApplicator):
                 we get an error when trying to create the bundle_id BasketAttribute.
         """
         offers = self.get_offers(basket, user, request, bundle_id)
-        self.apply_offers(basket, offers)
+        prefetch_condition_data(basket, offers)
+        basket.discount_ledger = DiscountLedger(basket, offers)
+        try:
+            self.apply_offers(basket, offers)
+        finally:
+            basket.discount_ledger = None
 
     def get_offers(self, basket, user=None, request=None, bundle_id=None):  # pylint: disable=arguments-differ
         """
@@ -72,6 +80,26 @@ class Applicator(OscarApplicator):
             )
         )
 
+    def get_basket_offers(self, basket, user):
+        """
+        Return the offers of the vouchers applied to the basket.
+
+        Oscar ignores the vouchers of baskets without an id. Baskets priced in memory are never saved, so their
+        vouchers are taken into account here.
+        """
+        if basket.id or not user or not basket.contains_a_voucher:
+            return super(Applicator, self).get_basket_offers(basket, user)
+
+        offers = []
+        for voucher in basket.get_vouchers():
+            available_to_user, __ = voucher.is_available_to_user(user=user)
+            if voucher.is_active() and available_to_user:
+                voucher_offers = voucher.offers.all()
+                for offer in voucher_offers:
+                    offer.set_voucher(voucher)
+                offers.extend(voucher_offers)
+        return offers
+
     def get_site_offers(self):
         """
         Return other site offers that are available to baskets without bundle ids or
@@ -79,13 +107,7 @@ class Applicator(OscarApplicator):
 
         Excludes: Bundle and Enterprise offers.
         """
-        ConditionalOffer = get_model('offer', 'ConditionalOffer')
-        qs = ConditionalOffer.active.filter(
-            offer_type=ConditionalOffer.SITE,
-            condition__program_uuid__isnull=True,
-            condition__enterprise_customer_uuid__isnull=True,
-        )
-        return qs.select_related('condition', 'benefit')
+        return get_offer_index().get_site_offers()
 
     def _get_enterprise_offers(self, site, user):
         """
@@ -93,12 +115,7 @@ class Applicator(OscarApplicator):
         """
         enterprise_id = get_enterprise_id_for_user(site, user)
         if enterprise_id:
-            ConditionalOffer = get_model('offer', 'ConditionalOffer')
-            offers = ConditionalOffer.active.filter(
-                offer_type=ConditionalOffer.SITE,
-                condition__enterprise_customer_uuid=enterprise_id
-            )
-            return offers.select_related('condition', 'benefit')
+            return get_offer_index().get_enterprise_offers(enterprise_id)
 
         return []
 
@@ -112,19 +129,17 @@ class Applicator(OscarApplicator):
         Returns:
             list of Offer: List of all the offers applicable to the program.
         """
-        BasketAttribute = get_model('basket', 'BasketAttribute')
-        BasketAttributeType = get_model('basket', 'BasketAttributeType')
-        ConditionalOffer = get_model('offer', 'ConditionalOffer')
+        program_uuid = bundle_id
+        if basket.id:
+            BasketAttribute = get_model('basket', 'BasketAttribute')
+            bundle_attribute = BasketAttribute.objects.filter(
+                basket=basket,
+                attribute_type__name=BUNDLE
+            ).values_list('value_text', flat=True).first()
+            if bundle_attribute is not None:
+                program_uuid = bundle_attribute
 
-        bundle_attributes = BasketAttribute.objects.filter(
-            basket=basket,
-            attribute_type=BasketAttributeType.objects.get(name=BUNDLE)
-        )
-        program_uuid = bundle_id if bundle_attributes.count() == 0 else bundle_attributes.first().value_text
         if program_uuid:
-            offers = ConditionalOffer.active.filter(
-                offer_type=ConditionalOffer.SITE, condition__program_uuid=program_uuid
-            )
-            return offers.select_related('condition', 'benefit')
+            return get_offer_index().get_program_offers(program_uuid)
 
         return []
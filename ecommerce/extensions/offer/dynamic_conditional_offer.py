@@ -100,7 +100,7 @@ class DynamicDiscountCondition(ConditionWithoutRangeMixin, SingleItemConsumption
         if basket.num_items > 1:
             return False
 
-        if not basket.lines.first().product.is_seat_product:
+        if not basket.all_lines()[0].product.is_seat_product:
             return False
 
         decoded_jwt_discount = get_decoded_jwt_discount_from_request()
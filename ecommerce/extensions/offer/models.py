@@ -39,6 +39,7 @@ from ecommerce.extensions.offer.constants import (
     OFFER_MAX_USES_DEFAULT,
     OFFER_REDEEMED
 )
+from ecommerce.extensions.offer.range_membership import CatalogRangeMembershipResolver
 from ecommerce.extensions.offer.utils import format_assigned_offer_email
 
 OFFER_PRIORITY_ENTERPRISE = 10
@@ -82,40 +83,6 @@ class Benefit(AbstractBenefit):
             line.product.attr.certificate_type.lower() in applicable_range.course_seat_types
         ]
 
-    def _identify_uncached_product_identifiers(self, lines, domain, partner_code, query):
-        """
-        Checks the cache to see if each line is in the catalog range specified by the given query
-        and tracks identifiers for which discovery service data is still needed.
-        """
-        uncached_course_run_ids = []
-        uncached_course_uuids = []
-
-        applicable_lines = lines
-        for line in applicable_lines:
-            if line.product.is_seat_product:
-                product_id = line.product.course.id
-            else:  # All lines passed to this method should either have a seat or an entitlement product
-                product_id = line.product.attr.UUID
-
-            cache_key = get_cache_key(
-                site_domain=domain,
-                partner_code=partner_code,
-                resource='catalog_query.contains',
-                course_id=product_id,
-                query=query
-            )
-            in_catalog_range_cached_response = TieredCache.get_cached_response(cache_key)
-
-            if not in_catalog_range_cached_response.is_found:
-                if line.product.is_seat_product:
-                    uncached_course_run_ids.append({'id': product_id, 'cache_key': cache_key, 'line': line})
-                else:
-                    uncached_course_uuids.append({'id': product_id, 'cache_key': cache_key, 'line': line})
-            elif not in_catalog_range_cached_response.value:
-                applicable_lines.remove(line)
-
-        return uncached_course_run_ids, uncached_course_uuids, applicable_lines
-
     def get_applicable_lines(self, offer, basket, range=None):  # pylint: disable=redefined-builtin
         """
         Returns the basket lines for which the benefit is applicable.
@@ -123,48 +90,18 @@ class Benefit(AbstractBenefit):
         applicable_range = range if range else self.range
 
         if applicable_range and applicable_range.catalog_query is not None:
-
-            query = applicable_range.catalog_query
             applicable_lines = self._filter_for_paid_course_products(basket.all_lines(), applicable_range)
-
-            site = basket.site
-            partner_code = site.siteconfiguration.partner.short_code
-            course_run_ids, course_uuids, applicable_lines = self._identify_uncached_product_identifiers(
-                applicable_lines, site.domain, partner_code, query
-            )
-
-            if course_run_ids or course_uuids:
-                # Hit Discovery Service to determine if remaining courses and runs are in the range.
-                try:
-                    response = site.siteconfiguration.discovery_api_client.catalog.query_contains.get(
-                        course_run_ids=','.join([metadata['id'] for metadata in course_run_ids]),
-                        course_uuids=','.join([metadata['id'] for metadata in course_uuids]),
-                        query=query,
-                        partner=partner_code
-                    )
-                except Exception as err:  # pylint: disable=bare-except
-                    logger.exception(
-                        '[Code Redemption Failure] Unable to apply benefit because we failed to query the '
-                        'Discovery Service for catalog data. '
-                        'User: %s, Offer: %s, Basket: %s, Message: %s',
-                        basket.owner.username, offer.id, basket.id, err
-                    )
-                    raise Exception('Failed to contact Discovery Service to retrieve offer catalog_range data.')
-
-                # Cache range-state individually for each course or run identifier and remove lines not in the range.
-                for metadata in course_run_ids + course_uuids:
-                    in_range = response[str(metadata['id'])]
-
-                    # Convert to int, because this is what memcached will return, and the request cache should return
-                    # the same value.
-                    # Note: once the TieredCache is fixed to handle this case, we could remove this line.
-                    in_range = int(in_range)
-                    TieredCache.set_all_tiers(metadata['cache_key'], in_range, settings.COURSES_API_CACHE_TIMEOUT)
-
-                    if not in_range:
-                        applicable_lines.remove(metadata['line'])
-
-            return [(line.product.stockrecords.first().price_excl_tax, line) for line in applicable_lines]
+            resolver = CatalogRangeMembershipResolver(basket.site, applicable_range.catalog_query)
+            try:
+                return resolver.get_priced_lines(applicable_lines)
+            except Exception as err:  # pylint: disable=bare-except
+                logger.exception(
+                    '[Code Redemption Failure] Unable to apply benefit because we failed to query the '
+                    'Discovery Service for catalog data. '
+                    'User: %s, Offer: %s, Basket: %s, Message: %s',
+                    basket.owner.username, offer.id, basket.id, err
+                )
+                raise Exception('Failed to contact Discovery Service to retrieve offer catalog_range data.')
         return super(Benefit, self).get_applicable_lines(offer, basket, range=range)  # pylint: disable=bad-super-call
 
 
@@ -213,10 +150,34 @@ class ConditionalOffer(AbstractConditionalOffer):
         null=True,
     )
 
+    # Fields updated on every order that uses the offer
+    USAGE_FIELDS = ('num_applications', 'total_discount', 'num_orders')
+
     def save(self, *args, **kwargs):
         self.clean()
         super(ConditionalOffer, self).save(*args, **kwargs)  # pylint: disable=bad-super-call
 
+    def record_usage(self, discount):
+        """
+        Record the usage of the offer, only saving its usage counters unless the offer is consumed.
+
+        Offers served by the offer index may carry stale counters, so they are reloaded first. Saves that
+        only update the counters do not invalidate the offer index, unless the offer is limited by a maximum
+        discount or number of applications (see ecommerce.extensions.offer.signals).
+        """
+        self.refresh_from_db(fields=self.USAGE_FIELDS + ('status',))
+        previous_status = self.status
+        self.num_applications += discount['freq']
+        self.total_discount += discount['discount']
+        self.num_orders += 1
+        update_fields = list(self.USAGE_FIELDS)
+        if not self.is_suspended and self.get_max_applications() == 0:
+            self.status = self.CONSUMED
+        if self.status != previous_status:
+            update_fields.append('status')
+        self.save(update_fields=update_fields)
+    record_usage.alters_data = True
+
     def clean(self):
         self.clean_email_domains()
         self.clean_max_global_applications()  # Our frontend uses the name max_uses instead of max_global_applications
@@ -330,7 +291,7 @@ class ConditionalOffer(AbstractConditionalOffer):
 
         if self.benefit.range and self.benefit.range.catalog_query:
             # The condition is only satisfied if all basket lines are in the offer range
-            num_lines = basket.all_lines().count()
+            num_lines = basket.num_lines
             voucher = self.get_voucher()
             code = voucher and voucher.code
             username = basket.owner and basket.owner.username
@@ -0,0 +1,142 @@
+"""
+In-process index of the open site offers used by the custom Applicator.
+
+Basket calculation is the hottest path in the service, and the Applicator used to run several
+ConditionalOffer queries for every basket it priced. The index loads every open site offer,
+together with its condition, benefit and ranges, in a single query and partitions the offers by
+the program and enterprise customer they are restricted to.
+
+The index is versioned through the TieredCache. Saving or deleting an offer, condition, benefit
+or range stores a new version (see ecommerce.extensions.offer.signals), and every process rebuilds
+its local index the next time it notices that the version has changed.
+"""
+import copy
+import logging
+import threading
+import time
+from collections import defaultdict
+from uuid import UUID, uuid4
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.timezone import now
+from edx_django_utils.cache import TieredCache
+from oscar.core.loading import get_model
+
+logger = logging.getLogger(__name__)
+
+OFFER_INDEX_VERSION_CACHE_KEY = 'offer.offer_index.version'
+
+_offer_index = None
+_offer_index_lock = threading.Lock()
+
+
+def _normalize_uuid(value):
+    """ Return the canonical string representation of a UUID, or None if the value is not a valid UUID. """
+    try:
+        return str(value if isinstance(value, UUID) else UUID(str(value)))
+    except ValueError:
+        return None
+
+
+class OfferIndex:
+    """
+    Snapshot of the open site offers, keyed by program UUID and enterprise customer UUID.
+
+    Offers are returned as copies so that callers can mutate them (e.g. when recording usage)
+    without affecting the instances shared by other requests.
+    """
+
+    def __init__(self, version, offers):
+        self.version = version
+        self.built_at = time.time()
+        self.site_offers = []
+        self.program_offers = defaultdict(list)
+        self.enterprise_offers = defaultdict(list)
+
+        for offer in offers:
+            program_uuid = offer.condition.program_uuid
+            enterprise_customer_uuid = offer.condition.enterprise_customer_uuid
+            if program_uuid:
+                self.program_offers[str(program_uuid)].append(offer)
+            if enterprise_customer_uuid:
+                self.enterprise_offers[str(enterprise_customer_uuid)].append(offer)
+            if not (program_uuid or enterprise_customer_uuid):
+                self.site_offers.append(offer)
+
+    @classmethod
+    def build(cls, version):
+        """
+        Load every open site offer that has not expired yet.
+
+        Offers that have not started yet are loaded as well; the start and end dates are checked
+        whenever offers are read from the index, so the index does not go stale when an offer
+        becomes active or expires.
+        """
+        ConditionalOffer = get_model('offer', 'ConditionalOffer')
+        offers = ConditionalOffer.objects.filter(
+            Q(end_datetime__gte=now()) | Q(end_datetime=None),
+            offer_type=ConditionalOffer.SITE,
+            status=ConditionalOffer.OPEN,
+        ).select_related('condition', 'benefit', 'condition__range', 'benefit__range')
+        return cls(version, list(offers))
+
+    def is_expired(self):
+        return time.time() - self.built_at > settings.OFFER_INDEX_CACHE_TIMEOUT
+
+    def _active(self, offers):
+        cutoff = now()
+        return [
+            copy.deepcopy(offer) for offer in offers
+            if (offer.start_datetime is None or offer.start_datetime <= cutoff) and
+            (offer.end_datetime is None or offer.end_datetime >= cutoff)
+        ]
+
+    def get_site_offers(self):
+        """ Return the active site offers not associated with a program or an enterprise customer. """
+        return self._active(self.site_offers)
+
+    def get_program_offers(self, program_uuid):
+        """ Return the active site offers associated with the given program. """
+        return self._active(self.program_offers.get(_normalize_uuid(program_uuid), []))
+
+    def get_enterprise_offers(self, enterprise_customer_uuid):
+        """ Return the active site offers associated with the given enterprise customer. """
+        return self._active(self.enterprise_offers.get(_normalize_uuid(enterprise_customer_uuid), []))
+
+
+def _get_current_version():
+    cached_response = TieredCache.get_cached_response(OFFER_INDEX_VERSION_CACHE_KEY)
+    if cached_response.is_found:
+        return cached_response.value
+    return invalidate_offer_index()
+
+
+def get_offer_index():
+    """
+    Return the offer index for the current version, rebuilding it if necessary.
+    """
+    global _offer_index  # pylint: disable=global-statement
+
+    version = _get_current_version()
+    index = _offer_index
+    if index is None or index.version != version or index.is_expired():
+        with _offer_index_lock:
+            index = _offer_index
+            if index is None or index.version != version or index.is_expired():
+                index = OfferIndex.build(version)
+                _offer_index = index
+                logger.debug('Rebuilt offer index version [%s].', version)
+    return index
+
+
+def invalidate_offer_index():
+    """
+    Store a new offer index version, forcing every process to rebuild its index.
+
+    Returns:
+        str: The new version.
+    """
+    version = uuid4().hex
+    TieredCache.set_all_tiers(OFFER_INDEX_VERSION_CACHE_KEY, version, settings.OFFER_INDEX_CACHE_TIMEOUT)
+    return version
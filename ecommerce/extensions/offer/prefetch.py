@@ -0,0 +1,128 @@
+"""
+Concurrent prefetching of the remote data needed to evaluate offer conditions.
+
+Some conditions call other services (Discovery, LMS, Enterprise) while they are evaluated. When a
+basket has several candidate offers these calls used to be made serially, one offer at a time.
+Conditions can declare the remote lookups they are going to make by implementing
+``get_remote_lookups(offer, basket, snapshot)``. The Applicator collects the lookups of every
+candidate offer, deduplicates them by key and runs them concurrently on a bounded thread pool.
+
+The lookups are the same TieredCache-backed functions the conditions call, so once the request cache
+entries produced by the worker threads are copied into the request cache of the current thread, the
+conditions are evaluated against this snapshot without making any remote calls. Worker threads see the
+current request, and close the database connections they open once their lookup is done.
+
+Lookups may depend on the results of other lookups (e.g. the course runs of an entitlement product
+have to be known before checking if they are in a catalog). ``get_remote_lookups`` receives the
+results gathered so far, and lookups are collected again until no new lookups are declared.
+"""
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
+
+from ecommerce.core.concurrency import bind_current_request
+
+logger = logging.getLogger(__name__)
+
+MAX_PREFETCH_ROUNDS = 3
+
+RemoteLookup = namedtuple('RemoteLookup', ['key', 'func', 'args'])
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor  # pylint: disable=global-statement
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.OFFER_CONDITION_PREFETCH_MAX_WORKERS,
+                    thread_name_prefix='offer-condition-prefetch',
+                )
+    return _executor
+
+
+def _call_lookup(lookup):
+    try:
+        return lookup.func(*lookup.args)
+    except Exception as exc:  # pylint: disable=broad-except
+        # The condition makes the same call again while it is evaluated, and handles the error itself.
+        logger.info('Failed to prefetch [%s] for offer conditions: %s', lookup.key, exc)
+        return exc
+
+
+def _run_lookup_in_worker(lookup, request_cache_data):
+    """
+    Run a lookup on a worker thread, seeding its request cache with the data of the calling thread.
+
+    Returns:
+        tuple: The result of the lookup and the request cache data of the worker thread.
+    """
+    DEFAULT_REQUEST_CACHE.clear()
+    DEFAULT_REQUEST_CACHE.data.update(request_cache_data)
+    try:
+        result = _call_lookup(lookup)
+        return result, dict(DEFAULT_REQUEST_CACHE.data)
+    finally:
+        DEFAULT_REQUEST_CACHE.clear()
+
+
+def _collect_lookups(conditions, basket, snapshot):
+    lookups = {}
+    for offer, condition in conditions:
+        for lookup in condition.get_remote_lookups(offer, basket, snapshot):
+            if lookup.key not in snapshot:
+                lookups.setdefault(lookup.key, lookup)
+    return lookups
+
+
+def prefetch_condition_data(basket, offers):
+    """
+    Make the remote lookups needed by the conditions of the given offers, concurrently.
+
+    Arguments:
+        basket (Basket): The basket the offers are going to be applied to.
+        offers (list of ConditionalOffer): The candidate offers.
+
+    Returns:
+        dict: The result of every lookup, or the exception it raised, keyed by lookup key.
+    """
+    snapshot = {}
+    if not settings.OFFER_CONDITION_PREFETCH_MAX_WORKERS:
+        return snapshot
+
+    conditions = []
+    for offer in offers:
+        condition = offer.condition.proxy()
+        if hasattr(condition, 'get_remote_lookups'):
+            conditions.append((offer, condition))
+
+    for __ in range(MAX_PREFETCH_ROUNDS):
+        lookups = _collect_lookups(conditions, basket, snapshot)
+        if not lookups:
+            break
+
+        if len(lookups) == 1:
+            key, lookup = lookups.popitem()
+            snapshot[key] = _call_lookup(lookup)
+            continue
+
+        request_cache_data = dict(DEFAULT_REQUEST_CACHE.data)
+        executor = _get_executor()
+        run_lookup = bind_current_request(_run_lookup_in_worker)
+        futures = {
+            key: executor.submit(run_lookup, lookup, request_cache_data)
+            for key, lookup in lookups.items()
+        }
+        for key, future in futures.items():
+            snapshot[key], worker_request_cache_data = future.result()
+            DEFAULT_REQUEST_CACHE.data.update(worker_request_cache_data)
+
+    return snapshot
@@ -0,0 +1,138 @@
+"""
+Batched resolution of the basket lines contained in a dynamic catalog range.
+
+A range with a catalog query contains the seats and entitlements of the courses returned by the
+query on the Discovery Service. Whether a course is in the range is cached for every course, so
+baskets with many lines used to make a cache lookup per line, and a stock record query per line
+to price it. The resolver looks up every line in a single multi-get against the cache backend,
+asks the Discovery Service about all the misses in a single ``query_contains`` call, and prices
+the lines from stock records prefetched in a single query.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE, TieredCache
+
+from ecommerce.core.utils import get_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogRangeMembershipResolver:
+    """
+    Resolves which basket lines belong to the range defined by a catalog query.
+
+    The number of course identifiers found in the cache and the number of course identifiers that required
+    the Discovery Service are kept in ``hits`` and ``misses``.
+    """
+
+    def __init__(self, site, query):
+        self.site = site
+        self.query = query
+        self.partner_code = site.siteconfiguration.partner.short_code
+        self.hits = 0
+        self.misses = 0
+
+    def _get_product_identifier(self, line):
+        if line.product.is_seat_product:
+            return line.product.course.id
+        # All lines passed to the resolver should either have a seat or an entitlement product
+        return line.product.attr.UUID
+
+    def _get_cache_key(self, product_id):
+        return get_cache_key(
+            site_domain=self.site.domain,
+            partner_code=self.partner_code,
+            resource='catalog_query.contains',
+            course_id=product_id,
+            query=self.query
+        )
+
+    def _get_cached_membership(self, cache_keys):
+        """
+        Return the cached range membership of the given keys, reading the request cache first and
+        the django cache for the remaining keys in a single multi-get.
+        """
+        cached_membership = {}
+        uncached_keys = []
+        for cache_key in cache_keys:
+            cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(cache_key)
+            if cached_response.is_found:
+                cached_membership[cache_key] = cached_response.value
+            else:
+                uncached_keys.append(cache_key)
+
+        if uncached_keys:
+            for cache_key, value in cache.get_many(uncached_keys).items():
+                DEFAULT_REQUEST_CACHE.set(cache_key, value)
+                cached_membership[cache_key] = value
+
+        return cached_membership
+
+    def _query_contains(self, course_run_ids, course_uuids):
+        """
+        Ask the Discovery Service whether the given course runs and courses are in the range.
+        """
+        response = self.site.siteconfiguration.discovery_api_client.catalog.query_contains.get(
+            course_run_ids=','.join(course_run_ids),
+            course_uuids=','.join(course_uuids),
+            query=self.query,
+            partner=self.partner_code
+        )
+        return {str(product_id): in_range for product_id, in_range in response.items()}
+
+    def get_lines_in_range(self, lines):
+        """
+        Return the lines contained in the range, in the order they were given.
+
+        Raises:
+            Exception: The errors raised when the Discovery Service cannot be reached.
+        """
+        lines = list(lines)
+        line_keys = []
+        product_ids = {}
+        for line in lines:
+            product_id = self._get_product_identifier(line)
+            cache_key = self._get_cache_key(product_id)
+            line_keys.append(cache_key)
+            product_ids[cache_key] = (str(product_id), line.product.is_seat_product)
+
+        membership = self._get_cached_membership(product_ids.keys())
+        uncached_keys = [cache_key for cache_key in product_ids if cache_key not in membership]
+        self.hits += len(membership)
+        self.misses += len(uncached_keys)
+
+        if uncached_keys:
+            response = self._query_contains(
+                [product_ids[cache_key][0] for cache_key in uncached_keys if product_ids[cache_key][1]],
+                [product_ids[cache_key][0] for cache_key in uncached_keys if not product_ids[cache_key][1]],
+            )
+            for cache_key in uncached_keys:
+                # Convert to int, because this is what memcached will return, and the request cache should return
+                # the same value.
+                # Note: once the TieredCache is fixed to handle this case, we could remove this line.
+                in_range = int(response[product_ids[cache_key][0]])
+                TieredCache.set_all_tiers(cache_key, in_range, settings.COURSES_API_CACHE_TIMEOUT)
+                membership[cache_key] = in_range
+
+        logger.debug(
+            'Resolved range membership of %d lines for catalog query [%s]: %d cache hits, %d cache misses.',
+            len(lines), self.query, len(product_ids) - len(uncached_keys), len(uncached_keys)
+        )
+        return [line for line, cache_key in zip(lines, line_keys) if membership[cache_key]]
+
+    def get_priced_lines(self, lines):
+        """
+        Return (price, line) tuples for the lines contained in the range.
+
+        Lines are priced with the first stock record of their product, and the stock records of all the
+        lines are loaded in a single query.
+        """
+        lines = self.get_lines_in_range(lines)
+        prefetch_related_objects([line.product for line in lines], 'stockrecords')
+        return [
+            (min(line.product.stockrecords.all(), key=lambda stockrecord: stockrecord.pk).price_excl_tax, line)
+            for line in lines
+        ]
@@ -0,0 +1,51 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.offer.offer_index import invalidate_offer_index
+
+Benefit = get_model('offer', 'Benefit')
+Condition = get_model('offer', 'Condition')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+Range = get_model('offer', 'Range')
+
+
+def is_offer_usage_update(sender, update_fields):
+    """
+    Return True if an offer is saved only to record its usage, which doesn't change its pricing.
+    """
+    return sender is ConditionalOffer and bool(update_fields) and set(update_fields) <= set(sender.USAGE_FIELDS)
+
+
+def is_offer_limited_by_usage(offer):
+    """
+    Return True if the availability of an offer is checked against its usage, because it is limited
+    by a maximum discount or number of applications.
+    """
+    return offer.max_discount is not None or offer.max_global_applications is not None
+
+
+@receiver(post_save, sender=Benefit, dispatch_uid='offer_index.benefit_saved')
+@receiver(post_delete, sender=Benefit, dispatch_uid='offer_index.benefit_deleted')
+@receiver(post_save, sender=Condition, dispatch_uid='offer_index.condition_saved')
+@receiver(post_delete, sender=Condition, dispatch_uid='offer_index.condition_deleted')
+@receiver(post_save, sender=ConditionalOffer, dispatch_uid='offer_index.offer_saved')
+@receiver(post_delete, sender=ConditionalOffer, dispatch_uid='offer_index.offer_deleted')
+@receiver(post_save, sender=Range, dispatch_uid='offer_index.range_saved')
+@receiver(post_delete, sender=Range, dispatch_uid='offer_index.range_deleted')
+def invalidate_offer_index_on_change(sender, instance, update_fields=None, **_kwargs):
+    """
+    Invalidate the offer index used by the Applicator whenever a site offer or its related data changes.
+    Recording the usage of an offer doesn't invalidate it, unless the offer is limited by it or consumed.
+
+    The index is invalidated immediately, so the current process sees the change, and again once the
+    transaction is committed, so other processes cannot rebuild their index from uncommitted data.
+    """
+    if sender is ConditionalOffer and instance.offer_type != ConditionalOffer.SITE:
+        # The index only holds site offers
+        return
+    if is_offer_usage_update(sender, update_fields) and not is_offer_limited_by_usage(instance):
+        return
+    invalidate_offer_index()
+    transaction.on_commit(invalidate_offer_index)
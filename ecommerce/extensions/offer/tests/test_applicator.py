@@ -86,7 +86,7 @@ class ApplicatorTests(TestCase):
                 enterprise_customer_uuid=None
             )
             ConditionalOfferFactory(condition=condition)
-        assert self.applicator.get_site_offers().count() == 3 + len(existing_offers)
+        assert len(self.applicator.get_site_offers()) == 3 + len(existing_offers)
 
     @ddt.data(
         (uuid4(), 2),
@@ -129,4 +129,25 @@ class ApplicatorTests(TestCase):
         if num_expected_offers == 0:
             assert not enterprise_offers
         else:
-            assert enterprise_offers.count() == num_expected_offers
+            assert len(enterprise_offers) == num_expected_offers
+
+    def test_get_offers_with_unsaved_basket_bundle_id(self):
+        """ Verify program offers are looked up by the given bundle id when the basket has not been saved. """
+        program_offers = [ProgramOfferFactory()]
+        basket = factories.BasketFactory.build()
+
+        # pylint: disable=protected-access
+        offers = self.applicator._get_program_offers(basket, str(program_offers[0].condition.program_uuid))
+        self.assertEqual(offers, program_offers)
+
+    def test_get_offers_reflects_offer_changes(self):
+        """ Verify offers that are closed after the offer index was built are no longer returned. """
+        program_offer = ProgramOfferFactory()
+        self.create_bundle_attribute(program_offer.condition.program_uuid)
+        self.assert_correct_offers([program_offer])
+
+        program_offer.status = ConditionalOffer.SUSPENDED
+        program_offer.save()
+        self.assertNotIn(program_offer, self.applicator.get_site_offers())
+        # pylint: disable=protected-access
+        self.assertEqual(self.applicator._get_program_offers(self.basket, None), [])
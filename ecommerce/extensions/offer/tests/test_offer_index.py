@@ -0,0 +1,136 @@
+import datetime
+from uuid import uuid4
+
+from django.utils.timezone import now
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.offer.offer_index import get_offer_index, invalidate_offer_index
+from ecommerce.extensions.test.factories import (
+    ConditionalOfferFactory,
+    ConditionFactory,
+    EnterpriseOfferFactory,
+    ProgramOfferFactory
+)
+from ecommerce.tests.testcases import TestCase
+
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+
+
+class OfferIndexTests(TestCase):
+    """ Tests for the in-process offer index. """
+
+    def test_offers_partitioned_by_condition(self):
+        """ Verify offers are keyed by program UUID and enterprise customer UUID. """
+        site_offer = ConditionalOfferFactory(condition=ConditionFactory(program_uuid=None))
+        program_offer = ProgramOfferFactory()
+        enterprise_offer = EnterpriseOfferFactory()
+
+        index = get_offer_index()
+        self.assertIn(site_offer, index.get_site_offers())
+        self.assertNotIn(program_offer, index.get_site_offers())
+        self.assertNotIn(enterprise_offer, index.get_site_offers())
+        self.assertEqual(index.get_program_offers(program_offer.condition.program_uuid), [program_offer])
+        self.assertEqual(index.get_program_offers(str(program_offer.condition.program_uuid)), [program_offer])
+        self.assertEqual(
+            index.get_enterprise_offers(str(enterprise_offer.condition.enterprise_customer_uuid)), [enterprise_offer]
+        )
+        self.assertEqual(index.get_program_offers(uuid4()), [])
+        self.assertEqual(index.get_program_offers('not-a-uuid'), [])
+
+    def test_offer_dates_checked_on_read(self):
+        """ Verify offers outside of their date range are not returned. """
+        future_offer = ProgramOfferFactory(start_datetime=now() + datetime.timedelta(days=1))
+        expired_offer = ProgramOfferFactory(end_datetime=now() - datetime.timedelta(days=1))
+
+        index = get_offer_index()
+        self.assertEqual(index.get_program_offers(future_offer.condition.program_uuid), [])
+        self.assertEqual(index.get_program_offers(expired_offer.condition.program_uuid), [])
+
+    def test_index_reused_until_invalidated(self):
+        """ Verify the index is only rebuilt when its version changes. """
+        program_offer = ProgramOfferFactory()
+        index = get_offer_index()
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_offer_index(), index)
+            self.assertEqual(index.get_program_offers(program_offer.condition.program_uuid), [program_offer])
+
+        invalidate_offer_index()
+        self.assertIsNot(get_offer_index(), index)
+
+    def test_index_invalidated_on_save(self):
+        """ Verify saving an offer invalidates the index. """
+        program_offer = ProgramOfferFactory()
+        index = get_offer_index()
+
+        program_offer.status = ConditionalOffer.SUSPENDED
+        program_offer.save()
+
+        rebuilt_index = get_offer_index()
+        self.assertIsNot(rebuilt_index, index)
+        self.assertEqual(rebuilt_index.get_program_offers(program_offer.condition.program_uuid), [])
+
+    def test_offers_are_copies(self):
+        """ Verify callers cannot mutate the offers held by the index. """
+        program_offer = ProgramOfferFactory()
+        index = get_offer_index()
+
+        offer = index.get_program_offers(program_offer.condition.program_uuid)[0]
+        offer.num_applications += 1
+
+        self.assertEqual(
+            index.get_program_offers(program_offer.condition.program_uuid)[0].num_applications,
+            program_offer.num_applications
+        )
+
+    def test_index_not_invalidated_on_usage(self):
+        """ Verify recording the usage of an offer keeps the index, and doesn't lose usage of stale offers. """
+        program_offer = ProgramOfferFactory()
+        index = get_offer_index()
+        offers = [
+            index.get_program_offers(program_offer.condition.program_uuid)[0],
+            index.get_program_offers(program_offer.condition.program_uuid)[0],
+        ]
+
+        for offer in offers:
+            offer.record_usage({'freq': 1, 'discount': 10})
+
+        self.assertIs(get_offer_index(), index)
+        program_offer.refresh_from_db()
+        self.assertEqual(program_offer.num_orders, 2)
+        self.assertEqual(program_offer.num_applications, 2)
+        self.assertEqual(program_offer.total_discount, 20)
+
+    def test_index_invalidated_when_consumed(self):
+        """ Verify the index is invalidated once the usage of an offer consumes it. """
+        program_offer = ProgramOfferFactory(max_global_applications=1)
+        index = get_offer_index()
+
+        index.get_program_offers(program_offer.condition.program_uuid)[0].record_usage({'freq': 1, 'discount': 10})
+
+        rebuilt_index = get_offer_index()
+        self.assertIsNot(rebuilt_index, index)
+        self.assertEqual(rebuilt_index.get_program_offers(program_offer.condition.program_uuid), [])
+
+    def test_index_invalidated_on_limited_usage(self):
+        """ Verify recording the usage of an offer limited by its usage invalidates the index. """
+        for limit in ({'max_global_applications': 5}, {'max_discount': 100}):
+            program_offer = ProgramOfferFactory(**limit)
+            index = get_offer_index()
+
+            index.get_program_offers(program_offer.condition.program_uuid)[0].record_usage({'freq': 1, 'discount': 10})
+
+            rebuilt_index = get_offer_index()
+            self.assertIsNot(rebuilt_index, index)
+            offer = rebuilt_index.get_program_offers(program_offer.condition.program_uuid)[0]
+            self.assertEqual(offer.num_applications, 1)
+            self.assertEqual(offer.total_discount, 10)
+
+    def test_index_not_invalidated_on_voucher_offer_save(self):
+        """ Verify saving an offer that is not a site offer keeps the index. """
+        voucher_offer = ConditionalOfferFactory(offer_type=ConditionalOffer.VOUCHER)
+        index = get_offer_index()
+
+        voucher_offer.save()
+
+        self.assertIs(get_offer_index(), index)
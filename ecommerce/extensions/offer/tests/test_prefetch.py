@@ -0,0 +1,132 @@
+import threading
+
+import crum
+import mock
+from django.test import RequestFactory, override_settings
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
+
+from ecommerce.extensions.offer.prefetch import RemoteLookup, prefetch_condition_data
+from ecommerce.tests.testcases import TestCase
+
+
+class FakeCondition:
+    """ Condition declaring a fixed set of lookups, plus lookups depending on earlier results. """
+
+    def __init__(self, lookups, dependent_lookups=None):
+        self.lookups = lookups
+        self.dependent_lookups = dependent_lookups or {}
+
+    def get_remote_lookups(self, offer, basket, snapshot):  # pylint: disable=unused-argument
+        lookups = list(self.lookups)
+        for key, lookup in self.dependent_lookups.items():
+            if key in snapshot:
+                lookups.append(lookup)
+        return lookups
+
+
+def make_offer(condition):
+    offer = mock.Mock()
+    offer.condition.proxy.return_value = condition
+    return offer
+
+
+class PrefetchConditionDataTests(TestCase):
+    """ Tests for prefetch_condition_data. """
+
+    def setUp(self):
+        super(PrefetchConditionDataTests, self).setUp()
+        self.basket = mock.Mock()
+
+    def test_lookups_deduplicated(self):
+        """ Verify lookups shared by several offers are only made once. """
+        func = mock.Mock(return_value='program')
+        other_func = mock.Mock(return_value='enrollments')
+        offers = [
+            make_offer(FakeCondition([RemoteLookup('program', func, ('uuid',))])),
+            make_offer(FakeCondition([
+                RemoteLookup('program', func, ('uuid',)),
+                RemoteLookup('enrollments', other_func, ()),
+            ])),
+        ]
+
+        snapshot = prefetch_condition_data(self.basket, offers)
+
+        self.assertEqual(snapshot, {'program': 'program', 'enrollments': 'enrollments'})
+        func.assert_called_once_with('uuid')
+        other_func.assert_called_once_with()
+
+    def test_lookups_run_concurrently(self):
+        """ Verify lookups are made on worker threads and their request cache entries are kept. """
+        threads = set()
+        main_thread = threading.current_thread()
+
+        def lookup(key):
+            threads.add(threading.current_thread())
+            DEFAULT_REQUEST_CACHE.set(key, key.upper())
+            return key
+
+        DEFAULT_REQUEST_CACHE.set('existing', 'value')
+        offers = [make_offer(FakeCondition([RemoteLookup(key, lookup, (key,)) for key in ('a', 'b', 'c')]))]
+
+        snapshot = prefetch_condition_data(self.basket, offers)
+
+        self.assertEqual(snapshot, {'a': 'a', 'b': 'b', 'c': 'c'})
+        self.assertNotIn(main_thread, threads)
+        for key in ('a', 'b', 'c'):
+            self.assertEqual(DEFAULT_REQUEST_CACHE.get_cached_response(key).value, key.upper())
+        self.assertEqual(DEFAULT_REQUEST_CACHE.get_cached_response('existing').value, 'value')
+
+    def test_lookups_bound_to_current_request(self):
+        """ Verify lookups made on worker threads see the current request, and close their database connections. """
+        request = RequestFactory().get('/')
+        crum.set_current_request(request)
+        self.addCleanup(crum.set_current_request, None)
+        lookup = mock.Mock(side_effect=lambda key: crum.get_current_request())
+        offers = [make_offer(FakeCondition([RemoteLookup(key, lookup, (key,)) for key in ('a', 'b')]))]
+
+        with mock.patch('ecommerce.core.concurrency.connections') as mock_connections:
+            snapshot = prefetch_condition_data(self.basket, offers)
+
+        self.assertEqual(snapshot, {'a': request, 'b': request})
+        self.assertEqual(mock_connections.close_all.call_count, 2)
+
+    def test_dependent_lookups(self):
+        """ Verify lookups declared once earlier results are available are made as well. """
+        dependent_func = mock.Mock(return_value='catalog')
+        condition = FakeCondition(
+            [RemoteLookup('course', mock.Mock(return_value='course'), ())],
+            dependent_lookups={'course': RemoteLookup('catalog', dependent_func, ())},
+        )
+
+        snapshot = prefetch_condition_data(self.basket, [make_offer(condition)])
+
+        self.assertEqual(snapshot, {'course': 'course', 'catalog': 'catalog'})
+        dependent_func.assert_called_once_with()
+
+    def test_lookup_errors(self):
+        """ Verify errors raised by lookups are kept in the snapshot instead of being raised. """
+        error = ValueError('failure')
+        offers = [make_offer(FakeCondition([
+            RemoteLookup('failing', mock.Mock(side_effect=error), ()),
+            RemoteLookup('succeeding', mock.Mock(return_value=True), ()),
+        ]))]
+
+        snapshot = prefetch_condition_data(self.basket, offers)
+
+        self.assertEqual(snapshot, {'failing': error, 'succeeding': True})
+
+    def test_conditions_without_lookups(self):
+        """ Verify conditions that do not declare lookups are ignored. """
+        offer = mock.Mock()
+        offer.condition.proxy.return_value = object()
+
+        self.assertEqual(prefetch_condition_data(self.basket, [offer]), {})
+
+    @override_settings(OFFER_CONDITION_PREFETCH_MAX_WORKERS=0)
+    def test_prefetch_disabled(self):
+        """ Verify no lookups are made when prefetching is disabled. """
+        func = mock.Mock()
+        offers = [make_offer(FakeCondition([RemoteLookup('program', func, ())]))]
+
+        self.assertEqual(prefetch_condition_data(self.basket, offers), {})
+        func.assert_not_called()
@@ -0,0 +1,74 @@
+import httpretty
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
+from oscar.test import factories
+
+from ecommerce.coupons.tests.mixins import DiscoveryMockMixin
+from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
+from ecommerce.extensions.offer.range_membership import CatalogRangeMembershipResolver
+from ecommerce.tests.factories import UserFactory
+from ecommerce.tests.testcases import TestCase
+
+
+@httpretty.activate
+class CatalogRangeMembershipResolverTests(DiscoveryTestMixin, DiscoveryMockMixin, TestCase):
+    query = 'uuid:*'
+
+    def setUp(self):
+        super(CatalogRangeMembershipResolverTests, self).setUp()
+        self.basket = factories.BasketFactory(site=self.site, owner=UserFactory())
+        self.entitlement_product = self.create_entitlement_product()
+        self.course, self.seat = self.create_course_and_seat()
+        self.other_course, self.other_seat = self.create_course_and_seat(course_id='edX/Other/Course')
+        for product in (self.entitlement_product, self.seat, self.other_seat):
+            self.basket.add_product(product)
+        self.lines = list(self.basket.all_lines())
+        self.mock_access_token_response()
+
+    def mock_query_contains(self, absent_ids=()):
+        self.mock_catalog_query_contains_endpoint(
+            course_run_ids=[self.course.id, self.other_course.id],
+            course_uuids=[self.entitlement_product.attr.UUID],
+            absent_ids=list(absent_ids),
+            query=self.query,
+            discovery_api_url=self.site_configuration.discovery_api_url
+        )
+
+    def test_get_lines_in_range(self):
+        """ Verify all the lines are resolved with a single Discovery Service call, and cached afterwards. """
+        self.mock_query_contains(absent_ids=[self.other_course.id])
+
+        resolver = CatalogRangeMembershipResolver(self.site, self.query)
+        self.assertEqual(resolver.get_lines_in_range(self.lines), self.lines[:2])
+        self.assertEqual((resolver.hits, resolver.misses), (0, 3))
+        query_contains_requests = [
+            request for request in httpretty.latest_requests() if 'query_contains' in request.path
+        ]
+        self.assertEqual(len(query_contains_requests), 1)
+
+        httpretty.disable()
+        self.assertEqual(resolver.get_lines_in_range(self.lines), self.lines[:2])
+        self.assertEqual((resolver.hits, resolver.misses), (3, 3))
+
+    def test_get_lines_in_range_django_cache(self):
+        """ Verify lines missing from the request cache are read from the django cache. """
+        self.mock_query_contains()
+        CatalogRangeMembershipResolver(self.site, self.query).get_lines_in_range(self.lines)
+        httpretty.disable()
+
+        DEFAULT_REQUEST_CACHE.clear()
+        resolver = CatalogRangeMembershipResolver(self.site, self.query)
+        self.assertEqual(resolver.get_lines_in_range(self.lines), self.lines)
+        self.assertEqual((resolver.hits, resolver.misses), (3, 0))
+
+    def test_get_priced_lines(self):
+        """ Verify the lines are priced from stock records loaded with a single query. """
+        self.mock_query_contains()
+        resolver = CatalogRangeMembershipResolver(self.site, self.query)
+        resolver.get_lines_in_range(self.lines)
+
+        with self.assertNumQueries(1):
+            priced_lines = resolver.get_priced_lines(self.lines)
+        self.assertEqual(
+            priced_lines,
+            [(line.product.stockrecords.first().price_excl_tax, line) for line in self.lines]
+        )
@@ -309,6 +309,9 @@ def update_assignments_for_multi_use_per_customer(voucher):
     Update `OfferAssignment` records for MULTI_USE_PER_CUSTOMER coupon type when max_uses changes for a coupon.
     """
     if voucher.usage == voucher.MULTI_USE_PER_CUSTOMER:
+        # pylint: disable=import-outside-toplevel
+        from ecommerce.extensions.voucher.coupon_stats import invalidate_coupon_stats
+
         OfferAssignment = get_model('offer', 'OfferAssignment')
 
         offer = voucher.enterprise_offer
@@ -325,3 +328,4 @@ def update_assignments_for_multi_use_per_customer(voucher):
                 for __ in range(offer_assignments_available)
             ]
             OfferAssignment.objects.bulk_create(assignments)
+            invalidate_coupon_stats(codes=[voucher.code])
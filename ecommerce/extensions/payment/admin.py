@@ -7,7 +7,7 @@ from oscar.apps.payment.admin import *  # noqa pylint: disable=wildcard-import,u
 from oscar.core.loading import get_model
 from solo.admin import SingletonModelAdmin
 
-from ecommerce.extensions.payment.models import SDNCheckFailure, BoletaElectronica, UserBillingInfo, BoletaErrorMessage, PaypalUSDConversion, BoletaUSDConversion
+from ecommerce.extensions.payment.models import SDNCheckFailure, BoletaElectronica, UserBillingInfo, BoletaErrorMessage, PaypalUSDConversion, BoletaUSDConversion, BoletaEmission
 
 PaymentProcessorResponse = get_model('payment', 'PaymentProcessorResponse')
 PaypalProcessorConfiguration = get_model('payment', 'PaypalProcessorConfiguration')
@@ -67,6 +67,13 @@ class UserBillingAdmin(admin.ModelAdmin):
 class BoletaErrorMessageAdmin(admin.ModelAdmin):
     pass
 
+@admin.register(BoletaEmission)
+class BoletaEmissionAdmin(admin.ModelAdmin):
+    raw_id_fields = ('basket',)
+    search_fields = ('order_number',)
+    list_display = ('order_number', 'payment_processor', 'status', 'attempts', 'next_attempt_at')
+    list_filter = ('status', 'payment_processor')
+
 
 @admin.register(PaypalUSDConversion)
 class PaypalUSDConversionAdmin(admin.ModelAdmin):
@@ -0,0 +1,76 @@
+"""
+In-process cache of the current CLP to USD conversion rate used to pay with Paypal.
+
+Every Paypal payment attempt used to read the most recent PaypalUSDConversion, and to add its
+basket to the baskets of that row. The current rate is now kept in each process, and the rate
+used by a basket is stored in its UserBillingInfo with the rest of its billing info.
+
+The rate is versioned through the TieredCache. Saving or deleting a PaypalUSDConversion stores
+a new version (see ecommerce.extensions.payment.signals), and every process reloads its rate the
+next time it notices that the version has changed.
+"""
+import threading
+import time
+from uuid import uuid4
+
+from edx_django_utils.cache import TieredCache
+
+from ecommerce.extensions.payment.models import PaypalUSDConversion
+
+PAYPAL_CONVERSION_VERSION_CACHE_KEY = 'payment.paypal_conversion.version'
+# Seconds a process keeps its rate without a new version, in case an invalidation is lost
+PAYPAL_CONVERSION_CACHE_TIMEOUT = 60 * 60
+
+_paypal_conversion = None
+_paypal_conversion_lock = threading.Lock()
+
+
+class CachedConversion:
+    def __init__(self, version, conversion):
+        self.version = version
+        self.conversion = conversion
+        self.loaded_at = time.time()
+
+    def is_current(self, version):
+        return self.version == version and time.time() - self.loaded_at <= PAYPAL_CONVERSION_CACHE_TIMEOUT
+
+
+def _get_current_version():
+    cached_response = TieredCache.get_cached_response(PAYPAL_CONVERSION_VERSION_CACHE_KEY)
+    if cached_response.is_found:
+        return cached_response.value
+    return invalidate_paypal_conversion()
+
+
+def get_paypal_conversion():
+    """
+    Return the current Paypal conversion, loading it again if its version changed.
+
+    Raises:
+        PaypalUSDConversion.DoesNotExist: No conversion rate is defined.
+    """
+    global _paypal_conversion  # pylint: disable=global-statement
+
+    version = _get_current_version()
+    cached = _paypal_conversion
+    if cached is None or not cached.is_current(version):
+        with _paypal_conversion_lock:
+            cached = _paypal_conversion
+            if cached is None or not cached.is_current(version):
+                cached = CachedConversion(version, PaypalUSDConversion.objects.first())
+                _paypal_conversion = cached
+    if cached.conversion is None:
+        raise PaypalUSDConversion.DoesNotExist("No Paypal CLP to USD conversion defined")
+    return cached.conversion
+
+
+def invalidate_paypal_conversion():
+    """
+    Store a new Paypal conversion version, forcing every process to load the current rate again.
+
+    Returns:
+        str: The new version.
+    """
+    version = uuid4().hex
+    TieredCache.set_all_tiers(PAYPAL_CONVERSION_VERSION_CACHE_KEY, version, PAYPAL_CONVERSION_CACHE_TIMEOUT)
+    return version
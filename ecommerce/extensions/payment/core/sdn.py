@@ -6,7 +6,9 @@ import io
 import logging
 import re
 import string
+import threading
 import unicodedata
+from collections import defaultdict
 from datetime import datetime, timezone
 from urllib.parse import urlencode
 
@@ -30,6 +32,8 @@ BasketAttribute = get_model('basket', 'BasketAttribute')
 BasketAttributeType = get_model('basket', 'BasketAttributeType')
 
 COUNTRY_CODES = {country.alpha_2 for country in pycountry.countries}
+SDN_FALLBACK_SOURCE = 'Specially Designated Nationals (SDN) - Treasury Department'
+SDN_FALLBACK_TYPE = 'Individual'
 
 
 def checkSDN(request, name, city, country):
@@ -86,8 +90,8 @@ def checkSDNFallback(name, city, country):
     """
     Performs an SDN check against the SDNFallbackData
 
-    First, filter the SDNFallbackData records by source, type and country.
-    Then, compare the provided name/city against each record and return whether we find a match.
+    The provided name/city are looked up in the SDNFallbackMatcher of the current SDN list, which indexes the
+    SDNFallbackData records of the Treasury Department SDN list by country, and returns the number of matches.
     The check uses the following properties:
         1. Order of words doesn’t matter
         2. Number of times that a given word appears doesn’t matter
@@ -95,17 +99,112 @@ def checkSDNFallback(name, city, country):
         4. If a subset of words match, it still counts as a match
         5. Capitalization doesn’t matter
     """
-    hit_count = 0
-    records = SDNFallbackData.get_current_records_and_filter_by_source_and_type(
-        'Specially Designated Nationals (SDN) - Treasury Department', 'Individual'
-    )
-    records = records.filter(countries__contains=country)
     processed_name, processed_city = process_text(name), process_text(city)
-    for record in records:
-        record_names, record_addresses = set(record.names.split()), set(record.addresses.split())
-        if (processed_name.issubset(record_names) and processed_city.issubset(record_addresses)):
-            hit_count = hit_count + 1
-    return hit_count
+    return get_sdn_fallback_matcher().count_matches(processed_name or set(), processed_city or set(), country)
+
+
+class SDNFallbackMatcher:
+    """
+    In-memory index of the current SDNFallbackData records of individuals of the Treasury Department SDN list.
+
+    The records are partitioned by country, and each partition maps every name and address word to the records
+    containing it. A name and a city match a record if all their words are in the names and addresses of the record,
+    so the matching records are the intersection of the records of every word.
+
+    Use ``get_sdn_fallback_matcher`` to get the matcher of the current SDNFallbackMetadata entry.
+    """
+
+    def __init__(self, version, records):
+        """
+        Args:
+            version (tuple): Identifies the SDNFallbackMetadata entry the records were imported with.
+            records (iterable): (names, addresses, countries) tuples of space separated words.
+        """
+        self.version = version
+        self.size = 0
+        self._records = defaultdict(set)
+        self._names = defaultdict(lambda: defaultdict(set))
+        self._addresses = defaultdict(lambda: defaultdict(set))
+        for record_id, (names, addresses, countries) in enumerate(records):
+            self.size += 1
+            names, addresses = set(names.split()), set(addresses.split())
+            for country in set(countries.split()):
+                self._records[country].add(record_id)
+                for word in names:
+                    self._names[country][word].add(record_id)
+                for word in addresses:
+                    self._addresses[country][word].add(record_id)
+
+    @classmethod
+    def build(cls, version, metadata_id):
+        records = SDNFallbackData.objects.filter(
+            sdn_fallback_metadata_id=metadata_id, source=SDN_FALLBACK_SOURCE, sdn_type=SDN_FALLBACK_TYPE
+        ).values_list('names', 'addresses', 'countries').iterator()
+        return cls(version, records)
+
+    def _get_matches(self, country, name_words, city_words):
+        postings = [self._names[country].get(word, set()) for word in name_words]
+        postings += [self._addresses[country].get(word, set()) for word in city_words]
+        if not postings:
+            return self._records[country]
+        # Intersect the smallest sets first, to stop as soon as no record is left.
+        postings.sort(key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            if not matches:
+                break
+            matches &= posting
+        return matches
+
+    def count_matches(self, name_words, city_words, country):
+        """
+        Return the number of records in the country whose names contain all the name words, and whose addresses
+        contain all the city words.
+        """
+        if country in self._records:
+            return len(self._get_matches(country, name_words, city_words))
+
+        # Like the countries__contains lookup this replaces, a value which is not a country code matches the
+        # records of every country code containing it.
+        matches = set()
+        for record_country in self._records:
+            if country in record_country:
+                matches |= self._get_matches(record_country, name_words, city_words)
+        return len(matches)
+
+
+_sdn_fallback_matcher = None
+_sdn_fallback_matcher_lock = threading.Lock()
+
+
+def get_sdn_fallback_matcher():
+    """
+    Return the SDNFallbackMatcher of the current SDNFallbackMetadata entry, building it if a new SDN list
+    was imported since it was last built.
+
+    Raises:
+        SDNFallbackDataEmptyError: if there is no current SDNFallbackMetadata entry.
+    """
+    global _sdn_fallback_matcher  # pylint: disable=global-statement
+
+    current_metadata = SDNFallbackMetadata.objects.filter(import_state='Current').values_list(
+        'id', 'file_checksum', 'import_timestamp'
+    ).first()
+    # The metadata relies on the manage command having been run. If it is missing, tell engineer what's needed
+    if current_metadata is None:
+        logger.warning(
+            "SDNFallbackMetadata is empty! Run this: ./manage.py populate_sdn_fallback_data_and_metadata"
+        )
+        raise SDNFallbackDataEmptyError
+
+    matcher = _sdn_fallback_matcher
+    if matcher is None or matcher.version != current_metadata:
+        with _sdn_fallback_matcher_lock:
+            matcher = _sdn_fallback_matcher
+            if matcher is None or matcher.version != current_metadata:
+                matcher = SDNFallbackMatcher.build(current_metadata, current_metadata[0])
+                _sdn_fallback_matcher = matcher
+    return matcher
 
 
 class SDNClient:
@@ -365,6 +464,8 @@ def populate_sdn_fallback_data_and_metadata(sdn_csv_string):
         metadata_entry.import_timestamp = now
         metadata_entry.save()
         metadata_entry.swap_all_states()
+        # Index the imported records now, instead of in the first checkout that needs the fallback.
+        get_sdn_fallback_matcher()
     return metadata_entry
 
 
@@ -19,10 +19,12 @@ from testfixtures import LogCapture
 from ecommerce.core.models import User
 from ecommerce.extensions.payment.core.sdn import (
     SDNClient,
+    SDNFallbackMatcher,
     checkSDN,
     checkSDNFallback,
     compare_SDNCheck_vs_fallback,
     extract_country_information,
+    get_sdn_fallback_matcher,
     populate_sdn_fallback_data,
     populate_sdn_fallback_data_and_metadata,
     populate_sdn_fallback_metadata,
@@ -455,6 +457,47 @@ Joshuafort, MD 72104, TH",,,,,,,,,,,,,,https://banks-bender.com/,Michael Anderso
         metadata_entry = populate_sdn_fallback_data_and_metadata(csv_string)
         self.assertEqual(checkSDNFallback("Juan", "Kristinaport", 'SN'), 0)
 
+    def test_sdn_fallback_matcher(self):
+        """ Verify the matcher counts the records of a country containing all the name and city words. """
+        matcher = SDNFallbackMatcher(None, [
+            ('juan de la cruz', 'north kristinaport', 'SN JO'),
+            ('juan perez', 'north kristinaport', 'SN'),
+            ('juan cruz', 'south kristinaport', 'JO'),
+            ('maria', '', 'SN'),
+        ])
+        self.assertEqual(matcher.count_matches({'juan'}, {'kristinaport'}, 'SN'), 2)
+        self.assertEqual(matcher.count_matches({'juan', 'cruz'}, {'kristinaport'}, 'SN'), 1)
+        self.assertEqual(matcher.count_matches({'juan', 'cruz'}, {'kristinaport'}, 'JO'), 2)
+        self.assertEqual(matcher.count_matches({'juan'}, {'south'}, 'SN'), 0)
+        self.assertEqual(matcher.count_matches({'pedro'}, {'kristinaport'}, 'SN'), 0)
+        self.assertEqual(matcher.count_matches({'juan'}, {'kristinaport'}, 'AB'), 0)
+        # A value which is not a country code matches every country code containing it, once per record.
+        self.assertEqual(matcher.count_matches({'juan', 'cruz'}, {'kristinaport'}, 'O'), 2)
+
+    def test_sdn_fallback_matcher_rebuilt_on_import(self):
+        """ Verify the matcher is built when a new csv is imported, and reused until the next import. """
+        # pylint: disable=line-too-long
+        csv_string = self.csv_header + """94734218,Specially Designated Nationals (SDN) - Treasury Department,96663868,Individual,material,Juan M. de la Cruz,Dr.,"17472 Christie Stream Apt. 976 North Kristinaport, HI 91033, SN",,,,,,,,,,,,,,https://www.juarez-collier.org/,Wendy Brock,DJ,1944-03-05,Faroe Islands,PK,http://richardson-richardson.org/,CI"""
+        # pylint: enable=line-too-long
+        populate_sdn_fallback_data_and_metadata(csv_string)
+        matcher = get_sdn_fallback_matcher()
+        self.assertEqual(matcher.size, 1)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(checkSDNFallback('Juan', 'Kristinaport', 'SN'), 1)
+        self.assertIs(get_sdn_fallback_matcher(), matcher)
+
+        populate_sdn_fallback_data_and_metadata(csv_string.replace('Juan M.', 'Pedro M.'))
+        self.assertIsNot(get_sdn_fallback_matcher(), matcher)
+        self.assertEqual(checkSDNFallback('Juan', 'Kristinaport', 'SN'), 0)
+        self.assertEqual(checkSDNFallback('Pedro', 'Kristinaport', 'SN'), 1)
+
+    def test_sdn_fallback_matcher_empty_metadata(self):
+        """ Verify an error is raised if no SDN list was imported. """
+        SDNFallbackMetadata.objects.all().delete()
+        with self.assertRaises(SDNFallbackDataEmptyError):
+            checkSDNFallback('Juan', 'Kristinaport', 'SN')
+
     @ddt.data(0, 1)
     @mock.patch.object(User, 'deactivate_account')
     @mock.patch('ecommerce.extensions.payment.core.sdn.checkSDNFallback')
@@ -1,37 +1,116 @@
+import json
 import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
 import requests
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.core.mail import send_mail
-from django.core.cache import cache
 from oscar.core.loading import get_model
 from oscar.apps.partner import strategy
 
-from ecommerce.extensions.payment.models import UserBillingInfo, BoletaErrorMessage
-from ecommerce.extensions.payment.boleta import authenticate_boleta_electronica, make_boleta_electronica
+from ecommerce.core.concurrency import run_concurrently
+from ecommerce.extensions.payment.models import BoletaEmission, BoletaErrorMessage, UserBillingInfo
+from ecommerce.extensions.payment.boleta import (
+    BoletaClient,
+    BoletaElectronicaException,
+    is_boleta_request_unsent,
+    make_boleta_electronica
+)
 
 Order = get_model('order','Order')
 logger = logging.getLogger(__name__)
 
+
+class RateLimiter:
+    """
+    Space the calls of all threads so that at most `rate` calls start per second.
+    A rate of 0 does not limit the calls.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.next_call = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            call_at = max(now, self.next_call)
+            self.next_call = call_at + self.interval
+        if call_at > now:
+            time.sleep(call_at - now)
+
+
+class EmissionCheckpoint:
+    """
+    Append-only record of the emissions, one JSON line per order and state.
+
+    An order is "started" right before its boleta is requested to the Ventas API, and "emitted" once it is saved.
+    Orders left "started" by a crashed run may have a boleta in the Ventas API that was not saved, so they are not
+    emitted again and must be reconciled with the get_boleta_emissions command.
+    """
+    STARTED = "started"
+    EMITTED = "emitted"
+    FAILED = "failed"
+
+    def __init__(self, path=None):
+        self.path = path
+        self.states = {}
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as checkpoint_file:
+                for line in checkpoint_file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.states[entry["order"]] = entry["state"]
+
+    def get(self, order_number):
+        return self.states.get(order_number)
+
+    def set(self, order_number, state):
+        with self.lock:
+            self.states[order_number] = state
+            if self.path:
+                with open(self.path, "a") as checkpoint_file:
+                    checkpoint_file.write(json.dumps({"order": order_number, "state": state}) + "\n")
+                    checkpoint_file.flush()
+                    os.fsync(checkpoint_file.fileno())
+
+
 class Command(BaseCommand):
     help = """Create boletas from unused user billing info."""
     requires_migrations_checks = True
 
     def get_auth_from_cache(self, basket):
         """
-        Save authentication credentials on cache for half it's lifetime
+        Recover authentication credentials, cached until shortly before they expire
         """
-        auth = cache.get("boleta_emissions_auth_cache", None)
-        if auth == None or auth["expires_in"] < 20:
-            logger.info('inside if')
-            auth = authenticate_boleta_electronica(basket=basket)
-            cache.set("boleta_emissions_auth_cache", auth, auth["expires_in"]//2)
-        return auth
+        return BoletaClient().get_auth(basket=basket)
 
     def add_arguments(self, parser):
         parser.add_argument("--dry-run", help="Run without applying changes", action='store_true', default=False)
         parser.add_argument("--processor", help="Payment processor name used (webpay or paypal)", default="webpay")
         parser.add_argument("--order-number", nargs="+", help="Subset of orders to process like EOL-10001", required=False)
+        parser.add_argument("--workers", help="Number of boletas emitted concurrently", type=int, default=1)
+        parser.add_argument(
+            "--rate-limit", help="Maximum boletas emitted per second, 0 for no limit", type=float, default=0)
+        parser.add_argument(
+            "--checkpoint", help="File recording the emissions, to resume a crashed run", required=False)
+
+    def get_billing_infos(self, orders):
+        """
+        Recover the billing info of every order basket with a single query
+        """
+        billing_infos = defaultdict(list)
+        for info in UserBillingInfo.objects.filter(basket_id__in=[order.basket_id for order in orders]):
+            billing_infos[info.basket_id].append(info)
+        return billing_infos
 
     def handle(self, *args, **options):
 
@@ -42,42 +121,86 @@ class Command(BaseCommand):
 
         dry_run = options["dry_run"]
         payment_processor = options["processor"]
-
-        completed = 0
-        failed = 0
+        rate_limiter = RateLimiter(options["rate_limit"])
+        checkpoint = EmissionCheckpoint(None if dry_run else options["checkpoint"])
 
         # Get payed orders
         orders = Order.objects.filter(status="Complete", basket__boletaelectronica=None, total_incl_tax__gt=0, basket__userbillinginfo__payment_processor=payment_processor)
+        # Boletas queued for emission are emitted by the emit_boleta task, so they are never requested twice
+        orders = orders.exclude(number__in=BoletaEmission.objects.filter(
+            status__in=[BoletaEmission.PENDING, BoletaEmission.EMITTING]).values("order_number"))
 
         if options["order_number"] is not None and len(options["order_number"]) > 0:
             orders = orders.filter(number__in=options["order_number"])
 
-        for order in orders:
-            try:
-                # We re-check if there is a boleta associated to the basket via the userbillinginfo
-                used_info = UserBillingInfo.objects.filter(basket=order.basket).exclude(boleta=None)
-                if used_info.count() > 0:
-                    logger.warning("Order {} is complete, but without the proper association with it's boleta {}".format(order.number, used_info.first().boleta))
-                    continue
-
-                info = UserBillingInfo.objects.get(basket=order.basket, boleta=None, payment_processor=payment_processor)
-
-                basket = info.basket
-                basket.strategy = strategy.Default()
-
-                if not dry_run:
-                    auth = self.get_auth_from_cache(basket)
-                    logger.info(auth)
-                    logger.info("Datos de auth: {}, Datos de basket: {}, Datos de order: {}, Procesador de pago: {}".format(auth, basket, order, payment_processor))
-                    boleta_id = make_boleta_electronica(basket, order, auth, payment_processor=payment_processor)
-                completed = completed + 1
-                logger.info("Completed Boleta for order {}, user {}, amount CLP {}".format(order.number,basket.owner.username, order.total_incl_tax))
-            except requests.exceptions.ConnectionError:
+        orders = list(orders.select_related('basket', 'basket__owner', 'site').distinct())
+        billing_infos = self.get_billing_infos(orders)
+
+        def emit(order):
+            """
+            Emit the boleta of an order. Returns True if the boleta was emitted, False if the order was skipped.
+            """
+            infos = billing_infos[order.basket_id]
+            # We re-check if there is a boleta associated to the basket via the userbillinginfo
+            used_info = [info for info in infos if info.boleta_id is not None]
+            if used_info:
+                logger.warning("Order {} is complete, but without the proper association with it's boleta {}".format(
+                    order.number, used_info[0].boleta))
+                return False
+
+            if checkpoint.get(order.number) == EmissionCheckpoint.STARTED:
+                logger.warning("Order {} was being emitted when a previous run stopped, "
+                               "reconcile it with get_boleta_emissions".format(order.number))
+                return False
+
+            unused_info = [
+                info for info in infos if info.boleta_id is None and info.payment_processor == payment_processor
+            ]
+            if not unused_info:
+                raise UserBillingInfo.DoesNotExist("Order {} has no unused billing info".format(order.number))
+            if len(unused_info) > 1:
+                raise UserBillingInfo.MultipleObjectsReturned(
+                    "Order {} has {} unused billing infos".format(order.number, len(unused_info)))
+            info = unused_info[0]
+
+            basket = order.basket
+            basket.strategy = strategy.Default()
+
+            if not dry_run:
+                rate_limiter.wait()
+                auth = self.get_auth_from_cache(basket)
+                logger.info("Datos de basket: {}, Datos de order: {}, Procesador de pago: {}".format(
+                    basket, order, payment_processor))
+                checkpoint.set(order.number, EmissionCheckpoint.STARTED)
+                try:
+                    make_boleta_electronica(basket, order, auth, payment_processor=payment_processor, billing_info=info)
+                except BoletaElectronicaException:
+                    # The Ventas API refused the boleta, so it can be emitted again
+                    checkpoint.set(order.number, EmissionCheckpoint.FAILED)
+                    raise
+                except requests.exceptions.RequestException as e:
+                    # Boletas of requests that were never sent can be emitted again. Any other error,
+                    # like a read timeout, leaves the order started, since its boleta may have been created.
+                    if is_boleta_request_unsent(e):
+                        checkpoint.set(order.number, EmissionCheckpoint.FAILED)
+                    raise
+                checkpoint.set(order.number, EmissionCheckpoint.EMITTED)
+            logger.info("Completed Boleta for order {}, user {}, amount CLP {}".format(
+                order.number, basket.owner.username, order.total_incl_tax))
+            return True
+
+        completed = 0
+        failed = 0
+        for order, emitted, exc in run_concurrently(emit, orders, max_workers=max(options["workers"], 1)):
+            if exc is None:
+                completed = completed + int(emitted)
+            elif isinstance(exc, requests.exceptions.ConnectionError):
                 failed = failed + 1
-                logger.warning("Coudn't connect to boleta API for: {}".format(info), exc_info=True)
-            except Exception:
+                logger.warning("Coudn't connect to boleta API for order: {}".format(order.number), exc_info=exc)
+            else:
                 failed = failed + 1
-                logger.warning("Error while processing boleta for: {}".format(info), exc_info=True)
+                logger.warning("Error while processing boleta for order: {}".format(order.number), exc_info=exc)
+
         if not dry_run:
             # Check for errors and recover messages
             error_messages = BoletaErrorMessage.objects.all()
@@ -105,4 +228,3 @@ class Command(BaseCommand):
                 error_messages.delete()
 
         logger.info("Completed {}, Failed {}, Total {}".format(completed,failed,completed+failed))
-
@@ -4,7 +4,7 @@ from datetime import datetime
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from ecommerce.extensions.payment.models import BoletaElectronica
-from ecommerce.extensions.payment.boleta import authenticate_boleta_electronica, get_boleta_details
+from ecommerce.extensions.payment.boleta import BoletaClient, get_boleta_details
 
 logger = logging.getLogger(__name__)
 
@@ -41,10 +41,10 @@ class Command(BaseCommand):
         return
     
     # Complete each boleta's info
+    client = BoletaClient()
     for boleta in boletas:
       try:
-        auth = authenticate_boleta_electronica()
-        headers = {"Authorization": "Bearer " + auth["access_token"]}
+        headers = client.get_auth_headers()
         details = get_boleta_details(boleta.voucher_id, headers)
         if not options["dry_run"]:
           # Update
@@ -0,0 +1,63 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ecommerce.extensions.payment.models import BoletaEmission
+from ecommerce.extensions.payment.tasks import emit_queued_boleta
+
+logger = logging.getLogger(__name__)
+
+# Minutes after which an emission still being emitted is reported, e.g. when its worker died
+STALE_EMISSION_MINUTES = 30
+
+
+class Command(BaseCommand):
+    help = """Emit the queued boletas whose next attempt is due, e.g. when their task was lost."""
+    requires_migrations_checks = True
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--order-number", nargs="+", help="Subset of orders to process like EOL-10001", required=False)
+        parser.add_argument(
+            "--stale-minutes", type=int, default=STALE_EMISSION_MINUTES,
+            help="Report the emissions being emitted for longer than these minutes")
+
+    def handle(self, *args, **options):
+        boleta_active = hasattr(settings, 'BOLETA_CONFIG') and settings.BOLETA_CONFIG.get("enabled", False)
+        if not boleta_active:
+            logger.error("BOLETA_CONFIG is not set or enabled, enable it on your settings to run this commmand")
+            return
+
+        emissions = BoletaEmission.objects.filter(status=BoletaEmission.PENDING, next_attempt_at__lte=timezone.now())
+        if options["order_number"]:
+            emissions = emissions.filter(order_number__in=options["order_number"])
+
+        statuses = {}
+        for order_number in list(emissions.order_by("next_attempt_at").values_list("order_number", flat=True)):
+            status = emit_queued_boleta(order_number).status
+            statuses[status] = statuses.get(status, 0) + 1
+
+        summary = ", ".join("{} {}".format(status, count) for status, count in sorted(statuses.items()))
+        logger.info("Queued boletas: %s", summary or "none due")
+
+        self.report_stale_emissions(options)
+
+    def report_stale_emissions(self, options):
+        """
+        Report the emissions left emitting, e.g. by a worker that died while the Ventas API was called.
+        They are not retried, as their boleta may have been emitted.
+        """
+        stale = BoletaEmission.objects.filter(
+            status=BoletaEmission.EMITTING,
+            modified__lt=timezone.now() - timedelta(minutes=options["stale_minutes"]))
+        if options["order_number"]:
+            stale = stale.filter(order_number__in=options["order_number"])
+
+        order_numbers = list(stale.order_by("modified").values_list("order_number", flat=True))
+        if order_numbers:
+            logger.error(
+                "Boletas of orders %s are emitting for more than %d minutes, check them with get_boleta_emissions "
+                "and update their emission", ", ".join(order_numbers), options["stale_minutes"])
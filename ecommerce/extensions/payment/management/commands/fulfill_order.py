@@ -14,6 +14,7 @@ from oscar.apps.payment.exceptions import PaymentError
 from ecommerce.extensions.payment.processors import HandledProcessorResponse
 from ecommerce.extensions.checkout.mixins import EdxOrderPlacementMixin
 from ecommerce.extensions.payment.processors.webpay import Webpay
+from ecommerce.extensions.payment.views import BoletaEmissionMixin
 
 Order = get_model('order','Order')
 Basket = get_model('basket','Basket')
@@ -22,7 +23,7 @@ OrderTotalCalculator = get_class('checkout.calculators', 'OrderTotalCalculator')
 PaymentProcessorResponse = get_model('payment', 'PaymentProcessorResponse')
 logger = logging.getLogger(__name__)
 
-class OrderPlacer(EdxOrderPlacementMixin):
+class OrderPlacer(BoletaEmissionMixin, EdxOrderPlacementMixin):
     """
     Auxiliar class to place orders on behalf of Webpay usign unregistered
     but backend completed transactions
@@ -131,9 +132,6 @@ class OrderPlacer(EdxOrderPlacementMixin):
                     
                 except PaymentError:
                     raise Exception("Error processing payment.")
-            
-            # Order is created; then send email if enabled
-            self.payment_processor.boleta_emission(self.basket, order)
         except Exception as e:  # pylint: disable=broad-except
             logger.exception(self.order_placement_failure_msg, self.order_number, self.basket.id)
             raise Exception("Error while processing order.")
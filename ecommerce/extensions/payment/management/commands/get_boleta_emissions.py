@@ -1,15 +1,56 @@
 import logging
+import os
+from datetime import datetime, timedelta
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from django.core.mail import EmailMessage
+from django.db.models import BooleanField, Case, Q, Value, When
 
 from ecommerce.extensions.payment.models import BoletaElectronica
-from ecommerce.extensions.payment.boleta import authenticate_boleta_electronica, get_boletas
+from ecommerce.extensions.payment.boleta import BoletaClient, iter_boletas
 
 
 logger = logging.getLogger(__name__)
 
+REMOTE_BOLETAS_HEADER = "order_number,boleta_id,folio,fecha,monto,on_DB\n"
+LOCAL_BOLETAS_HEADER = "order_number,total,date_placed,boleta_id\n"
+# Local boletas emitted this long before the window are also loaded,
+# since some emission dates have been recorded with timezone mistakes
+LOCAL_WINDOW_MARGIN = timedelta(days=1)
+
+
+class ReportFile:
+    """
+    CSV report written one row at a time.
+    The file is only created once its first row is written, and only if enabled.
+    """
+
+    def __init__(self, filename, header, enabled):
+        self.filename = filename
+        self.header = header
+        self.enabled = enabled
+        self.rows = 0
+        self.file = None
+
+    @property
+    def path(self):
+        return os.path.abspath(self.filename)
+
+    def write(self, *values):
+        self.rows += 1
+        if not self.enabled:
+            return
+        if self.file is None:
+            self.file = open(self.filename, "w")
+            self.file.write(self.header)
+        self.file.write(",".join("{}".format(value) for value in values) + "\n")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
 
 class Command(BaseCommand):
     help = """Recover boleta's info, counts and verifies that there are no duplicates or inconsistencies"""
@@ -26,7 +67,7 @@ class Command(BaseCommand):
 
     def write_local_boletas(self, boleta_objects, filename):
         with open(filename,"w") as f:
-            f.write("order_number,total,date_placed,boleta_id\n")
+            f.write(LOCAL_BOLETAS_HEADER)
             for local_boleta in boleta_objects:
                 f.write("{},{},{},{}\n".format(
                     local_boleta["basket__order__number"],
@@ -34,52 +75,6 @@ class Command(BaseCommand):
                     local_boleta["basket__order__date_placed"],
                     local_boleta["voucher_id"]))
 
-    def write_remote_boletas(self, boletas, exists, data, filename):
-        with open(filename, "w") as f:
-            f.write("order_number,boleta_id,folio,fecha,monto,on_DB\n")
-            c = 0
-            for boleta_id in boletas:
-                f.write("{},{},{},{},{},{}\n".format(
-                    data[boleta_id]["puntoVenta"]["rutCajero"],
-                    boleta_id,
-                    data[boleta_id]["boleta"]["folio"],
-                    data[boleta_id]["boleta"]["fechaEmision"],
-                    data[boleta_id]["recaudaciones"][0]["monto"],
-                    exists[c]))
-                c += 1
-
-    def register_duplicates(self, order_numbers, data):
-        """
-        Arguments
-            order_numbers dictionary with order_number as key
-                and a list of boleta_id hashes
-            data dictionary with raw data for each
-                boleta by id
-        """
-        duplicates_boleta_ids = []
-        for order_number in order_numbers:
-            count = len(order_numbers[order_number])
-            if count > 1:
-                logger.info("order {}, duplicates_boleta_ids {}".format(
-                    order_number, count))
-                duplicates_boleta_ids.extend(order_numbers[order_number])
-        if len(duplicates_boleta_ids) > 0 and self.save:
-            exists = []
-            # Check if the order is locally saved
-            for boleta_id in duplicates_boleta_ids:
-                try:
-                    BoletaElectronica.objects.get(voucher_id=boleta_id)
-                    exists.append(True)
-                except BoletaElectronica.DoesNotExist:
-                    exists.append(False)
-            self.write_remote_boletas(duplicates_boleta_ids, exists, data, "duplicate_boletas.csv")
-            if self.email:
-                self.send_email_with_attachment(
-                    "[Ecommerce] Existen boletas duplicadas",
-                    "El comando get_boleta_emissions reportó boletas duplicadas en la API de Ventas UChile. Se adjuntan detalles.",
-                    "/openedx/ecommerce/duplicate_boletas.csv"
-                )
-
     def verify_local_count_is_zero(self, since):
         """
         If local count is zero return.
@@ -102,134 +97,123 @@ class Command(BaseCommand):
                     .values(
                         "basket__order__number",
                         "basket__order__total_incl_tax",
-                        "basket__order__date__placed",
+                        "basket__order__date_placed",
                         "voucher_id")
                 self.write_local_boletas(local, "local_boletas.csv")
                 if self.email:
                     self.send_email_with_attachment(
                         "[Ecommerce] Inconsistencia con API",
                         "Existen boletas locales pero ninguna boleta en la API. Puede que hayan sido borradas.",
-                        "/openedx/ecommerce/local_boletas.csv")
+                        os.path.abspath("local_boletas.csv"))
             raise CommandError("Inconsistency detected")
 
-    def look_for_duplicates(self, raw_data):
+    def get_local_boletas(self, since):
         """
-        Group boletas by order_number and check
-        if we have 1 order_number to 1 boleta_id
-        """
-        duplicates = 0
-        orders = 0
-        remote_boleta_orders = {}
+        Load the voucher ids of the local boletas of the window with a single query
 
-        # Pair order to (hopefully just one) hash boleta_ids
-        for venta in raw_data:
-            if venta["puntoVenta"]["rutCajero"] is None:
-                logger.info("Boleta_id {} viene con un order_number None".format(venta["id"]))
-                continue
-            order_number = venta["puntoVenta"]["rutCajero"]
-            try:
-                aux = order_number.split('OP')
-                order_number = "OP-{}.".format(aux[1])
-            except Exception as e:
-                logger.error("Error get_boleta_emissions in order_number from rutCajero, error: {}".format(str(e)))
-            prev = remote_boleta_orders.get(
-                order_number, [])
-            prev.append(venta["id"])
-            remote_boleta_orders[order_number] = prev
-        # Count
-        for boleta in remote_boleta_orders:
-            if len(remote_boleta_orders[boleta]) > 1:
-                duplicates += len(remote_boleta_orders[boleta])
-                orders += 1
-        if duplicates > 0:
-            logger.error("There are {} duplicate boletas for {} orders. boletas: {}".format(
-                duplicates, orders, raw_data))
-            # map ids to a dict
-            boletas_data = {}
-            for item in raw_data:
-                boletas_data[item["id"]] = item
-                try:
-                    aux = boletas_data[item["id"]]["puntoVenta"]["rutCajero"].split('UA')
-                    boletas_data[item["id"]]["puntoVenta"]["rutCajero"] = "OP-{}".format(aux[1])
-                except Exception as e:
-                    logger.error("Error get_boleta_emissions in order_number from rutCajero, error: {}".format(str(e)))
-            self.register_duplicates(remote_boleta_orders, boletas_data)
-            raise CommandError("Inconsistency detected")
-        return remote_boleta_orders
+        Returns
+            set of the voucher ids emitted since the given date, or without emission date,
+                including a margin before the window
+            set of the voucher ids emitted since the given date
+        """
+        margin_since = datetime.fromisoformat(since) - LOCAL_WINDOW_MARGIN
+        local_boletas = BoletaElectronica.objects \
+            .filter(Q(emission_date__gte=margin_since) | Q(emission_date=None)) \
+            .annotate(in_window=Case(
+                When(emission_date__gte=since, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField())) \
+            .values_list("voucher_id", "in_window")
+        local_voucher_ids = set()
+        window_voucher_ids = set()
+        for voucher_id, in_window in local_boletas.iterator():
+            local_voucher_ids.add(voucher_id)
+            if in_window:
+                window_voucher_ids.add(voucher_id)
+        return local_voucher_ids, window_voucher_ids
 
-    def find_on_local_db(self, order_boleta_pairs, raw_data):
+    def get_order_key(self, order_number):
         """
-        Make a list of boleta_ids and try to find it
-        locally on the DB.
+        Normalize the order number of a remote boleta to group boletas by order
         """
-        boleta_ids = [b[1] for b in order_boleta_pairs]
-        not_recorded = []
-        for boleta_id in boleta_ids:
-            try:
-                b = BoletaElectronica.objects.get(voucher_id=boleta_id)
-            except BoletaElectronica.DoesNotExist:
-                not_recorded.append(boleta_id)
-        if len(not_recorded) != 0:
-            logger.error("Some boletas are not registered on ecommerce but created at ventas API. Total {}".format(len(not_recorded)))
-            logger.info(not_recorded)
-            # Reporting and email logic
-            if self.save:
-                # map ids to a dict
-                boletas_data = {}
-                for item in raw_data:
-                    boletas_data[item["id"]] = item
-                self.write_remote_boletas(not_recorded,
-                    [False for b in not_recorded],
-                    boletas_data, "missing_boletas.csv")
-                if self.email:
-                    self.send_email_with_attachment(
-                        "[Ecommerce] Inconsistencia de boletas",
-                        "El comando get_boleta_emissions reportó boletas que existen en la API de Ventas UChile y no localmente. Se adjuntan detalles.",
-                        "/openedx/ecommerce/missing_boletas.csv"
-                    )
+        try:
+            aux = order_number.split('OP')
+            order_number = "OP-{}.".format(aux[1])
+        except Exception as e:
+            logger.error("Error get_boleta_emissions in order_number from rutCajero, error: {}".format(str(e)))
+        return order_number
 
-            raise CommandError("Inconsistency detected")
+    def get_remote_row(self, venta, order_number, on_db):
+        return (
+            order_number,
+            venta["id"],
+            venta["boleta"]["folio"],
+            venta["boleta"]["fechaEmision"],
+            venta["recaudaciones"][0]["monto"],
+            on_db,
+        )
+
+    def get_duplicate_order_number(self, order_number):
+        try:
+            aux = order_number.split('UA')
+            order_number = "OP-{}".format(aux[1])
+        except Exception as e:
+            logger.error("Error get_boleta_emissions in order_number from rutCajero, error: {}".format(str(e)))
+        return order_number
 
-    def find_missing_locals(self, order_boleta_pairs, since):
+    def reconcile(self, boletas, local_voucher_ids, duplicates_report, missing_report):
         """
-        By this point the only option is that we have more
-        boletas locally (because of the previous checks)
+        Stream the remote boletas once, grouping them by order_number
+        and checking that they are locally recorded.
 
-        Compare if remote and local counts match.
-        Otherwise register errors and missing elements.
+        Duplicates are written to their report as soon as they are found.
+        Boletas not found among the local ones of the window are
+        looked up at the end, in a single query.
 
-        NOTE: some errors have arisen from timezone mistakes
+        Returns
+            set of the remote boleta ids
         """
-        def list_diff(l1,l2):
-            second = set(l2)
-            return [item for item in l1 if item not in second]
-
-        local = BoletaElectronica.objects.filter(
-            emission_date__gte=since)
-        local_count = local.count()
-        if len(order_boleta_pairs) < local_count:
-            logger.error(
-                "Boleta count is inconsistent. Local {} - Remote {}".format(local_count, len(order_boleta_pairs)))
-            remote_boleta_ids = [b[1] for b in order_boleta_pairs] # Tuples
-            local_boletas = [b.voucher_id for b in local]
-            local_diff = list_diff(local_boletas, remote_boleta_ids)
-            logger.info("These boletas are only locally available {}".format(local_diff))
-            # Reporting and email logic
-            if self.save:
-                local_boletas = BoletaElectronica.objects \
-                        .filter(voucher_id__in=local_diff) \
-                        .values(
-                            "basket__order__number",
-                            "basket__order__total_incl_tax",
-                            "basket__order__date_placed",
-                            "voucher_id")
-                self.write_local_boletas(local_boletas, "only_local_boletas.csv")
-                if self.email:
-                    self.send_email_with_attachment(
-                        "[Ecommerce] Inconsistencia de boletas",
-                        "Existe una diferencia al contar boletas remotas y locales. En particular las boletas {} existen solo localmente. Detalle adjunto.".format(local_diff),
-                        "/openedx/ecommerce/only_local_boletas.csv")
-            raise CommandError("Inconsistency detected")
+        remote_ids = set()
+        # First boleta row of every order, to report it if the order turns out to be duplicated
+        first_rows = {}
+        duplicate_orders = {}
+        not_in_window = {}
+
+        for venta in boletas:
+            remote_ids.add(venta["id"])
+            if venta["puntoVenta"]["rutCajero"] is None:
+                logger.info("Boleta_id {} viene con un order_number None".format(venta["id"]))
+                continue
+            order_number = venta["puntoVenta"]["rutCajero"]
+            order_key = self.get_order_key(order_number)
+            on_db = venta["id"] in local_voucher_ids
+
+            if order_key in first_rows:
+                if order_key not in duplicate_orders:
+                    duplicates_report.write(*first_rows[order_key])
+                    duplicate_orders[order_key] = 1
+                duplicates_report.write(*self.get_remote_row(venta, self.get_duplicate_order_number(order_number), on_db))
+                duplicate_orders[order_key] += 1
+            else:
+                first_rows[order_key] = self.get_remote_row(venta, self.get_duplicate_order_number(order_number), on_db)
+                if not on_db:
+                    not_in_window[venta["id"]] = self.get_remote_row(venta, order_number, False)
+
+        if duplicate_orders:
+            logger.error("There are {} duplicate boletas for {} orders.".format(
+                sum(duplicate_orders.values()), len(duplicate_orders)))
+            for order_key, count in duplicate_orders.items():
+                logger.info("order {}, duplicates_boleta_ids {}".format(order_key, count))
+
+        # Boletas emitted outside of the window, i.e. with timezone mistakes, are still recorded
+        recorded = set(BoletaElectronica.objects
+                       .filter(voucher_id__in=list(not_in_window))
+                       .values_list("voucher_id", flat=True))
+        for boleta_id, row in not_in_window.items():
+            if boleta_id not in recorded:
+                missing_report.write(*row)
+
+        return remote_ids
 
     def add_arguments(self, parser):
         # Optional argument
@@ -242,11 +226,12 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         """
-        Verify consistency in the following steps
-        - Recover boletas from API with state INGRESADA and CONTABILIZADA
-        - Group boleta_ids by order_number and verify that we have no duplicates
-        - See if the boletas recorded remotely are locally available
-        - Compare local to remote counts
+        Verify consistency in a single pass over the Ventas API boletas
+        - Load the local boletas of the window into sets
+        - Stream boletas from API with state INGRESADA and CONTABILIZADA
+        - Group boleta_ids by order_number and report duplicates
+        - Report the boletas recorded remotely that are not locally available
+        - Report the local boletas that are not remotely available
         """
 
         boleta_active = hasattr(
@@ -259,38 +244,81 @@ class Command(BaseCommand):
         self.save = options["save"]
         # Emails require a saved file
         if self.email:
-            self.save = True    
-
-        # Get boletas registry from API
-        auth = authenticate_boleta_electronica()
-        headers = {
-            "Authorization": "Bearer " + auth["access_token"]
-        }
-        # Get boletas state = INGRESADA
-        raw_boletas = get_boletas(headers, options["since"])
-        # Get boletas state=CONTABILIZADA extend to raw_boletas
-        raw_boletas.extend(get_boletas(headers, options["since"], state="CONTABILIZADA"))
+            self.save = True
+        since = options["since"]
+
+        local_voucher_ids, window_voucher_ids = self.get_local_boletas(since)
+
+        duplicates_report = ReportFile("duplicate_boletas.csv", REMOTE_BOLETAS_HEADER, self.save)
+        missing_report = ReportFile("missing_boletas.csv", REMOTE_BOLETAS_HEADER, self.save)
+        try:
+            # Get boletas registry from API
+            headers = BoletaClient().get_auth_headers()
+            remote_ids = self.reconcile(
+                iter_boletas(headers, since), local_voucher_ids, duplicates_report, missing_report)
+        finally:
+            duplicates_report.close()
+            missing_report.close()
 
         # CHECK ZERO
         # Verify that counts are consistent
-        if len(raw_boletas) == 0:
+        if not remote_ids:
             logger.info(
                 "No boletas recovered from Ventas API. Checking local count ...")
-            self.verify_local_count_is_zero(options["since"])
+            self.verify_local_count_is_zero(since)
+
+        inconsistent = False
 
         # CHECK ONE:
-        # Process boletas and review duplicates
-        grouped_boleta = self.look_for_duplicates(raw_boletas)
-        order_boleta_pairs = [(b, grouped_boleta[b][0]) for b in grouped_boleta]
+        # Duplicates
+        if duplicates_report.rows:
+            inconsistent = True
+            if self.email:
+                self.send_email_with_attachment(
+                    "[Ecommerce] Existen boletas duplicadas",
+                    "El comando get_boleta_emissions reportó boletas duplicadas en la API de Ventas UChile. Se adjuntan detalles.",
+                    duplicates_report.path
+                )
 
-        # No duplicates so far
         # CHECK TWO:
         # Verify that we have these boletas recorded at ecommerce
-        self.find_on_local_db(order_boleta_pairs, raw_boletas)
+        if missing_report.rows:
+            inconsistent = True
+            logger.error("Some boletas are not registered on ecommerce but created at ventas API. Total {}".format(missing_report.rows))
+            if self.email:
+                self.send_email_with_attachment(
+                    "[Ecommerce] Inconsistencia de boletas",
+                    "El comando get_boleta_emissions reportó boletas que existen en la API de Ventas UChile y no localmente. Se adjuntan detalles.",
+                    missing_report.path
+                )
+
+        # CHECK THREE
+        # Local boletas of the window that are not in the Ventas API
+        # NOTE: some errors have arisen from timezone mistakes
+        local_diff = sorted(window_voucher_ids - remote_ids)
+        if local_diff:
+            inconsistent = True
+            logger.error(
+                "Boleta count is inconsistent. Local {} - Remote {}".format(len(window_voucher_ids), len(remote_ids)))
+            logger.info("These boletas are only locally available {}".format(local_diff))
+            # Reporting and email logic
+            if self.save:
+                local_boletas = BoletaElectronica.objects \
+                        .filter(voucher_id__in=local_diff) \
+                        .values(
+                            "basket__order__number",
+                            "basket__order__total_incl_tax",
+                            "basket__order__date_placed",
+                            "voucher_id")
+                self.write_local_boletas(local_boletas.iterator(), "only_local_boletas.csv")
+                if self.email:
+                    self.send_email_with_attachment(
+                        "[Ecommerce] Inconsistencia de boletas",
+                        "Existe una diferencia al contar boletas remotas y locales. En particular las boletas {} existen solo localmente. Detalle adjunto.".format(local_diff),
+                        os.path.abspath("only_local_boletas.csv"))
 
-        # CHECK THREE (maybe redundant)
-        # Make sure the counts are correct
-        self.find_missing_locals(order_boleta_pairs, options["since"])
+        if inconsistent:
+            raise CommandError("Inconsistency detected")
 
         # They exists
         # All OK
@@ -5,11 +5,14 @@ import logging
 
 import paypalrestsdk
 from django.conf import settings
+from django.contrib.sites.models import Site
 from django.core.management.base import BaseCommand, CommandError
 from django.db.utils import IntegrityError
 from paypalrestsdk import WebProfile  # pylint: disable=ungrouped-imports
 
+from ecommerce.extensions.payment.constants import PAYPAL_LOCALES
 from ecommerce.extensions.payment.models import PaypalWebProfile
+from ecommerce.extensions.payment.processors.paypal import Paypal
 
 log = logging.getLogger(__name__)
 
@@ -26,8 +29,11 @@ class Command(BaseCommand):
         delete [id]         Delete an existing profile. (Use -d to automatically disable when deleting.)
         enable [id]         Enable the web profile in this Django application (send it in PayPal API calls).
         disable [id]        Disable the web profile in this Django application (don't send in PayPal API calls).
+        refresh_temporary   Replace the temporary web profiles reused by checkouts of the partner sites, per locale.
+        clear_temporary     Discard the temporary web profiles reused by checkouts of the partner sites.
 
     The 'enable' and 'disable' actions are idempotent so it is safe to run them repeatedly in the same environment.
+    The 'refresh_temporary' action can be run periodically so checkouts never create temporary web profiles.
     """
     args = "action partner [id] [json]"
 
@@ -211,3 +217,32 @@ class Command(BaseCommand):
             log.info("Disabled profile %s.", profile_id)
         except PaypalWebProfile.DoesNotExist:
             log.info("Did not find an enabled web profile with id %s to disable.", profile_id)
+
+    def _get_temporary_processors(self, partner):
+        sites = Site.objects.filter(siteconfiguration__partner__short_code__iexact=partner).order_by('domain')
+        if not sites:
+            raise CommandError("No site found for partner `{}`.".format(partner))
+        return [Paypal(site) for site in sites]
+
+    def handle_refresh_temporary(self, options):
+        """
+        Create new temporary web profiles for every locale of the partner sites, replacing the ones
+        reused by their checkouts (see Paypal.get_web_profile_id), and print their ids by site and locale.
+        """
+        result = {}
+        for processor in self._get_temporary_processors(options.get('partner')):
+            result[processor.site.domain] = {
+                locale_code: processor.refresh_web_profile(locale_code)
+                for locale_code in sorted(set(PAYPAL_LOCALES.values()))
+            }
+        self.print_json(result)
+
+    def handle_clear_temporary(self, options):
+        """
+        Discard the temporary web profiles reused by checkouts of the partner sites.
+        The next checkouts of every locale will create them again.
+        """
+        for processor in self._get_temporary_processors(options.get('partner')):
+            for locale_code in set(PAYPAL_LOCALES.values()):
+                processor.clear_web_profile(locale_code)
+            log.info("Cleared the temporary web profiles of site %s.", processor.site.domain)
@@ -1,14 +1,21 @@
 import json
+import os
+import tempfile
+
+import mock
+import requests
 import responses
 
 from django.core.management import call_command
 from django.core.management.base import CommandError
 from django.utils.six import StringIO
 from django.test import override_settings
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
 
 from ecommerce.tests.testcases import TestCase
 from ecommerce.extensions.fulfillment.status import ORDER
-from ecommerce.extensions.payment.models import BoletaElectronica, UserBillingInfo
+from ecommerce.extensions.payment.management.commands.boleta_emissions import EmissionCheckpoint, RateLimiter
+from ecommerce.extensions.payment.models import BoletaElectronica, BoletaEmission, UserBillingInfo
 from ecommerce.extensions.test.factories import create_basket, create_order
 from ecommerce.extensions.payment.tests.mixins import BoletaMixin
 
@@ -70,6 +77,30 @@ class TestBoletaEmissionsCommand(BoletaMixin, TestCase):
             self.call_command_action()
             self.assertEqual(1, self.count_boletas())
 
+    @responses.activate
+    def test_no_emissions_on_queued_order(self):
+        """ Verify orders whose boleta is queued or being emitted by the emit_boleta task are skipped. """
+        self.make_billing_info_helper('0', 'CL',self.basket)
+        self.order.status = ORDER.COMPLETE
+        self.order.save()
+        emission = BoletaEmission.objects.create(order_number=self.order.number, basket=self.basket)
+
+        self.mock_boleta_auth()
+        self.mock_boleta_creation()
+        self.mock_boleta_details(self.order.total_incl_tax)
+
+        with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS):
+            for status in [BoletaEmission.PENDING, BoletaEmission.EMITTING]:
+                emission.status = status
+                emission.save()
+                self.call_command_action()
+                self.assertEqual(0, self.count_boletas())
+
+            emission.status = BoletaEmission.FAILED
+            emission.save()
+            self.call_command_action()
+            self.assertEqual(1, self.count_boletas())
+
     @responses.activate
     def test_emissions_for_webpay_payment_processor(self):
         self.make_billing_info_helper('0', 'CL',self.basket, "webpay")
@@ -265,3 +296,111 @@ class TestBoletaEmissionsCommand(BoletaMixin, TestCase):
         with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS):
             self.call_command_action("--dry-run")
             self.assertEqual(0, self.count_boletas())
+
+    @responses.activate
+    def test_emissions_checkpoint(self):
+        self.make_billing_info_helper('0', 'CL',self.basket)
+        self.order.status = ORDER.COMPLETE
+        self.order.save()
+
+        self.mock_boleta_auth()
+        self.mock_boleta_creation()
+        self.mock_boleta_details(self.order.total_incl_tax)
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS):
+            checkpoint = os.path.join(directory, "checkpoint.jsonl")
+            self.call_command_action("--checkpoint", checkpoint, "--workers", "1", "--rate-limit", "10")
+            self.assertEqual(1, self.count_boletas())
+
+            with open(checkpoint) as checkpoint_file:
+                states = [json.loads(line) for line in checkpoint_file]
+            self.assertEqual(states, [
+                {"order": self.order.number, "state": EmissionCheckpoint.STARTED},
+                {"order": self.order.number, "state": EmissionCheckpoint.EMITTED},
+            ])
+
+    @responses.activate
+    def test_emissions_resume_from_checkpoint(self):
+        """
+        Orders left started by a crashed run are not emitted again, failed ones are retried
+        """
+        self.make_billing_info_helper('0', 'CL',self.basket)
+        self.order.status = ORDER.COMPLETE
+        self.order.save()
+
+        self.mock_boleta_auth()
+        self.mock_boleta_creation()
+        self.mock_boleta_details(self.order.total_incl_tax)
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS):
+            checkpoint = os.path.join(directory, "checkpoint.jsonl")
+            EmissionCheckpoint(checkpoint).set(self.order.number, EmissionCheckpoint.STARTED)
+            self.call_command_action("--checkpoint", checkpoint)
+            self.assertEqual(0, self.count_boletas())
+
+            EmissionCheckpoint(checkpoint).set(self.order.number, EmissionCheckpoint.FAILED)
+            self.call_command_action("--checkpoint", checkpoint)
+            self.assertEqual(1, self.count_boletas())
+
+    @responses.activate
+    def test_emissions_checkpoint_on_api_error(self):
+        self.make_billing_info_helper('0', 'CL',self.basket)
+        self.order.status = ORDER.COMPLETE
+        self.order.save()
+
+        self.mock_boleta_auth()
+        self.mock_boleta_creation_500()
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS):
+            checkpoint = os.path.join(directory, "checkpoint.jsonl")
+            self.call_command_action("--checkpoint", checkpoint)
+            self.assertEqual(0, self.count_boletas())
+            self.assertEqual(EmissionCheckpoint(checkpoint).get(self.order.number), EmissionCheckpoint.FAILED)
+
+    def assert_checkpoint_on_connection_error(self, error, state):
+        self.make_billing_info_helper('0', 'CL', self.basket)
+        self.order.status = ORDER.COMPLETE
+        self.order.save()
+
+        self.mock_boleta_auth()
+        responses.add(
+            method=responses.POST,
+            url='https://ventas-test.uchile.cl/ventas-api-front/api/v1/ventas',
+            body=error
+        )
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS):
+            checkpoint = os.path.join(directory, "checkpoint.jsonl")
+            self.call_command_action("--checkpoint", checkpoint)
+            self.assertEqual(0, self.count_boletas())
+            self.assertEqual(EmissionCheckpoint(checkpoint).get(self.order.number), state)
+
+    @responses.activate
+    def test_emissions_checkpoint_on_connection_refused(self):
+        """
+        Orders whose request was never sent, like when the connection is refused, can be emitted again
+        """
+        refused = NewConnectionError(None, "Failed to establish a new connection: Connection refused")
+        self.assert_checkpoint_on_connection_error(
+            requests.exceptions.ConnectionError(MaxRetryError(None, "/ventas", refused)), EmissionCheckpoint.FAILED)
+
+    @responses.activate
+    def test_emissions_checkpoint_on_connection_aborted(self):
+        """
+        Orders whose response was aborted are left started, since their boleta may have been created
+        """
+        self.assert_checkpoint_on_connection_error(
+            requests.exceptions.ConnectionError(ProtocolError("Connection aborted.")), EmissionCheckpoint.STARTED)
+
+    @responses.activate
+    def test_emissions_checkpoint_on_read_timeout(self):
+        self.assert_checkpoint_on_connection_error(requests.exceptions.ReadTimeout(), EmissionCheckpoint.STARTED)
+
+    def test_rate_limiter(self):
+        rate_limiter = RateLimiter(2)
+        with mock.patch("ecommerce.extensions.payment.management.commands.boleta_emissions.time") as mock_time:
+            mock_time.monotonic.return_value = 100
+            rate_limiter.wait()
+            rate_limiter.wait()
+            rate_limiter.wait()
+        self.assertEqual([call[0][0] for call in mock_time.sleep.call_args_list], [0.5, 1.0])
@@ -0,0 +1,60 @@
+import datetime
+
+import mock
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from ecommerce.extensions.payment.models import BoletaEmission
+from ecommerce.extensions.payment.tests.mixins import BoletaMixin
+from ecommerce.extensions.test.factories import create_basket, create_order
+from ecommerce.tests.testcases import TestCase
+
+
+class TestEmitQueuedBoletasCommand(BoletaMixin, TestCase):
+
+    def create_emission(self, **kwargs):
+        basket = create_basket(price="10.0")
+        order = create_order(basket=basket)
+        return BoletaEmission.objects.create(order_number=order.number, basket=basket, **kwargs)
+
+    def test_emit_due(self):
+        """ Verify only the pending emissions whose next attempt is due are emitted. """
+        due = self.create_emission()
+        self.create_emission(next_attempt_at=timezone.now() + datetime.timedelta(hours=1))
+        self.create_emission(status=BoletaEmission.FAILED)
+
+        with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS), \
+                mock.patch('ecommerce.extensions.payment.management.commands.emit_queued_boletas.emit_queued_boleta',
+                           return_value=due) as mock_emit:
+            call_command('emit_queued_boletas')
+
+        mock_emit.assert_called_once_with(due.order_number)
+
+    def test_report_stale_emissions(self):
+        """ Verify the emissions left emitting for too long are reported, and not emitted again. """
+        stale = self.create_emission(status=BoletaEmission.EMITTING)
+        BoletaEmission.objects.filter(pk=stale.pk).update(modified=timezone.now() - datetime.timedelta(hours=1))
+        recent = self.create_emission(status=BoletaEmission.EMITTING)
+
+        with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS), \
+                mock.patch('ecommerce.extensions.payment.management.commands.emit_queued_boletas.emit_queued_boleta') \
+                as mock_emit, \
+                mock.patch('ecommerce.extensions.payment.management.commands.emit_queued_boletas.logger') \
+                as mock_logger:
+            call_command('emit_queued_boletas')
+
+        mock_emit.assert_not_called()
+        mock_logger.error.assert_called_once()
+        self.assertIn(stale.order_number, mock_logger.error.call_args[0][1])
+        self.assertNotIn(recent.order_number, mock_logger.error.call_args[0][1])
+
+    def test_disabled(self):
+        self.create_emission()
+
+        with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS_DISABLED), \
+                mock.patch('ecommerce.extensions.payment.management.commands.emit_queued_boletas.emit_queued_boleta') \
+                as mock_emit:
+            call_command('emit_queued_boletas')
+
+        mock_emit.assert_not_called()
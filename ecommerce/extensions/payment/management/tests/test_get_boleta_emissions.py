@@ -1,10 +1,15 @@
 import json
+import os
+import tempfile
+
 import responses
 
 from django.core.management import call_command
+from django.db import connection
 from django.core.management.base import CommandError
 from django.utils.six import StringIO
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 
 from ecommerce.tests.testcases import TestCase
 from ecommerce.extensions.fulfillment.status import ORDER
@@ -52,6 +57,12 @@ class TestBoletaEmissionsCommand(BoletaMixin, TestCase):
     def setUp(self):
         self.stdout = StringIO()
 
+        # Reports are written to the working directory, keep them out of the repository.
+        report_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(report_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(report_dir.name)
+
     def call_command_action(self, *args, **kwargs):
         call_command('get_boleta_emissions',
                      *args,
@@ -239,4 +250,35 @@ class TestBoletaEmissionsCommand(BoletaMixin, TestCase):
             self.mock_boleta_auth()
             self.mock_boleta_get_boletas_custom(self.DATE_1, two_boletas)
             self.mock_boleta_get_boletas_custom(self.DATE_1, [], status="CONTABILIZADA")
-            self.assertRaises(CommandError, self.call_command_action, self.DATE_1, "--email")
\ No newline at end of file
+            self.assertRaises(CommandError, self.call_command_action, self.DATE_1, "--email")
+
+    @responses.activate
+    def test_local_boletas_single_query(self):
+        with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS):
+            boletas = self.make_boletas(number=5)
+
+            self.mock_boleta_auth()
+            self.mock_boleta_get_boletas_custom(self.DATE_1, boletas[:3])
+            self.mock_boleta_get_boletas_custom(self.DATE_1, boletas[3:], status="CONTABILIZADA")
+            with CaptureQueriesContext(connection) as queries:
+                self.call_command_action(self.DATE_1)
+
+            boleta_queries = [query for query in queries if "payment_boletaelectronica" in query["sql"]]
+            self.assertEqual(len(boleta_queries), 1)
+
+    @responses.activate
+    def test_duplicates_report(self):
+        with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS):
+            three_boletas = self.make_boletas(number=1, repeat=3)
+
+            self.mock_boleta_auth()
+            self.mock_boleta_get_boletas_custom(self.DATE_1, three_boletas[:2])
+            self.mock_boleta_get_boletas_custom(self.DATE_1, three_boletas[2:], status="CONTABILIZADA")
+            self.assertRaises(CommandError, self.call_command_action, self.DATE_1, "--save")
+            with open("duplicate_boletas.csv") as report:
+                rows = report.read().splitlines()
+            self.assertFalse(os.path.exists("only_local_boletas.csv"))
+
+            self.assertEqual(rows[0], "order_number,boleta_id,folio,fecha,monto,on_DB")
+            self.assertEqual([row.split(",")[1:2] + row.split(",")[-1:] for row in rows[1:]],
+                             [["0-0", "True"], ["0-1", "False"], ["0-2", "False"]])
@@ -9,6 +9,7 @@ from django.core.management import call_command
 from django.core.management.base import CommandError
 
 from ecommerce.extensions.payment.models import PaypalWebProfile
+from ecommerce.extensions.payment.processors.paypal import Paypal
 from ecommerce.tests.testcases import TestCase
 
 
@@ -159,3 +160,35 @@ class TestPaypalProfileCommand(TestCase):
         with self.assertRaises(CommandError) as context:
             call_command('paypal_profile', partner='edX', action='disable', stdout=self.stdout)  # no profile id
         self.assertEqual('Action `disable` requires a profile_id to be specified.', str(context.exception))
+
+
+@mock.patch.object(Paypal, 'create_temporary_web_profile', side_effect=lambda locale_code: 'id-' + locale_code)
+class TestPaypalTemporaryProfileCommand(TestCase):
+
+    def setUp(self):
+        super(TestPaypalTemporaryProfileCommand, self).setUp()
+        self.stdout = StringIO()
+        self.processor = Paypal(self.site)
+
+    def test_refresh_temporary(self, mock_create_web_profile):
+        call_command('paypal_profile', partner='edX', action='refresh_temporary', stdout=self.stdout)
+
+        self.assertEqual(json.loads(self.stdout.getvalue()), {
+            self.site.domain: {'CN': 'id-CN', 'FR': 'id-FR', 'MX': 'id-MX', 'US': 'id-US'},
+        })
+        self.assertEqual(mock_create_web_profile.call_count, 4)
+        # Checkouts reuse the refreshed profiles
+        self.assertEqual(self.processor.get_web_profile_id('MX'), 'id-MX')
+        self.assertEqual(mock_create_web_profile.call_count, 4)
+
+    def test_clear_temporary(self, mock_create_web_profile):
+        self.processor.get_web_profile_id('MX')
+        call_command('paypal_profile', partner='edX', action='clear_temporary', stdout=self.stdout)
+
+        self.processor.get_web_profile_id('MX')
+        self.assertEqual(mock_create_web_profile.call_count, 2)
+
+    def test_unknown_partner_site(self, mock_create_web_profile):  # pylint: disable=unused-argument
+        with self.assertRaises(CommandError) as context:
+            call_command('paypal_profile', partner='other', action='refresh_temporary', stdout=self.stdout)
+        self.assertEqual('No site found for partner `other`.', str(context.exception))
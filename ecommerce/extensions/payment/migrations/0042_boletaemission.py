@@ -0,0 +1,31 @@
+# Generated by Django 2.2.17 on 2026-10-17 10:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basket', '0015_pricingbasket'),
+        ('payment', '0041_auto_20210623_1545'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoletaEmission',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_number', models.CharField(max_length=128, unique=True)),
+                ('payment_processor', models.CharField(default='webpay', max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('emitting', 'Emitting'), ('emitted', 'Emitted'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('basket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='basket.Basket', verbose_name='Basket')),
+            ],
+        ),
+    ]
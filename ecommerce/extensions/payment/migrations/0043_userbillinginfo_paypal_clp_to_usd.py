@@ -0,0 +1,18 @@
+# Generated by Django 2.2.17 on 2026-10-17 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0042_boletaemission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userbillinginfo',
+            name='paypal_clp_to_usd',
+            field=models.IntegerField(blank=True, help_text='Rate used at payment to give the correct price to paypal', null=True),
+        ),
+    ]
@@ -339,6 +339,8 @@ class UserBillingInfo(models.Model):
     last_name_1 = models.CharField(max_length=12)
     last_name_2 = models.CharField(max_length=12,blank=True)
     payment_processor = models.CharField(max_length=10, default="webpay")
+    paypal_clp_to_usd = models.IntegerField(
+        null=True, blank=True, help_text="Rate used at payment to give the correct price to paypal")
 
     def __str__(self):
         return "Información de boleta de {} con {}".format(self.first_name, self.payment_processor)
@@ -388,3 +390,35 @@ class BoletaErrorMessage(models.Model):
 
     def __str__(self):
         return "Unsent message with code {}, check the email settings".format(self.code)
+
+class BoletaEmission(models.Model):
+    """
+    Outbox of the boletas to emit for placed orders.
+
+    A row is created with the order, in the same transaction, and the emit_boleta task
+    emits its boleta afterwards. There is a single row per order number, so a boleta is
+    never requested twice for the same order.
+    """
+    PENDING = "pending"
+    EMITTING = "emitting"
+    EMITTED = "emitted"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (EMITTING, "Emitting"),
+        (EMITTED, "Emitted"),
+        (FAILED, "Failed"),
+    ]
+
+    order_number = models.CharField(max_length=128, unique=True)
+    basket = models.ForeignKey('basket.Basket', verbose_name=_('Basket'), on_delete=models.CASCADE)
+    payment_processor = models.CharField(max_length=10, default="webpay")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return "Emisión de boleta de la orden {} ({})".format(self.order_number, self.status)
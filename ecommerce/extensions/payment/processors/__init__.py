@@ -13,7 +13,8 @@ from django.core.mail import send_mail
 from django.utils.functional import cached_property
 from oscar.core.loading import get_model
 from ecommerce.extensions.payment.models import UserBillingInfo, BoletaErrorMessage, PaypalUSDConversion
-from ecommerce.extensions.payment.boleta import authenticate_boleta_electronica, make_boleta_electronica, BoletaElectronicaException
+from ecommerce.extensions.payment.boleta import BoletaClient, make_boleta_electronica, BoletaElectronicaException
+from ecommerce.extensions.payment.conversion import get_paypal_conversion
 
 PaymentProcessorResponse = get_model('payment', 'PaymentProcessorResponse')
 
@@ -208,21 +209,15 @@ class EolBillingMixin:
         
         return id_type, id_number
 
-    def associate_paypal_conversion_rate(self, basket):
-        try:
-            paypal_conversion = PaypalUSDConversion.objects.first()
-            paypal_conversion.basket.add(basket)
-            paypal_conversion.save()
-
-        except PaypalUSDConversion.DoesNotExist:
-            raise Exception("No Paypal CLP to USD conversion defined")
-    
-    def remove_from_paypal_conversion_rate(self, basket):
+    def get_paypal_clp_to_usd(self, processor):
+        """
+        Return the CLP to USD rate to store in the billing info of a basket paid with the processor.
+        Only Paypal payments are converted, so other processors have no rate.
+        """
+        if processor != "paypal":
+            return None
         try:
-            paypal_conversion = PaypalUSDConversion.objects.first()
-            paypal_conversion.basket.remove(basket)
-            paypal_conversion.save()
-
+            return get_paypal_conversion().clp_to_usd
         except PaypalUSDConversion.DoesNotExist:
             raise Exception("No Paypal CLP to USD conversion defined")
 
@@ -231,13 +226,13 @@ class EolBillingMixin:
         # Stop orders from saving responses and info if finished (Why do I have to write this)
         if basket.status == 'Submitted':
             raise Exception("Orden ya procesada"+str(basket))
+        # Paypal payments record the rate used to convert their price
+        paypal_clp_to_usd = self.get_paypal_clp_to_usd(processor)
         # Overwrite userInfo:
         # sometimes the requests might duplicate
         # and a previous info might exists
-        previous_processor = "webpay"
         try:
             user_info = UserBillingInfo.objects.get(basket=basket)
-            previous_processor = user_info.payment_processor
             user_info.billing_district = request.data.get("billing_district")
             user_info.billing_city = request.data.get("billing_city")
             user_info.billing_address = request.data.get("billing_address")
@@ -250,6 +245,7 @@ class EolBillingMixin:
             user_info.last_name_1 = request.data.get("last_name_1")
             user_info.last_name_2 = request.data.get("last_name_2")
             user_info.payment_processor = processor
+            user_info.paypal_clp_to_usd = paypal_clp_to_usd
             user_info.save()
 
         except UserBillingInfo.DoesNotExist:
@@ -265,31 +261,18 @@ class EolBillingMixin:
                 first_name=request.data.get("first_name"),
                 last_name_1=request.data.get("last_name_1"),
                 last_name_2=request.data.get("last_name_2"),
-                payment_processor=processor
+                payment_processor=processor,
+                paypal_clp_to_usd=paypal_clp_to_usd,
             )
 
-        # Associate to paypal (default paypal case)
-        if previous_processor == "webpay" and processor == "paypal":
-            self.associate_paypal_conversion_rate(basket)
-        # Revert paypal case
-        elif previous_processor == "paypal" and processor == "webpay":
-            self.remove_from_paypal_conversion_rate(basket)
-        # Nothing else
-        # paypal == paypal
-        # webpay == webpay
-
     def asociateUserInfoToProcessor(self, basket, processor):
         try:
             user_info = UserBillingInfo.objects.get(basket=basket)
-            previous_processor = user_info.payment_processor
+            # Keep the rate of the payment if it was already paid with Paypal
+            if processor != "paypal" or user_info.paypal_clp_to_usd is None:
+                user_info.paypal_clp_to_usd = self.get_paypal_clp_to_usd(processor)
             user_info.payment_processor = processor
             user_info.save()
-            # Associate to paypal (default paypal case)
-            if previous_processor == "webpay" and processor == "paypal":
-                self.associate_paypal_conversion_rate(basket)
-            # Revert paypal case
-            elif previous_processor == "paypal" and processor == "webpay":
-                self.remove_from_paypal_conversion_rate(basket)        
         except UserBillingInfo.DoesNotExist:
             logger.error("No User Billing info associated to Basket")
 
@@ -320,7 +303,7 @@ class EolBillingMixin:
                 site.domain, site.siteconfiguration.lms_url_root)
             try:
                 # DATA FLOW FROM WEBPAY TO BOLETA ELECTRONICA
-                boleta_auth=authenticate_boleta_electronica(basket=basket)
+                boleta_auth=BoletaClient().get_auth(basket=basket)
                 boleta_id=make_boleta_electronica(
                     basket,
                     order,
@@ -3,6 +3,7 @@
 
 import logging
 import re
+import time
 import uuid
 from urllib.parse import urljoin
 
@@ -11,19 +12,34 @@ import waffle
 import six
 from decimal import Decimal, ROUND_HALF_UP
 from django.conf import settings
+from django.core.cache import cache
 from django.urls import reverse
 from django.utils.functional import cached_property
 from django.utils.translation import get_language
+from edx_django_utils.cache import TieredCache
 from oscar.apps.payment.exceptions import GatewayError
 
+from ecommerce.celery_app import app
 from ecommerce.core.url_utils import get_ecommerce_url
+from ecommerce.core.utils import get_cache_key
 from ecommerce.extensions.payment.constants import PAYPAL_LOCALES
-from ecommerce.extensions.payment.models import PaypalProcessorConfiguration, PaypalWebProfile, PaypalUSDConversion
+from ecommerce.extensions.payment.conversion import get_paypal_conversion
+from ecommerce.extensions.payment.models import PaypalProcessorConfiguration, PaypalWebProfile
 from ecommerce.extensions.payment.processors import BasePaymentProcessor, HandledProcessorResponse, EolBillingMixin
 from ecommerce.extensions.payment.utils import get_basket_program_uuid, middle_truncate
 
 logger = logging.getLogger(__name__)
 
+# Temporary web profiles persist for 3 hours. They are reused by checkouts for at most this many seconds,
+# so payments created with them are approved before they expire.
+PAYPAL_WEB_PROFILE_CACHE_TIMEOUT = 2 * 60 * 60
+# Seconds after which a reused web profile is replaced in the background
+PAYPAL_WEB_PROFILE_REFRESH_AGE = 90 * 60
+# Seconds a web profile refresh may be in progress before another one is sent
+PAYPAL_WEB_PROFILE_REFRESH_LOCK_TIMEOUT = 5 * 60
+# Sent by name, as the tasks module imports this processor
+PAYPAL_WEB_PROFILE_REFRESH_TASK = 'ecommerce.extensions.payment.tasks.refresh_paypal_web_profile'
+
 
 class Paypal(EolBillingMixin, BasePaymentProcessor):
     """
@@ -108,6 +124,63 @@ class Paypal(EolBillingMixin, BasePaymentProcessor):
                 "Creating PayPal WebProfile resulted in exception. Will continue without one.")
             return None
 
+    def get_web_profile_cache_key(self, locale_code):
+        return get_cache_key(
+            resource='paypal_web_profile',
+            site_id=self.site.id,
+            client_id=self.configuration['client_id'],
+            locale_code=locale_code,
+        )
+
+    def refresh_web_profile(self, locale_code):
+        """
+        Create a temporary web profile for the locale, and store it to be reused by the next checkouts.
+
+        Returns:
+            str: Id of the web profile, or None if it couldn't be created.
+        """
+        web_profile_id = self.create_temporary_web_profile(locale_code)
+        if web_profile_id is not None:
+            TieredCache.set_all_tiers(
+                self.get_web_profile_cache_key(locale_code),
+                {'id': web_profile_id, 'created_at': time.time()},
+                PAYPAL_WEB_PROFILE_CACHE_TIMEOUT,
+            )
+        return web_profile_id
+
+    def clear_web_profile(self, locale_code):
+        TieredCache.delete_all_tiers(self.get_web_profile_cache_key(locale_code))
+
+    def send_refresh_web_profile(self, locale_code):
+        """
+        Send the task that replaces the web profile of the locale, unless another process already sent it.
+        The task is routed to the PAYMENT_QUEUE queue by CELERY_ROUTES.
+        """
+        lock_key = self.get_web_profile_cache_key(locale_code) + '.lock'
+        if not cache.add(lock_key, True, PAYPAL_WEB_PROFILE_REFRESH_LOCK_TIMEOUT):
+            return
+        try:
+            app.send_task(PAYPAL_WEB_PROFILE_REFRESH_TASK, args=(self.site.id, locale_code))
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Couldn't send the refresh of the Paypal web profile for locale %s", locale_code)
+            cache.delete(lock_key)
+
+    def get_web_profile_id(self, locale_code):
+        """
+        Return the id of a temporary web profile for the locale, reusing the profile of previous checkouts.
+
+        Profiles are only created inline when there is none to reuse. Profiles about to be discarded are
+        still used while a new one is created in the background.
+        """
+        cached_response = TieredCache.get_cached_response(self.get_web_profile_cache_key(locale_code))
+        if not cached_response.is_found:
+            return self.refresh_web_profile(locale_code)
+
+        web_profile = cached_response.value
+        if time.time() - web_profile['created_at'] > PAYPAL_WEB_PROFILE_REFRESH_AGE:
+            self.send_refresh_web_profile(locale_code)
+        return web_profile['id']
+
     def get_courseid_title(self, line):
         """
         Get CourseID & Title from basket item
@@ -128,7 +201,7 @@ class Paypal(EolBillingMixin, BasePaymentProcessor):
         """
         Raises exception if PaypalUSDConversion is not set
         """
-        conversion_rate = PaypalUSDConversion.objects.first().clp_to_usd
+        conversion_rate = get_paypal_conversion().clp_to_usd
         return (Decimal(total) / Decimal(conversion_rate)).quantize(Decimal('.11'), rounding=ROUND_HALF_UP)
 
     def get_transaction_parameters(self, basket, request=None, use_client_side_checkout=False, **kwargs):
@@ -200,7 +273,7 @@ class Paypal(EolBillingMixin, BasePaymentProcessor):
         if waffle.switch_is_active('create_and_set_webprofile'):
             locale_code = self.resolve_paypal_locale(
                 request.COOKIES.get(settings.LANGUAGE_COOKIE_NAME))
-            web_profile_id = self.create_temporary_web_profile(locale_code)
+            web_profile_id = self.get_web_profile_id(locale_code)
             if web_profile_id is not None:
                 data['experience_profile_id'] = web_profile_id
         else:
@@ -1,11 +1,17 @@
 """ Webpay payment processing. """
 
 import logging
+import threading
+import time
 import requests
 from urllib.parse import urljoin
 from decimal import Decimal
 
+import newrelic.agent
 from django.urls import reverse
+from edx_django_utils import monitoring as monitoring_utils
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from oscar.apps.payment.exceptions import GatewayError, TransactionDeclined
 from oscar.core.loading import get_model
 
@@ -19,6 +25,45 @@ logger = logging.getLogger(__name__)
 
 PaymentProcessorResponse = get_model('payment', 'PaymentProcessorResponse')
 
+# (connect, read) timeout of the Webpay module requests, in seconds
+WEBPAY_API_TIMEOUT = (3, 30)
+
+_webpay_sessions = {}
+_webpay_sessions_lock = threading.Lock()
+
+
+def get_webpay_session(idempotent=False):
+    """
+    Return the keep-alive session shared by the Webpay module requests of this process.
+
+    Connection errors are retried for every request, since the request was never sent. Errors of
+    idempotent requests, like reading the status of a transaction, are also retried, while
+    transaction creations and commits are never sent twice.
+    """
+    with _webpay_sessions_lock:
+        if idempotent not in _webpay_sessions:
+            if idempotent:
+                retries = Retry(total=3, connect=3, read=2, status=2, backoff_factor=0.2,
+                                status_forcelist=(502, 503, 504), method_whitelist=frozenset(['POST']),
+                                raise_on_status=False)
+            else:
+                retries = Retry(total=2, connect=2, read=0, status=0, raise_on_status=False)
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(max_retries=retries))
+            session.mount('http://', HTTPAdapter(max_retries=retries))
+            _webpay_sessions[idempotent] = session
+    return _webpay_sessions[idempotent]
+
+
+def record_webpay_latency(operation, seconds, outcome):
+    """
+    Record the latency of a Webpay module request, both as a custom metric of the current
+    transaction and in the distribution of its operation (Custom/Webpay/<operation>).
+    """
+    monitoring_utils.set_custom_metric('webpay_{}_seconds'.format(operation), round(seconds, 3))
+    monitoring_utils.set_custom_metric('webpay_{}_outcome'.format(operation), outcome)
+    newrelic.agent.record_custom_metric('Custom/Webpay/{}'.format(operation), seconds)
+
 
 class WebpayAlreadyProcessed(Exception):
     """Raised when the order was successful and already processed"""
@@ -60,7 +105,25 @@ class Webpay(EolBillingMixin, BasePaymentProcessor):
         """
         super(Webpay, self).__init__(site)
 
+    def post_webpay(self, operation, path, data, idempotent=False):
+        """
+        Post to the Webpay module and record the latency of the operation.
 
+        Raises:
+            GatewayError: Indicates the Webpay module could not be reached or did not answer in time.
+        """
+        start = time.monotonic()
+        outcome = 'error'
+        try:
+            result = get_webpay_session(idempotent).post(
+                self.configuration["api_url"] + path, json=data, timeout=WEBPAY_API_TIMEOUT)
+            outcome = result.status_code
+            return result
+        except requests.exceptions.RequestException as e:
+            logger.exception("Webpay module request %s failed", operation)
+            raise GatewayError("Webpay module request {} failed: {}".format(operation, e))
+        finally:
+            record_webpay_latency(operation, time.monotonic() - start, outcome)
 
     def get_transaction_parameters(self, basket, request=None, use_client_side_checkout=False, **kwargs):
         """
@@ -83,7 +146,7 @@ class Webpay(EolBillingMixin, BasePaymentProcessor):
         # Before anything verify fields
         id_type, id_number = self.verifyIdNumber(request)
 
-        result = requests.post(self.configuration["api_url"]+"/process-webpay", json={
+        result = self.post_webpay("process_webpay", "/process-webpay", {
             "notify_url": notify_url.replace("http://", "https://"),
             "order_number": basket.order_number,
             "total_incl_tax": basket.total_incl_tax,
@@ -197,10 +260,10 @@ class Webpay(EolBillingMixin, BasePaymentProcessor):
         """
         Recover transaction data without commiting to webpay
         """
-        result=requests.post(self.configuration["api_url"]+"/transaction-status", json={
+        result=self.post_webpay("transaction_status", "/transaction-status", {
             "api_secret": self.configuration["api_secret"],
             "token": token
-        })
+        }, idempotent=True)
 
         if result.status_code == 403 or result.status_code == 500:
             self.send_support_email(
@@ -219,7 +282,7 @@ class Webpay(EolBillingMixin, BasePaymentProcessor):
         """
         Commit payment on webpay and record the response
         """
-        result=requests.post(self.configuration["api_url"]+"/get-transaction", json={
+        result=self.post_webpay("get_transaction", "/get-transaction", {
             "api_secret": self.configuration["api_secret"],
             "token": token
         })
@@ -3,12 +3,15 @@
 import logging
 
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from edx_django_utils.cache import TieredCache
 from waffle.models import Switch
 
 from ecommerce.extensions.api.v2.views.payments import PAYMENT_PROCESSOR_CACHE_KEY
+from ecommerce.extensions.payment.conversion import invalidate_paypal_conversion
+from ecommerce.extensions.payment.models import PaypalUSDConversion
 
 logger = logging.getLogger(__name__)
 
@@ -26,3 +29,16 @@ def invalidate_processor_cache(*_args, **kwargs):
         logger.info('Switched payment processor [%s] %s.', processor, 'on' if switch.active else 'off')
         TieredCache.delete_all_tiers(PAYMENT_PROCESSOR_CACHE_KEY)
         logger.info('Invalidated payment processor cache after toggling [%s].', switch.name)
+
+
+@receiver(post_save, sender=PaypalUSDConversion, dispatch_uid='paypal_conversion.saved')
+@receiver(post_delete, sender=PaypalUSDConversion, dispatch_uid='paypal_conversion.deleted')
+def invalidate_paypal_conversion_on_change(*_args, **_kwargs):
+    """
+    Invalidate the Paypal conversion rate cached by every process when a rate is saved or deleted.
+
+    The rate is invalidated immediately, and again once the transaction is committed, so that
+    other processes cannot load the rate from uncommitted data.
+    """
+    invalidate_paypal_conversion()
+    transaction.on_commit(invalidate_paypal_conversion)
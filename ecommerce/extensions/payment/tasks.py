@@ -0,0 +1,199 @@
+"""
+Asynchronous emission of the boletas of placed orders, and refresh of the Paypal web profiles.
+
+Placing an order queues a BoletaEmission in the same transaction, and the emit_boleta task emits
+its boleta once the transaction is committed, so learners are not kept waiting on the Ventas API.
+Failed attempts are retried with an exponential backoff. Emissions whose task was lost, e.g.
+because the broker was unreachable, are emitted by the emit_queued_boletas command, which must run
+from cron.
+
+The tasks are routed to the PAYMENT_QUEUE queue, which must be consumed by a worker of this service:
+
+    celery -A ecommerce.celery_app:app worker -Q ecommerce.payment
+
+Paypal checkouts reuse temporary web profiles, which the refresh_paypal_web_profile task replaces
+before they expire.
+"""
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from oscar.apps.partner import strategy
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.payment.boleta import (
+    BoletaClient,
+    BoletaElectronicaException,
+    is_boleta_request_unsent,
+    make_boleta_electronica
+)
+from ecommerce.extensions.payment.models import BoletaElectronica, BoletaEmission, BoletaErrorMessage
+from ecommerce.extensions.payment.processors.paypal import Paypal
+
+logger = logging.getLogger(__name__)
+Order = get_model('order', 'Order')
+
+# Attempts to emit a boleta before the emission is marked as failed
+BOLETA_EMISSION_MAX_ATTEMPTS = 5
+# Seconds before the first retry of an emission, doubled after every failed attempt
+BOLETA_EMISSION_RETRY_DELAY = 60
+
+
+def is_boleta_emission_enabled():
+    config = getattr(settings, 'BOLETA_CONFIG', {})
+    return config.get('enabled', False) and config.get('generate_on_payment', False)
+
+
+def is_boleta_emission_halting():
+    """
+    Return True if a failed boleta emission must fail the payment, as set by BOLETA_CONFIG["halt_on_boleta_failure"].
+    Payment views then emit the boleta while the learner waits instead of queueing it.
+    """
+    config = getattr(settings, 'BOLETA_CONFIG', {})
+    return is_boleta_emission_enabled() and config.get('halt_on_boleta_failure', False)
+
+
+def get_retry_delay(attempts):
+    return timedelta(seconds=BOLETA_EMISSION_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def send_emit_boleta(order_number):
+    """
+    Send the emit_boleta task of an order.
+    If the broker is unreachable the emission stays pending for the emit_queued_boletas command.
+    """
+    try:
+        emit_boleta.delay(order_number)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Couldn't send the boleta emission of order %s, it is left pending", order_number)
+
+
+def enqueue_boleta_emission(order, payment_processor):
+    """
+    Queue the emission of the boleta of an order in the current transaction,
+    and send its task once the transaction is committed.
+
+    Returns:
+        BoletaEmission of the order, or None if boletas are not emitted on payment.
+    """
+    if not is_boleta_emission_enabled():
+        return None
+    emission, created = BoletaEmission.objects.get_or_create(
+        order_number=order.number,
+        defaults={'basket': order.basket, 'payment_processor': payment_processor},
+    )
+    if created:
+        transaction.on_commit(lambda: send_emit_boleta(order.number))
+    return emission
+
+
+def send_boleta_emission_failure_email(emission, error):
+    """
+    Alert the team of an emission that failed, with the errors returned by the Ventas API.
+    """
+    site = emission.basket.site
+    error_messages = BoletaErrorMessage.objects.filter(order_number=emission.order_number)
+    details = "".join(
+        "Codigo {}, mensaje\n{}\n".format(message.code, message.content) for message in error_messages)
+    send_mail(
+        'Boleta Electronica API Error(s)',
+        "Lugar: emisión asíncrona de boletas ({}).\nDescripción: No se pudo obtener la boleta de la orden {} "
+        "tras {} intento(s).\n\nError {}\n{}\nOriginado en {} con partner {}".format(
+            emission.payment_processor, emission.order_number, emission.attempts, error, details,
+            site.domain, site.siteconfiguration.lms_url_root),
+        settings.BOLETA_CONFIG.get("from_email", None),
+        [settings.BOLETA_CONFIG.get("team_email", "")],
+        fail_silently=True
+    )
+    error_messages.delete()
+
+
+def emit_queued_boleta(order_number):
+    """
+    Emit the queued boleta of an order, if it is still pending.
+
+    Emissions are claimed before the boleta is requested, so concurrent tasks never request it twice.
+    Errors that ensure the boleta was not created leave the emission pending until its next attempt,
+    or failed after BOLETA_EMISSION_MAX_ATTEMPTS. Any other error marks it failed right away, since
+    its boleta may exist in the Ventas API and must be reconciled with the get_boleta_emissions command.
+
+    Returns:
+        BoletaEmission of the order.
+    """
+    emission = BoletaEmission.objects.select_related('basket').get(order_number=order_number)
+    if emission.status != BoletaEmission.PENDING:
+        logger.info("Boleta emission of order %s is %s, skipping it", order_number, emission.status)
+        return emission
+
+    if BoletaElectronica.objects.filter(basket_id=emission.basket_id).exists():
+        # Emitted by the boleta_emissions command in the meantime
+        emission.status = BoletaEmission.EMITTED
+        emission.save(update_fields=['status', 'modified'])
+        return emission
+
+    claimed = BoletaEmission.objects.filter(pk=emission.pk, status=BoletaEmission.PENDING).update(
+        status=BoletaEmission.EMITTING, attempts=F('attempts') + 1, modified=timezone.now())
+    if not claimed:
+        emission.refresh_from_db()
+        return emission
+    emission.refresh_from_db()
+
+    basket = emission.basket
+    basket.strategy = strategy.Default()
+    try:
+        order = Order.objects.get(number=order_number)
+        auth = BoletaClient().get_auth(basket=basket)
+        make_boleta_electronica(basket, order, auth, payment_processor=emission.payment_processor)
+    except Exception as e:  # pylint: disable=broad-except
+        if not isinstance(e, BoletaElectronicaException) and not is_boleta_request_unsent(e):
+            logger.exception("Boleta emission of order %s had an unexpected error", order_number)
+            emission.status = BoletaEmission.FAILED
+            emission.last_error = str(e)
+            emission.save(update_fields=['status', 'last_error', 'modified'])
+            send_boleta_emission_failure_email(emission, e)
+            return emission
+
+        # The Ventas API refused the boleta, or was never reached, so it can be emitted again
+        logger.warning("Boleta emission of order %s failed, attempt %d", order_number, emission.attempts, exc_info=True)
+        emission.last_error = str(e)
+        if emission.attempts < BOLETA_EMISSION_MAX_ATTEMPTS:
+            emission.status = BoletaEmission.PENDING
+            emission.next_attempt_at = timezone.now() + get_retry_delay(emission.attempts)
+        else:
+            emission.status = BoletaEmission.FAILED
+        emission.save(update_fields=['status', 'next_attempt_at', 'last_error', 'modified'])
+        if emission.status == BoletaEmission.FAILED:
+            send_boleta_emission_failure_email(emission, e)
+        return emission
+
+    emission.status = BoletaEmission.EMITTED
+    emission.last_error = ""
+    emission.save(update_fields=['status', 'last_error', 'modified'])
+    BoletaErrorMessage.objects.filter(order_number=order_number).delete()
+    logger.info("Completed Boleta for order %s in %d attempt(s)", order_number, emission.attempts)
+    return emission
+
+
+@shared_task(bind=True, ignore_result=True)
+def emit_boleta(self, order_number):
+    """
+    Emit the queued boleta of an order, retrying it at its next attempt while it is pending.
+    """
+    emission = emit_queued_boleta(order_number)
+    if emission.status == BoletaEmission.PENDING:
+        countdown = max((emission.next_attempt_at - timezone.now()).total_seconds(), 0)
+        raise self.retry(countdown=countdown, max_retries=None)
+
+
+@shared_task(ignore_result=True)
+def refresh_paypal_web_profile(site_id, locale_code):
+    """
+    Replace the web profile reused by the Paypal checkouts of a site for the locale.
+    """
+    Paypal(Site.objects.get(id=site_id)).refresh_web_profile(locale_code)
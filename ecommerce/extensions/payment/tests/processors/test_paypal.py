@@ -4,6 +4,7 @@
 
 import json
 import logging
+import time
 from urllib.parse import urljoin
 
 import ddt
@@ -24,7 +25,11 @@ from testfixtures import LogCapture
 from ecommerce.core.tests import toggle_switch
 from ecommerce.extensions.checkout.utils import get_receipt_page_url
 from ecommerce.extensions.payment.models import PaypalWebProfile, PaypalUSDConversion, UserBillingInfo
-from ecommerce.extensions.payment.processors.paypal import Paypal
+from ecommerce.extensions.payment.processors.paypal import (
+    PAYPAL_WEB_PROFILE_REFRESH_AGE,
+    PAYPAL_WEB_PROFILE_REFRESH_TASK,
+    Paypal
+)
 from ecommerce.extensions.payment.tests.mixins import PaypalMixin, BoletaMixin
 from ecommerce.extensions.payment.tests.processors.mixins import PaymentProcessorTestCaseMixin
 from ecommerce.tests.testcases import TestCase
@@ -192,6 +197,11 @@ class PaypalTests(BoletaMixin, PaypalMixin, PaymentProcessorTestCaseMixin, TestC
         expected = urljoin(self.site.siteconfiguration.build_ecommerce_url(), reverse('paypal:execute'))
         self.assertEqual(last_request_body['redirect_urls']['return_url'], expected)
 
+        user_info = UserBillingInfo.objects.get(basket=self.basket)
+        self.assertEqual(user_info.payment_processor, "paypal")
+        self.assertEqual(user_info.paypal_clp_to_usd, 750)
+        self.assertFalse(self.basket.paypalusdconversion_set.exists())
+
     @responses.activate
     def test_get_courseid_title(self):
         for line in self.basket.all_lines():
@@ -352,6 +362,39 @@ class PaypalTests(BoletaMixin, PaypalMixin, PaymentProcessorTestCaseMixin, TestC
         msg = 'Creating PayPal WebProfile resulted in exception. Will continue without one.'
         mock_logger.warning.assert_any_call(msg)
 
+    @mock.patch('ecommerce.extensions.payment.processors.paypal.app.send_task')
+    @mock.patch.object(Paypal, 'create_temporary_web_profile', return_value='test-profile-id')
+    def test_web_profile_reused(self, mock_create_web_profile, mock_refresh):
+        """ Verify checkouts of a locale reuse its web profile, and only the first one creates it. """
+        for __ in range(2):
+            self.assertEqual(self.processor.get_web_profile_id('US'), 'test-profile-id')
+        mock_create_web_profile.assert_called_once_with('US')
+
+        self.processor.get_web_profile_id('MX')
+        self.assertEqual(mock_create_web_profile.call_count, 2)
+        mock_refresh.assert_not_called()
+
+    @mock.patch('ecommerce.extensions.payment.processors.paypal.app.send_task')
+    @mock.patch.object(Paypal, 'create_temporary_web_profile', return_value='test-profile-id')
+    def test_web_profile_refreshed(self, mock_create_web_profile, mock_refresh):
+        """ Verify web profiles about to be discarded are still used, and refreshed once in the background. """
+        self.processor.get_web_profile_id('US')
+
+        with mock.patch('ecommerce.extensions.payment.processors.paypal.time.time',
+                        return_value=time.time() + PAYPAL_WEB_PROFILE_REFRESH_AGE + 1):
+            for __ in range(2):
+                self.assertEqual(self.processor.get_web_profile_id('US'), 'test-profile-id')
+
+        mock_create_web_profile.assert_called_once_with('US')
+        mock_refresh.assert_called_once_with(PAYPAL_WEB_PROFILE_REFRESH_TASK, args=(self.site.id, 'US'))
+
+    @mock.patch.object(Paypal, 'create_temporary_web_profile', return_value=None)
+    def test_web_profile_not_created(self, mock_create_web_profile):
+        """ Verify web profiles that couldn't be created are not reused. """
+        for __ in range(2):
+            self.assertIsNone(self.processor.get_web_profile_id('US'))
+        self.assertEqual(mock_create_web_profile.call_count, 2)
+
     @ddt.unpack
     @ddt.data(
         ['zh', 'en', 'US'],
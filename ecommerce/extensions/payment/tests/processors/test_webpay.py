@@ -1,18 +1,21 @@
 import responses
 import requests
-from unittest.mock import patch
+from unittest.mock import PropertyMock, patch
 
 from django.test import override_settings
 from oscar.apps.payment.exceptions import GatewayError, TransactionDeclined
 from ecommerce.tests.testcases import TestCase
 from ecommerce.extensions.test.factories import create_order
 from ecommerce.extensions.payment.exceptions import PartialAuthorizationError
-from ecommerce.extensions.payment.processors.webpay import Webpay, WebpayTransactionDeclined, WebpayRefundRequired
+from ecommerce.extensions.payment.processors.webpay import Webpay, WebpayTransactionDeclined, WebpayRefundRequired, \
+    get_webpay_session
 from ecommerce.extensions.payment.tests.processors.mixins import PaymentProcessorTestCaseMixin
 from ecommerce.extensions.payment.tests.mixins import BoletaMixin, TransbankMixin
 from ecommerce.extensions.payment.models import UserBillingInfo, BoletaErrorMessage
 from ecommerce.extensions.payment.boleta import BoletaElectronicaException
 
+WEBPAY_MODULE = 'ecommerce.extensions.payment.processors.webpay'
+
 
 class WebpayTests(TransbankMixin, BoletaMixin, PaymentProcessorTestCaseMixin, TestCase):
     """Tests for the webpay payment processor."""
@@ -256,3 +259,47 @@ class WebpayTests(TransbankMixin, BoletaMixin, PaymentProcessorTestCaseMixin, Te
     def test_issue_credit_error(self):
         self.assertRaises(
             NotImplementedError, self.processor.issue_credit, None, None, None, 0, 'CLP')
+
+
+class WebpayClientTests(TransbankMixin, TestCase):
+    """Tests for the requests of the webpay payment processor to the Webpay module."""
+
+    def setUp(self):
+        super(WebpayClientTests, self).setUp()
+        configuration = patch.object(Webpay, 'configuration', new_callable=PropertyMock,
+                                     return_value={"api_url": "http://transbank:5000", "api_secret": "secret"})
+        configuration.start()
+        self.addCleanup(configuration.stop)
+        self.processor = Webpay(self.site)
+
+    def test_shared_sessions(self):
+        """ Verify the sessions are shared, and only idempotent requests retry errors of sent requests. """
+        self.assertIs(get_webpay_session(), get_webpay_session())
+        self.assertIsNot(get_webpay_session(), get_webpay_session(idempotent=True))
+        self.assertEqual(get_webpay_session().get_adapter('http://transbank:5000').max_retries.read, 0)
+        self.assertEqual(get_webpay_session(idempotent=True).get_adapter('http://transbank:5000').max_retries.read, 2)
+
+    @responses.activate
+    def test_latency_recorded(self):
+        """ Verify the latency and outcome of every request are recorded per operation. """
+        self.mock_transbank_status_response('INITIALIZED', 10, "EOL-100001", 0)
+
+        with patch(WEBPAY_MODULE + '.newrelic.agent.record_custom_metric') as mock_record, \
+                patch(WEBPAY_MODULE + '.monitoring_utils.set_custom_metric') as mock_set:
+            self.processor.get_transaction_data("token")
+
+        mock_record.assert_called_once()
+        self.assertEqual(mock_record.call_args[0][0], 'Custom/Webpay/transaction_status')
+        mock_set.assert_any_call('webpay_transaction_status_outcome', 200)
+        self.assertEqual(responses.calls[0].request.url, 'http://transbank:5000/transaction-status')
+
+    @responses.activate
+    def test_connection_error(self):
+        """ Verify unreachable Webpay modules are reported as gateway errors, and their latency still recorded. """
+        responses.add(responses.POST, 'http://transbank:5000/get-transaction',
+                      body=requests.exceptions.ConnectionError())
+
+        with patch(WEBPAY_MODULE + '.newrelic.agent.record_custom_metric') as mock_record:
+            self.assertRaises(GatewayError, self.processor.commit_transaction, "token")
+
+        self.assertEqual(mock_record.call_args[0][0], 'Custom/Webpay/get_transaction')
@@ -3,9 +3,11 @@ import requests
 
 from collections import namedtuple
 from django.test import override_settings
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE, TieredCache
+from mock import patch
 from django.urls import reverse
 from ecommerce.extensions.payment.boleta import authenticate_boleta_electronica, \
-    BoletaElectronicaException, BoletaSinFoliosException, make_paragraphs_200, \
+    BoletaClient, BoletaElectronicaException, BoletaSinFoliosException, make_paragraphs_200, \
     make_boleta_electronica, get_boleta_details, recover_boleta, raise_boleta_error, \
     get_boletas, recover_boleta
 from ecommerce.extensions.payment.models import UserBillingInfo, BoletaElectronica, BoletaErrorMessage
@@ -206,6 +208,73 @@ class BoletaTests(BoletaMixin, TestCase):
                 "Authorization": "Bearer " + auth["access_token"]
             }, "2020-03-01T00:00:00")
 
+    def count_auth_calls(self):
+        return len([call for call in responses.calls if call.request.url.endswith('/authorization-token')])
+
+    @responses.activate
+    def test_client_caches_token(self):
+        TieredCache.dangerous_clear_all_tiers()
+        self.mock_boleta_auth()
+        client = BoletaClient(self.BOLETA_SETTINGS)
+
+        self.assertEqual("test", client.get_auth(basket=self.basket)["access_token"])
+        DEFAULT_REQUEST_CACHE.clear()
+        self.assertEqual({"Authorization": "Bearer test"}, BoletaClient(self.BOLETA_SETTINGS).get_auth_headers())
+        self.assertEqual(1, self.count_auth_calls())
+
+        client.clear_auth()
+        client.get_auth()
+        self.assertEqual(2, self.count_auth_calls())
+
+    @responses.activate
+    def test_boleta_token_rejected(self):
+        """ Verify a rejected token is discarded, and the boleta is requested again with a new one. """
+        TieredCache.dangerous_clear_all_tiers()
+        self.mock_boleta_auth()
+        responses.add(
+            method=responses.POST,
+            url='https://ventas-test.uchile.cl/ventas-api-front/api/v1/ventas',
+            status=401
+        )
+        self.mock_boleta_creation()
+        self.mock_boleta_details(self.order.total_incl_tax)
+        self.make_billing_info_helper('0', 'CL', self.basket)
+
+        with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS):
+            auth = BoletaClient(self.BOLETA_SETTINGS).get_auth(basket=self.basket)
+            self.assertEqual("id", make_boleta_electronica(
+                self.basket, self.order, auth, configuration=self.BOLETA_SETTINGS)["id"])
+
+        self.assertEqual(2, self.count_auth_calls())
+        self.assertTrue(BoletaElectronica.objects.filter(basket=self.basket).exists())
+
+    @responses.activate
+    def test_client_refreshes_expired_token(self):
+        TieredCache.dangerous_clear_all_tiers()
+        self.mock_boleta_auth()
+        client = BoletaClient(self.BOLETA_SETTINGS)
+
+        with patch('ecommerce.extensions.payment.boleta.time.time', return_value=1000):
+            client.get_auth()
+        # The token expires in 299 seconds, and is refreshed 30 seconds before
+        with patch('ecommerce.extensions.payment.boleta.time.time', return_value=1000 + 268):
+            client.get_auth()
+        self.assertEqual(1, self.count_auth_calls())
+        with patch('ecommerce.extensions.payment.boleta.time.time', return_value=1000 + 270):
+            client.get_auth()
+        self.assertEqual(2, self.count_auth_calls())
+
+    @responses.activate
+    def test_client_auth_error(self):
+        TieredCache.dangerous_clear_all_tiers()
+        self.mock_boleta_auth_refused()
+        client = BoletaClient(self.BOLETA_SETTINGS)
+
+        self.assertRaises(BoletaElectronicaException, client.get_auth, basket=self.basket)
+        self.assertRaises(BoletaElectronicaException, client.get_auth, basket=self.basket)
+        self.assertEqual(2, self.count_auth_calls())
+        self.assertEqual(2, self.count_boleta_errors())
+
 
 class BoletaViewsTests(BoletaMixin, TestCase):
     def create_boleta(self):
@@ -0,0 +1,35 @@
+from ecommerce.extensions.payment.conversion import get_paypal_conversion, invalidate_paypal_conversion
+from ecommerce.extensions.payment.models import PaypalUSDConversion
+from ecommerce.tests.testcases import TestCase
+
+
+class PaypalConversionTests(TestCase):
+
+    def setUp(self):
+        super(PaypalConversionTests, self).setUp()
+        invalidate_paypal_conversion()
+
+    def test_no_conversion(self):
+        """ Verify an error is raised while no conversion rate is defined. """
+        with self.assertRaises(PaypalUSDConversion.DoesNotExist):
+            get_paypal_conversion()
+
+    def test_cached(self):
+        """ Verify the conversion rate is only loaded again once it changes. """
+        PaypalUSDConversion.objects.create(clp_to_usd=750)
+        self.assertEqual(get_paypal_conversion().clp_to_usd, 750)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_paypal_conversion().clp_to_usd, 750)
+
+        PaypalUSDConversion.objects.create(clp_to_usd=800)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_paypal_conversion().clp_to_usd, 800)
+
+    def test_deleted(self):
+        """ Verify a deleted conversion rate is no longer used. """
+        conversion = PaypalUSDConversion.objects.create(clp_to_usd=750)
+        get_paypal_conversion()
+        conversion.delete()
+
+        with self.assertRaises(PaypalUSDConversion.DoesNotExist):
+            get_paypal_conversion()
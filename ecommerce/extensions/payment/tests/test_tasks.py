@@ -0,0 +1,175 @@
+import datetime
+
+import mock
+import requests
+import responses
+from django.conf import settings
+from django.core import mail
+from django.test import override_settings
+from django.utils import timezone
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from ecommerce.celery_app import app
+from ecommerce.extensions.payment.models import BoletaElectronica, BoletaEmission, BoletaErrorMessage
+from ecommerce.extensions.payment.processors.paypal import PAYPAL_WEB_PROFILE_REFRESH_TASK, Paypal
+from ecommerce.extensions.payment.tasks import (
+    BOLETA_EMISSION_MAX_ATTEMPTS,
+    emit_boleta,
+    emit_queued_boleta,
+    enqueue_boleta_emission,
+    is_boleta_emission_halting,
+    refresh_paypal_web_profile
+)
+from ecommerce.extensions.payment.tests.mixins import BoletaMixin
+from ecommerce.extensions.test.factories import create_basket, create_order
+from ecommerce.tests.testcases import TestCase
+
+
+class BoletaEmissionTaskTests(BoletaMixin, TestCase):
+
+    def setUp(self):
+        self.basket = create_basket(price="10.0")
+        self.order = create_order(basket=self.basket)
+        self.make_billing_info_helper('0', 'CL', self.basket)
+
+    def enqueue(self):
+        with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS):
+            return enqueue_boleta_emission(self.order, "webpay")
+
+    def test_enqueue_disabled(self):
+        """ Verify nothing is queued if boletas are not emitted on payment. """
+        with override_settings(BOLETA_CONFIG=dict(self.BOLETA_SETTINGS, generate_on_payment=False)):
+            self.assertIsNone(enqueue_boleta_emission(self.order, "webpay"))
+        self.assertFalse(BoletaEmission.objects.exists())
+
+    def test_emission_halting(self):
+        with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS):
+            self.assertTrue(is_boleta_emission_halting())
+        with override_settings(BOLETA_CONFIG=dict(self.BOLETA_SETTINGS, halt_on_boleta_failure=False)):
+            self.assertFalse(is_boleta_emission_halting())
+        with override_settings(BOLETA_CONFIG=dict(self.BOLETA_SETTINGS, generate_on_payment=False)):
+            self.assertFalse(is_boleta_emission_halting())
+
+    def test_route(self):
+        """ Verify the task is routed to the queue consumed by the payment worker. """
+        self.assertEqual(app.amqp.router.route({}, emit_boleta.name)['queue'].name, settings.PAYMENT_QUEUE)
+
+    def test_enqueue_once(self):
+        """ Verify an order is queued once, and its task is only sent once the transaction is committed. """
+        with mock.patch('ecommerce.extensions.payment.tasks.emit_boleta.delay') as mock_delay, \
+                mock.patch('django.db.transaction.on_commit') as mock_on_commit:
+            emission = self.enqueue()
+            self.assertEqual(self.enqueue(), emission)
+
+            mock_delay.assert_not_called()
+            self.assertEqual(mock_on_commit.call_count, 1)
+            mock_on_commit.call_args[0][0]()
+        mock_delay.assert_called_once_with(self.order.number)
+        self.assertEqual(emission.status, BoletaEmission.PENDING)
+        self.assertEqual(emission.basket, self.basket)
+
+    @responses.activate
+    def test_emit(self):
+        """ Verify the queued boleta is emitted, and not emitted again. """
+        self.mock_boleta_auth()
+        self.mock_boleta_creation()
+        self.mock_boleta_details(self.order.total_incl_tax)
+        self.enqueue()
+
+        with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS):
+            emit_boleta.delay(self.order.number)
+            emission = emit_queued_boleta(self.order.number)
+
+        self.assertEqual(emission.status, BoletaEmission.EMITTED)
+        self.assertEqual(emission.attempts, 1)
+        self.assertEqual(BoletaElectronica.objects.filter(basket=self.basket).count(), 1)
+
+    def test_emit_already_emitted(self):
+        """ Verify orders whose boleta was emitted by other means are not emitted again. """
+        self.enqueue()
+        BoletaElectronica.objects.create(basket=self.basket, voucher_id="id", receipt_url="url")
+
+        with mock.patch('ecommerce.extensions.payment.tasks.make_boleta_electronica') as mock_make_boleta:
+            emission = emit_queued_boleta(self.order.number)
+
+        mock_make_boleta.assert_not_called()
+        self.assertEqual(emission.status, BoletaEmission.EMITTED)
+        self.assertEqual(emission.attempts, 0)
+
+    @responses.activate
+    def test_emit_retry(self):
+        """ Verify refused boletas are retried with a backoff, and marked failed after the last attempt. """
+        self.mock_boleta_auth()
+        self.mock_boleta_creation_500()
+        self.enqueue()
+
+        with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS):
+            emission = emit_queued_boleta(self.order.number)
+            self.assertEqual(emission.status, BoletaEmission.PENDING)
+            self.assertEqual(emission.attempts, 1)
+            self.assertGreater(emission.next_attempt_at, timezone.now() + datetime.timedelta(seconds=30))
+            self.assertEqual(len(mail.outbox), 0)
+
+            for __ in range(BOLETA_EMISSION_MAX_ATTEMPTS - 1):
+                emission = emit_queued_boleta(self.order.number)
+
+        self.assertEqual(emission.status, BoletaEmission.FAILED)
+        self.assertEqual(emission.attempts, BOLETA_EMISSION_MAX_ATTEMPTS)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(self.order.number, mail.outbox[0].body)
+        self.assertFalse(BoletaErrorMessage.objects.filter(order_number=self.order.number).exists())
+        self.assertFalse(BoletaElectronica.objects.exists())
+
+    def assert_status_on_connection_error(self, error, status):
+        self.enqueue()
+
+        with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS), \
+                mock.patch('ecommerce.extensions.payment.tasks.BoletaClient.get_auth'), \
+                mock.patch('ecommerce.extensions.payment.tasks.make_boleta_electronica', side_effect=error):
+            emission = emit_queued_boleta(self.order.number)
+
+        self.assertEqual(emission.status, status)
+
+    def test_emit_connection_refused(self):
+        """ Verify boletas whose request was never sent are retried. """
+        refused = NewConnectionError(None, "Failed to establish a new connection: Connection refused")
+        self.assert_status_on_connection_error(
+            requests.exceptions.ConnectionError(MaxRetryError(None, "/ventas", refused)), BoletaEmission.PENDING)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_emit_read_timeout(self):
+        """ Verify boletas whose request may have been received are not retried. """
+        self.assert_status_on_connection_error(requests.exceptions.ReadTimeout(), BoletaEmission.FAILED)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_emit_unexpected_error(self):
+        """ Verify boletas that may have been created are not retried. """
+        self.enqueue()
+
+        with override_settings(BOLETA_CONFIG=self.BOLETA_SETTINGS), \
+                mock.patch('ecommerce.extensions.payment.tasks.BoletaClient.get_auth'), \
+                mock.patch('ecommerce.extensions.payment.tasks.make_boleta_electronica', side_effect=KeyError):
+            emission = emit_queued_boleta(self.order.number)
+
+        self.assertEqual(emission.status, BoletaEmission.FAILED)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class RefreshPaypalWebProfileTaskTests(TestCase):
+
+    def test_name(self):
+        """ Verify the Paypal processor sends the task by its name. """
+        self.assertEqual(refresh_paypal_web_profile.name, PAYPAL_WEB_PROFILE_REFRESH_TASK)
+
+    def test_route(self):
+        """ Verify the task is routed to the queue consumed by the payment worker. """
+        self.assertEqual(
+            app.amqp.router.route({}, PAYPAL_WEB_PROFILE_REFRESH_TASK)['queue'].name, settings.PAYMENT_QUEUE)
+
+    def test_refresh(self):
+        """ Verify the task replaces the web profile reused by checkouts. """
+        processor = Paypal(self.site)
+        with mock.patch.object(Paypal, 'create_temporary_web_profile', side_effect=['old-id', 'new-id']):
+            processor.get_web_profile_id('US')
+            refresh_paypal_web_profile.delay(self.site.id, 'US')
+            self.assertEqual(processor.get_web_profile_id('US'), 'new-id')
@@ -15,6 +15,7 @@ from oscar.core.loading import get_class, get_model
 
 from ecommerce.core.url_utils import get_lms_url
 from ecommerce.extensions.payment.forms import PaymentForm
+from ecommerce.extensions.payment.tasks import enqueue_boleta_emission, is_boleta_emission_halting
 
 logger = logging.getLogger(__name__)
 
@@ -101,6 +102,23 @@ class BasePaymentSubmitView(View):
 
         return JsonResponse(data, status=400)
 
+class BoletaEmissionMixin:
+    """
+    Queue the boleta of every order placed with the payment processor,
+    in the same transaction that places the order.
+
+    Views that set emits_halting_boletas emit the boleta themselves when
+    BOLETA_CONFIG["halt_on_boleta_failure"] is set, so it is not queued.
+    """
+    emits_halting_boletas = False
+
+    def place_order(self, *args, **kwargs):
+        order = super(BoletaEmissionMixin, self).place_order(*args, **kwargs)
+        if not (self.emits_halting_boletas and is_boleta_emission_halting()):
+            enqueue_boleta_emission(order, self.payment_processor.NAME)
+        return order
+
+
 class EolAlertMixin:
     def send_simple_alert_to_eol(self, site, message, order_number=None, payed=False, user=None, processor="webpay"):
         if hasattr(settings, 'BOLETA_CONFIG') and (settings.BOLETA_CONFIG.get('enabled',False)):
@@ -23,7 +23,7 @@ from ecommerce.extensions.basket.utils import basket_add_organization_attribute
 from ecommerce.extensions.checkout.mixins import EdxOrderPlacementMixin
 from ecommerce.extensions.checkout.utils import get_receipt_page_url
 from ecommerce.extensions.payment.processors.paypal import Paypal
-from ecommerce.extensions.payment.views import EolAlertMixin
+from ecommerce.extensions.payment.views import BoletaEmissionMixin, EolAlertMixin
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +37,7 @@ OrderTotalCalculator = get_class('checkout.calculators', 'OrderTotalCalculator')
 PaymentProcessorResponse = get_model('payment', 'PaymentProcessorResponse')
 
 
-class PaypalPaymentExecutionView(EolAlertMixin, EdxOrderPlacementMixin, View):
+class PaypalPaymentExecutionView(EolAlertMixin, BoletaEmissionMixin, EdxOrderPlacementMixin, View):
     """Execute an approved PayPal payment and place an order for paid products as appropriate."""
 
     @property
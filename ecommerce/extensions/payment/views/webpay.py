@@ -15,7 +15,8 @@ from ecommerce.core.url_utils import get_lms_dashboard_url, get_lms_explore_cour
 from ecommerce.extensions.basket.utils import basket_add_organization_attribute
 from ecommerce.extensions.checkout.mixins import EdxOrderPlacementMixin
 from ecommerce.extensions.payment.processors.webpay import Webpay, WebpayAlreadyProcessed, WebpayTransactionDeclined, WebpayRefundRequired
-from ecommerce.extensions.payment.views import EolAlertMixin
+from ecommerce.extensions.payment.tasks import is_boleta_emission_halting
+from ecommerce.extensions.payment.views import BoletaEmissionMixin, EolAlertMixin
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +25,10 @@ PaymentProcessorResponse = get_model('payment', 'PaymentProcessorResponse')
 NoShippingRequired = get_class('shipping.methods', 'NoShippingRequired')
 OrderTotalCalculator = get_class('checkout.calculators', 'OrderTotalCalculator')
 
-class WebpayPaymentNotificationView(EolAlertMixin, EdxOrderPlacementMixin, View):
+class WebpayPaymentNotificationView(EolAlertMixin, BoletaEmissionMixin, EdxOrderPlacementMixin, View):
     """Process the Webpay notification of a completed transaction"""
+    emits_halting_boletas = True
+
     @property
     def payment_processor(self):
         return Webpay(self.request.site)
@@ -155,8 +158,9 @@ class WebpayPaymentNotificationView(EolAlertMixin, EdxOrderPlacementMixin, View)
             )
             self.handle_post_order(order)
 
-            # Order is created; then send email if enabled
-            self.payment_processor.boleta_emission(basket, order, logger)
+            if is_boleta_emission_halting():
+                # The boleta is not queued, a failed emission fails the payment
+                self.payment_processor.boleta_emission(basket, order, logger)
 
             return HttpResponseRedirect("{}?order_number={}".format(reverse('checkout:receipt'),order_number))
         except Exception as e:  # pylint: disable=broad-except
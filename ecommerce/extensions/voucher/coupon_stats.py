@@ -0,0 +1,128 @@
+"""
+Materialized statistics of the coupons listed by the enterprise coupon overview.
+
+The overview used to count the codes, uses and bounced assignments of every coupon it listed, and to loop over
+all of its vouchers to add up their unassigned slots, with several queries per coupon. These statistics are now
+stored in CouponStats rows, which are calculated the first time a coupon is listed and read together with the
+coupons afterwards.
+
+Saving or deleting a voucher, offer or offer assignment, or changing the vouchers of a coupon or the offers of a
+voucher, deletes the rows of the coupons they belong to (see ecommerce.extensions.voucher.signals), so that they
+are calculated again on the next read. Code that changes these models with bulk queries, which send no signals,
+must call ``invalidate_coupon_stats`` itself.
+"""
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.offer.constants import (
+    OFFER_ASSIGNMENT_EMAIL_BOUNCED,
+    OFFER_ASSIGNMENT_REVOKED,
+    OFFER_MAX_USES_DEFAULT,
+    OFFER_REDEEMED
+)
+
+CouponStats = get_model('voucher', 'CouponStats')
+OfferAssignment = get_model('offer', 'OfferAssignment')
+Voucher = get_model('voucher', 'Voucher')
+
+
+def _get_max_uses(voucher, voucher_count):
+    """ Return the maximum number of uses of the codes of a coupon (Maximum Coupon Usage). """
+    if voucher.usage == Voucher.SINGLE_USE:
+        max_uses_per_code = 1
+    elif voucher.best_offer.max_global_applications:
+        max_uses_per_code = voucher.best_offer.max_global_applications
+    else:
+        max_uses_per_code = OFFER_MAX_USES_DEFAULT
+    return max_uses_per_code * voucher_count
+
+
+def _get_num_unassigned(vouchers, enterprise_offer):
+    """ Return the number of slots of the vouchers still available for assignment. """
+    if not enterprise_offer:
+        return 0
+
+    assignments = OfferAssignment.objects.filter(code__in=vouchers.values('code')).exclude(
+        status__in=[OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]
+    ).values('code').annotate(num_assignments=Count('code')).order_by('code')
+    vouchers_num_assignments = {item['code']: item['num_assignments'] for item in assignments}
+
+    all_slots_available = 0
+    for voucher in vouchers.only('code', 'usage', 'num_orders').iterator():
+        voucher_slots_available = voucher.calculate_available_slots(
+            enterprise_offer.max_global_applications,
+            vouchers_num_assignments.get(voucher.code, 0)
+        )
+        if voucher_slots_available > 0:
+            all_slots_available += voucher_slots_available
+    return all_slots_available
+
+
+def calculate_coupon_stats(coupon):
+    """
+    Calculate and store the statistics of a coupon.
+
+    Args:
+        coupon (Product): Coupon product.
+
+    Returns:
+        CouponStats
+    """
+    vouchers = Voucher.objects.filter(coupon_vouchers__coupon=coupon)
+    voucher = vouchers.prefetch_related('offers__condition').first()
+    totals = vouchers.aggregate(num_codes=Count('id'), num_uses=Sum('num_orders'))
+    num_errors = OfferAssignment.objects.filter(
+        code__in=vouchers.values('code'), status=OFFER_ASSIGNMENT_EMAIL_BOUNCED
+    ).count()
+
+    stats, __ = CouponStats.objects.update_or_create(coupon=coupon, defaults={
+        'start_datetime': voucher.start_datetime,
+        'end_datetime': voucher.end_datetime,
+        'usage': voucher.usage,
+        'num_codes': totals['num_codes'],
+        'num_uses': totals['num_uses'] or 0,
+        'max_uses': _get_max_uses(voucher, totals['num_codes']),
+        'num_unassigned': _get_num_unassigned(vouchers, voucher.enterprise_offer),
+        'num_errors': num_errors,
+    })
+    return stats
+
+
+def get_coupon_stats(coupon):
+    """
+    Return the statistics of a coupon, calculating them if they are not stored.
+
+    Select the ``coupon_stats`` of the coupons to read the stored statistics of a list of coupons in one query.
+    """
+    try:
+        return coupon.coupon_stats
+    except CouponStats.DoesNotExist:
+        return calculate_coupon_stats(coupon)
+
+
+def _delete_coupon_stats(filters):
+    CouponStats.objects.filter(filters).delete()
+
+
+def invalidate_coupon_stats(coupon_ids=None, voucher_ids=None, codes=None, offer_ids=None):
+    """
+    Delete the statistics of the coupons with the given ids, or owning the given vouchers, codes or offers.
+
+    The statistics are deleted immediately, and again once the transaction is committed, so statistics
+    calculated by other processes from data read before the commit are not kept.
+    """
+    filters = Q()
+    if coupon_ids:
+        filters |= Q(coupon_id__in=coupon_ids)
+    if voucher_ids:
+        filters |= Q(coupon__coupon_vouchers__vouchers__in=voucher_ids)
+    if codes:
+        filters |= Q(coupon__coupon_vouchers__vouchers__code__in=codes)
+    if offer_ids:
+        filters |= Q(coupon__coupon_vouchers__vouchers__offers__in=offer_ids)
+    if not filters:
+        return
+
+    _delete_coupon_stats(filters)
+    transaction.on_commit(lambda: _delete_coupon_stats(filters))
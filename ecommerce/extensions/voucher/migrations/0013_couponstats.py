@@ -0,0 +1,31 @@
+# Generated by Django 2.2.17 on 2026-10-17 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0052_add_scholarship_coupon_category'),
+        ('voucher', '0012_voucher_is_public'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CouponStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_datetime', models.DateTimeField()),
+                ('end_datetime', models.DateTimeField()),
+                ('usage', models.CharField(max_length=128)),
+                ('num_codes', models.PositiveIntegerField()),
+                ('num_uses', models.PositiveIntegerField()),
+                ('max_uses', models.PositiveIntegerField()),
+                ('num_unassigned', models.PositiveIntegerField()),
+                ('num_errors', models.PositiveIntegerField()),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('coupon', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='coupon_stats', to='catalogue.Product')),
+            ],
+        ),
+    ]
@@ -33,6 +33,25 @@ class OrderLineVouchers(models.Model):
     vouchers = models.ManyToManyField('voucher.Voucher', related_name='order_line_vouchers')
 
 
+class CouponStats(models.Model):
+    """
+    Statistics of the vouchers of a coupon, shown in the enterprise coupon overview.
+
+    Rows are deleted when the vouchers, offers or assignments of their coupon change, and calculated
+    again the next time they are read (see ecommerce.extensions.voucher.coupon_stats).
+    """
+    coupon = models.OneToOneField('catalogue.Product', related_name='coupon_stats', on_delete=models.CASCADE)
+    start_datetime = models.DateTimeField()
+    end_datetime = models.DateTimeField()
+    usage = models.CharField(max_length=128)
+    num_codes = models.PositiveIntegerField()
+    num_uses = models.PositiveIntegerField()
+    max_uses = models.PositiveIntegerField()
+    num_unassigned = models.PositiveIntegerField()
+    num_errors = models.PositiveIntegerField()
+    modified = models.DateTimeField(auto_now=True)
+
+
 class Voucher(AbstractVoucher):
     SINGLE_USE, MULTI_USE, ONCE_PER_CUSTOMER, MULTI_USE_PER_CUSTOMER = (
         'Single use', 'Multi-use', 'Once per customer', 'Multi-use-per-Customer')
@@ -103,6 +122,14 @@ class Voucher(AbstractVoucher):
 
     @property
     def original_offer(self):
+        if 'offers' in getattr(self, '_prefetched_objects_cache', {}):
+            # Pick the offer from the prefetched offers instead of querying them again.
+            offers = self.offers.all()
+            for offer in offers:
+                if offer.condition.range_id is not None:
+                    return offer
+            return sorted(offers, key=lambda offer: offer.date_created)[0]
+
         try:
             return self.offers.filter(condition__range__isnull=False)[0]
         except (IndexError, ObjectDoesNotExist):
@@ -0,0 +1,62 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.voucher.coupon_stats import invalidate_coupon_stats
+
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+CouponVouchers = get_model('voucher', 'CouponVouchers')
+OfferAssignment = get_model('offer', 'OfferAssignment')
+Voucher = get_model('voucher', 'Voucher')
+
+
+@receiver(post_save, sender=Voucher, dispatch_uid='coupon_stats.voucher_saved')
+@receiver(pre_delete, sender=Voucher, dispatch_uid='coupon_stats.voucher_deleted')
+def invalidate_coupon_stats_on_voucher_change(instance, **_kwargs):
+    """
+    Invalidate the statistics of the coupon of a voucher whose dates, usage or number of orders changed.
+
+    Deleted vouchers are handled before they are deleted, while they still belong to their coupon.
+    """
+    invalidate_coupon_stats(voucher_ids=[instance.id])
+
+
+@receiver(post_save, sender=OfferAssignment, dispatch_uid='coupon_stats.offer_assignment_saved')
+@receiver(post_delete, sender=OfferAssignment, dispatch_uid='coupon_stats.offer_assignment_deleted')
+def invalidate_coupon_stats_on_assignment_change(instance, **_kwargs):
+    """ Invalidate the statistics of the coupon of an assigned code. """
+    invalidate_coupon_stats(codes=[instance.code])
+
+
+@receiver(post_save, sender=ConditionalOffer, dispatch_uid='coupon_stats.offer_saved')
+def invalidate_coupon_stats_on_offer_change(instance, **_kwargs):
+    """ Invalidate the statistics of the coupons whose vouchers have an offer, e.g. when its max uses change. """
+    invalidate_coupon_stats(offer_ids=[instance.id])
+
+
+@receiver(m2m_changed, sender=Voucher.offers.through, dispatch_uid='coupon_stats.voucher_offers_changed')
+def invalidate_coupon_stats_on_voucher_offers_change(instance, action, reverse, pk_set, **_kwargs):
+    """ Invalidate the statistics of the coupons whose vouchers had offers added or removed. """
+    if action in ('post_add', 'post_remove'):
+        invalidate_coupon_stats(voucher_ids=pk_set if reverse else [instance.pk])
+    elif action == 'pre_clear':
+        if reverse:
+            invalidate_coupon_stats(offer_ids=[instance.pk])
+        else:
+            invalidate_coupon_stats(voucher_ids=[instance.pk])
+
+
+@receiver(m2m_changed, sender=CouponVouchers.vouchers.through, dispatch_uid='coupon_stats.coupon_vouchers_changed')
+def invalidate_coupon_stats_on_coupon_vouchers_change(instance, action, reverse, pk_set, **_kwargs):
+    """ Invalidate the statistics of the coupons that had vouchers added or removed. """
+    if action in ('post_add', 'post_remove'):
+        if reverse:
+            coupon_ids = CouponVouchers.objects.filter(pk__in=pk_set).values_list('coupon_id', flat=True)
+        else:
+            coupon_ids = [instance.coupon_id]
+        invalidate_coupon_stats(coupon_ids=list(coupon_ids))
+    elif action == 'pre_clear':
+        if reverse:
+            invalidate_coupon_stats(voucher_ids=[instance.pk])
+        else:
+            invalidate_coupon_stats(coupon_ids=[instance.coupon_id])
@@ -6,8 +6,9 @@ import uuid
 import ddt
 import httpretty
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils.translation import ugettext_lazy as _
 from factory.fuzzy import FuzzyText
 from oscar.templatetags.currency_filters import currency
@@ -33,10 +34,13 @@ from ecommerce.extensions.fulfillment.status import LINE
 from ecommerce.extensions.offer.models import OFFER_PRIORITY_VOUCHER
 from ecommerce.extensions.test.factories import create_order, prepare_voucher
 from ecommerce.extensions.voucher.utils import (
+    _generate_code_strings,
     create_vouchers,
     generate_coupon_report,
+    generate_offer_name,
     get_voucher_and_products_from_code,
     get_voucher_discount_info,
+    stream_coupon_report,
     update_voucher_offer
 )
 from ecommerce.tests.factories import UserFactory
@@ -46,6 +50,7 @@ from ecommerce.tests.testcases import TestCase
 Basket = get_model('basket', 'Basket')
 Benefit = get_model('offer', 'Benefit')
 Catalog = get_model('catalogue', 'Catalog')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
 CouponVouchers = get_model('voucher', 'CouponVouchers')
 Order = get_model('order', 'Order')
 Product = get_model('catalogue', 'Product')
@@ -298,6 +303,78 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
         with self.assertRaises(ValueError):
             create_vouchers(**self.data)
 
+    @override_settings(VOUCHER_BULK_CREATE_BATCH_SIZE=4)
+    def test_create_multi_use_vouchers_in_bulk(self):
+        """
+        Test that the vouchers of a multi-use coupon are created in batches, each with its own offer
+        sharing the condition and benefit of the others.
+        """
+        self.data.update({
+            'max_uses': 2,
+            'quantity': 10,
+            'voucher_type': Voucher.MULTI_USE,
+        })
+        vouchers = create_vouchers(**self.data)
+
+        self.assertEqual(len(vouchers), 10)
+        self.assertEqual(len({voucher.code for voucher in vouchers}), 10)
+        self.assertEqual(Voucher.objects.filter(id__in=[voucher.id for voucher in vouchers]).count(), 10)
+
+        offers = [voucher.offers.get() for voucher in vouchers]
+        self.assertEqual(len({offer.id for offer in offers}), 10)
+        self.assertEqual(len({offer.slug for offer in offers}), 10)
+        self.assertEqual({offer.condition_id for offer in offers}, {offers[0].condition_id})
+        self.assertEqual({offer.benefit_id for offer in offers}, {offers[0].benefit_id})
+        for num, offer in enumerate(offers):
+            self.assertEqual(offer.name, generate_offer_name(self.coupon.id, Benefit.PERCENTAGE, 100.00, num))
+            self.assertEqual(offer.max_global_applications, 2)
+            self.assertTrue(offer.is_open)
+            self.assertEqual(offer.history.count(), 1)
+
+    def test_create_multi_use_vouchers_existing_offers(self):
+        """ Test that existing offers are updated, and reopened when their max uses are raised. """
+        self.data.update({
+            'max_uses': 1,
+            'quantity': 3,
+            'voucher_type': Voucher.MULTI_USE,
+        })
+        create_vouchers(**self.data)
+        offer_names = [generate_offer_name(self.coupon.id, Benefit.PERCENTAGE, 100.00, num) for num in range(3)]
+        existing_offer = ConditionalOffer.objects.get(name=offer_names[1])
+        existing_offer.record_usage({'freq': 1, 'discount': 10})
+        self.assertEqual(existing_offer.status, ConditionalOffer.CONSUMED)
+
+        self.data['max_uses'] = 2
+        vouchers = create_vouchers(**self.data)
+
+        offer = vouchers[1].offers.get()
+        self.assertEqual(offer, existing_offer)
+        self.assertEqual(offer.max_global_applications, 2)
+        self.assertTrue(offer.is_open)
+        self.assertEqual(offer.history.count(), 3)
+
+    def test_create_multi_use_vouchers_query_count(self):
+        """ Test that the number of queries made to create vouchers does not grow with the number of vouchers. """
+        self.data['voucher_type'] = Voucher.MULTI_USE
+        num_queries = []
+        for benefit_value, quantity in ((15.00, 2), (25.00, 20)):
+            self.data.update({'benefit_value': benefit_value, 'quantity': quantity})
+            with CaptureQueriesContext(connection) as queries:
+                create_vouchers(**self.data)
+            num_queries.append(len(queries))
+
+        self.assertEqual(num_queries[0], num_queries[1])
+
+    @override_settings(VOUCHER_CODE_LENGTH=VOUCHER_CODE_LENGTH)
+    def test_generate_code_strings(self):
+        """ Test that generated codes are unique and skip the codes of existing vouchers. """
+        for code in 'BCDFGHJKL':
+            VoucherFactory(code=code)
+
+        codes = _generate_code_strings(VOUCHER_CODE_LENGTH, 20)
+        self.assertEqual(len(set(codes)), 20)
+        self.assertFalse(set(codes) & set('BCDFGHJKL'))
+
     def test_create_discount_coupon(self):
         """
         Test discount voucher creation with specified code
@@ -644,6 +721,33 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
         self.assertEqual(rows[2]['Redeemed By Username'], self.user.username)
         self.assertEqual(rows[3]['Redemption Count'], 0)
 
+    def test_coupon_report_query_count(self):
+        """ Verify the number of queries made to generate the report does not grow with the number of vouchers. """
+        num_queries = []
+        for quantity in (2, 6):
+            coupon = self.create_coupon(
+                title='Test report {}'.format(quantity), catalog=self.catalog, quantity=quantity
+            )
+            for index, voucher in enumerate(coupon.attr.coupon_vouchers.vouchers.all()):
+                self.use_voucher('TEST-{}-{}'.format(quantity, index), voucher, self.user)
+
+            with CaptureQueriesContext(connection) as queries:
+                __, rows = stream_coupon_report([coupon.attr.coupon_vouchers])
+                rows = list(rows)
+            num_queries.append(len(queries))
+            self.assertEqual(len(rows), 1 + quantity * 2)
+
+        self.assertEqual(num_queries[0], num_queries[1])
+
+    @override_settings(COUPON_REPORT_CHUNK_SIZE=2)
+    def test_coupon_report_chunks(self):
+        """ Verify the vouchers of the report are loaded in chunks, in order. """
+        coupon = self.create_coupon(title='Test chunks', catalog=self.catalog, quantity=5)
+        vouchers = coupon.attr.coupon_vouchers.vouchers.order_by('id')
+
+        __, rows = stream_coupon_report([coupon.attr.coupon_vouchers])
+        self.assertEqual([row['Code'] for row in list(rows)[1:]], [voucher.code for voucher in vouchers])
+
     def test_generate_coupon_report_for_used_query_coupon(self):
         """Test that used query coupon voucher reports which course was it used for."""
         catalog_query = '*:*'
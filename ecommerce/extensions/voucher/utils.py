@@ -7,15 +7,19 @@ import hashlib
 import logging
 import uuid
 from decimal import Decimal, DecimalException
+from itertools import chain
 
 import dateutil.parser
 import pytz
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
 from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
 from edx_django_utils.cache import TieredCache
 from opaque_keys.edx.keys import CourseKey
 from oscar.core.loading import get_model
+from oscar.core.utils import slugify
 from oscar.templatetags.currency_filters import currency
 
 from ecommerce.core.url_utils import get_ecommerce_url
@@ -247,16 +251,83 @@ def _get_redemption_course_ids(voucher_application):
     return redemption_course_ids
 
 
-def generate_coupon_report(coupon_vouchers):
+def _get_coupon_report_vouchers(coupon_voucher):
     """
-    Generate coupon report data
+    Yield the vouchers of a coupon in chunks of COUPON_REPORT_CHUNK_SIZE, paginated by id.
+
+    The offers and the applications of the vouchers, with the orders, lines and users needed by the report,
+    are prefetched for every chunk, so the number of queries does not grow with the number of vouchers.
+    """
+    vouchers = coupon_voucher.vouchers.order_by('id').prefetch_related(
+        Prefetch('offers', queryset=ConditionalOffer.objects.select_related('condition', 'benefit')),
+        Prefetch(
+            'applications',
+            queryset=VoucherApplication.objects.select_related('user', 'order').prefetch_related(
+                'order__lines__product__product_class',
+                'order__lines__product__parent__product_class',
+            )
+        ),
+    )
+
+    last_id = 0
+    while True:
+        chunk = list(vouchers.filter(id__gt=last_id)[:settings.COUPON_REPORT_CHUNK_SIZE])
+        if not chunk:
+            return
+        yield from chunk
+        last_id = chunk[-1].id
+
+
+def _generate_coupon_report_rows(coupon_vouchers, header_row):
+    for coupon_voucher, coupon_row in coupon_vouchers:
+        yield coupon_row
+
+        for voucher in _get_coupon_report_vouchers(coupon_voucher):
+            row = _get_voucher_info_for_coupon_report(voucher)
+
+            for item in (_('Order Number'), _('Redeemed By Username'),):
+                row[item] = ''
+
+            yield row
+
+            if voucher.num_orders > 0:
+                for application in voucher.applications.all():
+                    redemption_course_ids = _get_redemption_course_ids(application)
+                    redemption_user_username = application.user.username
+
+                    new_row = row.copy()
+                    _add_redemption_course_ids(new_row, header_row, redemption_course_ids)
+                    new_row.update({
+                        _('Status'): _('Redeemed'),
+                        _('Order Number'): application.order.number,
+                        _('Redeemed By Username'): redemption_user_username,
+                        _('Maximum Coupon Usage'): 1,
+                        _('Redemption Count'): 1,
+                    })
+                    yield new_row
+
+
+def _get_coupon_report_row(coupon_voucher):
+    coupon = coupon_voucher.coupon
+    coupon_row = _get_info_for_coupon_report(coupon, coupon_voucher.vouchers.first())
+    coupon_row[_('Client')] = Invoice.objects.get(order__lines__product=coupon).business_client.name
+    return coupon_voucher, coupon_row
+
+
+def stream_coupon_report(coupon_vouchers):
+    """
+    Generate coupon report data, one row at a time.
+
+    The first row of the report is generated before returning, so that errors in the coupon data are raised
+    by this function. The rest of the rows are generated while the returned iterator is consumed, and only
+    one chunk of vouchers is kept in memory at a time.
 
     Args:
         coupon_vouchers (List[CouponVouchers]): List of coupon_vouchers the report should be generated for
 
     Returns:
         List[str]
-        List[dict]
+        Iterator[dict]
     """
 
     field_names = [
@@ -288,48 +359,17 @@ def generate_coupon_report(coupon_vouchers):
         _('Coupon Expiry Date'),
         _('Email Domains'),
     ]
-    rows = []
 
-    for coupon_voucher in coupon_vouchers:
-        coupon = coupon_voucher.coupon
-        client = Invoice.objects.get(order__lines__product=coupon).business_client.name
-        rows.append(_get_info_for_coupon_report(coupon, coupon_voucher.vouchers.first()))
-        rows[0][_('Client')] = client
-
-        for voucher in coupon_voucher.vouchers.all().prefetch_related('offers'):
-            row = _get_voucher_info_for_coupon_report(voucher)
-
-            for item in (_('Order Number'), _('Redeemed By Username'),):
-                row[item] = ''
+    coupon_vouchers = iter(coupon_vouchers)
+    first_coupon_voucher, header_row = _get_coupon_report_row(next(coupon_vouchers))
 
-            rows.append(row)
-
-            if voucher.num_orders > 0:
-                voucher_applications = VoucherApplication.objects.filter(
-                    voucher=voucher).prefetch_related('user', 'order__lines')
-
-                for application in voucher_applications:
-                    redemption_course_ids = _get_redemption_course_ids(application)
-                    redemption_user_username = application.user.username
-
-                    new_row = row.copy()
-                    _add_redemption_course_ids(new_row, rows[0], redemption_course_ids)
-                    new_row.update({
-                        _('Status'): _('Redeemed'),
-                        _('Order Number'): application.order.number,
-                        _('Redeemed By Username'): redemption_user_username,
-                        _('Maximum Coupon Usage'): 1,
-                        _('Redemption Count'): 1,
-                    })
-                    rows.append(new_row)
-
-    if _('Program UUID') in rows[0]:
+    if _('Program UUID') in header_row:
         field_names.remove(_('Course ID'))
         field_names.remove(_('Organization'))
         field_names.remove(_('Catalog Query'))
         field_names.remove(_('Course Seat Types'))
         field_names.remove(_('Redeemed For Course ID'))
-    elif _('Catalog Query') in rows[0]:
+    elif _('Catalog Query') in header_row:
         field_names.remove(_('Course ID'))
         field_names.remove(_('Organization'))
         field_names.remove(_('Program UUID'))
@@ -340,7 +380,26 @@ def generate_coupon_report(coupon_vouchers):
         field_names.remove(_('Redeemed For Course IDs'))
         field_names.remove(_('Program UUID'))
 
-    return field_names, rows
+    coupon_rows = chain(
+        [(first_coupon_voucher, header_row)],
+        (_get_coupon_report_row(coupon_voucher) for coupon_voucher in coupon_vouchers),
+    )
+    return field_names, _generate_coupon_report_rows(coupon_rows, header_row)
+
+
+def generate_coupon_report(coupon_vouchers):
+    """
+    Generate coupon report data
+
+    Args:
+        coupon_vouchers (List[CouponVouchers]): List of coupon_vouchers the report should be generated for
+
+    Returns:
+        List[str]
+        List[dict]
+    """
+    field_names, rows = stream_coupon_report(coupon_vouchers)
+    return field_names, list(rows)
 
 
 def generate_offer_name(coupon_id, benefit_type, benefit_value, offer_number=None, is_enterprise=False):
@@ -501,16 +560,55 @@ def _generate_code_string(length):
     Returns:
         str
     """
+    return _generate_code_strings(length, 1)[0]
+
+
+def _generate_code_strings(length, count):
+    """
+    Create unique strings of random characters of specified length, not used by any existing voucher.
+
+    Codes are generated in memory and checked against the existing vouchers with a single query per batch.
+    Codes that are already in use are discarded and generated again.
+
+    Args:
+        length (int): Defines the length of randomly generated strings.
+        count (int): Number of strings to generate.
+
+    Raises:
+        ValueError raised if length is less than one.
+
+    Returns:
+        List[str]
+    """
     if length < 1:
         raise ValueError("Voucher code length must be a positive number.")
 
-    h = hashlib.sha256()
-    h.update(uuid.uuid4().bytes)
-    voucher_code = base64.b32encode(h.digest())[0:length].decode('utf-8')
-    if Voucher.objects.filter(code__iexact=voucher_code).exists():
-        return _generate_code_string(length)
+    codes = []
+    generated_codes = set()
+    while len(codes) < count:
+        batch = []
+        while len(batch) < min(count - len(codes), settings.VOUCHER_BULK_CREATE_BATCH_SIZE):
+            h = hashlib.sha256()
+            h.update(uuid.uuid4().bytes)
+            voucher_code = base64.b32encode(h.digest())[0:length].decode('utf-8')
+            if voucher_code not in generated_codes:
+                generated_codes.add(voucher_code)
+                batch.append(voucher_code)
+
+        existing_codes = set(Voucher.objects.filter(code__in=batch).values_list('code', flat=True))
+        codes.extend(voucher_code for voucher_code in batch if voucher_code not in existing_codes)
+
+    return codes
+
+
+def _parse_voucher_datetimes(start_datetime, end_datetime):
+    if not isinstance(start_datetime, datetime.datetime):
+        start_datetime = dateutil.parser.parse(start_datetime)
+
+    if not isinstance(end_datetime, datetime.datetime):
+        end_datetime = dateutil.parser.parse(end_datetime)
 
-    return voucher_code
+    return start_datetime, end_datetime
 
 
 def create_new_voucher(code, end_datetime, name, start_datetime, voucher_type):
@@ -531,11 +629,7 @@ def create_new_voucher(code, end_datetime, name, start_datetime, voucher_type):
         Voucher
     """
     voucher_code = code or _generate_code_string(settings.VOUCHER_CODE_LENGTH)
-    if not isinstance(start_datetime, datetime.datetime):
-        start_datetime = dateutil.parser.parse(start_datetime)
-
-    if not isinstance(end_datetime, datetime.datetime):
-        end_datetime = dateutil.parser.parse(end_datetime)
+    start_datetime, end_datetime = _parse_voucher_datetimes(start_datetime, end_datetime)
 
     voucher = Voucher.objects.create(
         name=name[:128],
@@ -548,6 +642,118 @@ def create_new_voucher(code, end_datetime, name, start_datetime, voucher_type):
     return voucher
 
 
+def create_new_vouchers(end_datetime, name, quantity, start_datetime, voucher_type):
+    """
+    Creates vouchers with randomly generated codes.
+
+    Vouchers are inserted in batches of VOUCHER_BULK_CREATE_BATCH_SIZE, and the progress is logged
+    after every batch.
+
+    Args:
+        end_datetime (datetime): Voucher end date.
+        name (str): Voucher name.
+        quantity (int): Number of vouchers to be created.
+        start_datetime (datetime): Voucher start date.
+        voucher_type (str): Voucher usage.
+
+    Returns:
+        List[Voucher]
+    """
+    start_datetime, end_datetime = _parse_voucher_datetimes(start_datetime, end_datetime)
+    codes = _generate_code_strings(settings.VOUCHER_CODE_LENGTH, quantity)
+
+    vouchers = []
+    batch_size = settings.VOUCHER_BULK_CREATE_BATCH_SIZE
+    for index in range(0, quantity, batch_size):
+        batch_codes = codes[index:index + batch_size]
+        batch = [
+            Voucher(
+                name=name[:128],
+                code=voucher_code,
+                usage=voucher_type,
+                start_datetime=start_datetime,
+                end_datetime=end_datetime,
+            )
+            for voucher_code in batch_codes
+        ]
+        for voucher in batch:
+            voucher.clean()
+        Voucher.objects.bulk_create(batch)
+
+        # Primary keys are not set by bulk_create on every database, so read them back.
+        voucher_ids = dict(Voucher.objects.filter(code__in=batch_codes).values_list('code', 'id'))
+        for voucher in batch:
+            voucher.id = voucher_ids[voucher.code]
+        vouchers.extend(batch)
+        logger.info('Created [%d] of [%d] vouchers [%s].', len(vouchers), quantity, name)
+
+    return vouchers
+
+
+def create_offer_copies(offer, offer_names):
+    """
+    Return offers with the given names which share the condition, benefit and settings of the given offer.
+
+    Offers that already exist are rare, and are saved one by one so that their status is recomputed, e.g. when
+    their max_global_applications are raised, and their history and signals are recorded. The rest are
+    inserted, together with their history records, in batches of VOUCHER_BULK_CREATE_BATCH_SIZE.
+
+    Args:
+        offer (ConditionalOffer): Offer to copy.
+        offer_names (List[str]): Names of the offers.
+
+    Returns:
+        List[ConditionalOffer]
+    """
+    offer_fields = {
+        'offer_type': offer.offer_type,
+        'condition': offer.condition,
+        'benefit': offer.benefit,
+        'max_global_applications': offer.max_global_applications,
+        'email_domains': offer.email_domains,
+        'site': offer.site,
+        'partner': offer.partner,
+        'priority': offer.priority,
+    }
+    batch_size = settings.VOUCHER_BULK_CREATE_BATCH_SIZE
+
+    offers = []
+    for index in range(0, len(offer_names), batch_size):
+        batch_names = offer_names[index:index + batch_size]
+        existing_names = set()
+        for existing_offer in ConditionalOffer.objects.filter(name__in=batch_names):
+            for field, value in offer_fields.items():
+                setattr(existing_offer, field, value)
+            existing_offer.save()
+            existing_names.add(existing_offer.name)
+
+        new_offers = [
+            ConditionalOffer(name=offer_name, **offer_fields)
+            for offer_name in batch_names if offer_name not in existing_names
+        ]
+        for new_offer in new_offers:
+            new_offer.clean()
+            new_offer.status = ConditionalOffer.OPEN if new_offer.get_max_applications() else ConditionalOffer.CONSUMED
+            new_offer.slug = slugify(new_offer.name)[:128].strip('-')
+        # Slugs already in use are left empty, so that the slug field picks the next available one.
+        used_slugs = set(ConditionalOffer.objects.filter(
+            slug__in=[new_offer.slug for new_offer in new_offers]
+        ).values_list('slug', flat=True))
+        for new_offer in new_offers:
+            if new_offer.slug in used_slugs:
+                new_offer.slug = ''
+        ConditionalOffer.objects.bulk_create(new_offers)
+
+        # Primary keys are not set by bulk_create on every database, so read the offers back.
+        created_offers = ConditionalOffer.objects.in_bulk(batch_names, field_name='name')
+        if new_offers:
+            ConditionalOffer.history.bulk_history_create([created_offers[new_offer.name] for new_offer in new_offers])
+        offers.extend(created_offers[offer_name] for offer_name in batch_names)
+        logger.info('Created [%d] of [%d] offers [%s].', len(offers), len(offer_names), offer.name)
+
+    return offers
+
+
 def create_vouchers_and_attach_offers(
         code,
         end_datetime,
@@ -576,31 +782,44 @@ def create_vouchers_and_attach_offers(
     Returns:
         List[Voucher]
     """
-    vouchers = []
-    voucher_offers = []
-    enterprise_voucher_offers = []
-    for i in range(quantity):
-        voucher = create_new_voucher(
-            end_datetime=end_datetime,
-            start_datetime=start_datetime,
-            voucher_type=voucher_type,
-            code=code,
-            name=name
-        )
-        voucher_offers.append(
-            VoucherOffer(voucher=voucher, conditionaloffer=offers[i] if len(offers) > 1 else offers[0])
-        )
-        if enterprise_customer and enterprise_offers:
-            enterprise_voucher_offers.append(
-                VoucherOffer(
-                    voucher=voucher,
-                    conditionaloffer=enterprise_offers[i] if len(enterprise_offers) > 1 else enterprise_offers[0]
+    with transaction.atomic():
+        if code:
+            vouchers = [
+                create_new_voucher(
+                    end_datetime=end_datetime,
+                    start_datetime=start_datetime,
+                    voucher_type=voucher_type,
+                    code=code,
+                    name=name
                 )
+                for __ in range(quantity)
+            ]
+        else:
+            vouchers = create_new_vouchers(
+                end_datetime=end_datetime,
+                name=name,
+                quantity=quantity,
+                start_datetime=start_datetime,
+                voucher_type=voucher_type
+            )
+
+        voucher_offers = []
+        enterprise_voucher_offers = []
+        for i, voucher in enumerate(vouchers):
+            voucher_offers.append(
+                VoucherOffer(voucher=voucher, conditionaloffer=offers[i] if len(offers) > 1 else offers[0])
             )
-        vouchers.append(voucher)
+            if enterprise_customer and enterprise_offers:
+                enterprise_voucher_offers.append(
+                    VoucherOffer(
+                        voucher=voucher,
+                        conditionaloffer=enterprise_offers[i] if len(enterprise_offers) > 1 else enterprise_offers[0]
+                    )
+                )
 
-    VoucherOffer.objects.bulk_create(voucher_offers)
-    VoucherOffer.objects.bulk_create(enterprise_voucher_offers)
+        batch_size = settings.VOUCHER_BULK_CREATE_BATCH_SIZE
+        VoucherOffer.objects.bulk_create(voucher_offers, batch_size=batch_size)
+        VoucherOffer.objects.bulk_create(enterprise_voucher_offers, batch_size=batch_size)
     return vouchers
 
 
@@ -652,6 +871,7 @@ def validate_voucher_fields(
             )
 
 
+@transaction.atomic
 def create_enterprise_vouchers(
         voucher_type,
         quantity,
@@ -680,22 +900,23 @@ def create_enterprise_vouchers(
 
     voucher_types = (Voucher.MULTI_USE, Voucher.ONCE_PER_CUSTOMER, Voucher.MULTI_USE_PER_CUSTOMER)
 
-    offers = []
     quantity = int(quantity)
     num_of_offers = quantity if voucher_type in voucher_types else 1
-    for num in range(num_of_offers):
-        offer_name = generate_offer_name(coupon_id, benefit_type, benefit_value, num, is_enterprise=True)
-        offer = get_or_create_enterprise_offer(
-            benefit_type=benefit_type,
-            benefit_value=benefit_value,
-            enterprise_customer=enterprise_customer,
-            enterprise_customer_catalog=enterprise_customer_catalog,
-            max_uses=max_uses,
-            offer_name=offer_name,
-            email_domains=email_domains,
-            site=site
-        )
-        offers.append(offer)
+    offer = get_or_create_enterprise_offer(
+        benefit_type=benefit_type,
+        benefit_value=benefit_value,
+        enterprise_customer=enterprise_customer,
+        enterprise_customer_catalog=enterprise_customer_catalog,
+        max_uses=max_uses,
+        offer_name=generate_offer_name(coupon_id, benefit_type, benefit_value, is_enterprise=True),
+        email_domains=email_domains,
+        site=site
+    )
+    # The offers of the other vouchers only differ in their names, so they are created in bulk.
+    offers = [offer] + create_offer_copies(offer, [
+        generate_offer_name(coupon_id, benefit_type, benefit_value, num, is_enterprise=True)
+        for num in range(1, num_of_offers)
+    ])
 
     return create_vouchers_and_attach_offers(
         code,
@@ -710,6 +931,7 @@ def create_enterprise_vouchers(
     )
 
 
+@transaction.atomic
 def create_vouchers(
         benefit_type,
         benefit_value,
@@ -762,7 +984,6 @@ def create_vouchers(
         List[Voucher]
     """
     logger.info("Creating [%d] vouchers product [%s]", quantity, coupon.id)
-    offers = []
     enterprise_offers = []
 
     # Validation
@@ -806,36 +1027,40 @@ def create_vouchers(
     # mean all vouchers will have their usage decreased by one, hence each voucher needs
     # its own offer to keep track of its own usages without interfering with others.
     num_of_offers = quantity if voucher_type in (Voucher.MULTI_USE, Voucher.ONCE_PER_CUSTOMER) else 1
-    for num in range(num_of_offers):
-        offer_name = generate_offer_name(coupon.id, benefit_type, benefit_value, num)
-        offer = _get_or_create_offer(
-            product_range=product_range,
+    offer = _get_or_create_offer(
+        product_range=product_range,
+        benefit_type=benefit_type,
+        benefit_value=benefit_value,
+        max_uses=max_uses,
+        offer_name=generate_offer_name(coupon.id, benefit_type, benefit_value),
+        email_domains=email_domains,
+        program_uuid=program_uuid,
+        site=site
+    )
+    # The offers of the other vouchers only differ in their names, so they are created in bulk.
+    offer_names = [generate_offer_name(coupon.id, benefit_type, benefit_value, num) for num in range(1, num_of_offers)]
+    if program_uuid:
+        offer_names = ['{}-{}'.format(offer_name, offer.benefit.name) for offer_name in offer_names]
+    offers = [offer] + create_offer_copies(offer, offer_names)
+
+    # This is a temporary measure to create enterprise conditional offers ahead of updating the Coupon creation
+    # and redemption logic to use enterprise conditional offers when appropriate.
+    # This and the surrounding code will be refactored at that point.
+    if enterprise_customer:
+        enterprise_offer = get_or_create_enterprise_offer(
             benefit_type=benefit_type,
             benefit_value=benefit_value,
+            enterprise_customer=enterprise_customer,
+            enterprise_customer_catalog=enterprise_customer_catalog,
             max_uses=max_uses,
-            offer_name=offer_name,
+            offer_name=generate_offer_name(coupon.id, benefit_type, benefit_value, is_enterprise=True),
             email_domains=email_domains,
-            program_uuid=program_uuid,
             site=site
         )
-        offers.append(offer)
-
-        # This is a temporary measure to create enterprise conditional offers ahead of updating the Coupon creation
-        # and redemption logic to use enterprise conditional offers when appropriate.
-        # This and the surrounding code will be refactored at that point.
-        if enterprise_customer:
-            offer_name = generate_offer_name(coupon.id, benefit_type, benefit_value, num, is_enterprise=True)
-            enterprise_offer = get_or_create_enterprise_offer(
-                benefit_type=benefit_type,
-                benefit_value=benefit_value,
-                enterprise_customer=enterprise_customer,
-                enterprise_customer_catalog=enterprise_customer_catalog,
-                max_uses=max_uses,
-                offer_name=offer_name,
-                email_domains=email_domains,
-                site=site
-            )
-            enterprise_offers.append(enterprise_offer)
+        enterprise_offers = [enterprise_offer] + create_offer_copies(enterprise_offer, [
+            generate_offer_name(coupon.id, benefit_type, benefit_value, num, is_enterprise=True)
+            for num in range(1, num_of_offers)
+        ])
 
     return create_vouchers_and_attach_offers(
         code,
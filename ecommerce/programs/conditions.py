@@ -4,7 +4,7 @@ import logging
 import operator
 
 from django.conf import settings
-from edx_django_utils.cache import TieredCache
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE, TieredCache
 from oscar.apps.offer import utils as oscar_utils
 from oscar.core.loading import get_model
 from requests.exceptions import ConnectionError as ReqConnectionError
@@ -14,6 +14,7 @@ from slumber.exceptions import HttpNotFoundError, SlumberBaseException
 from ecommerce.core.utils import deprecated_traverse_pagination, get_cache_key
 from ecommerce.extensions.offer.decorators import check_condition_applicability
 from ecommerce.extensions.offer.mixins import SingleItemConsumptionConditionMixin
+from ecommerce.extensions.offer.prefetch import RemoteLookup
 from ecommerce.programs.utils import get_program
 
 Condition = get_model('offer', 'Condition')
@@ -79,6 +80,17 @@ class ProgramCourseRunSeatsCondition(SingleItemConsumptionConditionMixin, Condit
 
         site_configuration = basket.site.siteconfiguration
         if site_configuration.enable_partial_program:
+            # Entitlements may span several pages, so keep the traversed data for the rest of the request.
+            cache_key = get_cache_key(
+                site_domain=basket.site.domain,
+                resource='program_condition.ownership',
+                username=basket.owner and basket.owner.username,
+                retrieve_entitlements=retrieve_entitlements,
+            )
+            ownership_cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(cache_key)
+            if ownership_cached_response.is_found:
+                return ownership_cached_response.value
+
             enrollments = self._get_lms_resource(
                 basket, 'enrollments', site_configuration.enrollment_api_client.enrollment)
             if retrieve_entitlements:
@@ -90,6 +102,7 @@ class ProgramCourseRunSeatsCondition(SingleItemConsumptionConditionMixin, Condit
                         response, site_configuration.entitlement_api_client.entitlements)
                 else:
                     entitlements = response
+            DEFAULT_REQUEST_CACHE.set(cache_key, (enrollments, entitlements))
         return enrollments, entitlements
 
     def _has_entitlements(self, program):
@@ -101,6 +114,34 @@ class ProgramCourseRunSeatsCondition(SingleItemConsumptionConditionMixin, Condit
                 return True
         return False
 
+    def get_remote_lookups(self, offer, basket, snapshot):
+        """
+        Declares the program and LMS data needed to evaluate this condition, so it can be prefetched.
+
+        See ecommerce.extensions.offer.prefetch for details.
+        """
+        site_configuration = basket.site.siteconfiguration
+        if offer.partner != site_configuration.partner or basket.is_empty:
+            return []
+
+        program_key = ('program', str(self.program_uuid))
+        lookups = [RemoteLookup(program_key, get_program, (self.program_uuid, site_configuration))]
+        if site_configuration.enable_partial_program and basket.owner:
+            lookups.append(RemoteLookup(
+                ('program_condition.ownership', basket.owner.username, False),
+                self._get_user_ownership_data,
+                (basket, False),
+            ))
+
+            program = snapshot.get(program_key)
+            if isinstance(program, dict) and self._has_entitlements(program):
+                lookups.append(RemoteLookup(
+                    ('program_condition.ownership', basket.owner.username, True),
+                    self._get_user_ownership_data,
+                    (basket, True),
+                ))
+        return lookups
+
     @check_condition_applicability()
     def is_satisfied(self, offer, basket):  # pylint: disable=unused-argument
         """
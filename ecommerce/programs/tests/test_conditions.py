@@ -243,6 +243,36 @@ class ProgramCourseRunSeatsConditionTests(ProgramTestMixin, TestCase):
                         return_value=program):
             self.assertTrue(self.condition.is_satisfied(offer, basket))
 
+    def test_get_remote_lookups(self):
+        """ The program and the user's enrollments should be prefetched, and entitlements once they are needed. """
+        offer = factories.ProgramOfferFactory(partner=self.partner, condition=self.condition)
+        basket = BasketFactory(site=self.site, owner=UserFactory())
+        basket.add_product(self.test_product)
+        program_key = ('program', str(self.condition.program_uuid))
+
+        lookups = self.condition.get_remote_lookups(offer, basket, {})
+        self.assertEqual(
+            [lookup.key for lookup in lookups],
+            [program_key, ('program_condition.ownership', basket.owner.username, False)]
+        )
+
+        program = {'courses': [{'entitlements': [{'mode': 'verified', 'sku': 'ABC'}]}]}
+        lookups = self.condition.get_remote_lookups(offer, basket, {program_key: program})
+        self.assertEqual(lookups[-1].key, ('program_condition.ownership', basket.owner.username, True))
+
+        basket.flush()
+        self.assertEqual(self.condition.get_remote_lookups(offer, basket, {}), [])
+
+    @httpretty.activate
+    def test_get_user_ownership_data_cached_for_request(self):
+        """ Ownership data, including traversed entitlement pages, should only be retrieved once per request. """
+        self.mock_access_token_response()
+        basket = BasketFactory(site=self.site, owner=UserFactory())
+        with mock.patch.object(self.condition, '_get_lms_resource', return_value=[]) as mock_get_lms_resource:
+            self.condition._get_user_ownership_data(basket, retrieve_entitlements=True)  # pylint: disable=protected-access
+            self.condition._get_user_ownership_data(basket, retrieve_entitlements=True)  # pylint: disable=protected-access
+        self.assertEqual(mock_get_lms_resource.call_count, 2)
+
     @httpretty.activate
     def test_is_satisfied_program_without_entitlements(self):
         """
@@ -108,6 +108,9 @@ FULFILLMENT_MODULES = [
     'ecommerce.extensions.fulfillment.modules.DonationsFromCheckoutTestFulfillmentModule',
 ]
 
+# Maximum number of Fulfillment Modules fulfilling the lines of an order concurrently, outside of a transaction
+FULFILLMENT_MODULES_MAX_WORKERS = 4
+
 HAYSTACK_CONNECTIONS = {
     'default': {
         'ENGINE': 'haystack.backends.simple_backend.SimpleEngine',
@@ -308,9 +311,18 @@ OSCAR_DASHBOARD_NAVIGATION = [
 # Default timeout for Enrollment API calls
 ENROLLMENT_FULFILLMENT_TIMEOUT = 7
 
+# Maximum number of Enrollment API calls made concurrently when fulfilling the lines of an order
+ENROLLMENT_FULFILLMENT_MAX_WORKERS = 8
+
 # Coupon code length
 VOUCHER_CODE_LENGTH = 16
 
+# Number of vouchers and offers inserted per query when creating the codes of a coupon
+VOUCHER_BULK_CREATE_BATCH_SIZE = 500
+
+# Number of vouchers loaded per query when generating a coupon report
+COUPON_REPORT_CHUNK_SIZE = 500
+
 THUMBNAIL_DEBUG = False
 
 OSCAR_FROM_EMAIL = 'testing@example.com'
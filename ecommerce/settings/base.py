@@ -267,12 +267,24 @@ CREDIT_PROVIDER_CACHE_TIMEOUT = 600
 # Anonymous User Calculate Cache timeout
 ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT = 3600  # Value is in seconds.
 
+# Maximum number of quotes calculated by a single basket calculate batch request
+BASKET_CALCULATE_BATCH_MAX_QUOTES = 50
+
+# Number of manual enrollment orders placed in a single transaction
+MANUAL_ENROLLMENT_ORDER_CHUNK_SIZE = 100
+
 # LMS API settings used for fetching information from LMS
 LMS_API_CACHE_TIMEOUT = 30  # Value is in seconds.
 # END URL CONFIGURATION
 
 VOUCHER_CACHE_TIMEOUT = 10  # Value is in seconds.
 
+# Maximum age of the in-process offer index used by the Applicator.
+OFFER_INDEX_CACHE_TIMEOUT = 300  # Value is in seconds.
+
+# Number of threads used to prefetch the remote data needed by offer conditions. Set to 0 to disable prefetching.
+OFFER_CONDITION_PREFETCH_MAX_WORKERS = 4
+
 SDN_CHECK_REQUEST_TIMEOUT = 5  # Value is in seconds.
 
 # APP CONFIGURATION
@@ -556,9 +568,14 @@ BROKER_HEARTBEAT_CHECKRATE = 2
 # See http://celery.readthedocs.io/en/latest/userguide/configuration.html#imports.
 CELERY_IMPORTS = (
     'ecommerce_worker.fulfillment.v1.tasks',
+    'ecommerce.extensions.payment.tasks',
 )
 
 DEFAULT_PRIORITY_QUEUE = 'ecommerce.default'
+# Tasks of this service are consumed by its own worker, as the ecommerce worker doesn't register them:
+#   celery -A ecommerce.celery_app:app worker -Q ecommerce.payment
+# The emit_queued_boletas command must also run from cron, to emit the boletas whose task was lost.
+PAYMENT_QUEUE = 'ecommerce.payment'
 CELERY_DEFAULT_EXCHANGE = 'ecommerce'
 CELERY_DEFAULT_ROUTING_KEY = 'ecommerce'
 CELERY_DEFAULT_QUEUE = DEFAULT_PRIORITY_QUEUE
@@ -570,6 +587,8 @@ CELERY_ROUTES = {
     'ecommerce_worker.sailthru.v1.tasks.send_offer_update_email': {'queue': 'ecommerce.email_marketing'},
     'ecommerce_worker.sailthru.v1.tasks.send_offer_usage_email': {'queue': 'ecommerce.email_marketing'},
     'ecommerce_worker.sailthru.v1.tasks.send_code_assignment_nudge_email': {'queue': 'ecommerce.email_marketing'},
+    'ecommerce.extensions.payment.tasks.emit_boleta': {'queue': PAYMENT_QUEUE},
+    'ecommerce.extensions.payment.tasks.refresh_paypal_web_profile': {'queue': PAYMENT_QUEUE},
 }
 
 # Prevent Celery from removing handlers on the root logger. Allows setting custom logging handlers.